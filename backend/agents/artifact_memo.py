@@ -0,0 +1,208 @@
+"""
+Memo de artefatos gerados pelos especialistas (arquivos, designs, páginas).
+
+Usuários pedem o mesmo PDF/Excel de novo ou o frontend reenvia o pedido
+depois de um soluço; sem memo, tudo é refeito (LLM, render, upload). Aqui o
+resultado final do especialista é guardado pela chave:
+
+  rota + argumentos normalizados (espaços/caixa) + versão do agente
+  (prompt + tools, ver qa_policy.prompt_version) + modelo da rota
+
+Quando os argumentos não trazem os dados (ex: fast path do pré-roteador,
+"gere um PDF com o resumo"), o texto das últimas mensagens do usuário entra
+na chave — o mesmo pedido em outra conversa é outro arquivo.
+
+Um hit só vale enquanto o artefato existir: expira em artifact_memo_ttl_seconds
+e, para resultados com link de download, um HEAD confirma que o arquivo
+ainda está no Storage. "regenerate": true no corpo do chat ignora o memo
+(o novo resultado substitui o antigo).
+
+Compartilhado entre os workers via SQLite em workspace_path.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifact_memo (
+    key TEXT PRIMARY KEY,
+    route TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS artifact_memo_created ON artifact_memo(created_at);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+_DOWNLOAD_LINK = re.compile(r"\]\((https?://[^)]+)\)")
+# Argumentos que carregam o conteúdo; sem eles o pedido depende da conversa
+_DATA_ARGS = ("data", "file_url")
+# Mensagens do usuário que entram na chave quando os argumentos não bastam
+_CONTEXT_MESSAGES = 3
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip().casefold()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def memo_key(route: str, func_args: dict, context: list, model: str) -> str:
+    from backend.agents.qa_policy import prompt_version
+    material = {"route": route, "args": _normalize(func_args), "version": prompt_version(route), "model": model}
+    if not any(str(func_args.get(name) or "").strip() for name in _DATA_ARGS):
+        material["context"] = [
+            _normalize(str(m.get("content", "")))
+            for m in context if m.get("role") == "user"
+        ][-_CONTEXT_MESSAGES:]
+    return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ArtifactMemo:
+    """Resultados de especialistas por chave de conteúdo, com TTL e validação do link."""
+
+    def __init__(self, db_path: Path, ttl: float = 86400.0, enabled: bool = True):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.enabled = enabled
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = {}
+
+    # ── API async ─────────────────────────────────────
+
+    async def get(self, route: str, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            row = await asyncio.to_thread(self._load, key)
+        except Exception as e:
+            logger.warning(f"[MEMO] Falha lendo memo: {e}")
+            self._count(route, "errors")
+            return None
+        if row is None:
+            self._count(route, "misses")
+            return None
+        result, created_at = row
+        if time.time() - created_at > self.ttl or not await _links_alive(result):
+            self._count(route, "stale")
+            await self._delete(key)
+            return None
+        self._count(route, "hits")
+        return result
+
+    async def put(self, route: str, key: str, result: str):
+        if not self.enabled or not result.strip() or result.startswith("Erro"):
+            return
+        try:
+            await asyncio.to_thread(self._store, key, route, result)
+            self._count(route, "stored")
+        except Exception as e:
+            logger.warning(f"[MEMO] Falha gravando memo: {e}")
+            self._count(route, "errors")
+
+    def record_bypass(self, route: str):
+        self._count(route, "bypassed")
+
+    async def _delete(self, key: str):
+        try:
+            await asyncio.to_thread(lambda: self._conn().execute("DELETE FROM artifact_memo WHERE key = ?", (key,)))
+        except Exception as e:
+            logger.warning(f"[MEMO] Falha removendo entrada: {e}")
+
+    def _count(self, route: str, kind: str):
+        with self._stats_lock:
+            entry = self._stats.setdefault(
+                route, {"hits": 0, "misses": 0, "stale": 0, "stored": 0, "bypassed": 0, "errors": 0}
+            )
+            entry[kind] += 1
+
+    # ── SQLite (roda em thread) ───────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _load(self, key: str) -> Optional[tuple[str, float]]:
+        conn = self._conn()
+        row = conn.execute("SELECT result, created_at FROM artifact_memo WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE artifact_memo SET hits = hits + 1 WHERE key = ?", (key,))
+        return row
+
+    def _store(self, key: str, route: str, result: str):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO artifact_memo (key, route, result, created_at, hits) VALUES (?, ?, ?, ?, 0)",
+            (key, route, result, now),
+        )
+        conn.execute("DELETE FROM artifact_memo WHERE created_at < ?", (now - self.ttl,))
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            routes = {
+                route: {
+                    **entry,
+                    "hit_rate": round(entry["hits"] / lookups, 3) if (lookups := entry["hits"] + entry["misses"] + entry["stale"]) else None,
+                }
+                for route, entry in self._stats.items()
+            }
+        return {"enabled": self.enabled, "ttl_seconds": self.ttl, "routes": routes}
+
+
+async def _links_alive(result: str) -> bool:
+    """HEAD nos links de download do resultado: arquivo removido do Storage invalida o memo."""
+    from backend.core.http_client import request as http_request
+    for url in _DOWNLOAD_LINK.findall(result):
+        try:
+            response = await http_request("HEAD", url, timeout=5.0, follow_redirects=True)
+        except Exception as e:
+            logger.info(f"[MEMO] Link do memo inacessível ({e}) — regenerando")
+            return False
+        if response.status_code >= 400:
+            logger.info(f"[MEMO] Link do memo expirou ({response.status_code}) — regenerando")
+            return False
+    return True
+
+
+_memo: Optional[ArtifactMemo] = None
+
+
+def get_artifact_memo() -> ArtifactMemo:
+    """Retorna o memo singleton, configurado a partir de AgentConfig."""
+    global _memo
+    if _memo is None:
+        from backend.core.config import get_config
+        config = get_config()
+        _memo = ArtifactMemo(
+            db_path=config.workspace_path / "artifact_memo.sqlite3",
+            ttl=config.artifact_memo_ttl_seconds,
+            enabled=config.artifact_memo_enable,
+        )
+    return _memo
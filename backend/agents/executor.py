@@ -1,7 +1,10 @@
 """
 Execução de ferramentas para os agentes especialistas.
 
-Cada função de ferramenta está isolada aqui, desacoplada do endpoint HTTP.
+Cada função de ferramenta está isolada aqui, desacoplada do endpoint HTTP,
+e declarada com @tool (agents/tool_registry.py): schema dos argumentos,
+timeout, limite de concorrência, executor e se o resultado é cacheável.
+O JSON de tools enviado ao OpenRouter (agents/tools.py) sai dessas declarações.
 """
 
 import asyncio
@@ -11,83 +14,166 @@ import os
 import tempfile
 import time
 
-import httpx
+from backend.agents.tool_registry import get_tool_runner, tool
+from backend.core.http_client import request as http_request
+from backend.core.tracing import span
 
 logger = logging.getLogger(__name__)
 
 
 async def execute_tool(func_name: str, func_args: dict) -> str:
     """Despachante principal: executa a ferramenta e retorna resultado como string."""
-    if func_name == "web_search":
-        return await _web_search(func_args.get("query", ""))
-
-    elif func_name == "web_fetch":
-        return await _web_fetch(func_args.get("url", ""))
-
-    elif func_name == "generate_pdf":
-        return await _generate_pdf(func_args)
-
-    elif func_name == "generate_excel":
-        return await _generate_excel(func_args)
-
-    elif func_name == "execute_python":
-        return await _execute_python(func_args.get("code", ""))
-
-    elif func_name == "fetch_file_content":
-        return await _fetch_file_content(func_args.get("url", ""))
-
-    elif func_name == "modify_excel":
-        return await _modify_excel(func_args)
-
-    elif func_name == "modify_pptx":
-        return await _modify_pptx(func_args)
-
-    elif func_name == "modify_pdf":
-        return await _modify_pdf(func_args)
-
-    elif func_name == "ask_browser":
-        return await _ask_browser(func_args)
-
-    elif func_name == "generate_pdf_template":
-        return await _generate_pdf_template(func_args)
-
-    elif func_name == "use_design_template":
-        return await _use_design_template(func_args)
-
-    return f"Ferramenta desconhecida: {func_name}"
+    with span("tool.execute", tool=func_name) as s:
+        result = await get_tool_runner().run(func_name, func_args)
+        s.set(result_chars=len(result))
+        return result
 
 
 # ── Implementações ─────────────────────────────────────────────────────────────
 
-async def _web_search(query: str) -> str:
+@tool(
+    "web_search",
+    "Pesquisa informações atualizadas na internet",
+    {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Consulta de busca"
+            }
+        },
+        "required": [
+            "query"
+        ]
+    },
+    timeout=30, concurrency=4, cacheable=True,
+)
+async def _web_search(args: dict) -> str:
     from backend.services.search_service import search_web_formatted
-    return await search_web_formatted(query)
-
-
-async def _web_fetch(url: str) -> str:
-    try:
-        from bs4 import BeautifulSoup
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            response = await client.get(
-                url, headers={"User-Agent": "ArccoAgent/2.0"}, follow_redirects=True
-            )
-            html = response.text
-
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside", "form", "svg", "noscript"]):
-            tag.decompose()
-
-        text = soup.get_text(separator=" ", strip=True)
-        title = soup.title.string if soup.title else url
-
-        if len(text) > 20000:
-            text = text[:20000] + "... [Truncado]"
-
-        return f"**Conteúdo de {url}**\n**Título:** {title}\n\n{text}"
-    except Exception as e:
-        return f"Erro ao ler URL ({url}): {e}"
-
+    return await search_web_formatted(args.get("query", ""))
+
+
+@tool(
+    "web_fetch",
+    "Lê e extrai texto de uma URL específica",
+    {
+        "type": "object",
+        "properties": {
+            "url": {
+                "type": "string",
+                "description": "URL para acessar"
+            }
+        },
+        "required": [
+            "url"
+        ]
+    },
+    timeout=30, concurrency=8, cacheable=True,
+)
+async def _web_fetch(args: dict) -> str:
+    from backend.services.web_fetcher import fetch_page
 
+    url = args.get("url", "")
+    page = await fetch_page(url, max_chars=20000)
+    if page.error:
+        return f"Erro ao ler URL ({url}): {page.error}"
+    return f"**Conteúdo de {url}**\n**Título:** {page.title or url}\n\n{page.text}"
+
+
+@tool(
+    "ask_browser",
+    (
+        "Abre um navegador headless para acessar, interagir e extrair conteúdo de um site. "
+        "Suporta ações como clicar em botões, rolar a página, digitar texto, e executar JavaScript. "
+        "Use quando precisar ler artigos completos, interagir com sites dinâmicos (SPAs), passar por carrosséis, "
+        "aceitar cookies, ou extrair dados de URLs que exigem renderização JavaScript.\n\n"
+        "TIPOS DE ACTIONS SUPORTADAS (no campo 'actions'):\n"
+        "- {\"type\": \"click\", \"selector\": \"CSS_SELECTOR\"} — Clica num elemento\n"
+        "- {\"type\": \"scroll\", \"direction\": \"down\", \"amount\": 500} — Rola a página\n"
+        "- {\"type\": \"wait\", \"milliseconds\": 2000} — Espera X ms\n"
+        "- {\"type\": \"write\", \"text\": \"...\", \"selector\": \"CSS_SELECTOR\"} — Digita texto\n"
+        "- {\"type\": \"press\", \"key\": \"Enter\"} — Pressiona tecla\n"
+        "- {\"type\": \"screenshot\"} — Tira print da página\n"
+        "- {\"type\": \"execute_javascript\", \"script\": \"...\"} — Executa JS customizado\n"
+        "- {\"type\": \"scrape\"} — Extrai o conteúdo após as ações\n\n"
+        "EXEMPLO de carrossel: actions=[{\"type\":\"click\",\"selector\":\".next-slide\"},{\"type\":\"wait\",\"milliseconds\":1000},{\"type\":\"scrape\"}]"
+    ),
+    {
+        "type": "object",
+        "properties": {
+            "url": {
+                "type": "string",
+                "description": "URL completa do site a ser acessado (ex: https://example.com/artigo)"
+            },
+            "actions": {
+                "type": "array",
+                "description": "Lista de ações a executar no browser ANTES de extrair o conteúdo. Cada ação é um objeto com 'type' obrigatório. Tipos: click, scroll, wait, write, press, screenshot, execute_javascript, scrape.",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "type": {
+                            "type": "string",
+                            "enum": ["click", "scroll", "wait", "write", "press", "screenshot", "execute_javascript", "scrape"],
+                            "description": "Tipo da ação"
+                        },
+                        "selector": {
+                            "type": "string",
+                            "description": "Seletor CSS do elemento (para click e write)"
+                        },
+                        "text": {
+                            "type": "string",
+                            "description": "Texto a digitar (para write)"
+                        },
+                        "key": {
+                            "type": "string",
+                            "description": "Tecla a pressionar (para press): Enter, Tab, Escape, etc."
+                        },
+                        "direction": {
+                            "type": "string",
+                            "enum": ["up", "down"],
+                            "description": "Direção do scroll"
+                        },
+                        "amount": {
+                            "type": "integer",
+                            "description": "Pixels para scroll"
+                        },
+                        "milliseconds": {
+                            "type": "integer",
+                            "description": "Milissegundos para wait"
+                        },
+                        "script": {
+                            "type": "string",
+                            "description": "Código JavaScript a executar"
+                        }
+                    },
+                    "required": ["type"]
+                }
+            },
+            "wait_for": {
+                "type": "integer",
+                "description": "Milissegundos para esperar antes de extrair conteúdo. Útil para SPAs que carregam via JavaScript. Padrão: sem espera."
+            },
+            "mobile": {
+                "type": "boolean",
+                "description": "Se true, acessa o site em modo mobile (viewport de celular). Útil para sites responsivos."
+            },
+            "include_tags": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Tags HTML para incluir na extração (ex: ['article', 'main']). Filtra o conteúdo."
+            },
+            "exclude_tags": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Tags HTML para excluir da extração (ex: ['nav', 'footer', 'aside']). Remove ruído."
+            }
+        },
+        "required": [
+            "url"
+        ]
+    },
+    timeout=180, concurrency=2,
+)
 async def _ask_browser(args: dict) -> str:
     """
     Navega remotamente via Browserbase + Playwright (CDP).
@@ -109,6 +195,41 @@ async def _ask_browser(args: dict) -> str:
     )
 
 
+@tool(
+    "generate_pdf",
+    (
+        "Gera um PDF profissional e retorna o link de download. "
+        "MODO PLAYWRIGHT (recomendado para PDFs visuais): forneça 'html_content' com HTML completo e Tailwind CSS — o resultado visual é infinitamente superior. "
+        "MODO TEXTO (fallback): forneça 'title' + 'content' em markdown simples."
+    ),
+    {
+        "type": "object",
+        "properties": {
+            "title": {
+                "type": "string",
+                "description": "Título do documento (usado no modo texto)"
+            },
+            "content": {
+                "type": "string",
+                "description": "Conteúdo em texto/markdown (usado no modo texto quando html_content não é fornecido)"
+            },
+            "html_content": {
+                "type": "string",
+                "description": (
+                    "HTML completo com estilos Tailwind CSS embutidos para gerar um PDF visualmente rico. "
+                    "Inclua <!DOCTYPE html>, <head> com <script src='https://cdn.tailwindcss.com'></script>, e todo o conteúdo no <body>. "
+                    "Use classes Tailwind para cores, tipografia, tabelas, grids. Fundo branco, fonte sans-serif."
+                )
+            },
+            "filename": {
+                "type": "string",
+                "description": "Nome do arquivo sem extensão"
+            }
+        },
+        "required": []
+    },
+    timeout=120, concurrency=2,
+)
 async def _generate_pdf(args: dict) -> str:
     from backend.core.config import get_config
     from backend.core.supabase_client import upload_to_supabase
@@ -146,6 +267,47 @@ async def _generate_pdf(args: dict) -> str:
     )
 
 
+@tool(
+    "generate_pdf_template",
+    (
+        "Gera um PDF usando um template HTML pré-aprovado (Jinja2). "
+        "O LLM fornece apenas os dados (JSON); o design profissional vem do template. "
+        "Use para relatórios e propostas com visual padronizado e consistente."
+    ),
+    {
+        "type": "object",
+        "properties": {
+            "template_name": {
+                "type": "string",
+                "enum": ["relatorio", "proposta"],
+                "description": (
+                    "'relatorio': Relatório com KPIs, tabelas e seções. "
+                    "'proposta': Proposta comercial com capa, entregas e investimento."
+                )
+            },
+            "data": {
+                "type": "object",
+                "description": (
+                    "JSON com os dados para injetar no template. "
+                    "Para 'relatorio': {titulo, subtitulo?, empresa?, data?, periodo?, resumo?, "
+                    "metricas?: [{label, valor, variacao?, positivo?}], "
+                    "secoes: [{titulo, texto?, tabela?: {colunas, linhas}, lista?}], conclusao?}. "
+                    "Para 'proposta': {titulo, subtitulo?, empresa_origem?, empresa_destino?, data?, validade?, "
+                    "contexto?, solucao?, "
+                    "entregas?: [{titulo, descricao?}], "
+                    "investimento?: {itens: [{servico, descricao?, valor}], total, condicoes?}, "
+                    "proximos_passos?: [...], cta?, contato?, email?}."
+                )
+            },
+            "filename": {
+                "type": "string",
+                "description": "Nome do arquivo sem extensão"
+            }
+        },
+        "required": ["template_name", "data"]
+    },
+    timeout=120, concurrency=2,
+)
 async def _generate_pdf_template(args: dict) -> str:
     from backend.core.config import get_config
     from backend.core.supabase_client import upload_to_supabase
@@ -178,6 +340,82 @@ async def _generate_pdf_template(args: dict) -> str:
     )
 
 
+@tool(
+    "use_design_template",
+    (
+        "Seleciona um template HTML pré-construído do catálogo e preenche com conteúdo real. "
+        "Use SEMPRE que criar qualquer design visual de página única (poster, card, convite, "
+        "briefing, email visual, folder, post de Instagram). "
+        "Para apresentações multi-slide, gere HTML diretamente sem usar esta ferramenta."
+    ),
+    {
+        "type": "object",
+        "properties": {
+            "slug": {
+                "type": "string",
+                "description": "Slug exato do template conforme catálogo no system prompt. Ex: 'apresentacoes/ia-apresentacao-aurora-hero-split'",
+            },
+            "title": {
+                "type": "string",
+                "description": "Texto para substituir o <h1> principal do template.",
+            },
+            "eyebrow": {
+                "type": "string",
+                "description": "Label/tag pequena acima do título (uppercase, curta). Ex: 'NOVIDADE', 'LANÇAMENTO 2026'",
+            },
+            "subtitle": {
+                "type": "string",
+                "description": "Parágrafo de descrição/subtítulo (substitui .lede). Máx 2 frases.",
+            },
+            "footer": {
+                "type": "string",
+                "description": "Texto do rodapé. Ex: 'empresa | categoria'",
+            },
+            "heading": {
+                "type": "string",
+                "description": "Subtítulo secundário para <h2>, se houver no template.",
+            },
+            "pexels_query": {
+                "type": "string",
+                "description": (
+                    "Termos de busca para encontrar uma foto real no Pexels (preferível a image_url). "
+                    "Use em inglês para melhores resultados. Ex: 'wedding flowers elegant', "
+                    "'business meeting modern office', 'electronic music neon lights'. "
+                    "Deixe em branco para manter o placeholder decorativo SVG do template."
+                ),
+            },
+            "image_url": {
+                "type": "string",
+                "description": (
+                    "URL direta de imagem (use apenas se tiver uma URL específica). "
+                    "Prefira pexels_query para busca automática de imagem relevante."
+                ),
+            },
+            "extra_patches": {
+                "type": "array",
+                "description": "Substituições adicionais de texto para outros elementos do template.",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "find": {"type": "string", "description": "Texto exato a encontrar no HTML"},
+                        "replace": {"type": "string", "description": "Texto de substituição"},
+                    },
+                    "required": ["find", "replace"],
+                },
+            },
+            "color_overrides": {
+                "type": "object",
+                "description": (
+                    "Sobrescreve variáveis CSS de cor do template. "
+                    "Variáveis disponíveis: --accent, --accent-2, --accent-3, --bg, --bg2. "
+                    "Ex: {\"--accent\": \"#e63946\", \"--bg\": \"#0a0a0a\"}"
+                ),
+            },
+        },
+        "required": ["slug"],
+    },
+    timeout=60,
+)
 async def _use_design_template(args: dict) -> str:
     """Aplica um template de design pré-construído e retorna HTML standalone."""
     from backend.services.template_service import get_template_html, apply_content, search_pexels_image
@@ -219,50 +457,105 @@ async def _use_design_template(args: dict) -> str:
     return html
 
 
-async def _generate_excel(args: dict) -> str:
+@tool(
+    "generate_excel",
+    "Gera uma planilha Excel (.xlsx) com dados estruturados e retorna o link de download",
+    {
+        "type": "object",
+        "properties": {
+            "title": {
+                "type": "string",
+                "description": "Nome da aba (máximo 31 caracteres)"
+            },
+            "headers": {
+                "type": "array",
+                "items": {
+                    "type": "string"
+                },
+                "description": "Cabeçalhos das colunas"
+            },
+            "rows": {
+                "type": "array",
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "string"
+                    }
+                },
+                "description": "Linhas de dados"
+            },
+            "filename": {
+                "type": "string",
+                "description": "Nome do arquivo (sem extensão)"
+            }
+        },
+        "required": [
+            "title",
+            "headers",
+            "rows"
+        ]
+    },
+    timeout=60, executor="thread",
+)
+def _generate_excel(args: dict) -> str:
+    """Síncrona: openpyxl + upload rodam inteiros numa thread (executor="thread")."""
     from backend.core.config import get_config
     from backend.core.supabase_client import upload_to_supabase
     from openpyxl import Workbook
 
     config = get_config()
-
-    def sync_excel():
-        headers = [str(h) for h in args.get("headers", [])]
-        rows = [[str(c) for c in row] for row in args.get("rows", [])]
-        title = args.get("title", "Planilha")[:31]
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = title
-        ws.append(headers)
-        for row in rows:
-            ws.append(row)
-
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        file_bytes = buffer.getvalue()
-
-        filename = args.get("filename", f"planilha-{int(time.time())}")
-        if not filename.endswith(".xlsx"):
-            filename += ".xlsx"
-
-        return upload_to_supabase(
-            config.supabase_storage_bucket,
-            filename,
-            file_bytes,
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-
-    url = await asyncio.to_thread(sync_excel)
+    headers = [str(h) for h in args.get("headers", [])]
+    rows = [[str(c) for c in row] for row in args.get("rows", [])]
+    title = str(args.get("title", "Planilha"))[:31]
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    file_bytes = buffer.getvalue()
+
+    filename = args.get("filename", f"planilha-{int(time.time())}")
+    if not filename.endswith(".xlsx"):
+        filename += ".xlsx"
+
+    url = upload_to_supabase(
+        config.supabase_storage_bucket,
+        filename,
+        file_bytes,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
     return (
         f"Planilha Excel gerada. URL: {url}\n\n"
         f"INSTRUÇÃO OBRIGATÓRIA: Inclua exatamente este link na resposta final: [Baixar Planilha]({url})"
     )
 
 
-async def _execute_python(code: str) -> str:
+@tool(
+    "execute_python",
+    "Executa Python para processar e formatar dados complexos. Use print() para output.",
+    {
+        "type": "object",
+        "properties": {
+            "code": {
+                "type": "string",
+                "description": "Código Python a executar"
+            }
+        },
+        "required": [
+            "code"
+        ]
+    },
+    timeout=30, concurrency=2,
+)
+async def _execute_python(args: dict) -> str:
     from backend.core.config import get_config
     config = get_config()
+    code = args.get("code", "")
 
     if not config.allow_code_execution:
         return "❌ Execução de código desabilitada neste ambiente."
@@ -311,11 +604,28 @@ async def _execute_python(code: str) -> str:
 
 # ── Modificador de Arquivos ────────────────────────────────────────────────────
 
-async def _fetch_file_content(url: str) -> str:
+@tool(
+    "fetch_file_content",
+    "Baixa e lê a estrutura de um arquivo (PDF, Excel, PPTX) antes de modificar. Sempre chame isso primeiro.",
+    {
+        "type": "object",
+        "properties": {
+            "url": {
+                "type": "string",
+                "description": "URL do arquivo a ser lido"
+            }
+        },
+        "required": [
+            "url"
+        ]
+    },
+    timeout=60, concurrency=4, cacheable=True,
+)
+async def _fetch_file_content(args: dict) -> str:
     """Baixa um arquivo e retorna sua estrutura como texto legível."""
+    url = args.get("url", "")
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, follow_redirects=True)
+        response = await http_request("GET", url, follow_redirects=True, timeout=30.0)
         if response.status_code != 200:
             return f"Erro ao baixar arquivo: HTTP {response.status_code}"
 
@@ -388,6 +698,75 @@ def _read_pdf_text(file_bytes: bytes) -> str:
     return "\n".join(lines)
 
 
+@tool(
+    "modify_excel",
+    "Modifica uma planilha Excel (.xlsx) e retorna link de download",
+    {
+        "type": "object",
+        "properties": {
+            "url": {
+                "type": "string",
+                "description": "URL da planilha original"
+            },
+            "cell_updates": {
+                "type": "array",
+                "description": "Células a atualizar",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "sheet": {
+                            "type": "string",
+                            "description": "Nome da aba (opcional, usa a primeira se omitido)"
+                        },
+                        "cell": {
+                            "type": "string",
+                            "description": "Referência da célula (ex: A1, B3)"
+                        },
+                        "value": {
+                            "type": "string",
+                            "description": "Novo valor"
+                        }
+                    },
+                    "required": [
+                        "cell",
+                        "value"
+                    ]
+                }
+            },
+            "append_rows": {
+                "type": "array",
+                "description": "Linhas a adicionar no final da aba",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "sheet": {
+                            "type": "string",
+                            "description": "Nome da aba (opcional)"
+                        },
+                        "values": {
+                            "type": "array",
+                            "items": {
+                                "type": "string"
+                            },
+                            "description": "Valores da linha"
+                        }
+                    },
+                    "required": [
+                        "values"
+                    ]
+                }
+            },
+            "output_filename": {
+                "type": "string",
+                "description": "Nome do arquivo modificado (sem extensão)"
+            }
+        },
+        "required": [
+            "url"
+        ]
+    },
+    timeout=120,
+)
 async def _modify_excel(args: dict) -> str:
     from backend.core.config import get_config
     from backend.core.supabase_client import upload_to_supabase
@@ -399,8 +778,7 @@ async def _modify_excel(args: dict) -> str:
     output_filename = args.get("output_filename", f"planilha-modificada")
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, follow_redirects=True)
+        response = await http_request("GET", url, follow_redirects=True, timeout=30.0)
         if response.status_code != 200:
             return f"Erro ao baixar planilha: HTTP {response.status_code}"
         file_bytes = response.content
@@ -440,6 +818,49 @@ async def _modify_excel(args: dict) -> str:
     )
 
 
+@tool(
+    "modify_pptx",
+    "Modifica uma apresentação PowerPoint (.pptx) substituindo textos e retorna link de download",
+    {
+        "type": "object",
+        "properties": {
+            "url": {
+                "type": "string",
+                "description": "URL da apresentação original"
+            },
+            "text_replacements": {
+                "type": "array",
+                "description": "Substituições de texto em todos os slides",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "find": {
+                            "type": "string",
+                            "description": "Texto a encontrar"
+                        },
+                        "replace": {
+                            "type": "string",
+                            "description": "Texto de substituição"
+                        }
+                    },
+                    "required": [
+                        "find",
+                        "replace"
+                    ]
+                }
+            },
+            "output_filename": {
+                "type": "string",
+                "description": "Nome do arquivo modificado (sem extensão)"
+            }
+        },
+        "required": [
+            "url",
+            "text_replacements"
+        ]
+    },
+    timeout=120,
+)
 async def _modify_pptx(args: dict) -> str:
     from backend.core.config import get_config
     from backend.core.supabase_client import upload_to_supabase
@@ -450,8 +871,7 @@ async def _modify_pptx(args: dict) -> str:
     output_filename = args.get("output_filename", f"apresentacao-modificada")
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, follow_redirects=True)
+        response = await http_request("GET", url, follow_redirects=True, timeout=30.0)
         if response.status_code != 200:
             return f"Erro ao baixar apresentação: HTTP {response.status_code}"
         file_bytes = response.content
@@ -491,6 +911,52 @@ async def _modify_pptx(args: dict) -> str:
     )
 
 
+@tool(
+    "modify_pdf",
+    "Modifica um PDF existente (extrai texto, aplica alterações, regera o documento) e retorna link de download",
+    {
+        "type": "object",
+        "properties": {
+            "url": {
+                "type": "string",
+                "description": "URL do PDF original"
+            },
+            "text_replacements": {
+                "type": "array",
+                "description": "Substituições de texto no documento",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "find": {
+                            "type": "string",
+                            "description": "Texto a encontrar"
+                        },
+                        "replace": {
+                            "type": "string",
+                            "description": "Texto de substituição"
+                        }
+                    },
+                    "required": [
+                        "find",
+                        "replace"
+                    ]
+                }
+            },
+            "append_content": {
+                "type": "string",
+                "description": "Conteúdo adicional a inserir no final do documento"
+            },
+            "output_filename": {
+                "type": "string",
+                "description": "Nome do arquivo modificado (sem extensão)"
+            }
+        },
+        "required": [
+            "url"
+        ]
+    },
+    timeout=120,
+)
 async def _modify_pdf(args: dict) -> str:
     from backend.core.config import get_config
     from backend.core.supabase_client import upload_to_supabase
@@ -502,8 +968,7 @@ async def _modify_pdf(args: dict) -> str:
     output_filename = args.get("output_filename", f"documento-modificado")
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, follow_redirects=True)
+        response = await http_request("GET", url, follow_redirects=True, timeout=30.0)
         if response.status_code != 200:
             return f"Erro ao baixar PDF: HTTP {response.status_code}"
         file_bytes = response.content
@@ -554,3 +1019,35 @@ async def _modify_pdf(args: dict) -> str:
         f"PDF modificado com sucesso. URL: {upload_url}\n\n"
         f"INSTRUÇÃO OBRIGATÓRIA: Inclua exatamente este link na resposta final: [Baixar PDF Modificado]({upload_url})"
     )
+
+
+# ── Saídas comprimidas ───────────────────────────────────────────────────────
+
+@tool(
+    "read_tool_output",
+    (
+        "Recupera o texto completo de uma saída de ferramenta que veio resumida "
+        "(marcador 'Saída resumida' com ref). Com query, devolve os trechos mais relevantes para ela."
+    ),
+    {
+        "type": "object",
+        "properties": {
+            "ref": {
+                "type": "string",
+                "description": "Referência indicada no marcador da saída resumida"
+            },
+            "query": {
+                "type": "string",
+                "description": "Opcional: o que procurar no texto completo"
+            }
+        },
+        "required": [
+            "ref"
+        ]
+    },
+    timeout=10,
+)
+async def _read_tool_output(args: dict) -> str:
+    """Saída original (ou outro recorte) de uma ferramenta comprimida (core/compression.py)."""
+    from backend.core.compression import get_tool_compressor
+    return get_tool_compressor().retrieve(args.get("ref", ""), args.get("query", ""))
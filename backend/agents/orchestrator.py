@@ -3,11 +3,19 @@ Orquestrador Multi-Agente do Arcco (Arquitetura Supervisor-Worker / ReAct).
 
 Fluxo de execução:
   1. O Agente Supervisor (único a conversar com o usuário) recebe a requisição.
+     Pedidos inequívocos ("crie uma planilha...", "faça um post...") pulam o
+     primeiro turno dele: o pré-roteador (agents/prerouter.py) já escolhe a ferramenta.
   2. O Supervisor decide se responde diretamente ou se usa Ferramentas (Sub-Agentes).
   3. Ao usar uma Ferramenta Não-Terminal (Busca, Arquivos):
       - O sub-agente executa a tarefa.
       - O Agente QA revisa (máx 2 tentativas).
       - O resultado volta para o Supervisor redigir a resposta final amigável.
+      - Várias ferramentas não-terminais no mesmo turno rodam em paralelo
+        (AgentConfig.tool_max_concurrency); os eventos SSE se intercalam e os
+        resultados voltam ao Supervisor na ordem original.
+      - AGENT_QA_MODE=speculative: o QA roda em paralelo com o próximo turno do
+        Supervisor, cuja saída fica retida até a aprovação; se o QA rejeitar,
+        o turno é descartado, o especialista corrige e o Supervisor responde de novo.
   4. Ao usar uma Ferramenta Terminal (Design, Dev HTML):
       - O sub-agente executa a tarefa.
       - O Agente QA revisa.
@@ -18,12 +26,22 @@ Fluxo de execução:
 import asyncio
 import json
 import logging
+import random
 import re
+import time
+from dataclasses import dataclass, field
 from typing import AsyncGenerator
 
-from backend.core.llm import call_openrouter, stream_openrouter
+from backend.core.compression import compression_query, get_tool_compressor
+from backend.core.llm import StreamedMessage, call_openrouter, stream_openrouter, system_message
+from backend.core.sse import sse_event
+from backend.core.tracing import span
 from backend.agents import registry
+from backend.agents.artifact_memo import get_artifact_memo, memo_key
 from backend.agents.executor import execute_tool
+from backend.agents.prerouter import PreRoute, preroute, record_agreement, record_decision
+from backend.agents.qa_policy import get_qa_policy
+from backend.core.session_store import Session, tool_result_key
 
 logger = logging.getLogger(__name__)
 
@@ -40,11 +58,14 @@ TOOL_MAP = {
 # Rotas que DEVEM conter links de download
 ROUTES_REQUIRING_LINK = {"file_generator", "file_modifier"}
 _MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\((https?://[^)]+)\)')
+# Gravações no memo aguardando o QA especulativo (referência forte até terminarem)
+_memo_tasks: set[asyncio.Task] = set()
 
 # ── Utilitários SSE ──────────────────────────────────────────────────────────
 
 def sse(event_type: str, content: str) -> str:
-    return f'data: {{"type": "{event_type}", "content": {json.dumps(content)}}}\n\n'
+    # Frame compartilhado com o builder; chunks são agrupados por core/sse.coalesce_sse no endpoint
+    return sse_event(event_type, content)
 
 
 # ── Agente QA ────────────────────────────────────────────────────────────────
@@ -64,22 +85,35 @@ async def _qa_review(
                 {"role": "system", "content": registry.get_prompt("qa")},
                 {"role": "user", "content": review_prompt},
             ],
-            model=registry.get_model("qa") or model,
+            model=await registry.pick_model("qa", default=model, output_tokens=300),
             max_tokens=300,
             temperature=0.1,
+            fallback_models=registry.get_fallback_models("qa"),
+            input_budget=registry.get_input_budget("qa"),
         )
         raw = data["choices"][0]["message"]["content"].strip()
         raw = re.sub(r"```(?:json)?\s*|\s*```", "", raw).strip()
         return json.loads(raw)
     except Exception as e:
         logger.warning(f"[QA] Erro na revisão: {e}")
-        return {"approved": True, "issues": []}  # Fail-open
+        return {"approved": True, "issues": [], "error": True}  # Fail-open (não conta na política)
+
+
+async def _qa_review_recorded(
+    user_intent: str, specialist_response: str, route: str, model: str, specialist_model: str
+) -> dict:
+    """_qa_review + registro do resultado na política de amostragem (agents/qa_policy.py)."""
+    with span("qa.review", route=route, model=specialist_model) as s:
+        qa_result = await _qa_review(user_intent, specialist_response, route, model)
+        s.set(approved=bool(qa_result.get("approved", True)), fail_open=bool(qa_result.get("error")))
+    if not qa_result.get("error"):
+        await get_qa_policy().record(route, specialist_model, qa_result.get("approved", True))
+    return qa_result
 
 
 # ── Validação Anti-Alucinação ────────────────────────────────────────────────
 
 _URL_PATTERN = re.compile(r'https?://[^\s\)\]"\'>]+', re.IGNORECASE)
-_DOC_TAG_RE = re.compile(r'<doc\s+title="([^"]+)">([\s\S]*?)</doc>', re.DOTALL)
 _MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\((https?://[^\)]+)\)', re.IGNORECASE)
 
 ROUTES_REQUIRING_LINK = {"file_generator", "file_modifier"}
@@ -134,8 +168,235 @@ def _validate_specialist_response(response: str, route: str, tool_messages: list
     return response
 
 
+# ── Streaming do Supervisor ──────────────────────────────────────────────────
+
+_DOC_OPEN_RE = re.compile(r'<doc\s+title="([^"]+)">')
+_DOC_OPEN, _DOC_CLOSE = "<doc", "</doc>"
+_DOC_OPEN_MAX_LEN = 300  # "<doc" sem ">" depois disso não é uma tag de documento
+
+# Texto do Supervisor segurado antes de assumir que é a resposta final. Se uma
+# tool call surgir antes disso, o texto vira "thought" (raciocínio) em vez de chunk.
+_ANSWER_HOLDBACK_CHARS = 160
+
+
+def _partial_suffix(text: str, token: str) -> int:
+    """Tamanho do maior sufixo de text que é prefixo de token (tag possivelmente cortada)."""
+    for size in range(min(len(token) - 1, len(text)), 0, -1):
+        if text.endswith(token[:size]):
+            return size
+    return 0
+
+
+class _DocTagFilter:
+    """
+    Detecta <doc title="...">...</doc> incrementalmente no texto em streaming.
+    As tags são removidas dos chunks; ao fechar o documento emite "text_doc".
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._doc_title: str | None = None  # não-None = dentro de um documento
+        self._doc_parts: list[str] = []
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        events: list[str] = []
+        while True:
+            if self._doc_title is None:
+                start = self._buffer.find(_DOC_OPEN)
+                if start == -1:
+                    safe = len(self._buffer) - _partial_suffix(self._buffer, _DOC_OPEN)
+                    self._emit(events, self._buffer[:safe])
+                    self._buffer = self._buffer[safe:]
+                    return events
+                self._emit(events, self._buffer[:start])
+                self._buffer = self._buffer[start:]
+                end = self._buffer.find(">")
+                if end == -1 and len(self._buffer) < _DOC_OPEN_MAX_LEN:
+                    return events  # tag de abertura ainda incompleta
+                match = _DOC_OPEN_RE.match(self._buffer[:end + 1]) if end != -1 else None
+                if not match:
+                    # "<doc" que não é a tag (ex: "<document>") segue como texto
+                    self._emit(events, self._buffer[:len(_DOC_OPEN)])
+                    self._buffer = self._buffer[len(_DOC_OPEN):]
+                    continue
+                self._doc_title = match.group(1).strip()
+                self._doc_parts = []
+                self._buffer = self._buffer[end + 1:].lstrip()
+            else:
+                end = self._buffer.find(_DOC_CLOSE)
+                if end == -1:
+                    safe = len(self._buffer) - _partial_suffix(self._buffer, _DOC_CLOSE)
+                    self._doc_parts.append(self._buffer[:safe])
+                    self._emit(events, self._buffer[:safe])
+                    self._buffer = self._buffer[safe:]
+                    return events
+                self._doc_parts.append(self._buffer[:end])
+                self._emit(events, self._buffer[:end])
+                events.append(sse("text_doc", json.dumps({
+                    "title": self._doc_title,
+                    "content": "".join(self._doc_parts).strip(),
+                })))
+                self._doc_title = None
+                self._buffer = self._buffer[end + len(_DOC_CLOSE):]
+
+    def flush(self) -> list[str]:
+        """Fim do stream: o que sobrou no buffer vai como texto (doc sem </doc> não gera text_doc)."""
+        events: list[str] = []
+        self._emit(events, self._buffer)
+        self._buffer = ""
+        return events
+
+    @staticmethod
+    def _emit(events: list[str], text: str):
+        if text:
+            events.append(sse("chunk", text))
+
+
+async def _stream_supervisor_turn(
+    messages: list,
+    model: str,
+    tools: list,
+    streamed: StreamedMessage,
+) -> AsyncGenerator[str, None]:
+    """
+    Uma chamada do Supervisor em streaming. Yields SSE; a mensagem completa
+    (texto + tool_calls) fica em `streamed`.
+
+    Até _ANSWER_HOLDBACK_CHARS o texto fica retido: se aparecer uma tool call,
+    ele é emitido como "thought"; caso contrário assume-se resposta final e
+    cada delta segue imediatamente como "chunk".
+
+    Tool call depois disso: o texto já mostrado era o preâmbulo da chamada. Sai
+    um evento "retract" (a UI apaga a resposta parcial e api/chat.py a deixa
+    fora da sessão), o texto volta como "thought" e as ferramentas rodam.
+    """
+    held = ""
+    answering = False
+    doc_filter = _DocTagFilter()
+
+    async for chunk in stream_openrouter(
+        messages=messages,
+        model=model,
+        max_tokens=4096,
+        tools=tools,
+        fallback_models=registry.get_fallback_models("chat"),
+        input_budget=registry.get_input_budget("chat"),
+    ):
+        text, _ = streamed.add(chunk)
+        if answering and streamed.has_tool_calls:
+            answering = False
+            logger.info("[ORCHESTRATOR] Tool call depois da resposta parcial — retirando o texto mostrado")
+            yield sse("retract", "tool_call")
+            if streamed.content.strip():
+                yield sse("thought", streamed.content.strip())
+            doc_filter = _DocTagFilter()
+            held = ""
+            continue
+        if answering:
+            for event in doc_filter.feed(text):
+                yield event
+            continue
+
+        held += text
+        if streamed.has_tool_calls:
+            # Modo ferramenta: o texto até aqui era raciocínio antes da chamada
+            if held.strip():
+                yield sse("thought", held.strip())
+            held = ""
+        elif len(held) >= _ANSWER_HOLDBACK_CHARS:
+            answering = True
+            yield sse("steps", "<step>Preparando resposta final...</step>")
+            for event in doc_filter.feed(held):
+                yield event
+            held = ""
+
+    streamed.finish()
+    if not answering and not streamed.has_tool_calls and held:
+        # Resposta curta: terminou antes de atingir o holdback
+        answering = True
+        yield sse("steps", "<step>Preparando resposta final...</step>")
+        for event in doc_filter.feed(held):
+            yield event
+    elif held.strip():
+        yield sse("thought", held.strip())
+    if answering:
+        for event in doc_filter.flush():
+            yield event
+
+
+async def _prerouted_turn(guess: PreRoute, streamed: StreamedMessage) -> AsyncGenerator[str, None]:
+    """Turno do Supervisor resolvido pelo pré-roteador: a tool call sem chamar o LLM."""
+    streamed.add({"choices": [{
+        "delta": {"tool_calls": [{"index": 0, **guess.as_tool_call()}]},
+        "finish_reason": "tool_calls",
+    }]})
+    yield sse("steps", "<step>Pedido identificado — acionando o especialista direto...</step>")
+
+
+# Tasks de comparação em segundo plano (referência forte até terminarem)
+_shadow_tasks: set = set()
+
+
+def _shadow_supervisor(guess: PreRoute, messages: list, model: str, tools: list):
+    """Roda o Supervisor em segundo plano só para medir a concordância com o fast path."""
+    async def compare():
+        try:
+            data = await call_openrouter(
+                messages=messages,
+                model=model,
+                max_tokens=1024,
+                tools=tools,
+                fallback_models=registry.get_fallback_models("chat"),
+                input_budget=registry.get_input_budget("chat"),
+            )
+            tool_calls = data["choices"][0]["message"].get("tool_calls") or []
+            record_agreement(guess, tool_calls[0]["function"]["name"] if tool_calls else None, "shadow")
+        except Exception as e:
+            logger.warning(f"[PREROUTER] Comparação com o Supervisor falhou: {e}")
+
+    task = asyncio.create_task(compare())
+    _shadow_tasks.add(task)
+    task.add_done_callback(_shadow_tasks.discard)
+
+
 # ── Loops dos Especialistas (Sub-Agentes) ────────────────────────────────────
 
+async def _execute_tool_call(tool: dict) -> str:
+    """Executa uma tool call de especialista. Erros viram texto para o LLM corrigir."""
+    func_name = tool["function"]["name"]
+    try:
+        func_args = json.loads(tool["function"]["arguments"])
+        return await execute_tool(func_name, func_args)
+    except json.JSONDecodeError:
+        return "Erro: Argumentos da ferramenta com JSON inválido. Corrija a formatação JSON e tente novamente."
+    except Exception as e:
+        return f"Erro na execução da ferramenta: {e}"
+
+
+def _tool_args(tool: dict) -> dict:
+    try:
+        return json.loads(tool["function"]["arguments"] or "{}")
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+async def _execute_tool_calls(tool_calls: list) -> list:
+    """Executa as tool calls em paralelo (até AgentConfig.tool_max_concurrency), na ordem original."""
+    from backend.core.config import get_config
+
+    if len(tool_calls) == 1:
+        return [await _execute_tool_call(tool_calls[0])]
+
+    semaphore = asyncio.Semaphore(max(1, get_config().tool_max_concurrency))
+
+    async def run(tool: dict) -> str:
+        async with semaphore:
+            return await _execute_tool_call(tool)
+
+    return await asyncio.gather(*(run(tool) for tool in tool_calls))
+
+
 async def _run_specialist_with_tools(
     messages: list,
     model: str,
@@ -143,13 +404,22 @@ async def _run_specialist_with_tools(
     tools: list,
     max_iterations: int = 5,
     thought_log: list | None = None,
+    fallback_models: list | None = None,
+    cacheable: bool = False,
+    input_budget: int | None = None,
+    use_cache: bool = True,
 ) -> str:
     """
     Executa especialista com ferramentas. Retorna resposta final como string.
     Se thought_log for passado, acumula nele o raciocínio do especialista
     (texto que acompanha tool_calls) para streaming posterior.
+    cacheable=True marca system prompt + tools para prompt caching entre iterações.
+    Saídas grandes de ferramentas entram comprimidas (core/compression.py).
+    use_cache=False ignora o cache de respostas do LLM ("regenerate").
     """
-    current = [{"role": "system", "content": system_prompt}, *messages]
+    current = [system_message(system_prompt, cacheable=cacheable), *messages]
+    compressor = get_tool_compressor()
+    intent = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
 
     for _ in range(max_iterations):
         data = await call_openrouter(
@@ -157,6 +427,9 @@ async def _run_specialist_with_tools(
             model=model,
             max_tokens=4096,
             tools=tools if tools else None,
+            fallback_models=fallback_models,
+            input_budget=input_budget,
+            use_cache=use_cache,
         )
         message = data["choices"][0]["message"]
         current.append(message)
@@ -168,20 +441,16 @@ async def _run_specialist_with_tools(
                 if intermediate_thought:
                     thought_log.append(intermediate_thought)
 
-            for tool in message["tool_calls"]:
-                func_name = tool["function"]["name"]
-                try:
-                    func_args = json.loads(tool["function"]["arguments"])
-                    result = await execute_tool(func_name, func_args)
-                except json.JSONDecodeError:
-                    result = "Erro: Argumentos da ferramenta com JSON inválido. Corrija a formatação JSON e tente novamente."
-                except Exception as e:
-                    result = f"Erro na execução da ferramenta: {e}"
-
+            # Tool calls do mesmo turno são independentes: rodam em paralelo,
+            # resultados entram na ordem original
+            results = await _execute_tool_calls(message["tool_calls"])
+            for tool, result in zip(message["tool_calls"], results):
                 current.append({
                     "role": "tool",
                     "tool_call_id": tool["id"],
-                    "content": str(result),
+                    "content": compressor.compress(
+                        tool["function"]["name"], str(result), compression_query(intent, _tool_args(tool))
+                    ),
                 })
         else:
             return message.get("content", "")
@@ -194,6 +463,10 @@ async def _run_terminal_one_shot(
     model: str,
     system_prompt: str,
     tools: list,
+    fallback_models: list | None = None,
+    cacheable: bool = False,
+    input_budget: int | None = None,
+    use_cache: bool = True,
 ) -> str:
     """
     Agente terminal com suporte a UMA chamada de ferramenta.
@@ -206,13 +479,16 @@ async def _run_terminal_one_shot(
     Comparado a _run_specialist_with_tools: economiza 1 LLM call por design
     (o agente não precisa "re-outputar" os 9KB de HTML que a ferramenta já gerou).
     """
-    current = [{"role": "system", "content": system_prompt}, *messages]
+    current = [system_message(system_prompt, cacheable=cacheable), *messages]
 
     data = await call_openrouter(
         messages=current,
         model=model,
         max_tokens=6000,
         tools=tools if tools else None,
+        fallback_models=fallback_models,
+        input_budget=input_budget,
+        use_cache=use_cache,
     )
     message = data["choices"][0]["message"]
 
@@ -235,30 +511,75 @@ async def _run_terminal_one_shot(
 
 
 async def _run_specialist_no_tools_stream(
-    messages: list, model: str, system_prompt: str, max_tokens: int = 4096
+    messages: list,
+    model: str,
+    system_prompt: str,
+    max_tokens: int = 4096,
+    fallback_models: list | None = None,
+    cacheable: bool = False,
+    input_budget: int | None = None,
 ) -> AsyncGenerator[str, None]:
     """Especialista sem ferramentas (Design, Dev). Faz STREAM direto do OpenRouter."""
-    current = [{"role": "system", "content": system_prompt}, *messages]
+    current = [system_message(system_prompt, cacheable=cacheable), *messages]
     
-    async for chunk in stream_openrouter(messages=current, model=model, max_tokens=max_tokens):
+    async for chunk in stream_openrouter(
+        messages=current, model=model, max_tokens=max_tokens,
+        fallback_models=fallback_models, input_budget=input_budget,
+    ):
         if "choices" in chunk and len(chunk["choices"]) > 0:
             delta = chunk["choices"][0].get("delta", {})
             if "content" in delta and delta["content"]:
                 yield delta["content"]
 
 
+@dataclass
+class _PendingQA:
+    """Revisão de QA rodando em paralelo com o próximo turno do Supervisor (qa_mode=speculative)."""
+    route: str
+    user_intent: str
+    model: str
+    messages: list  # contexto do especialista, para a correção em caso de rejeição
+    response: str
+    task: asyncio.Task
+    started: float = field(default_factory=time.monotonic)
+    finished: float = 0.0
+    tool_call_id: str = ""
+
+    def __post_init__(self):
+        self.task.add_done_callback(lambda _: setattr(self, "finished", time.monotonic()))
+
+    @property
+    def rejected(self) -> bool:
+        return self.task.done() and not self.task.result().get("approved", True)
+
+
 async def _run_specialist_with_qa(
-    route: str, user_intent: str, temp_messages: list, model: str, custom_step_msg: str
+    route: str,
+    user_intent: str,
+    temp_messages: list,
+    model: str,
+    custom_step_msg: str,
+    qa_pending: list | None = None,
+    first_attempt: int = 0,
+    specialist_model: str | None = None,
+    use_cache: bool = True,
 ) -> AsyncGenerator[str, None]:
     """
     Executa o Especialista + QA + Validação Anti-Alucinação.
     Yields SSE steps para a UI, e no final yielda 'RESULT:' com a resposta validada.
+
+    Com qa_pending (qa_mode=speculative), a primeira tentativa não espera o QA:
+    a revisão vira uma task em qa_pending e o resultado segue otimista para o
+    Supervisor. first_attempt > 0 é usado na correção depois de uma rejeição.
+    specialist_model: modelo já escolhido pelo chamador (mesmo da chave do memo);
+    use_cache=False ("regenerate") não reaproveita respostas do cache do LLM.
     """
     MAX_QA_RETRIES = 2
     specialist_response = ""
     current_messages = list(temp_messages)
+    specialist_model = specialist_model or await registry.pick_model(route, default=model)
 
-    for attempt in range(MAX_QA_RETRIES + 1):
+    for attempt in range(first_attempt, MAX_QA_RETRIES + 1):
         if attempt == 0:
             yield sse("steps", f"<step>{custom_step_msg}</step>")
         else:
@@ -269,10 +590,14 @@ async def _run_specialist_with_qa(
         try:
             specialist_response = await _run_specialist_with_tools(
                 current_messages,
-                registry.get_model(route) or model,
+                specialist_model,
                 registry.get_prompt(route),
                 registry.get_tools(route),
                 thought_log=thought_log,
+                fallback_models=registry.get_fallback_models(route),
+                cacheable=registry.is_prompt_cacheable(route),
+                input_budget=registry.get_input_budget(route),
+                use_cache=use_cache,
             )
         except Exception as e:
             logger.error(f"[SPECIALIST] Erro na execução do especialista '{route}': {e}")
@@ -288,265 +613,606 @@ async def _run_specialist_with_qa(
             specialist_response, route, current_messages
         )
 
+        # ── Política de amostragem: rotas com aprovação alta pulam o QA ──────
+        if attempt == 0 and not await get_qa_policy().should_review(route, specialist_model):
+            break
+
+        # ── QA especulativo: revisão em paralelo, resultado segue otimista ──
+        if qa_pending is not None and attempt == 0:
+            qa_pending.append(_PendingQA(
+                route=route,
+                user_intent=user_intent,
+                model=model,
+                messages=current_messages,
+                response=specialist_response,
+                task=asyncio.create_task(
+                    _qa_review_recorded(user_intent, specialist_response, route, model, specialist_model)
+                ),
+            ))
+            break
+
         # ── QA Review ─────────────────────────────────────────────────────────
         yield sse("steps", "<step>Validando qualidade do resultado...</step>")
-        qa_result = await _qa_review(user_intent, specialist_response, route, model)
+        qa_result = await _qa_review_recorded(user_intent, specialist_response, route, model, specialist_model)
 
         if qa_result.get("approved", True):
             break
 
         if attempt < MAX_QA_RETRIES:
-            correction = qa_result.get("correction_instruction", "Corrija a resposta.")
-            current_messages = current_messages + [
-                {"role": "assistant", "content": specialist_response},
-                {"role": "user", "content": f"[QA Feedback] {correction}"},
-            ]
+            current_messages = _with_qa_feedback(current_messages, specialist_response, qa_result)
         else:
             yield sse("steps", "<step>Preparando melhor resultado disponível...</step>")
 
     yield f"RESULT:{specialist_response}"
 
 
+def _with_qa_feedback(messages: list, response: str, qa_result: dict) -> list:
+    correction = qa_result.get("correction_instruction", "Corrija a resposta.")
+    return messages + [
+        {"role": "assistant", "content": response},
+        {"role": "user", "content": f"[QA Feedback] {correction}"},
+    ]
+
+
+# ── Ferramentas do Supervisor ────────────────────────────────────────────────
+
+def _is_terminal_call(tool: dict) -> bool:
+    return TOOL_MAP.get(tool["function"]["name"], {}).get("is_terminal", False)
+
+
+def _prepare_route(func_name: str, func_args: dict, messages: list, user_intent: str) -> tuple[str, str, list | None]:
+    """Rota, mensagem de step e contexto do sub-agente para uma ferramenta do TOOL_MAP."""
+    route = TOOL_MAP[func_name]["route"]
+
+    # Contexto truncado: pega as últimas 5 interações pra enviar aos sub-agentes
+    recent_context = [m for m in messages if m.get("role") in ["user", "assistant"]][-5:]
+
+    if route == "file_generator":
+        file_type = func_args.get("file_type", "arquivo").upper()
+        step_message = f"Gerando {file_type} → estruturando dados e criando arquivo..."
+        content = f"Instruções: {func_args.get('instructions')} Dados: {func_args.get('data')}"
+        temp_msgs = recent_context + [{"role": "user", "content": content}]
+    elif route == "file_modifier":
+        step_message = "Lendo estrutura do arquivo original e aplicando modificações..."
+        content = f"Arquivo: {func_args.get('file_url')} Instruções: {func_args.get('instructions')}"
+        temp_msgs = recent_context + [{"role": "user", "content": content}]
+    elif route == "design":
+        step_message = "Criando design → posicionando elementos e aplicando estilo..."
+        temp_msgs = recent_context + [{"role": "user", "content": func_args.get("requirements", user_intent)}]
+    elif route == "dev":
+        step_message = "Criando design visual → selecionando template e aplicando conteúdo..."
+        temp_msgs = recent_context + [{"role": "user", "content": func_args.get("requirements", user_intent)}]
+    else:  # browser
+        url = func_args.get("url", "")
+        step_message = f"Abrindo navegador e extraindo dados de {url[:40]}..."
+        temp_msgs = None  # Browser usa executor direto, sem sub-agente
+    return route, step_message, temp_msgs
+
+
+async def _run_terminal_tool(
+    func_name: str, func_args: dict, messages: list, user_intent: str, model: str, use_memo: bool = True
+) -> AsyncGenerator[str, None]:
+    """
+    Ferramenta terminal (Design, Dev): o resultado bruto vai direto ao usuário.
+    Pedido idêntico dentro do TTL reenvia o resultado do memo (agents/artifact_memo.py).
+    """
+    route, step_message, temp_msgs = _prepare_route(func_name, func_args, messages, user_intent)
+    yield sse("steps", f"<step>{step_message}</step>")
+    route_prompt = registry.get_prompt(route)
+    route_model = await registry.pick_model(route, default=model)
+    route_tools = registry.get_tools(route)
+    route_fallbacks = registry.get_fallback_models(route)
+    chunk_size = 40
+
+    memo = get_artifact_memo()
+    key = memo_key(route, func_args, messages, route_model) if memo.enabled else None
+    if key is not None and not use_memo:
+        memo.record_bypass(route)
+    elif key is not None and (cached := await memo.get(route, key)) is not None:
+        logger.info(f"[MEMO] {route}: resultado idêntico reaproveitado")
+        yield sse("steps", "<step>Resultado idêntico gerado recentemente — reaproveitando...</step>")
+        for i in range(0, len(cached), chunk_size):
+            yield sse("chunk", cached[i:i + chunk_size])
+        return
+    output: list[str] = []
+
+    if route_tools:
+        # Terminal com ferramentas: 1 LLM call + execução da ferramenta
+        # A ferramenta retorna o HTML diretamente — sem 3ª chamada ao LLM
+        yield sse("steps", "<step>Selecionando template e aplicando conteúdo...</step>")
+        final_result = await _run_terminal_one_shot(
+            temp_msgs, route_model, route_prompt, route_tools,
+            fallback_models=route_fallbacks,
+            cacheable=registry.is_prompt_cacheable(route),
+            input_budget=registry.get_input_budget(route),
+            use_cache=use_memo,
+        )
+        output.append(final_result)
+        for i in range(0, len(final_result), chunk_size):
+            yield sse("chunk", final_result[i:i + chunk_size])
+    else:
+        # Terminal sem ferramentas — stream direto (design PostAST)
+        yield sse("steps", "<step>Transmitindo resultado em tempo real...</step>")
+        async for text_chunk in _run_specialist_no_tools_stream(
+            temp_msgs, route_model, route_prompt, max_tokens=6000,
+            fallback_models=route_fallbacks,
+            cacheable=registry.is_prompt_cacheable(route),
+            input_budget=registry.get_input_budget(route),
+        ):
+            output.append(text_chunk)
+            yield sse("chunk", text_chunk)
+
+    if key is not None:
+        await memo.put(route, key, "".join(output))
+
+
+async def _run_supervisor_tool(
+    tool: dict,
+    messages: list,
+    user_intent: str,
+    model: str,
+    qa_pending: list | None = None,
+    use_memo: bool = True,
+) -> AsyncGenerator[str, None]:
+    """
+    Ferramenta não-terminal do Supervisor. Yields SSE para a UI e, no final,
+    'RESULT:' com o conteúdo da mensagem "tool" (mesmo protocolo de _run_specialist_with_qa).
+    qa_pending: recebe as revisões de QA especulativas (ver _PendingQA).
+    use_memo=False ignora o link guardado no memo de artefatos e gera de novo.
+    """
+    func_name = tool["function"]["name"]
+    try:
+        func_args = json.loads(tool["function"]["arguments"])
+    except json.JSONDecodeError:
+        yield sse("steps", "<step>Aguardando sub-agente corrigir os parâmetros da ferramenta...</step>")
+        yield "RESULT:Erro sintático no JSON da ferramenta. Corrija a formatação e tente novamente."
+        return
+
+    if func_name == "read_tool_output":
+        yield sse("steps", "<step>Recuperando conteúdo completo da ferramenta...</step>")
+        yield f"RESULT:{await execute_tool(func_name, func_args)}"
+        return
+
+    if func_name not in TOOL_MAP:
+        yield f"RESULT:Erro: ferramenta '{func_name}' não suportada pelo orquestrador."
+        return
+
+    route, step_message, temp_msgs = _prepare_route(func_name, func_args, messages, user_intent)
+
+    if route == "browser":
+        # Browser: executa direto pelo executor, sem sub-agente
+        # Emite eventos "browser_action" para a UI mostrar card estilo Manus
+        url = func_args.get("url", "")
+        raw_actions = func_args.get("actions", [])
+
+        # Monta descrição das ações para o step
+        if raw_actions:
+            action_types = [a.get("type", "?") for a in raw_actions if isinstance(a, dict)]
+            action_label = ", ".join(action_types)
+            step_message = f"Navegando em {url[:40]}... (ações: {action_label})"
+
+        yield sse("steps", f"<step>{step_message}</step>")
+        yield sse("browser_action", json.dumps({
+            "status": "navigating",
+            "url": url,
+            "title": f"Acessando {url[:60]}...",
+            "actions": [a.get("type", "?") for a in raw_actions] if raw_actions else []
+        }))
+
+        specialist_result = await execute_tool("ask_browser", func_args)
+
+        # Se o resultado é um erro, emite status de erro
+        if specialist_result.startswith("Erro"):
+            yield sse("browser_action", json.dumps({
+                "status": "error",
+                "url": url,
+                "title": specialist_result[:100]
+            }))
+        else:
+            yield sse("browser_action", json.dumps({
+                "status": "done",
+                "url": url,
+                "title": "Página lida com sucesso"
+            }))
+
+        specialist_result = get_tool_compressor().compress(
+            "ask_browser", specialist_result, compression_query(user_intent, func_args)
+        )
+        yield sse("steps", "<step>Conteúdo extraído — analisando dados...</step>")
+        yield f"RESULT:{specialist_result}"
+        return
+
+    # Arquivo idêntico ainda válido no Storage: devolve o link sem refazer nada
+    memo = get_artifact_memo()
+    # Mesmo modelo na chave e na execução (a política de roteamento pode variar entre chamadas)
+    specialist_model = await registry.pick_model(route, default=model)
+    key = memo_key(route, func_args, messages, specialist_model) if memo.enabled else None
+    if key is not None and not use_memo:
+        memo.record_bypass(route)
+    elif key is not None and (cached := await memo.get(route, key)) is not None:
+        logger.info(f"[MEMO] {route}: link reaproveitado de um pedido idêntico")
+        yield sse("steps", "<step>Arquivo idêntico gerado recentemente — reaproveitando link...</step>")
+        yield f"RESULT:{cached}"
+        return
+
+    pending: list | None = [] if qa_pending is not None else None
+    specialist_result = ""
+    async for event in _run_specialist_with_qa(
+        route, user_intent, temp_msgs, model, step_message, qa_pending=pending,
+        specialist_model=specialist_model, use_cache=use_memo,
+    ):
+        if event.startswith("RESULT:"):
+            specialist_result = event[7:]
+        else:
+            yield event
+    for item in pending or []:
+        item.tool_call_id = tool["id"]
+        qa_pending.append(item)
+
+    final_result = _finalize_specialist_result(route, specialist_result)
+    if key is not None and _MARKDOWN_LINK_PATTERN.search(final_result):
+        if pending:
+            # QA especulativo ainda revisando: só memoriza se aprovar
+            _memoize_after_qa(pending, route, key, final_result)
+        else:
+            await memo.put(route, key, final_result)
+
+    yield sse("steps", "<step>Integrando resultado do especialista...</step>")
+    yield f"RESULT:{final_result}"
+
+
+def _memoize_after_qa(pending: list, route: str, key: str, result: str):
+    async def store():
+        await asyncio.wait([item.task for item in pending])
+        if any(item.task.cancelled() or item.task.exception() or item.rejected for item in pending):
+            return
+        await get_artifact_memo().put(route, key, result)
+
+    task = asyncio.ensure_future(store())
+    _memo_tasks.add(task)
+    task.add_done_callback(_memo_tasks.discard)
+
+
+def _finalize_specialist_result(route: str, specialist_result: str) -> str:
+    """Resultado do especialista como o Supervisor deve vê-lo (mensagem "tool")."""
+    # Garantia final: se o especialista retornou resultado vazio, reportar
+    if not specialist_result.strip():
+        specialist_result = "O especialista não retornou resultado. Tente reformular o pedido."
+        logger.warning(f"[ORCHESTRATOR] Especialista '{route}' retornou vazio")
+
+    # ── ANTI-LEAK: Para rotas de arquivo, enviar APENAS o link pro Supervisor ──
+    # Isso impede definitivamente o Supervisor de ver/replicar conteúdo interno.
+    if route in ROUTES_REQUIRING_LINK:
+        md_links = _MARKDOWN_LINK_PATTERN.findall(specialist_result)
+        if md_links:
+            links_only = "\n".join(f"[{label}]({url})" for label, url in md_links)
+            specialist_result = f"Arquivo gerado com sucesso.\n\n{links_only}"
+            logger.info("[ANTI-LEAK] Conteúdo suprimido. Apenas link enviado ao Supervisor.")
+    return specialist_result
+
+
+async def _merge_tool_streams(
+    streams: list, limit: int
+) -> AsyncGenerator[tuple[int, str], None]:
+    """
+    Roda os geradores de ferramentas em paralelo (no máximo `limit` por vez) e
+    entrega (índice, evento) na ordem em que os eventos chegam, para a UI ver
+    steps/browser_action de cada ferramenta assim que acontecem. Uma ferramenta
+    que levanta exceção vira 'RESULT:Erro...' sem derrubar as outras.
+    """
+    if len(streams) == 1:
+        async for event in streams[0]:
+            yield 0, event
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max(1, limit))
+    finished = object()
+
+    async def pump(index: int, stream):
+        try:
+            async with semaphore:
+                async for event in stream:
+                    await queue.put((index, event))
+        except Exception as e:
+            logger.error(f"[ORCHESTRATOR] Ferramenta #{index} falhou: {e}")
+            await queue.put((index, f"RESULT:Erro na execução da ferramenta: {e}"))
+        finally:
+            queue.put_nowait((index, finished))
+
+    tasks = [asyncio.create_task(pump(i, stream)) for i, stream in enumerate(streams)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            index, event = await queue.get()
+            if event is finished:
+                remaining -= 1
+                continue
+            yield index, event
+    finally:
+        # Cliente desconectou ou o Supervisor foi interrompido: não deixa ferramentas órfãs
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+# ── QA especulativo ──────────────────────────────────────────────────────────
+
+_qa_stats = {
+    "speculative_reviews": 0,
+    "approved_turns": 0,
+    "rolled_back_turns": 0,
+    "saved_ms_total": 0.0,
+    "wasted_ms_total": 0.0,
+}
+
+
+def get_qa_metrics() -> dict:
+    """Métricas do QA especulativo deste worker (usado em /api/admin/metrics)."""
+    from backend.core.config import get_config
+    turns = _qa_stats["approved_turns"]
+    return {
+        "mode": get_config().qa_mode,
+        **{k: round(v, 1) if isinstance(v, float) else v for k, v in _qa_stats.items()},
+        "avg_saved_ms": round(_qa_stats["saved_ms_total"] / turns, 1) if turns else 0.0,
+    }
+
+
+async def _stream_turn_behind_qa(turn, qa_pending: list, outcome: dict) -> AsyncGenerator[str, None]:
+    """
+    Consome o turno do Supervisor enquanto as revisões de QA especulativas rodam.
+    Os eventos ficam retidos até todas aprovarem (a partir daí seguem ao vivo);
+    se alguma rejeitar, o turno é interrompido e descartado — a UI nunca vê
+    uma resposta que depois precisaria ser desfeita. outcome recebe
+    rejected e saved_ms (QA que deixou de bloquear o pipeline).
+    """
+    tasks = [item.task for item in qa_pending]
+    buffered: list[str] = []
+    live = False
+    try:
+        async for event in turn:
+            if not live and all(task.done() for task in tasks):
+                if any(item.rejected for item in qa_pending):
+                    outcome["rejected"] = True
+                    return
+                live = True
+                for held in buffered:
+                    yield held
+                buffered.clear()
+            if live:
+                yield event
+            else:
+                buffered.append(event)
+    finally:
+        await turn.aclose()
+
+    waited_from = time.monotonic()
+    if not live:
+        await asyncio.wait(tasks)
+        if any(item.rejected for item in qa_pending):
+            outcome["rejected"] = True
+            return
+        for held in buffered:
+            yield held
+    # Sem o modo especulativo o pipeline esperaria o QA inteiro; aqui só o que sobrou após o turno
+    qa_ms = max(item.finished - item.started for item in qa_pending) * 1000
+    waited_ms = max(0.0, max(item.finished for item in qa_pending) - waited_from) * 1000 if not live else 0.0
+    outcome["saved_ms"] = max(0.0, qa_ms - waited_ms)
+
+
+async def _correct_rejected(item: _PendingQA) -> AsyncGenerator[str, None]:
+    """Refaz o especialista com o feedback do QA especulativo (tentativas seguintes em modo bloqueante)."""
+    messages = _with_qa_feedback(item.messages, item.response, item.task.result())
+    result = ""
+    async for event in _run_specialist_with_qa(
+        item.route, item.user_intent, messages, item.model, "", first_attempt=1
+    ):
+        if event.startswith("RESULT:"):
+            result = event[7:]
+        else:
+            yield event
+    yield f"RESULT:{_finalize_specialist_result(item.route, result)}"
+
+
+async def _reused_tool_result(result: str) -> AsyncGenerator[str, None]:
+    """Resultado de uma tool call idêntica já executada nesta sessão."""
+    yield sse("steps", "<step>Reaproveitando resultado anterior desta conversa...</step>")
+    yield f"RESULT:{result}"
+
+
 # ── Pipeline Principal (Supervisor ReAct) ────────────────────────────────────
 
 async def orchestrate_and_stream(
     messages: list,
     model: str,
+    session: Session | None = None,
+    use_memo: bool = True,
 ) -> AsyncGenerator[str, None]:
     """
     Pipeline ReAct (Supervisor-Worker).
     O Supervisor gerencia a conversa, decidindo quando chamar ferramentas (sub-agentes).
     Contém proteção contra Loops Infinitos (MAX_ITERATIONS) e 
     Terminal Tools (quebram o loop para proteger o Frontend).
+    session: sessão do servidor (api/chat.py); tool calls idênticas às já feitas
+    na conversa reaproveitam o resultado guardado (só session_reuse_tools).
+    use_memo: False ("regenerate" no corpo do chat) ignora o memo de artefatos,
+    os resultados guardados na sessão e o cache de respostas do LLM.
     """
     
     from backend.agents.tools import SUPERVISOR_TOOLS
+    from backend.core.config import get_config
 
-    supervisor_prompt = registry.get_prompt("chat") # O agent 'chat' agora é o Supervisor
-    supervisor_model = registry.get_model("chat") or model
+    config = get_config()
+    supervisor_model = await registry.pick_model("chat", default=model)
     
     # Extrair intent do usuário da última mensagem para passar pro QA nas tools
     user_intent = next(
         (str(m["content"]) for m in reversed(messages) if m.get("role") == "user"), ""
     )
 
-    current_messages = [{"role": "system", "content": supervisor_prompt}] + messages
+    # O agent 'chat' é o Supervisor. Prompt + SUPERVISOR_TOOLS formam o prefixo
+    # cacheável reutilizado em todas as iterações do loop ReAct.
+    current_messages = [registry.get_system_message("chat")] + messages
     
     MAX_ITERATIONS = 7
-    
-    for iteration in range(MAX_ITERATIONS):
-        # Step inicial: mostra que o Supervisor está pensando
-        if iteration == 0:
-            yield sse("steps", "<step>Analisando pedido e planejando execução...</step>")
-        
-        # Chama o LLM do Supervisor
-        try:
-            data = await call_openrouter(
-                messages=current_messages,
-                model=supervisor_model,
-                max_tokens=4096,
-                tools=SUPERVISOR_TOOLS
-            )
-            message = data["choices"][0]["message"]
-        except (KeyError, IndexError) as e:
-            logger.error(f"[ORCHESTRATOR] Resposta LLM malformada: {e}")
-            yield sse("error", "Erro interno ao processar a resposta da IA. Tente novamente.")
-            return
-        except Exception as e:
-            logger.error(f"[ORCHESTRATOR] Erro na chamada LLM: {e}")
-            yield sse("error", f"Erro ao comunicar com a IA: {e}")
-            return
 
-        current_messages.append(message)
+    # qa_mode=speculative: revisões de QA em andamento, conferidas no próximo turno
+    qa_pending: list[_PendingQA] | None = [] if config.qa_mode == "speculative" else None
 
-        # Emite raciocínio do Supervisor quando ele pensa antes de chamar uma ferramenta
-        supervisor_reasoning = (message.get("content") or "").strip()
-        if supervisor_reasoning and message.get("tool_calls"):
-            yield sse("thought", supervisor_reasoning)
-
-        # O Supervisor decidiu usar uma Ferramenta (Especialista)?
-        if message.get("tool_calls"):
-            for tool in message["tool_calls"]:
-                func_name = tool["function"]["name"]
-                
-                try:
-                    func_args = json.loads(tool["function"]["arguments"])
-                except json.JSONDecodeError:
-                    current_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool["id"],
-                        "content": "Erro sintático no JSON da ferramenta. Corrija a formatação e tente novamente.",
-                    })
-                    yield sse("steps", "<step>Aguardando sub-agente corrigir os parâmetros da ferramenta...</step>")
-                    continue
-                    
-                # TOOL_MAP is now a module-level constant
-
-                if func_name in TOOL_MAP:
-                    route = TOOL_MAP[func_name]["route"]
-                    is_terminal = TOOL_MAP[func_name]["is_terminal"]
-                    
-                    # Contexto truncado: pega as últimas 5 interações pra enviar aos sub-agentes
-                    recent_context = [m for m in messages if m.get("role") in ["user", "assistant"]][-5:]
-                    
-                    if route == "file_generator":
-                        file_type = func_args.get("file_type", "arquivo").upper()
-                        step_message = f"Gerando {file_type} → estruturando dados e criando arquivo..."
-                        content = f"Instruções: {func_args.get('instructions')} Dados: {func_args.get('data')}"
-                        temp_msgs = recent_context + [{"role": "user", "content": content}]
-                    elif route == "file_modifier":
-                        step_message = "Lendo estrutura do arquivo original e aplicando modificações..."
-                        content = f"Arquivo: {func_args.get('file_url')} Instruções: {func_args.get('instructions')}"
-                        temp_msgs = recent_context + [{"role": "user", "content": content}]
-                    elif route == "design":
-                        step_message = "Criando design → posicionando elementos e aplicando estilo..."
-                        temp_msgs = recent_context + [{"role": "user", "content": func_args.get("requirements", user_intent)}]
-                    elif route == "dev":
-                        step_message = "Criando design visual → selecionando template e aplicando conteúdo..."
-                        temp_msgs = recent_context + [{"role": "user", "content": func_args.get("requirements", user_intent)}]
-                    elif route == "browser":
-                        url = func_args.get("url", "")
-                        step_message = f"Abrindo navegador e extraindo dados de {url[:40]}..."
-                        temp_msgs = None  # Browser usa executor direto, sem sub-agente
-                else:
-                    current_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool["id"],
-                        "content": f"Erro: ferramenta '{func_name}' não suportada pelo orquestrador.",
-                    })
-                    continue
+    # Pré-roteador: pedido inequívoco pula o primeiro turno do Supervisor (agents/prerouter.py)
+    guess = None
+    if config.prerouter_enable and messages and messages[-1].get("role") == "user":
+        guess = preroute(user_intent)
+    fast_path = guess is not None and guess.confidence >= config.prerouter_min_confidence
+    record_decision("fast_path" if fast_path else "supervisor" if guess else "no_match")
 
-                if is_terminal:
-                    yield sse("steps", f"<step>{step_message}</step>")
-                    route_prompt = registry.get_prompt(route)
-                    route_model = registry.get_model(route) or model
-                    route_tools = registry.get_tools(route)
-
-                    if route_tools:
-                        # Terminal com ferramentas: 1 LLM call + execução da ferramenta
-                        # A ferramenta retorna o HTML diretamente — sem 3ª chamada ao LLM
-                        yield sse("steps", "<step>Selecionando template e aplicando conteúdo...</step>")
-                        final_result = await _run_terminal_one_shot(
-                            temp_msgs, route_model, route_prompt, route_tools
-                        )
-                        chunk_size = 40
-                        for i in range(0, len(final_result), chunk_size):
-                            yield sse("chunk", final_result[i:i + chunk_size])
-                    else:
-                        # Terminal sem ferramentas — stream direto (design PostAST)
-                        yield sse("steps", "<step>Transmitindo resultado em tempo real...</step>")
-                        async for text_chunk in _run_specialist_no_tools_stream(
-                            temp_msgs, route_model, route_prompt, max_tokens=6000
-                        ):
-                            yield sse("chunk", text_chunk)
+    # "regenerate" também ignora resultados guardados na sessão
+    reuse_results = session is not None and config.session_reuse_tool_results and use_memo
+    # tool_call_id → chave do resultado na sessão (correções do QA especulativo atualizam a sessão)
+    session_keys: dict[str, str] = {}
 
-                    # Proteção do frontend: encerra o loop do Supervisor imediatamente
-                    return
-                elif route == "browser":
-                    # Browser: executa direto pelo executor, sem sub-agente
-                    # Emite eventos "browser_action" para a UI mostrar card estilo Manus
-                    url = func_args.get("url", "")
-                    raw_actions = func_args.get("actions", [])
-                    
-                    # Monta descrição das ações para o step
-                    if raw_actions:
-                        action_types = [a.get("type", "?") for a in raw_actions if isinstance(a, dict)]
-                        action_label = ", ".join(action_types)
-                        step_message = f"Navegando em {url[:40]}... (ações: {action_label})"
-                    
-                    yield sse("steps", f"<step>{step_message}</step>")
-                    yield sse("browser_action", json.dumps({
-                        "status": "navigating",
-                        "url": url,
-                        "title": f"Acessando {url[:60]}...",
-                        "actions": [a.get("type", "?") for a in raw_actions] if raw_actions else []
-                    }))
-                    
-                    specialist_result = await execute_tool("ask_browser", func_args)
-                    
-                    # Se o resultado é um erro, emite status de erro
-                    if specialist_result.startswith("Erro"):
-                        yield sse("browser_action", json.dumps({
-                            "status": "error",
-                            "url": url,
-                            "title": specialist_result[:100]
-                        }))
-                    else:
-                        yield sse("browser_action", json.dumps({
-                            "status": "done",
-                            "url": url,
-                            "title": "Página lida com sucesso"
-                        }))
-                    
-                    current_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool["id"],
-                        "content": specialist_result,
-                    })
-                    yield sse("steps", "<step>Conteúdo extraído — analisando dados...</step>")
-                else:
-                    specialist_result = ""
-                    async for event in _run_specialist_with_qa(route, user_intent, temp_msgs, model, step_message):
+    try:
+        for iteration in range(MAX_ITERATIONS):
+            # Step inicial: mostra que o Supervisor está pensando
+            if iteration == 0:
+                yield sse("steps", "<step>Analisando pedido e planejando execução...</step>")
+
+            # Chama o LLM do Supervisor em streaming (texto segue para a UI token a token)
+            streamed = StreamedMessage()
+            if iteration == 0 and fast_path:
+                logger.info(f"[PREROUTER] Fast path: {guess.tool} ({guess.confidence:.2f}, {guess.reason})")
+                if random.random() < config.prerouter_shadow_rate:
+                    _shadow_supervisor(guess, list(current_messages), supervisor_model, SUPERVISOR_TOOLS)
+                turn = _prerouted_turn(guess, streamed)
+            else:
+                turn = _stream_supervisor_turn(current_messages, supervisor_model, SUPERVISOR_TOOLS, streamed)
+            outcome: dict = {}
+            turn_started = time.monotonic()
+            if qa_pending:
+                turn = _stream_turn_behind_qa(turn, qa_pending, outcome)
+            try:
+                async for event in turn:
+                    yield event
+            except Exception as e:
+                logger.error(f"[ORCHESTRATOR] Erro na chamada LLM: {e}")
+                yield sse("error", f"Erro ao comunicar com a IA: {e}")
+                return
+
+            if qa_pending:
+                rejected = [item for item in qa_pending if item.rejected]
+                qa_pending.clear()
+                if outcome.get("rejected"):
+                    # Rollback: o turno especulativo é descartado e os resultados
+                    # rejeitados são refeitos antes de o Supervisor responder de novo
+                    wasted_ms = (time.monotonic() - turn_started) * 1000
+                    _qa_stats["rolled_back_turns"] += 1
+                    _qa_stats["wasted_ms_total"] += wasted_ms
+                    logger.info(
+                        f"[QA] Especulação revertida: {len(rejected)} resultado(s) rejeitado(s), "
+                        f"turno descartado após {wasted_ms:.0f}ms"
+                    )
+                    yield sse("steps", "<step>Revisão de qualidade pediu ajustes — corrigindo resultado...</step>")
+                    corrections = {}
+                    async for index, event in _merge_tool_streams(
+                        [_correct_rejected(item) for item in rejected], config.tool_max_concurrency
+                    ):
                         if event.startswith("RESULT:"):
-                            specialist_result = event[7:]
+                            corrections[rejected[index].tool_call_id] = event[7:]
                         else:
                             yield event
+                    for msg in current_messages:
+                        if msg.get("role") == "tool" and msg.get("tool_call_id") in corrections:
+                            msg["content"] = corrections[msg["tool_call_id"]]
+                    if reuse_results:
+                        for tool_call_id, result in corrections.items():
+                            if tool_call_id in session_keys:
+                                session.remember_tool_result(session_keys[tool_call_id], result)
+                    continue
+                _qa_stats["approved_turns"] += 1
+                _qa_stats["saved_ms_total"] += outcome.get("saved_ms", 0.0)
+                logger.info(f"[QA] Especulação aprovada: ~{outcome.get('saved_ms', 0.0):.0f}ms economizados neste turno")
+
+            message = streamed.as_dict()
+            current_messages.append(message)
+            if iteration == 0 and guess is not None and not fast_path:
+                first_tool = (message.get("tool_calls") or [{}])[0].get("function", {}).get("name")
+                record_agreement(guess, first_tool, "observed")
+
+            # O Supervisor decidiu usar uma Ferramenta (Especialista)?
+            if message.get("tool_calls"):
+                # Ferramentas não-terminais rodam em paralelo (até tool_max_concurrency);
+                # uma terminal encerra o loop, então só roda depois das que vêm antes dela.
+                pending = list(message["tool_calls"])
+                while pending:
+                    split = next(
+                        (i for i, tool in enumerate(pending) if _is_terminal_call(tool)), len(pending)
+                    )
+                    batch, terminal, pending = pending[:split], pending[split:split + 1], pending[split + 1:]
+
+                    results = [""] * len(batch)
+                    streams = []
+                    for tool in batch:
+                        key = None
+                        if reuse_results and tool["function"]["name"] in config.session_reuse_tools:
+                            key = tool_result_key(tool["function"]["name"], tool["function"]["arguments"])
+                            session_keys[tool["id"]] = key
+                        if key is not None and key in session.tool_results:
+                            logger.info(f"[ORCHESTRATOR] {tool['function']['name']}: resultado reaproveitado da sessão")
+                            streams.append(_reused_tool_result(session.tool_results[key]))
+                        else:
+                            streams.append(_run_supervisor_tool(tool, messages, user_intent, model, qa_pending, use_memo))
+                    async for index, event in _merge_tool_streams(streams, config.tool_max_concurrency):
+                        if event.startswith("RESULT:"):
+                            results[index] = event[7:]
+                        else:
+                            yield event
+                    # Resultados entram no histórico na ordem original das tool_calls
+                    for tool, result in zip(batch, results):
+                        current_messages.append({
+                            "role": "tool",
+                            "tool_call_id": tool["id"],
+                            "content": result,
+                        })
+                        if tool["id"] in session_keys and result and not result.startswith("Erro"):
+                            session.remember_tool_result(session_keys[tool["id"]], result)
+
+                    if terminal:
+                        tool = terminal[0]
+                        try:
+                            func_args = json.loads(tool["function"]["arguments"])
+                        except json.JSONDecodeError:
+                            current_messages.append({
+                                "role": "tool",
+                                "tool_call_id": tool["id"],
+                                "content": "Erro sintático no JSON da ferramenta. Corrija a formatação e tente novamente.",
+                            })
+                            yield sse("steps", "<step>Aguardando sub-agente corrigir os parâmetros da ferramenta...</step>")
+                            continue
+
+                        async for event in _run_terminal_tool(
+                            tool["function"]["name"], func_args, messages, user_intent, model, use_memo
+                        ):
+                            yield event
+                        # Proteção do frontend: encerra o loop do Supervisor imediatamente
+                        return
 
-                    # Garantia final: se o especialista retornou resultado vazio, reportar
-                    if not specialist_result.strip():
-                        specialist_result = "O especialista não retornou resultado. Tente reformular o pedido."
-                        logger.warning(f"[ORCHESTRATOR] Especialista '{route}' retornou vazio")
-
-                    # ── ANTI-LEAK: Para rotas de arquivo, enviar APENAS o link pro Supervisor ──
-                    # Isso impede definitivamente o Supervisor de ver/replicar conteúdo interno.
-                    if route in ROUTES_REQUIRING_LINK:
-                        md_links = _MARKDOWN_LINK_PATTERN.findall(specialist_result)
-                        if md_links:
-                            links_only = "\n".join(f"[{label}]({url})" for label, url in md_links)
-                            specialist_result = f"Arquivo gerado com sucesso.\n\n{links_only}"
-                            logger.info("[ANTI-LEAK] Conteúdo suprimido. Apenas link enviado ao Supervisor.")
-
-                    current_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool["id"],
-                        "content": specialist_result,
-                    })
-                    
-                    yield sse("steps", "<step>Integrando resultado do especialista...</step>")
-                
-            # Fim do loop de tool_calls desta iteração, prossegue o while para deixar o Supervisor responder
-            continue
-            
-        else:
-            # O Supervisor decidiu responder ao usuário diretamente (sem tools ou após usar tools)
-            # IMPORTANTE: Usa a resposta já obtida na chamada acima (sem chamar o LLM de novo)
-            # Isso garante que links de download e dados dos especialistas sejam preservados.
-            yield sse("steps", "<step>Preparando resposta final...</step>")
+                if qa_pending:
+                    _qa_stats["speculative_reviews"] += len(qa_pending)
+                # Fim do loop de tool_calls desta iteração, prossegue o while para deixar o Supervisor responder
+                continue
 
-            content = message.get("content", "")
-
-            # Detecta documento de texto com tag <doc title="...">...</doc>
-            doc_match = _DOC_TAG_RE.search(content)
-            if doc_match:
-                doc_title = doc_match.group(1).strip()
-                doc_content = doc_match.group(2).strip()
-                # Emite evento especial para o frontend mostrar botões de download
-                yield sse("text_doc", json.dumps({"title": doc_title, "content": doc_content}))
-                # Remove a tag <doc> deixando apenas o conteúdo interno para exibição
-                content = _DOC_TAG_RE.sub(doc_content, content)
-
-            if content:
-                # Envia em chunks pequenos para simular streaming na UI
-                chunk_size = 12
-                for i in range(0, len(content), chunk_size):
-                    yield sse("chunk", content[i:i + chunk_size])
-                    await asyncio.sleep(0.015)
             else:
-                yield sse("chunk", "Desculpe, não consegui gerar uma resposta. Tente novamente.")
-            
-            # Encerra o fluxo ReAct com sucesso
-            return
-
-    # Se saiu do loop, atingiu MAX_ITERATIONS
-    yield sse("error", "Limite máximo de processamento atingido. Por favor, seja mais específico na sua solicitação.")
-
+                # O Supervisor respondeu ao usuário diretamente: o texto (e eventuais
+                # text_doc) já foi transmitido em _stream_supervisor_turn.
+                if not streamed.content.strip():
+                    yield sse("chunk", "Desculpe, não consegui gerar uma resposta. Tente novamente.")
+
+                # Encerra o fluxo ReAct com sucesso
+                return
+
+        # Se saiu do loop, atingiu MAX_ITERATIONS
+        yield sse("error", "Limite máximo de processamento atingido. Por favor, seja mais específico na sua solicitação.")
+    finally:
+        # Cliente desconectou ou fluxo encerrado com revisões em aberto
+        for item in qa_pending or []:
+            item.task.cancel()
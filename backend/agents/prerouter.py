@@ -0,0 +1,190 @@
+"""
+Pré-roteador por keywords (zero tokens), compartilhado entre /route e o orquestrador.
+
+  - KEYWORD_PATTERNS / match_keywords → intents do endpoint /route
+    (web_search, ocr_scan, generate_file, deep_search)
+  - preroute() → decide se o primeiro turno do Supervisor pode ser pulado:
+    pedidos inequívocos viram direto a tool call do TOOL_MAP
+      "crie uma planilha de gastos"    → ask_file_generator(file_type=excel)
+      "gere um PDF com o resumo"       → ask_file_generator(file_type=pdf)
+      "faça um post para o instagram"  → generate_ui_design
+      "crie uma landing page para ..." → generate_web_page
+
+Só o verbo no imperativo conta como pedido ("crie", "gera", "monte-me").
+A confiança cai (e o Supervisor decide) quando o pedido é ambíguo: pergunta
+("como criar uma planilha?"), negação ("não crie um pdf"), verbo fora do
+imperativo ("criei um post ontem"), mais de um pedido de geração, sinais de
+pesquisa/OCR (o arquivo depende de dados que ainda não existem), URLs ou
+tipos que o especialista não gera (docx, pptx).
+
+Concordância com o Supervisor (get_prerouter_metrics):
+  - "observed": havia um palpite abaixo do limiar e o Supervisor rodou — a
+    primeira tool dele é comparada com o palpite, sem custo extra
+  - "shadow": o fast path foi usado; numa amostra (prerouter_shadow_rate) o
+    Supervisor roda em segundo plano só para comparar
+"""
+
+import json
+import logging
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Padrões de keywords para classificação zero-token
+KEYWORD_PATTERNS = {
+    "web_search": re.compile(
+        r"\b(pesquis|busc|procur|encontr|search|google|internet|quem é|o que é)\w*",
+        re.IGNORECASE,
+    ),
+    "ocr_scan": re.compile(
+        r"\b(leia|ler|extrair|texto da imagem|scan|ocr)\w*",
+        re.IGNORECASE,
+    ),
+    "generate_file": re.compile(
+        r"\b(gera|cri)\w*\s+(pdf|documento|relatório|report|slide|apresentação|pptx|planilha|excel|xlsx|word|docx)",
+        re.IGNORECASE,
+    ),
+    "deep_search": re.compile(
+        r"\b(pesquisa profunda|deep search|relatório completo|investiga)\w*",
+        re.IGNORECASE,
+    ),
+}
+
+# Verbo de criação no imperativo (você/tu, com ou sem "-me") + até 3 palavras + objeto
+# ("crie uma planilha", "gera o PDF final", "monte-me um site")
+_IMPERATIVE = r"\b(?:ger[ae]|cri[ae]|fa[çc]a|faz|mont[ae]|elabor[ae]|desenvolv[ae]|produza|produz)(?:-me)?\s+"
+# Qualquer forma do verbo ("criar", "criei", "montando"): vira palpite, nunca fast path
+_ANY_FORM = r"\b(?:ger|cri|fa[çcz]|fiz|fe[zi]|mont|elabor|desenvolv|produz)[\w-]*\s+"
+_WORDS = r"(?:\w+\s+){0,3}?"
+
+_OBJECTS = {
+    "ask_file_generator": r"(pdf|planilha|excel|xlsx|docx|word|pptx|apresenta[çc][aã]o|slides?)\b",
+    "generate_ui_design": r"(posts?|carross[eé](?:l|is)|banner|stories|story|flyer|criativos?)\b",
+    "generate_web_page": r"(site|landing\s*page|p[aá]gina\s+(?:web|de\s+vendas))\b",
+}
+FAST_PATH_PATTERNS = {tool: re.compile(_IMPERATIVE + _WORDS + obj, re.IGNORECASE) for tool, obj in _OBJECTS.items()}
+_LOOSE_PATTERNS = {tool: re.compile(_ANY_FORM + _WORDS + obj, re.IGNORECASE) for tool, obj in _OBJECTS.items()}
+# Objeto citado em qualquer lugar: "crie um post e um site" pede duas coisas
+_OBJECT_MENTIONS = {tool: re.compile(r"\b" + obj, re.IGNORECASE) for tool, obj in _OBJECTS.items()}
+
+# Tipos que o ask_file_generator sabe gerar
+_FILE_TYPES = {"pdf": "pdf", "planilha": "excel", "excel": "excel", "xlsx": "excel"}
+
+_URL_PATTERN = re.compile(r"https?://", re.IGNORECASE)
+# Pergunta: "?" ou mensagem começando por palavra interrogativa
+_QUESTION = re.compile(
+    r"\?|^\s*(?:como|qual|quais|quando|onde|por\s*que|porque|ser[aá]|d[aá]\s+pra|d[aá]\s+para|[eé]\s+poss[ií]vel)\b",
+    re.IGNORECASE,
+)
+_NEGATION = re.compile(r"\b(?:n[aã]o|nunca|nem)\b", re.IGNORECASE)
+
+CONFIDENT = 0.95
+AMBIGUOUS = 0.6
+
+
+def match_keywords(message: str) -> str | None:
+    """Classificação por keywords (zero tokens)."""
+    for intent, pattern in KEYWORD_PATTERNS.items():
+        if pattern.search(message):
+            return intent
+    return None
+
+
+@dataclass
+class PreRoute:
+    """Palpite do pré-roteador: a tool call que o Supervisor provavelmente faria."""
+
+    tool: str
+    arguments: dict = field(default_factory=dict)
+    confidence: float = 0.0
+    reason: str = ""
+
+    def as_tool_call(self) -> dict:
+        return {
+            "id": f"preroute_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": self.tool, "arguments": json.dumps(self.arguments, ensure_ascii=False)},
+        }
+
+
+def preroute(message: str) -> Optional[PreRoute]:
+    """Palpite de tool call para a mensagem, ou None se nada casar."""
+    if not message or not message.strip():
+        return None
+
+    matches = {tool: m for tool, pattern in FAST_PATH_PATTERNS.items() if (m := pattern.search(message))}
+    imperative = bool(matches)
+    if not matches:
+        matches = {tool: m for tool, pattern in _LOOSE_PATTERNS.items() if (m := pattern.search(message))}
+    if not matches:
+        return None
+
+    tool, match = next(iter(matches.items()))
+    if tool == "ask_file_generator":
+        file_type = _FILE_TYPES.get(match.group(1).lower())
+        arguments = {"file_type": file_type or match.group(1).lower(), "instructions": message, "data": ""}
+    else:
+        file_type = None
+        arguments = {"requirements": message}
+
+    if _QUESTION.search(message):
+        return PreRoute(tool, arguments, AMBIGUOUS, "pergunta")
+    if _NEGATION.search(message):
+        return PreRoute(tool, arguments, AMBIGUOUS, "negação")
+    if not imperative:
+        return PreRoute(tool, arguments, AMBIGUOUS, "verbo fora do imperativo")
+    mentioned = [t for t, pattern in _OBJECT_MENTIONS.items() if t in matches or pattern.search(message)]
+    if len(mentioned) > 1:
+        return PreRoute(tool, arguments, AMBIGUOUS, f"vários pedidos: {', '.join(mentioned)}")
+    if tool == "ask_file_generator" and file_type is None:
+        return PreRoute(tool, arguments, AMBIGUOUS, f"tipo não suportado pelo especialista: {match.group(1)}")
+    if _URL_PATTERN.search(message):
+        return PreRoute(tool, arguments, AMBIGUOUS, "mensagem com URL")
+    for intent in ("web_search", "deep_search", "ocr_scan"):
+        if KEYWORD_PATTERNS[intent].search(message):
+            return PreRoute(tool, arguments, AMBIGUOUS, f"depende de {intent}")
+    return PreRoute(tool, arguments, CONFIDENT, "pedido inequívoco")
+
+
+# ── Concordância com o Supervisor ────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats = {"fast_path": 0, "supervisor": 0, "no_match": 0}
+_agreement: dict[str, dict[str, int]] = {}
+
+
+def record_decision(kind: str):
+    """kind: fast_path | supervisor (palpite abaixo do limiar) | no_match."""
+    with _stats_lock:
+        _stats[kind] += 1
+
+
+def record_agreement(guess: PreRoute, supervisor_tool: Optional[str], source: str):
+    """Compara o palpite com a primeira tool do Supervisor (None = respondeu direto)."""
+    agreed = supervisor_tool == guess.tool
+    with _stats_lock:
+        entry = _agreement.setdefault(guess.tool, {"agree": 0, "disagree": 0, "shadow": 0, "observed": 0})
+        entry["agree" if agreed else "disagree"] += 1
+        entry[source] += 1
+    if not agreed:
+        logger.info(
+            f"[PREROUTER] Discordância ({source}): palpite {guess.tool} "
+            f"({guess.confidence:.2f}, {guess.reason}) x Supervisor {supervisor_tool or 'resposta direta'}"
+        )
+
+
+def get_prerouter_metrics() -> dict:
+    """Uso do fast path e taxa de concordância com o Supervisor (usado em /api/admin/metrics)."""
+    with _stats_lock:
+        by_tool = {
+            tool: {
+                **entry,
+                "agreement_rate": round(entry["agree"] / (entry["agree"] + entry["disagree"]), 3),
+            }
+            for tool, entry in _agreement.items()
+        }
+        return {**_stats, "agreement": by_tool}
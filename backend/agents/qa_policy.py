@@ -0,0 +1,228 @@
+"""
+Política de amostragem do Agente QA.
+
+O QA falha aberto e, em rotas onde aprova quase tudo, é só latência e custo.
+Aqui cada revisão registra aprovado/rejeitado por (rota, modelo, versão do
+prompt) e a decisão de revisar segue:
+
+  - menos de min_samples revisões para a versão atual → sempre revisa
+    (aquecimento: prompt, tools ou modelo novos depois de um update no registry
+    geram outra versão e recomeçam do zero)
+  - taxa de aprovação ≥ approval_threshold → revisa só uma amostra (sample_rate)
+  - caso contrário → sempre revisa
+
+As contagens decaem (_DECAY por revisão), então uma rota que começa a ser
+rejeitada volta a ser revisada sem esperar centenas de amostras. Correções
+pedidas pelo QA (tentativas > 0) e os validadores determinísticos
+(_validate_specialist_response) rodam sempre — a política só decide a
+primeira revisão.
+
+O histórico fica num SQLite em workspace_path, compartilhado entre os
+workers. Erros do SQLite ou do QA (fail-open) não contam como amostra.
+"""
+
+import asyncio
+import hashlib
+import logging
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS qa_outcomes (
+    route TEXT NOT NULL,
+    model TEXT NOT NULL,
+    version TEXT NOT NULL,
+    approved REAL NOT NULL DEFAULT 0,
+    rejected REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (route, model, version)
+);
+"""
+
+# Peso das revisões antigas a cada nova (0.98 → memória efetiva de ~50 revisões)
+_DECAY = 0.98
+
+
+def prompt_version(route: str) -> str:
+    """Impressão digital do prompt + tools da rota no registry."""
+    from backend.agents import registry
+    tools = sorted(
+        (t.get("function") or {}).get("name", "") for t in registry.get_tools(route) or []
+    )
+    digest = hashlib.sha256(f"{registry.get_prompt(route)}\x00{','.join(tools)}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class QAPolicy:
+    """Decide quando revisar e acumula o histórico de aprovação por rota/modelo/versão."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        enabled: bool = True,
+        min_samples: float = 20,
+        approval_threshold: float = 0.95,
+        sample_rate: float = 0.2,
+    ):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.min_samples = min_samples
+        self.approval_threshold = approval_threshold
+        self.sample_rate = sample_rate
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"reviewed": 0, "warmup": 0, "sampled": 0, "skipped": 0, "errors": 0}
+
+    # ── Decisão ───────────────────────────────────────
+
+    async def should_review(self, route: str, model: str) -> bool:
+        if not self.enabled:
+            return True
+        version = prompt_version(route)
+        try:
+            approved, rejected = await asyncio.to_thread(self._load, route, model, version)
+        except Exception as e:
+            logger.warning(f"[QA_POLICY] Falha lendo histórico: {e}")
+            self._count("errors")
+            return True
+
+        samples = approved + rejected
+        if samples < self.min_samples:
+            self._count("warmup")
+            return True
+        rate = approved / samples
+        if rate < self.approval_threshold:
+            self._count("reviewed")
+            return True
+        if random.random() < self.sample_rate:
+            self._count("sampled")
+            return True
+        self._count("skipped")
+        logger.info(f"[QA_POLICY] {route}/{model}: QA dispensado (aprovação {rate:.0%} em ~{samples:.0f} revisões)")
+        return False
+
+    async def record(self, route: str, model: str, approved: bool):
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._record, route, model, prompt_version(route), approved)
+        except Exception as e:
+            logger.warning(f"[QA_POLICY] Falha registrando revisão: {e}")
+            self._count("errors")
+
+    async def approval_rates(self, route: str) -> dict[str, float]:
+        """Taxa de aprovação por modelo na versão atual da rota (só com min_samples revisões)."""
+        if not self.enabled:
+            return {}
+        try:
+            rows = await asyncio.to_thread(self._load_route, route, prompt_version(route))
+        except Exception as e:
+            logger.warning(f"[QA_POLICY] Falha lendo histórico: {e}")
+            return {}
+        return {
+            model: approved / (approved + rejected)
+            for model, approved, rejected in rows
+            if approved + rejected >= self.min_samples
+        }
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    # ── SQLite (roda em thread) ───────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _load(self, route: str, model: str, version: str) -> tuple[float, float]:
+        row = self._conn().execute(
+            "SELECT approved, rejected FROM qa_outcomes WHERE route = ? AND model = ? AND version = ?",
+            (route, model, version),
+        ).fetchone()
+        return (row[0], row[1]) if row else (0.0, 0.0)
+
+    def _load_route(self, route: str, version: str) -> list[tuple[str, float, float]]:
+        return self._conn().execute(
+            "SELECT model, approved, rejected FROM qa_outcomes WHERE route = ? AND version = ?",
+            (route, version),
+        ).fetchall()
+
+    def _record(self, route: str, model: str, version: str, approved: bool):
+        self._conn().execute(
+            """
+            INSERT INTO qa_outcomes (route, model, version, approved, rejected, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (route, model, version) DO UPDATE SET
+                approved = approved * ? + excluded.approved,
+                rejected = rejected * ? + excluded.rejected,
+                updated_at = excluded.updated_at
+            """,
+            (route, model, version, float(approved), float(not approved), time.time(), _DECAY, _DECAY),
+        )
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            decisions = dict(self._stats)
+        routes = []
+        if self.enabled:
+            try:
+                rows = self._conn().execute(
+                    "SELECT route, model, version, approved, rejected FROM qa_outcomes "
+                    "ORDER BY updated_at DESC LIMIT 50"
+                ).fetchall()
+                routes = [
+                    {
+                        "route": route,
+                        "model": model,
+                        "version": version,
+                        "samples": round(approved + rejected, 1),
+                        "approval_rate": round(approved / (approved + rejected), 3) if approved + rejected else None,
+                    }
+                    for route, model, version, approved, rejected in rows
+                ]
+            except Exception as e:
+                logger.warning(f"[QA_POLICY] Falha lendo métricas: {e}")
+        return {
+            "enabled": self.enabled,
+            "min_samples": self.min_samples,
+            "approval_threshold": self.approval_threshold,
+            "sample_rate": self.sample_rate,
+            "decisions": decisions,
+            "routes": routes,
+        }
+
+
+_policy: Optional[QAPolicy] = None
+
+
+def get_qa_policy() -> QAPolicy:
+    """Retorna a política singleton, configurada a partir de AgentConfig."""
+    global _policy
+    if _policy is None:
+        from backend.core.config import get_config
+        config = get_config()
+        _policy = QAPolicy(
+            db_path=config.workspace_path / "qa_policy.sqlite3",
+            enabled=config.qa_policy_enable,
+            min_samples=config.qa_policy_min_samples,
+            approval_threshold=config.qa_policy_approval_threshold,
+            sample_rate=config.qa_policy_sample_rate,
+        )
+    return _policy
@@ -30,6 +30,11 @@ _REGISTRY: dict[str, dict[str, Any]] = {}
 # Flag para inicialização lazy — evita carregar tudo no import do módulo
 _initialized = False
 
+# Agentes cujo system prompt + tools é grande e estável o bastante para valer
+# o prompt caching do provider (a Anthropic só cacheia prefixos >= ~1024 tokens
+# e cobra a escrita no cache, então prompts pequenos ficam de fora).
+PROMPT_CACHE_DEFAULTS = {"chat", "file_generator", "file_modifier", "dev"}
+
 
 # ── Inicialização ──────────────────────────────────────────────────────────────
 
@@ -66,7 +71,8 @@ def initialize():
     )
     from backend.core.config import get_config
 
-    default_model = get_config().openrouter_model
+    config = get_config()
+    default_model = config.openrouter_model
 
     # Configuração padrão de cada agente.
     # "module" agrupa agentes por produto (Arcco Chat, Builder, Pages, Sistema).
@@ -164,6 +170,17 @@ def initialize():
         },
     }
 
+    # Campos comuns a todos os agentes (podem ser customizados pelo admin)
+    for agent in _REGISTRY.values():
+        # Modelos tentados em ordem quando o principal falha (429/5xx/timeout)
+        agent.setdefault("fallback_models", list(config.openrouter_fallback_models))
+        # system_prompt marcado com cache_control (core/llm.py: system_message)
+        agent.setdefault("prompt_cache", agent["id"] in PROMPT_CACHE_DEFAULTS)
+        # Máximo de tokens de entrada por chamada (core/tokens.py corta o excesso)
+        agent.setdefault("input_token_budget", config.llm_input_token_budget)
+        # Política do roteador de modelos (core/model_router.py); "static" = sempre `model`
+        agent.setdefault("routing", default_routing(agent["id"]))
+
     # Aplica overrides persistidos (customizações salvas pelo admin)
     _apply_overrides()
     _initialized = True
@@ -209,6 +226,10 @@ def _save_overrides():
                 "system_prompt": agent["system_prompt"],
                 "model": agent["model"],
                 "tools": agent["tools"],
+                "fallback_models": agent.get("fallback_models", []),
+                "prompt_cache": agent.get("prompt_cache", False),
+                "input_token_budget": agent.get("input_token_budget"),
+                "routing": agent.get("routing"),
             }
             for agent_id, agent in _REGISTRY.items()
         }
@@ -255,6 +276,48 @@ def get_model(agent_id: str) -> str:
     return get_config().openrouter_model
 
 
+def get_fallback_models(agent_id: str) -> list[str]:
+    """
+    Retorna a lista ordenada de modelos de fallback do agente.
+    Fallback para AgentConfig.openrouter_fallback_models se o agente não existir.
+    """
+    _ensure_initialized()
+    agent = _REGISTRY.get(agent_id)
+    if agent is not None:
+        return list(agent.get("fallback_models") or [])
+    from backend.core.config import get_config
+    return list(get_config().openrouter_fallback_models)
+
+
+def get_input_budget(agent_id: str) -> int:
+    """
+    Retorna o orçamento de tokens de entrada do agente.
+    Fallback para AgentConfig.llm_input_token_budget se não houver valor.
+    """
+    _ensure_initialized()
+    agent = _REGISTRY.get(agent_id)
+    if agent and agent.get("input_token_budget"):
+        return int(agent["input_token_budget"])
+    from backend.core.config import get_config
+    return get_config().llm_input_token_budget
+
+
+def is_prompt_cacheable(agent_id: str) -> bool:
+    """Indica se o system prompt do agente deve ir com breakpoint de prompt caching."""
+    _ensure_initialized()
+    agent = _REGISTRY.get(agent_id)
+    return bool(agent and agent.get("prompt_cache"))
+
+
+def get_system_message(agent_id: str, dynamic: str = "") -> dict:
+    """
+    Mensagem de sistema do agente: o prompt fixo é a parte cacheável e
+    `dynamic` (contexto da requisição) vem depois, fora do prefixo cacheado.
+    """
+    from backend.core.llm import system_message
+    return system_message(get_prompt(agent_id), dynamic, cacheable=is_prompt_cacheable(agent_id))
+
+
 def get_tools(agent_id: str) -> list:
     """Retorna a lista de tools do agente (formato OpenRouter/OpenAI)."""
     _ensure_initialized()
@@ -262,6 +325,61 @@ def get_tools(agent_id: str) -> list:
     return agent.get("tools", []) if agent else []
 
 
+def default_routing(agent_id: str) -> dict:
+    """Política padrão do agente/tarefa (AgentConfig.model_router_policies)."""
+    from backend.core.config import get_config
+    return {"policy": get_config().model_router_policies.get(agent_id, "static"), "models": [], "quality_floor": 0.9}
+
+
+def validate_routing(routing: dict) -> dict:
+    """Normaliza o "routing" vindo do admin. Levanta ValueError se a política não existir."""
+    from backend.core.model_router import POLICIES
+    policy = routing.get("policy", "static")
+    if policy not in POLICIES:
+        raise ValueError(f"política '{policy}' inválida (use {', '.join(POLICIES)})")
+    return {
+        "policy": policy,
+        "models": [m for m in routing.get("models") or [] if m],
+        "quality_floor": float(routing.get("quality_floor", 0.9)),
+    }
+
+
+async def pick_model(
+    agent_id: str, default: str | None = None, output_tokens: int = 500, input_tokens: int = 1000
+) -> str:
+    """
+    Modelo para esta chamada do agente (ou tarefa sem agente: "classify", "plan").
+    Com política "static" é o mesmo que get_model(); nas demais o roteador escolhe
+    entre routing["models"] (vazio = modelos pequenos do config) e o modelo padrão.
+    """
+    from backend.core.config import get_config
+    from backend.core.model_router import get_model_router
+    _ensure_initialized()
+    config = get_config()
+    agent = _REGISTRY.get(agent_id)
+    base = get_model(agent_id) if agent else (default or config.openrouter_model)
+    routing = (agent or {}).get("routing") or default_routing(agent_id)
+    policy = routing.get("policy", "static")
+    if policy == "static":
+        return base
+
+    candidates = list(routing.get("models") or config.model_router_small_models)
+    quality = None
+    if policy == "quality_floor":
+        from backend.agents.qa_policy import get_qa_policy
+        quality = await get_qa_policy().approval_rates(agent_id)
+    return get_model_router().choose(
+        agent_id,
+        base,
+        candidates,
+        policy,
+        output_tokens=output_tokens,
+        input_tokens=input_tokens,
+        quality=quality,
+        quality_floor=float(routing.get("quality_floor", 0.9)),
+    )
+
+
 def update_agent(agent_id: str, data: dict) -> bool:
     """
     Atualiza campos de um agente em memória e persiste no JSON override.
@@ -0,0 +1,401 @@
+"""
+Registro declarativo das ferramentas dos especialistas.
+
+Cada ferramenta é declarada uma única vez, com o decorator @tool em
+agents/executor.py:
+
+    @tool(
+        "web_fetch",
+        "Lê e extrai texto de uma URL específica",
+        {"type": "object", "properties": {...}, "required": ["url"]},
+        timeout=30, concurrency=8, cacheable=True,
+    )
+    async def _web_fetch(args: dict) -> str: ...
+
+Da mesma declaração saem:
+  - o JSON de tools do OpenRouter (openrouter_tools, usado em agents/tools.py)
+  - o validador dos argumentos, compilado uma vez no registro (compile_validator)
+  - timeout por chamada (TOOL_TIMEOUTS sobrescreve: "ask_browser=180,web_fetch=20")
+  - semáforo de concorrência por ferramenta (Playwright, Browserbase, subprocess)
+  - executor: "async" (no event loop), "thread" (asyncio.to_thread) ou
+    "process" (ProcessPoolExecutor — handler precisa ser uma função de módulo)
+  - cacheable: resultado reaproveitado por tool_cache_ttl_seconds para os
+    mesmos argumentos (só ferramentas de leitura, sem efeito colateral)
+
+Argumentos inválidos, timeout e ferramenta desconhecida viram texto de erro
+para o LLM corrigir, como o resto do loop dos especialistas. No timeout,
+handlers async são cancelados; código em thread/processo não é interrompido
+(o especialista só para de esperar). Em ambos os casos o slot de concorrência
+só volta quando o trabalho termina de fato.
+"""
+
+import asyncio
+import contextvars
+import copy
+import functools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ("async", "thread", "process")
+
+# Resultados de ferramentas cacheáveis guardados por worker
+_CACHE_SIZE = 256
+_PROCESS_WORKERS = 2
+# Erros que não valem como resultado (não entram no cache)
+_ERROR_PREFIXES = ("Erro", "❌")
+
+
+# ── Validação de argumentos ──────────────────────────────────────────────────
+
+Validator = Callable[[Any, str, list], None]
+
+
+def _check_type(expected: str) -> Callable[[Any], bool]:
+    # Números valem onde se espera string e vice-versa: os handlers já convertem (str()/int())
+    if expected == "string":
+        return lambda v: isinstance(v, (str, int, float)) and not isinstance(v, bool)
+    if expected in ("integer", "number"):
+        def is_number(v) -> bool:
+            if isinstance(v, bool):
+                return False
+            if isinstance(v, (int, float)):
+                return expected == "number" or float(v).is_integer()
+            if isinstance(v, str):
+                try:
+                    float(v)
+                    return True
+                except ValueError:
+                    return False
+            return False
+        return is_number
+    if expected == "boolean":
+        return lambda v: isinstance(v, bool)
+    if expected == "array":
+        return lambda v: isinstance(v, list)
+    if expected == "object":
+        return lambda v: isinstance(v, dict)
+    return lambda v: True
+
+
+def _compile(schema: dict) -> Validator:
+    expected = schema.get("type")
+    type_ok = _check_type(expected) if expected else None
+    checks: list[Validator] = []
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path} deve ser um de {allowed}")
+        checks.append(check_enum)
+
+    required = list(schema.get("required", []))
+    properties = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+    if required or properties:
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if value.get(name) is None:
+                    errors.append(f"campo obrigatório ausente: {path + '.' if path else ''}{name}")
+            for name, validate_property in properties.items():
+                if value.get(name) is not None:
+                    validate_property(value[name], f"{path}.{name}" if path else name, errors)
+        checks.append(check_object)
+
+    if "items" in schema:
+        validate_item = _compile(schema["items"])
+
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    validate_item(item, f"{path}[{i}]", errors)
+        checks.append(check_items)
+
+    def validate(value, path, errors):
+        # Tipo errado: as outras regras só gerariam ruído
+        if type_ok is not None and not type_ok(value):
+            errors.append(f"{path or 'argumentos'} deveria ser {expected}")
+            return
+        for check in checks:
+            check(value, path, errors)
+    return validate
+
+
+def compile_validator(schema: dict) -> Callable[[Any], list[str]]:
+    """
+    Validador de um JSON Schema de parâmetros (subconjunto usado nas tools:
+    type, enum, required, properties, items). Retorna a lista de erros.
+    Campos extras são aceitos: o LLM às vezes manda mais do que o pedido.
+    """
+    validate = _compile(schema)
+
+    def run(args: Any) -> list[str]:
+        errors: list[str] = []
+        validate(args, "", errors)
+        return errors
+    return run
+
+
+# ── Registro ─────────────────────────────────────────────────────────────────
+
+@dataclass
+class ToolSpec:
+    """Declaração de uma ferramenta: schema para o LLM + política de execução."""
+
+    name: str
+    handler: Callable
+    description: str
+    parameters: dict
+    timeout: float = 60.0
+    concurrency: Optional[int] = None
+    executor: str = "async"
+    cacheable: bool = False
+    validate: Callable[[Any], list[str]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"Executor inválido para '{self.name}': {self.executor} (use {', '.join(EXECUTORS)})")
+        self.validate = compile_validator(self.parameters)
+
+    def openrouter(self) -> dict:
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": copy.deepcopy(self.parameters),
+            },
+        }
+
+
+_TOOLS: dict[str, ToolSpec] = {}
+
+
+def tool(
+    name: str,
+    description: str,
+    parameters: dict,
+    *,
+    timeout: float = 60.0,
+    concurrency: Optional[int] = None,
+    executor: str = "async",
+    cacheable: bool = False,
+):
+    """Registra o handler `(args: dict) -> str` como a ferramenta `name`."""
+    def register(handler: Callable) -> Callable:
+        if name in _TOOLS:
+            raise ValueError(f"Ferramenta '{name}' registrada duas vezes")
+        _TOOLS[name] = ToolSpec(name, handler, description, parameters, timeout, concurrency, executor, cacheable)
+        return handler
+    return register
+
+
+def get_tool(name: str) -> Optional[ToolSpec]:
+    return _TOOLS.get(name)
+
+
+def openrouter_tool(name: str) -> dict:
+    """Definição de tool no formato do OpenRouter, gerada a partir do registro."""
+    return _TOOLS[name].openrouter()
+
+
+def openrouter_tools(*names: str) -> list:
+    return [openrouter_tool(name) for name in names]
+
+
+# ── Execução ─────────────────────────────────────────────────────────────────
+
+class ToolRunner:
+    """Executa ferramentas registradas com validação, timeout, limite de concorrência e cache."""
+
+    def __init__(self, timeouts: Optional[dict] = None, cache_ttl: float = 300.0):
+        self.timeouts = timeouts or {}
+        self.cache_ttl = cache_ttl
+
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._stats: dict[str, dict] = {}
+
+    async def run(self, name: str, args: Any) -> str:
+        spec = _TOOLS.get(name)
+        if spec is None:
+            return f"Ferramenta desconhecida: {name}"
+
+        errors = spec.validate(args)
+        if errors:
+            self._count(name, "invalid_args")
+            return f"Erro: argumentos inválidos para {name}: {'; '.join(errors[:5])}. Corrija e chame de novo."
+
+        cache_key = None
+        if spec.cacheable and self.cache_ttl > 0:
+            cache_key = f"{name}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self._count(name, "cache_hits")
+                return cached
+
+        timeout = float(self.timeouts.get(name, spec.timeout))
+        semaphore = self._semaphore(spec)
+        waited = time.perf_counter()
+        if semaphore is not None:
+            await semaphore.acquire()
+        started = time.perf_counter()
+        self._count(name, "in_flight")
+        try:
+            work = self._start(spec, args)
+        except BaseException:
+            self._finished(name, semaphore, None)
+            raise
+        # Slot e in_flight voltam quando o trabalho acaba, não quando a espera é abandonada
+        # (uma thread do Playwright segue rodando depois do timeout)
+        work.add_done_callback(functools.partial(self._finished, name, semaphore))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(work), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(work)
+            self._count(name, "timeouts")
+            logger.warning(f"[TOOLS] {name} excedeu {timeout:g}s")
+            return f"Erro: a ferramenta {name} excedeu o tempo limite de {timeout:g}s. Tente de novo com um pedido menor ou use outra ferramenta."
+        except asyncio.CancelledError:
+            self._abandon(work)
+            raise
+        except Exception:
+            self._count(name, "errors")
+            raise
+        finally:
+            self._record_time(name, (started - waited) * 1000, (time.perf_counter() - started) * 1000)
+
+        if not isinstance(result, str):
+            result = str(result)
+        if result.startswith(_ERROR_PREFIXES):
+            self._count(name, "errors")
+        elif cache_key is not None:
+            self._cache_put(cache_key, result)
+        return result
+
+    def _start(self, spec: ToolSpec, args: dict) -> asyncio.Future:
+        """Dispara o handler; o future só completa quando a thread/processo/coroutine termina."""
+        loop = asyncio.get_running_loop()
+        if spec.executor == "thread":
+            context = contextvars.copy_context()  # como asyncio.to_thread
+            return loop.run_in_executor(None, functools.partial(context.run, spec.handler, args))
+        if spec.executor == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=_PROCESS_WORKERS)
+            return loop.run_in_executor(self._process_pool, spec.handler, args)
+        return asyncio.ensure_future(spec.handler(args))
+
+    @staticmethod
+    def _abandon(work: asyncio.Future):
+        # Coroutine pode ser cancelada (ask_browser libera a sessão no finally);
+        # cancelar o future de uma thread só o marcaria como pronto com ela ainda rodando
+        if isinstance(work, asyncio.Task):
+            work.cancel()
+
+    def _finished(self, name: str, semaphore: Optional[asyncio.Semaphore], work: Optional[asyncio.Future]):
+        if semaphore is not None:
+            semaphore.release()
+        self._count(name, "in_flight", -1)
+        if work is not None and not work.cancelled():
+            work.exception()  # marca como lida: erro depois de um timeout não vira warning do asyncio
+
+    def _semaphore(self, spec: ToolSpec) -> Optional[asyncio.Semaphore]:
+        if not spec.concurrency:
+            return None
+        with self._lock:
+            semaphore = self._semaphores.get(spec.name)
+            if semaphore is None:
+                semaphore = self._semaphores[spec.name] = asyncio.Semaphore(spec.concurrency)
+            return semaphore
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_put(self, key: str, result: str):
+        with self._lock:
+            self._cache[key] = (time.time(), result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > _CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _entry(self, name: str) -> dict:
+        if name not in self._stats:
+            self._stats[name] = _new_entry()
+        return self._stats[name]
+
+    def _count(self, name: str, kind: str, delta: int = 1):
+        with self._lock:
+            self._entry(name)[kind] += delta
+
+    def _record_time(self, name: str, queue_ms: float, run_ms: float):
+        with self._lock:
+            entry = self._entry(name)
+            entry["calls"] += 1
+            entry["total_ms"] += run_ms
+            entry["max_ms"] = max(entry["max_ms"], run_ms)
+            entry["queue_ms"] += queue_ms
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = {name: dict(entry) for name, entry in self._stats.items()}
+            cached = len(self._cache)
+        tools = {}
+        for name, spec in _TOOLS.items():
+            entry = stats.get(name) or _new_entry()
+            calls = entry.pop("calls")
+            total_ms = entry.pop("total_ms")
+            queue_ms = entry.pop("queue_ms")
+            tools[name] = {
+                "timeout": float(self.timeouts.get(name, spec.timeout)),
+                "concurrency": spec.concurrency,
+                "executor": spec.executor,
+                "cacheable": spec.cacheable,
+                "calls": calls,
+                **entry,
+                "avg_ms": round(total_ms / calls, 1) if calls else None,
+                "avg_queue_ms": round(queue_ms / calls, 1) if calls else None,
+                "max_ms": round(entry["max_ms"], 1),
+            }
+        return {"cache_ttl_seconds": self.cache_ttl, "cached_results": cached, "tools": tools}
+
+
+def _new_entry() -> dict:
+    return {
+        "calls": 0, "in_flight": 0, "errors": 0, "timeouts": 0, "invalid_args": 0, "cache_hits": 0,
+        "total_ms": 0.0, "max_ms": 0.0, "queue_ms": 0.0,
+    }
+
+
+_runner: Optional[ToolRunner] = None
+
+
+def get_tool_runner() -> ToolRunner:
+    """Retorna o executor de ferramentas singleton, configurado a partir de AgentConfig."""
+    global _runner
+    if _runner is None:
+        from backend.core.config import get_config
+        config = get_config()
+        _runner = ToolRunner(timeouts=config.tool_timeouts, cache_ttl=config.tool_cache_ttl_seconds)
+    return _runner
@@ -7,11 +7,16 @@ ROTAS DISPONÍVEIS:
   PUT  /api/admin/agents/{id}         → Salva alterações diretamente nos arquivos .py + memória
   POST /api/admin/agents/reset/{id}   → Reseta agente para os valores padrão do código
   GET  /api/admin/models              → Lista todos os modelos do OpenRouter com preços
+  GET  /api/admin/metrics             → Métricas de runtime (pools HTTP, caches, limitadores, circuit breakers)
 
 COMO AS ALTERAÇÕES SÃO SALVAS:
   - system_prompt → reescrito com regex diretamente em prompts.py
   - tools         → reescrito com AST (análise de código) diretamente em tools.py
   - model         → salvo no override JSON (não existe constante .py para modelo)
+  - fallback_models → salvo no override JSON (cadeia de modelos em caso de falha)
+  - prompt_cache  → salvo no override JSON (breakpoint de prompt caching no system prompt)
+  - input_token_budget → salvo no override JSON (orçamento de contexto por chamada)
+  - routing       → salvo no override JSON (política do roteador de modelos, ver core/model_router.py)
   - name/description → apenas em memória/JSON (não ficam nos .py)
 
   Uvicorn com --reload detecta mudanças nos .py e reinicia o servidor automaticamente.
@@ -21,15 +26,34 @@ import ast
 import json
 import logging
 import re
-import time
 from pathlib import Path
 from typing import Any, Optional
 
-import httpx
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from backend.agents import registry
+from backend.agents.artifact_memo import get_artifact_memo
+from backend.agents.orchestrator import get_qa_metrics
+from backend.agents.prerouter import get_prerouter_metrics
+from backend.agents.qa_policy import get_qa_policy
+from backend.agents.tool_registry import get_tool_runner
+from backend.core.admission import get_admission_controller
+from backend.core.cancellation import get_cancellation_metrics
+from backend.core.circuit_breaker import get_circuit_metrics
+from backend.core.compression import get_tool_compressor
+from backend.core.credentials import get_credential_store
+from backend.core.http_client import get_http_metrics
+from backend.core.jobs import get_job_manager
+from backend.core.llm import get_prompt_cache_metrics
+from backend.core.llm_cache import get_llm_cache
+from backend.core.llm_cassette import get_cassette
+from backend.core.model_router import fetch_model_catalog, get_model_router
+from backend.core.session_store import get_session_store
+from backend.core.tokens import get_token_budget_metrics
+from backend.core.tracing import get_tracing_metrics
+from backend.core.rate_limiter import get_rate_limiter
+from backend.services.web_fetcher import get_fetch_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -147,14 +171,6 @@ def _write_tools_to_source(agent_id: str, new_tools: list) -> None:
         raise ValueError(f"Constante '{constant}' não encontrada em tools.py")
 
 
-# ── Cache de modelos OpenRouter ────────────────────────────────────────────────
-# A lista de modelos muda pouco — cache de 1 hora evita chamadas repetidas à API
-
-_models_cache: list | None = None
-_models_cache_ts: float = 0
-_MODELS_CACHE_TTL = 3600  # segundos (1 hora)
-
-
 # ── Endpoints ──────────────────────────────────────────────────────────────────
 
 @router.get("/agents")
@@ -210,6 +226,21 @@ async def update_agent(agent_id: str, req: "AgentUpdateRequest"):
     if req.model is not None:
         update_data["model"] = req.model
 
+    if req.fallback_models is not None:
+        update_data["fallback_models"] = [m for m in req.fallback_models if m]
+
+    if req.prompt_cache is not None:
+        update_data["prompt_cache"] = req.prompt_cache
+
+    if req.input_token_budget is not None:
+        update_data["input_token_budget"] = req.input_token_budget
+
+    if req.routing is not None:
+        try:
+            update_data["routing"] = registry.validate_routing(req.routing)
+        except ValueError as e:
+            errors.append(f"routing: {e}")
+
     if req.name is not None:
         update_data["name"] = req.name
 
@@ -247,6 +278,7 @@ async def reset_agent(agent_id: str):
     from backend.core.config import get_config
 
     default_model = get_config().openrouter_model
+    default_fallbacks = list(get_config().openrouter_fallback_models)
 
     DEFAULTS: dict[str, dict] = {
         "chat":           {"system_prompt": CHAT_SYSTEM_PROMPT,           "model": default_model, "tools": SUPERVISOR_TOOLS},
@@ -261,7 +293,13 @@ async def reset_agent(agent_id: str):
     if agent_id not in DEFAULTS:
         raise HTTPException(status_code=404, detail=f"Agente '{agent_id}' não encontrado")
 
-    registry.update_agent(agent_id, DEFAULTS[agent_id])
+    registry.update_agent(agent_id, {
+        **DEFAULTS[agent_id],
+        "fallback_models": default_fallbacks,
+        "prompt_cache": agent_id in registry.PROMPT_CACHE_DEFAULTS,
+        "input_token_budget": get_config().llm_input_token_budget,
+        "routing": registry.default_routing(agent_id),
+    })
     return {"success": True, "agent": registry.get_agent(agent_id)}
 
 
@@ -279,61 +317,67 @@ async def list_models():
       context_length → janela de contexto em tokens
       pricing        → { prompt_1m, completion_1m } — custo por 1 milhão de tokens em USD
     """
-    global _models_cache, _models_cache_ts
-
-    # Retorna do cache se ainda válido
-    if _models_cache and (time.time() - _models_cache_ts) < _MODELS_CACHE_TTL:
-        return {"models": _models_cache, "cached": True}
-
-    from backend.core.config import get_config
-    config = get_config()
-
-    headers: dict[str, str] = {
-        "HTTP-Referer": "https://arcco.ai",
-        "X-Title": "Arcco Admin",
-    }
-    if config.openrouter_api_key:
-        headers["Authorization"] = f"Bearer {config.openrouter_api_key}"
-
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.get("https://openrouter.ai/api/v1/models", headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
+        models, cached = await fetch_model_catalog()
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Erro ao buscar modelos do OpenRouter: {e}")
+    return {"models": models, "cached": cached}
 
-    models = []
-    for m in data.get("data", []):
-        pricing = m.get("pricing", {})
-        try:
-            # OpenRouter retorna preço por token; multiplicamos por 1M para exibir
-            prompt_1m     = round(float(pricing.get("prompt", 0) or 0) * 1_000_000, 4)
-            completion_1m = round(float(pricing.get("completion", 0) or 0) * 1_000_000, 4)
-        except (ValueError, TypeError):
-            prompt_1m = completion_1m = 0.0
-
-        models.append({
-            "id":             m["id"],
-            "name":           m.get("name", m["id"]),
-            "context_length": m.get("context_length", 0),
-            "pricing": {
-                "prompt_1m":     prompt_1m,
-                "completion_1m": completion_1m,
-            },
-        })
-
-    # Gratuitos (ambos os preços = 0) vão para o final da lista
-    models.sort(key=lambda x: (
-        x["pricing"]["prompt_1m"] == 0 and x["pricing"]["completion_1m"] == 0,
-        x["name"].lower()
-    ))
-
-    _models_cache    = models
-    _models_cache_ts = time.time()
-
-    logger.info(f"[ADMIN] {len(models)} modelos carregados do OpenRouter")
-    return {"models": models, "cached": False}
+
+@router.get("/metrics")
+async def runtime_metrics():
+    """
+    Métricas de runtime deste worker (cada worker uvicorn tem as suas).
+
+    Seções:
+      http        → pools de conexão e concorrência por host (core/http_client.py)
+      credentials → estado do cache de API keys (core/credentials.py)
+      llm_cache   → hits/misses do cache de respostas do LLM (core/llm_cache.py)
+      rate_limit  → limite AIMD, tokens e espera na fila por modelo (core/rate_limiter.py);
+                    "shared" vem do SQLite (todos os workers), "worker" é local
+      prompt_cache → tokens de prompt servidos do cache do provider (cache_control)
+      token_budget → chamadas cujo contexto foi cortado e o que foi removido (core/tokens.py)
+      cassette    → gravação/reprodução de chamadas (só quando LLM_CASSETTE_MODE != off)
+      circuit_breakers → estado por dependência (closed/open/half_open) e rejeições (core/circuit_breaker.py)
+      qa          → QA especulativo: turnos aprovados/revertidos e tempo economizado (AGENT_QA_MODE)
+      qa_policy   → decisões de amostragem do QA e taxa de aprovação por rota/modelo/versão do prompt
+      sessions    → sessões de conversa em memória e leituras do SQLite (core/session_store.py)
+      tracing     → traces/spans exportados em JSONL (core/tracing.py)
+      streams     → streams SSE concluídos x cancelados por desconexão do cliente (core/cancellation.py)
+      jobs        → jobs em segundo plano por status, retomadas com Last-Event-ID (core/jobs.py)
+      prerouter   → fast path x Supervisor e concordância por ferramenta (agents/prerouter.py)
+      artifact_memo → hits/misses/expirados e hit_rate por rota do memo de artefatos (agents/artifact_memo.py)
+      tool_compression → saídas de ferramentas comprimidas (BM25), tokens antes/depois e leituras do original
+      model_router → TTFT, tokens/s e taxa de erro por modelo e escolhas por agente/tarefa (core/model_router.py)
+      admission   → vagas em uso/fila (todos os workers), admitidos, recusados (429) e espera (core/admission.py)
+      tools       → por ferramenta: timeout/concorrência declarados, chamadas, timeouts, argumentos
+                    inválidos, hits do cache e latência (agents/tool_registry.py)
+      web_fetch   → páginas lidas, bytes, cortes no teto de tamanho e tempo de extração (services/web_fetcher.py)
+    """
+    cassette = get_cassette()
+    return {
+        "http": get_http_metrics(),
+        "credentials": get_credential_store().metrics(),
+        "llm_cache": get_llm_cache().metrics(),
+        "rate_limit": get_rate_limiter().metrics(),
+        "prompt_cache": get_prompt_cache_metrics(),
+        "token_budget": get_token_budget_metrics(),
+        "cassette": cassette.metrics() if cassette else None,
+        "circuit_breakers": get_circuit_metrics(),
+        "qa": get_qa_metrics(),
+        "qa_policy": get_qa_policy().metrics(),
+        "sessions": get_session_store().metrics(),
+        "tracing": get_tracing_metrics(),
+        "streams": get_cancellation_metrics(),
+        "jobs": get_job_manager().metrics(),
+        "prerouter": get_prerouter_metrics(),
+        "artifact_memo": get_artifact_memo().metrics(),
+        "tool_compression": get_tool_compressor().metrics(),
+        "model_router": get_model_router().metrics(),
+        "admission": get_admission_controller().metrics(),
+        "tools": get_tool_runner().metrics(),
+        "web_fetch": get_fetch_metrics(),
+    }
 
 
 # ── Schema de entrada ──────────────────────────────────────────────────────────
@@ -343,6 +387,10 @@ async def list_models():
 class AgentUpdateRequest(BaseModel):
     system_prompt: Optional[str] = None   # Novo system prompt (reescrito em prompts.py)
     model:         Optional[str] = None   # ID do modelo OpenRouter
+    fallback_models: Optional[list[str]] = None  # Modelos tentados em ordem se o principal falhar
+    prompt_cache:  Optional[bool] = None  # Marca o system prompt como cacheável (Anthropic/Gemini)
+    input_token_budget: Optional[int] = None  # Máx. de tokens de entrada por chamada (0 = sem limite)
+    routing:       Optional[dict] = None  # {"policy": static|fastest|cheapest|quality_floor, "models": [...], "quality_floor": 0.9}
     tools:         Optional[list[Any]] = None  # Lista de tools no formato OpenAI
     name:          Optional[str] = None   # Nome de exibição do agente
     description:   Optional[str] = None  # Descrição curta do agente
@@ -11,13 +11,19 @@ import logging
 import re
 from typing import AsyncGenerator, Optional, Dict, Any
 
-import httpx
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 
+from backend.api.jobs import job_stream_response
+from backend.core.admission import admit, admitted_stream, client_identity, hand_off_to_job
+from backend.core.cancellation import cancel_on_disconnect
 from backend.core.config import get_config
-from backend.core.llm import call_openrouter
+from backend.core.jobs import get_job_manager
+from backend.core.llm import call_openrouter, system_message
+from backend.core.sse import coalesce_sse, sse_event
+from backend.core.tracing import traced_stream
 from backend.services.search_service import search_web_formatted
+from backend.services.web_fetcher import fetch_page
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -52,25 +58,11 @@ BUILDER_TOOLS = [
 ]
 
 
-def sse_event(event_type: str, content: str) -> str:
-    return f"data: {json.dumps({'type': event_type, 'content': content})}\n\n"
-
-
 async def web_fetch_tool(url: str) -> str:
-    try:
-        from bs4 import BeautifulSoup
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            response = await client.get(url, headers={"User-Agent": "ArccoBuilder/2.0"}, follow_redirects=True)
-            soup = BeautifulSoup(response.text, "html.parser")
-            for tag in soup(["script", "style", "nav", "footer", "aside", "form", "svg"]):
-                tag.decompose()
-            text = soup.get_text(separator=" ", strip=True)
-            if len(text) > 15000:
-                text = text[:15000] + "... [Truncado]"
-            title = soup.title.string if soup.title else url
-            return f"**Referência: {title}**\\n\\n{text}"
-    except Exception as e:
-        return f"Erro ao buscar URL: {e}"
+    page = await fetch_page(url, max_chars=15000, user_agent="ArccoBuilder/2.0")
+    if page.error:
+        return f"Erro ao buscar URL: {page.error}"
+    return f"**Referência: {page.title or url}**\\n\\n{page.text}"
 
 
 async def execute_builder_tool(func_name: str, func_args: dict) -> str:
@@ -87,7 +79,10 @@ def build_context_message(files: list[dict], agent_mode: str, render_mode: str,
     if render_mode == "ast":
         # AST Mode Context
         mode_label = "DESIGN MODE (AST)"
-        state_json = json.dumps(page_state, indent=2, ensure_ascii=False) if page_state else "Empty Page (New)"
+        # JSON compacto: indentação custa ~30% a mais de tokens sem ajudar o modelo
+        state_json = (
+            json.dumps(page_state, ensure_ascii=False, separators=(",", ":")) if page_state else "Empty Page (New)"
+        )
         return (
             f"## Modo: {mode_label}\\n\\n"
             f"## Estado Atual da Página (AST)\\n```json\\n{state_json}\\n```\\n\\n"
@@ -207,10 +202,14 @@ async def builder_stream(
         # Prioridade: parâmetro explícito > claude-3.5-sonnet (padrão para apps)
         model_to_use = model or "anthropic/claude-3.5-sonnet"
         tools_to_use = None  # sem busca web no modo app (mais rápido e focado)
+        fallbacks_to_use = None  # fallbacks globais do config
+        budget_to_use = None  # orçamento global do config (LLM_INPUT_TOKEN_BUDGET)
     else:
         base_system = registry.get_prompt("pages_dev") or APP_BUILDER_SYSTEM_PROMPT
         model_to_use = model or registry.get_model("pages_dev") or config.openrouter_model
         tools_to_use = BUILDER_TOOLS
+        fallbacks_to_use = registry.get_fallback_models("pages_dev")
+        budget_to_use = registry.get_input_budget("pages_dev")
 
     logger.info(f"[BUILDER] mode={render_mode} is_app={is_app_mode} model={model_to_use} agent={agent_mode}")
 
@@ -230,9 +229,12 @@ async def builder_stream(
                 if kf in app_files:
                     project_context += f"\n### {kf}\n```typescript\n{app_files[kf][:3000]}\n```\n"
 
-    full_system = base_system + (f"\n\n---\n{project_context}" if project_context else "")
-
-    current_messages = [{"role": "system", "content": full_system}]
+    # Prompt base é o prefixo cacheável; o contexto do projeto muda a cada pedido
+    current_messages = [system_message(
+        base_system,
+        f"\n\n---\n{project_context}" if project_context else "",
+        cacheable=is_app_mode or registry.is_prompt_cacheable("pages_dev"),
+    )]
     for msg in messages:
         current_messages.append(msg if isinstance(msg, dict) else msg.model_dump())
 
@@ -262,9 +264,10 @@ async def builder_stream(
                         },
                         {"role": "user", "content": last_user_msg},
                     ],
-                    model=model_to_use,
+                    model=await registry.pick_model("plan", default=model_to_use, output_tokens=140, input_tokens=300),
                     max_tokens=140,
                     temperature=0.4,
+                    fallback_models=fallbacks_to_use,
                 )
                 plan_text = (plan_data["choices"][0]["message"].get("content") or "").strip()
                 if plan_text:
@@ -288,6 +291,9 @@ async def builder_stream(
                     model=model_to_use,
                     max_tokens=16000,
                     tools=tools_to_use,
+                    fallback_models=fallbacks_to_use,
+                    input_budget=budget_to_use,
+                    use_cache=False,  # nova tentativa do usuário deve gerar um novo projeto
                 )
             except Exception as outer_err:
                 logger.error(f"[BUILDER] Erro LLM: {outer_err}", exc_info=True)
@@ -492,6 +498,7 @@ async def copywrite_endpoint(request: Request):
             ],
             model=model,
             max_tokens=4000,
+            fallback_models=registry.get_fallback_models("pages_copy"),
         )
         if data.get("error"):
             return {"error": str(data["error"])}
@@ -557,8 +564,29 @@ async def builder_chat_endpoint(request: Request):
     model = body.get("model", "anthropic/claude-3.5-sonnet")
     app_files = body.get("appFiles")  # dict[str, str] — arquivos atuais do projeto
 
+    # Vaga por usuário/total (core/admission.py): fila justa ou 429 com Retry-After
+    ticket = await admit(request, body, "builder")
+
+    def pipeline():
+        return admitted_stream(ticket, lambda: coalesce_sse(
+            builder_stream(messages, files, agent_mode, render_mode, page_state, model, app_files)
+        ))
+
+    if body.get("background"):
+        # Job em segundo plano com SSE retomável (core/jobs.py, api/jobs.py)
+        job = await get_job_manager().submit(
+            "builder",
+            lambda: traced_stream(pipeline(), "builder", model=model, agent_mode=agent_mode, background=True),
+            owner=client_identity(request),
+            on_finish=hand_off_to_job(ticket),
+        )
+        return job_stream_response(await get_job_manager().subscribe(job.id, job.owner))
+
     return StreamingResponse(
-        builder_stream(messages, files, agent_mode, render_mode, page_state, model, app_files),
+        traced_stream(
+            cancel_on_disconnect(pipeline(), request),
+            "builder", model=model, agent_mode=agent_mode, render_mode=render_mode,
+        ),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -11,21 +11,74 @@ Modos:
   Chat Normal  → route 'chat': assistente direto, sem ferramentas, sem QA
   Modo Agente  → route web_search | file_generator | design | dev
 
+Sessões (core/session_store.py):
+  - O primeiro evento do stream é {"type": "session", "content": "<json>"}
+    com session_id e o tamanho do histórico guardado no servidor. O id é
+    sempre gerado pelo servidor e só vale para o mesmo cliente (token ou IP).
+  - {"session_id": ..., "messages": [histórico completo]} → substitui o histórico.
+  - {"session_id": ..., "delta": true, "messages": [só as novas]} → acrescenta
+    ao histórico do servidor. Sessão desconhecida/expirada → 409; o cliente
+    reenvia a conversa completa.
+  - A resposta final do assistente é gravada na sessão ao fim do stream.
+
+Se o cliente desconectar, a geração é cancelada (core/cancellation.py).
+Admissão (core/admission.py): servidor cheio → eventos {"type": "queued"}
+com a posição na fila antes do stream; fila cheia (ou "queue": false) → 429
+com Retry-After.
+Com "background": true o pipeline roda como job (core/jobs.py): os eventos
+vêm numerados (`id: N`) e uma queda de conexão é retomada em
+GET /api/agent/jobs/{job_id}/events com Last-Event-ID, sem refazer nada.
+Pedidos idênticos de arquivo/design reaproveitam o resultado ainda válido
+(agents/artifact_memo.py); "regenerate": true força gerar de novo.
+Com TRACING_SSE_TIMING=true o último evento é {"type": "timing"} com o
+resumo do trace da requisição (core/tracing.py).
+
 NOTA: O system_prompt enviado pelo frontend é IGNORADO intencionalmente.
 Os prompts de cada agente estão em backend/agents/prompts.py.
 """
 
+import json
 import logging
+from typing import AsyncGenerator
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
 from backend.agents.orchestrator import orchestrate_and_stream
+from backend.api.jobs import job_stream_response
+from backend.core.admission import admit, admitted_stream, client_identity, hand_off_to_job
+from backend.core.cancellation import cancel_on_disconnect
+from backend.core.jobs import get_job_manager
+from backend.core.session_store import Session, get_session_store
+from backend.core.sse import SSEFrame, coalesce_sse, sse_event
+from backend.core.tracing import traced_stream
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+async def _stream_with_session(stream: AsyncGenerator[str, None], session: Session) -> AsyncGenerator[str, None]:
+    """Anuncia a sessão, repassa o stream e grava a resposta do assistente no histórico."""
+    yield sse_event("session", json.dumps({"session_id": session.id, "messages": len(session.messages)}))
+    answer: list[str] = []
+    try:
+        async for event in stream:
+            if isinstance(event, SSEFrame) and event.event_type == "chunk":
+                answer.append(event.content)
+            elif isinstance(event, SSEFrame) and event.event_type == "retract":
+                # Preâmbulo de uma tool call: a UI apagou, a sessão também não guarda
+                answer.clear()
+            yield event
+    finally:
+        # Mesmo com o cliente desconectado, o texto parcial é o que a UI mostrou
+        if answer:
+            session.messages.append({"role": "assistant", "content": "".join(answer)})
+        try:
+            await get_session_store().save(session)
+        except Exception as e:
+            logger.warning(f"[CHAT] Falha ao gravar sessão {session.id}: {e}")
+
+
 @router.post("/chat")
 async def chat_endpoint(request: Request):
     """
@@ -33,11 +86,48 @@ async def chat_endpoint(request: Request):
     O Orquestrador determina automaticamente o especialista correto.
     """
     body = await request.json()
-    messages = body.get("messages", [])
+    incoming = body.get("messages", [])
     model = body.get("model", "anthropic/claude-3.5-sonnet")
+    session_id = body.get("session_id")
+    delta = bool(body.get("delta"))
+    use_memo = not body.get("regenerate")
+
+    store = get_session_store()
+    owner = client_identity(request)
+    session = await store.get(session_id, owner) if session_id else None
+    if delta and session is None:
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "session_not_found", "message": "Sessão expirada — reenvie o histórico completo."},
+        )
+    if session is None:
+        session = store.new(owner)
+
+    # Antes de mexer no histórico: um 429 não pode deixar a sessão alterada
+    ticket = await admit(request, body, "chat")
+
+    if delta:
+        session.messages.extend(incoming)
+    else:
+        session.messages = list(incoming)
+
+    def pipeline():
+        return admitted_stream(ticket, lambda: coalesce_sse(_stream_with_session(
+            orchestrate_and_stream(list(session.messages), model, session=session, use_memo=use_memo), session
+        )))
+
+    if body.get("background"):
+        job = await get_job_manager().submit(
+            "chat",
+            lambda: traced_stream(pipeline(), "chat", model=model, session_id=session.id, background=True),
+            owner=client_identity(request),
+            on_finish=hand_off_to_job(ticket),
+        )
+        return job_stream_response(await get_job_manager().subscribe(job.id, job.owner))
 
+    stream = cancel_on_disconnect(pipeline(), request)
     return StreamingResponse(
-        orchestrate_and_stream(messages, model),
+        traced_stream(stream, "chat", model=model, session_id=session.id, delta=delta),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -0,0 +1,54 @@
+"""
+Jobs em segundo plano (chat/builder com "background": true) — ver core/jobs.py.
+
+GET    /api/agent/jobs/{job_id}         → status do job
+GET    /api/agent/jobs/{job_id}/events  → SSE do job; retoma após o header
+                                          Last-Event-ID (ou ?last_event_id=N)
+DELETE /api/agent/jobs/{job_id}         → cancela o job
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from backend.core.admission import client_identity
+from backend.core.jobs import get_job_manager
+
+router = APIRouter()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def job_stream_response(stream) -> StreamingResponse:
+    """StreamingResponse de uma assinatura de job (também usada por chat e builder)."""
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str, request: Request):
+    info = await get_job_manager().status(job_id, client_identity(request))
+    if info is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+    return info
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, last_event_id: Optional[int] = None):
+    if last_event_id is None:
+        header = request.headers.get("last-event-id", "")
+        last_event_id = int(header) if header.strip().isdigit() else 0
+    stream = await get_job_manager().subscribe(job_id, client_identity(request), last_event_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+    return job_stream_response(stream)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, request: Request):
+    if not await get_job_manager().cancel(job_id, client_identity(request)):
+        raise HTTPException(status_code=404, detail="Job não encontrado ou já encerrado")
+    return {"job_id": job_id, "status": "cancelling"}
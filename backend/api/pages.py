@@ -23,11 +23,12 @@ Cache:
 import logging
 from datetime import datetime
 
-import httpx
 from fastapi import APIRouter
 from fastapi.responses import HTMLResponse
 
+from backend.core.circuit_breaker import get_breaker, is_failure_status
 from backend.core.config import get_config
+from backend.core.http_client import request as http_request
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -96,13 +97,15 @@ async def _fetch_page_from_supabase(slug: str) -> dict | None:
         "Authorization": f"Bearer {config.supabase_key}",
     }
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            res = await client.get(url, headers=headers)
-            if res.status_code != 200:
-                logger.warning(f"[Pages] Supabase error {res.status_code} for slug={slug}")
-                return None
-            rows = res.json()
-            return rows[0] if rows else None
+        with get_breaker("supabase").guard() as call:
+            res = await http_request("GET", url, headers=headers, timeout=8.0)
+            if is_failure_status(res.status_code):
+                call.fail()
+        if res.status_code != 200:
+            logger.warning(f"[Pages] Supabase error {res.status_code} for slug={slug}")
+            return None
+        rows = res.json()
+        return rows[0] if rows else None
     except Exception as e:
         logger.error(f"[Pages] Error fetching slug={slug}: {e}")
         return None
@@ -3,45 +3,19 @@ Endpoint de roteamento de intent.
 Portado de netlify/functions/agent-router.ts
 """
 
-import re
 import logging
 
 from fastapi import APIRouter
 
+from backend.agents import registry
 from backend.models.schemas import RouteRequest, RouteResponse
 from backend.core.llm import call_openrouter
+# Keywords compartilhadas com o fast path do orquestrador
+from backend.agents.prerouter import KEYWORD_PATTERNS, match_keywords  # noqa: F401
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Padrões de keywords para classificação zero-token
-KEYWORD_PATTERNS = {
-    "web_search": re.compile(
-        r"\b(pesquis|busc|procur|encontr|search|google|internet|quem é|o que é)\w*",
-        re.IGNORECASE,
-    ),
-    "ocr_scan": re.compile(
-        r"\b(leia|ler|extrair|texto da imagem|scan|ocr)\w*",
-        re.IGNORECASE,
-    ),
-    "generate_file": re.compile(
-        r"\b(gera|cri)\w*\s+(pdf|documento|relatório|report|slide|apresentação|pptx|planilha|excel|xlsx|word|docx)",
-        re.IGNORECASE,
-    ),
-    "deep_search": re.compile(
-        r"\b(pesquisa profunda|deep search|relatório completo|investiga)\w*",
-        re.IGNORECASE,
-    ),
-}
-
-
-def match_keywords(message: str) -> str | None:
-    """Classificação por keywords (zero tokens)."""
-    for intent, pattern in KEYWORD_PATTERNS.items():
-        if pattern.search(message):
-            return intent
-    return None
-
 
 async def classify_with_llm(message: str) -> str:
     """Classificação por LLM (fallback)."""
@@ -56,6 +30,7 @@ async def classify_with_llm(message: str) -> str:
                     'Return ONLY the intent.'
                 ),
             }],
+            model=await registry.pick_model("classify", output_tokens=20, input_tokens=80),
             max_tokens=20,
         )
         result = data["choices"][0]["message"]["content"]
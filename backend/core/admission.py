@@ -0,0 +1,543 @@
+"""
+Controle de admissão e fila justa para os streams de chat e builder.
+
+Com 2 workers, um usuário disparando várias gerações de app no
+/api/builder/chat ocupa o servidor inteiro e a latência piora para todos.
+Aqui cada stream precisa de uma vaga antes de começar:
+
+  - admission_max_in_flight   → vagas no total (somando os workers)
+  - admission_per_user        → vagas simultâneas por usuário
+
+Sem vaga, o pedido entra na fila. A próxima vaga vai para o usuário com
+menos streams em andamento (empate → quem espera há mais tempo), então
+quem já está gerando não passa na frente de quem ainda não foi atendido.
+Enquanto espera, o stream recebe eventos {"type": "queued"} com a posição.
+
+"Usuário" é o IP do cliente (client_address): o do socket, ou o do
+X-Forwarded-For quando a conexão vem de um proxy em trusted_proxies. Campos
+que o cliente escolhe (user_id, X-User-Id, token não verificado) não contam:
+trocá-los a cada pedido driblaria admission_per_user.
+
+Fila cheia (admission_max_queue no total ou admission_per_user_queue do
+mesmo usuário) ou "queue": false no corpo → 429 com Retry-After, estimado
+pela duração média dos streams.
+
+Vagas e fila ficam num SQLite em workspace_path (compartilhado entre os
+workers). Cada worker renova as suas linhas a cada _HEARTBEAT segundos;
+linhas sem renovação por _STALE segundos (worker morto) são descartadas.
+Se o SQLite falhar, o controle se desliga (fail-open).
+"""
+
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    acquired_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slots_user ON slots(user_id);
+CREATE INDEX IF NOT EXISTS waiters_user ON waiters(user_id);
+"""
+
+# Renovação das vagas/fila deste worker e idade a partir da qual uma linha é órfã
+_HEARTBEAT = 10.0
+_STALE = 45.0
+# Intervalo entre tentativas de quem está na fila
+_POLL = 0.25
+# Evento "queued" repetido mesmo sem mudar de posição (mantém a conexão viva)
+_QUEUED_KEEPALIVE = 5.0
+
+
+class AdmissionRejected(Exception):
+    """Sem vaga e sem lugar na fila: responder 429 com Retry-After."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass
+class Ticket:
+    """Lugar de um stream: na fila (admitted=False) ou com vaga."""
+
+    id: str
+    user_id: str
+    kind: str
+    admitted: bool = False
+    started: bool = False  # admitted_stream (ou um job) assumiu o ticket
+    released: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+    admitted_at: float = 0.0
+
+
+class AdmissionController:
+    """Vagas por usuário + total, com fila justa entre usuários, em SQLite."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_in_flight: int = 16,
+        per_user: int = 2,
+        max_queue: int = 32,
+        per_user_queue: int = 2,
+        max_wait: float = 120.0,
+        enabled: bool = True,
+    ):
+        self.db_path = db_path
+        self.max_in_flight = max_in_flight
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self.per_user_queue = per_user_queue
+        self.max_wait = max_wait
+        self.enabled = enabled
+
+        self._disabled = not enabled
+        self._local = threading.local()
+        self._owned: dict[str, Ticket] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "abandoned": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+        self._avg_hold_s = 30.0
+
+    # ── API async ─────────────────────────────────────
+
+    async def enter(self, user_id: str, kind: str, queue: bool = True) -> Ticket:
+        """
+        Reserva vaga ou lugar na fila. Levanta AdmissionRejected se não houver nenhum dos dois
+        (ou se queue=False e não houver vaga agora).
+        """
+        ticket = Ticket(uuid.uuid4().hex, user_id, kind)
+        if self._disabled:
+            ticket.admitted = True
+            return ticket
+        try:
+            outcome, queue_len = await asyncio.to_thread(self._enter, ticket, queue)
+        except Exception as e:
+            self._disable(e)
+            ticket.admitted = True
+            return ticket
+
+        if outcome == "admitted":
+            self._on_admitted(ticket)
+        elif outcome == "queued":
+            self._owned[ticket.id] = ticket
+            self._count("queued")
+            logger.info(f"[ADMISSION] {kind} de {user_id[:12]} na fila (posição ~{queue_len})")
+        else:
+            self._count("rejected")
+            retry_after = self.retry_after(queue_len)
+            logger.info(f"[ADMISSION] {kind} de {user_id[:12]} recusado ({outcome}), Retry-After {retry_after}s")
+            raise AdmissionRejected(retry_after, outcome)
+        self._ensure_heartbeat()
+        return ticket
+
+    async def wait(self, ticket: Ticket) -> AsyncIterator[int]:
+        """Enquanto o ticket estiver na fila, gera a posição atual; termina quando for admitido."""
+        deadline = time.monotonic() + self.max_wait
+        while not ticket.admitted:
+            try:
+                admitted, position = await asyncio.to_thread(self._try_admit, ticket)
+            except Exception as e:
+                self._disable(e)
+                admitted, position = True, 0
+            if admitted:
+                self._on_admitted(ticket)
+                return
+            if time.monotonic() > deadline:
+                self._count("timed_out")
+                raise AdmissionRejected(self.retry_after(position), "queue_timeout")
+            yield position
+            await asyncio.sleep(_POLL * random.uniform(0.8, 1.2))
+
+    async def release(self, ticket: Ticket):
+        # Idempotente: job em segundo plano libera no fim de admitted_stream e no fim do job
+        if ticket.released:
+            return
+        ticket.released = True
+        self._owned.pop(ticket.id, None)
+        if ticket.admitted and ticket.admitted_at:
+            held = time.monotonic() - ticket.admitted_at
+            self._avg_hold_s += 0.1 * (held - self._avg_hold_s)
+        elif not ticket.admitted:
+            self._count("abandoned")
+        if self._disabled:
+            return
+        try:
+            await asyncio.to_thread(self._release, ticket.id)
+        except Exception as e:
+            logger.warning(f"[ADMISSION] Falha ao liberar vaga: {e}")
+
+    def retry_after(self, queue_len: int) -> int:
+        """Segundos até uma nova tentativa ter chance: fila à frente × duração média / vagas."""
+        estimate = self._avg_hold_s * (queue_len + 1) / max(1, self.max_in_flight)
+        return int(min(60, max(1, math.ceil(estimate))))
+
+    def _on_admitted(self, ticket: Ticket):
+        ticket.admitted = True
+        ticket.admitted_at = time.monotonic()
+        self._owned[ticket.id] = ticket
+        waited_ms = (ticket.admitted_at - ticket.enqueued_at) * 1000
+        with self._stats_lock:
+            self._stats["admitted"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+
+    async def _heartbeat(self):
+        while self._owned and not self._disabled:
+            await asyncio.sleep(_HEARTBEAT)
+            # Resposta que nunca chegou a iterar o stream (cliente caiu antes) não segura vaga
+            now = time.monotonic()
+            for ticket in [t for t in self._owned.values() if not t.started and now - t.enqueued_at > _STALE]:
+                logger.warning(f"[ADMISSION] Ticket {ticket.id[:8]} nunca iniciado — liberando vaga")
+                await self.release(ticket)
+            try:
+                await asyncio.to_thread(self._touch, list(self._owned))
+            except Exception as e:
+                logger.warning(f"[ADMISSION] Falha no heartbeat: {e}")
+
+    # ── SQLite (roda em thread) ───────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _purge(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM slots WHERE heartbeat_at < ?", (now - _STALE,))
+        conn.execute("DELETE FROM waiters WHERE heartbeat_at < ?", (now - _STALE,))
+
+    def _next_waiter(self, conn: sqlite3.Connection) -> Optional[str]:
+        """Fila justa: usuário com menos vagas em uso primeiro, depois o pedido mais antigo."""
+        if conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0] >= self.max_in_flight:
+            return None
+        row = conn.execute(
+            """
+            SELECT w.id FROM waiters w
+            LEFT JOIN (SELECT user_id, COUNT(*) AS n FROM slots GROUP BY user_id) s ON s.user_id = w.user_id
+            WHERE COALESCE(s.n, 0) < ?
+            ORDER BY COALESCE(s.n, 0), w.enqueued_at
+            LIMIT 1
+            """,
+            (self.per_user,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _admit(self, conn: sqlite3.Connection, waiter_id: str, now: float):
+        user_id, kind = conn.execute("SELECT user_id, kind FROM waiters WHERE id = ?", (waiter_id,)).fetchone()
+        conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+        conn.execute(
+            "INSERT INTO slots (id, user_id, kind, pid, acquired_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (waiter_id, user_id, kind, os.getpid(), now, now),
+        )
+
+    def _position(self, conn: sqlite3.Connection, ticket_id: str) -> int:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM waiters WHERE enqueued_at < (SELECT enqueued_at FROM waiters WHERE id = ?)",
+            (ticket_id,),
+        ).fetchone()
+        return (row[0] if row else 0) + 1
+
+    def _enter(self, ticket: Ticket, queue: bool) -> tuple[str, int]:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._purge(conn, now)
+            conn.execute(
+                "INSERT INTO waiters (id, user_id, kind, pid, enqueued_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (ticket.id, ticket.user_id, ticket.kind, os.getpid(), now, now),
+            )
+            if self._next_waiter(conn) == ticket.id:
+                self._admit(conn, ticket.id, now)
+                conn.execute("COMMIT")
+                return "admitted", 0
+
+            queued = conn.execute("SELECT COUNT(*) FROM waiters").fetchone()[0]
+            user_queued = conn.execute(
+                "SELECT COUNT(*) FROM waiters WHERE user_id = ?", (ticket.user_id,)
+            ).fetchone()[0]
+            if not queue:
+                outcome = "saturated"
+            elif queued > self.max_queue:
+                outcome = "queue_full"
+            elif user_queued > self.per_user_queue:
+                outcome = "user_queue_full"
+            else:
+                outcome = "queued"
+            if outcome != "queued":
+                conn.execute("DELETE FROM waiters WHERE id = ?", (ticket.id,))
+            conn.execute("COMMIT")
+            return outcome, queued
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _try_admit(self, ticket: Ticket) -> tuple[bool, int]:
+        ticket_id = ticket.id
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._purge(conn, now)
+            conn.execute("UPDATE waiters SET heartbeat_at = ? WHERE id = ?", (now, ticket_id))
+            if conn.execute("SELECT 1 FROM slots WHERE id = ?", (ticket_id,)).fetchone():
+                conn.execute("COMMIT")
+                return True, 0
+            if not conn.execute("SELECT 1 FROM waiters WHERE id = ?", (ticket_id,)).fetchone():
+                # Linha expirada (ex: worker travado além de _STALE): volta para o fim da fila
+                conn.execute(
+                    "INSERT INTO waiters (id, user_id, kind, pid, enqueued_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (ticket_id, ticket.user_id, ticket.kind, os.getpid(), now, now),
+                )
+            admitted = self._next_waiter(conn) == ticket_id
+            if admitted:
+                self._admit(conn, ticket_id, now)
+            position = 0 if admitted else self._position(conn, ticket_id)
+            conn.execute("COMMIT")
+            return admitted, position
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _release(self, ticket_id: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM slots WHERE id = ?", (ticket_id,))
+        conn.execute("DELETE FROM waiters WHERE id = ?", (ticket_id,))
+
+    def _touch(self, ids: list[str]):
+        if not ids:
+            return
+        conn = self._conn()
+        now = time.time()
+        placeholders = ",".join("?" * len(ids))
+        conn.execute(f"UPDATE slots SET heartbeat_at = ? WHERE id IN ({placeholders})", (now, *ids))
+        conn.execute(f"UPDATE waiters SET heartbeat_at = ? WHERE id IN ({placeholders})", (now, *ids))
+
+    def _disable(self, error: Exception):
+        if not self._disabled:
+            logger.error(f"[ADMISSION] SQLite indisponível ({error}) — controle de admissão desligado")
+        self._disabled = True
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        shared: dict = {}
+        if not self._disabled:
+            try:
+                conn = self._conn()
+                now = time.time()
+                shared = {
+                    "in_flight": conn.execute(
+                        "SELECT COUNT(*) FROM slots WHERE heartbeat_at >= ?", (now - _STALE,)
+                    ).fetchone()[0],
+                    "queued": conn.execute(
+                        "SELECT COUNT(*) FROM waiters WHERE heartbeat_at >= ?", (now - _STALE,)
+                    ).fetchone()[0],
+                    "by_kind": dict(conn.execute(
+                        "SELECT kind, COUNT(*) FROM slots WHERE heartbeat_at >= ? GROUP BY kind", (now - _STALE,)
+                    ).fetchall()),
+                    # Só as contagens: o admin não precisa ver quem são os usuários
+                    "busiest_users": [n for (n,) in conn.execute(
+                        "SELECT COUNT(*) AS n FROM slots WHERE heartbeat_at >= ? GROUP BY user_id ORDER BY n DESC LIMIT 5",
+                        (now - _STALE,),
+                    )],
+                }
+            except sqlite3.Error as e:
+                logger.warning(f"[ADMISSION] Falha lendo métricas: {e}")
+        with self._stats_lock:
+            stats = dict(self._stats)
+        admitted = stats.pop("admitted")
+        wait_total = stats.pop("wait_ms_total")
+        return {
+            "enabled": not self._disabled,
+            "limits": {
+                "max_in_flight": self.max_in_flight,
+                "per_user": self.per_user,
+                "max_queue": self.max_queue,
+                "per_user_queue": self.per_user_queue,
+            },
+            "shared": shared,
+            "worker": {
+                "admitted": admitted,
+                **stats,
+                "avg_wait_ms": round(wait_total / admitted, 1) if admitted else 0.0,
+                "wait_ms_max": round(stats["wait_ms_max"], 1),
+                "avg_stream_seconds": round(self._avg_hold_s, 1),
+            },
+        }
+
+
+def _is_trusted(host: str, networks: list) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def _trusted_networks() -> list:
+    from .config import get_config
+    networks = []
+    for item in get_config().trusted_proxies:
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning(f"[ADMISSION] trusted_proxies inválido: {item}")
+    return networks
+
+
+def client_address(request) -> str:
+    """
+    IP do cliente: o do socket, ou — se o socket é um proxy em trusted_proxies —
+    o primeiro hop não confiável do X-Forwarded-For, lido da direita (o proxy
+    acrescenta no fim o endereço que viu; o começo do header é do cliente).
+    """
+    host = request.client.host if request.client else "unknown"
+    networks = _trusted_networks()
+    if not _is_trusted(host, networks):
+        return host
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, networks):
+            return hop
+        host = hop
+    return host
+
+
+def client_identity(request) -> str:
+    """Dono de sessões (core/session_store.py): hash do header Authorization ou o IP do cliente."""
+    auth = request.headers.get("authorization", "")
+    if auth:
+        return "token:" + hashlib.sha256(auth.encode("utf-8")).hexdigest()[:16]
+    return f"ip:{client_address(request)}"
+
+
+async def admit(request, body: dict, kind: str) -> Ticket:
+    """Ticket para o stream do endpoint; fila cheia vira HTTP 429 com Retry-After."""
+    from fastapi import HTTPException
+    try:
+        return await get_admission_controller().enter(
+            f"ip:{client_address(request)}", kind, queue=body.get("queue", True) is not False
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail={"error": e.reason, "message": "Servidor ocupado — tente novamente em instantes.", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def hand_off_to_job(ticket: Ticket) -> Callable[[], Awaitable[None]]:
+    """
+    Passa o ticket para um job em segundo plano (core/jobs.py).
+
+    O job pode esperar por uma vaga de job_max_workers por mais de _STALE antes de
+    iterar admitted_stream; marcado como iniciado, o heartbeat não libera a vaga
+    nesse meio-tempo. Devolve o callback de liberação para o fim do job, que cobre
+    o job cancelado antes de começar.
+    """
+    ticket.started = True
+    return lambda: get_admission_controller().release(ticket)
+
+
+async def admitted_stream(ticket: Ticket, make_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """
+    Espera a vaga do ticket (emitindo eventos "queued") e só então cria e repassa
+    o stream. A vaga é liberada no fim, no erro ou na desconexão.
+    """
+    from .sse import sse_event
+    controller = get_admission_controller()
+    ticket.started = True
+    try:
+        if not ticket.admitted:
+            started = time.monotonic()
+            last_position, last_sent = None, 0.0
+            try:
+                async for position in controller.wait(ticket):
+                    now = time.monotonic()
+                    if position != last_position or now - last_sent >= _QUEUED_KEEPALIVE:
+                        yield sse_event("queued", json.dumps({
+                            "position": position,
+                            "waited_ms": round((now - started) * 1000),
+                        }))
+                        last_position, last_sent = position, now
+            except AdmissionRejected as e:
+                yield sse_event("error", f"Servidor ocupado — tente novamente em {e.retry_after}s.")
+                return
+            yield sse_event("queued", json.dumps({"position": 0, "waited_ms": round((time.monotonic() - started) * 1000)}))
+        async for event in make_stream():
+            yield event
+    finally:
+        await controller.release(ticket)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Retorna o controlador singleton, configurado a partir de AgentConfig."""
+    global _controller
+    if _controller is None:
+        from .config import get_config
+        config = get_config()
+        _controller = AdmissionController(
+            db_path=config.workspace_path / "admission.sqlite3",
+            max_in_flight=config.admission_max_in_flight,
+            per_user=config.admission_per_user,
+            max_queue=config.admission_max_queue,
+            per_user_queue=config.admission_per_user_queue,
+            max_wait=config.admission_max_wait,
+            enabled=config.admission_enable,
+        )
+    return _controller
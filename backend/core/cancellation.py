@@ -0,0 +1,143 @@
+"""
+Cancelamento por desconexão do cliente.
+
+Quando o usuário fecha a aba no meio da geração, o StreamingResponse só
+percebe na próxima escrita (ASGI 2.4) — até lá o orquestrador, as chamadas
+ao LLM, o Playwright e o Browserbase continuam trabalhando para ninguém.
+
+cancel_on_disconnect() envolve o gerador SSE do endpoint e escuta o
+http.disconnect em paralelo. Na desconexão:
+
+  1. o CancelToken da requisição é marcado (threading.Event)
+  2. a leitura pendente do gerador é cancelada e o gerador é fechado — o
+     CancelledError/GeneratorExit desce pela árvore de tasks (tools em
+     paralelo, QA especulativo, streams do OpenRouter, httpx)
+
+Código em thread (asyncio.to_thread) não é cancelável pelo asyncio: ele
+herda o token pelo contextvar e chama check_cancelled() nos pontos de
+parada cooperativos (entre actions do navegador, antes de render/upload).
+
+O token é per-requisição; fora de uma requisição check_cancelled() não faz nada.
+"""
+
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelled(Exception):
+    """O cliente desconectou: o trabalho em andamento deve ser abandonado."""
+
+
+class CancelToken:
+    """Sinal de cancelamento visível de corrotinas e threads."""
+
+    __slots__ = ("_event", "reason")
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise RequestCancelled(self.reason)
+
+
+_current_token: ContextVar[Optional[CancelToken]] = ContextVar("arcco_cancel_token", default=None)
+_stats = {"streams": 0, "completed": 0, "disconnected": 0}
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+def set_cancel_token(token: CancelToken):
+    """Associa o token ao contexto atual (ex: task de um job em segundo plano)."""
+    _current_token.set(token)
+
+
+def check_cancelled():
+    """Ponto de parada cooperativo: levanta RequestCancelled se o cliente já desconectou."""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+async def _wait_disconnect(request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(stream: AsyncIterator[str], request) -> AsyncIterator[str]:
+    """
+    Repassa `stream` e o cancela assim que o cliente desconectar.
+    Vai entre traced_stream (mais externo) e coalesce_sse.
+    """
+    from .config import get_config
+    if not get_config().cancel_on_disconnect:
+        async for event in stream:
+            yield event
+        return
+
+    token = CancelToken()
+    context_token = _current_token.set(token)
+    iterator = stream.__aiter__()
+    watcher = asyncio.ensure_future(_wait_disconnect(request))
+    pending: Optional[asyncio.Future] = None
+    completed = False
+    _stats["streams"] += 1
+    try:
+        while True:
+            pending = asyncio.ensure_future(iterator.__anext__())
+            await asyncio.wait({pending, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not pending.done():
+                _stats["disconnected"] += 1
+                logger.info("[CANCEL] Cliente desconectou — cancelando geração em andamento")
+                return
+            task, pending = pending, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                completed = True
+                break
+            yield event
+    finally:
+        if completed:
+            _stats["completed"] += 1
+        else:
+            # Desconexão detectada aqui ou pelo próprio StreamingResponse (GeneratorExit)
+            token.cancel("client_disconnected")
+        watcher.cancel()
+        if pending is not None and not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        try:
+            _current_token.reset(context_token)
+        except ValueError:
+            pass
+
+
+def get_cancellation_metrics() -> dict:
+    """Streams concluídos x cancelados por desconexão (usado em /api/admin/metrics)."""
+    return dict(_stats)
@@ -0,0 +1,221 @@
+"""
+Circuit breakers por dependência externa.
+
+Quando o Supabase ou a Tavily degradam, cada requisição esperava o timeout
+inteiro (10–30s) antes de falhar ou cair no fallback, segurando vagas do
+worker. Com o breaker:
+
+  closed    → chamadas normais; N falhas seguidas abrem o circuito
+  open      → falha imediata (CircuitOpenError) durante open_seconds
+  half_open → passado esse tempo, UMA chamada de prova passa; sucesso fecha
+              o circuito, falha reabre por mais open_seconds
+
+Dependências: openrouter, supabase, tavily, brave, pexels, browserbase.
+Cada chamador decide o que conta como falha (timeout, erro de rede, 5xx);
+4xx de requisição inválida não é falha da dependência.
+
+Quem chama já tem um fallback e só precisa capturar CircuitOpenError:
+  - credentials.py  → mantém as chaves em cache (stale)
+  - search_service  → Tavily aberto cai direto no Brave
+  - template_service → Pexels aberto devolve imagem vazia
+  - llm.py          → vira LLMAPIError não-retryable (sem backoff)
+
+O estado é por processo (cada worker uvicorn aprende sozinho) e protegido
+por threading.Lock, pois o upload do Supabase roda em threads.
+
+Config: CIRCUIT_BREAKER (true/false), CIRCUIT_FAILURE_THRESHOLD,
+CIRCUIT_OPEN_SECONDS e CIRCUIT_BREAKER_OVERRIDES="supabase=3:20,pexels=2:120"
+(limite:segundos por dependência).
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEPENDENCIES = ("openrouter", "supabase", "tavily", "brave", "pexels", "browserbase")
+
+
+class CircuitOpenError(Exception):
+    """Circuito aberto: a dependência não é chamada."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} indisponível (circuito aberto, nova tentativa em {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Breaker de uma dependência. Seguro entre threads e corrotinas."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, open_seconds: float = 30.0, enabled: bool = True):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            return HALF_OPEN
+        return self._state
+
+    # ── Protocolo ─────────────────────────────────────
+
+    def before_call(self) -> bool:
+        """
+        Autoriza uma chamada. Levanta CircuitOpenError se o circuito estiver
+        aberto (ou se a prova do half-open já estiver em andamento).
+        Retorna True quando a chamada é a prova do half-open.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                self._stats["calls"] += 1
+                return False
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._state = HALF_OPEN
+                self._probe_in_flight = True
+                self._stats["calls"] += 1
+                self._stats["probes"] += 1
+                return True
+            self._stats["rejected"] += 1
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_success(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"[CIRCUIT] {self.name}: dependência respondeu — circuito fechado")
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or (self._state == CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._stats["opened"] += 1
+                logger.warning(
+                    f"[CIRCUIT] {self.name}: {self._consecutive_failures} falha(s) seguida(s) — "
+                    f"circuito aberto por {self.open_seconds:g}s"
+                )
+
+    def release_probe(self):
+        """Libera a prova sem decidir o estado (chamada cancelada ou falha do chamador)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    @contextmanager
+    def guard(self) -> Iterator["_GuardedCall"]:
+        """
+        Envolve uma chamada: exceção = falha, retorno normal = sucesso.
+        Para falhas que não são exceção (ex: HTTP 503), chame call.fail().
+        """
+        call = _GuardedCall(self.before_call())
+        try:
+            yield call
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelamento não diz nada sobre a saúde da dependência
+            if call.probe:
+                self.release_probe()
+            raise
+        if call.failed:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state if self.enabled else "disabled",
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "open_seconds": self.open_seconds,
+                "retry_in": (
+                    round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+                    if state == OPEN else 0.0
+                ),
+                **self._stats,
+            }
+
+
+class _GuardedCall:
+    __slots__ = ("probe", "failed")
+
+    def __init__(self, probe: bool):
+        self.probe = probe
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+def is_failure_status(status_code: Optional[int]) -> bool:
+    """Status HTTP que indicam dependência degradada (não erro da requisição)."""
+    return status_code is None or status_code >= 500 or status_code == 429
+
+
+# ── Registry ─────────────────────────────────────────
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker singleton da dependência (criado sob demanda a partir do AgentConfig)."""
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+    from .config import get_config
+    config = get_config()
+    threshold, open_seconds = config.circuit_breaker_overrides.get(
+        name, (config.circuit_failure_threshold, config.circuit_open_seconds)
+    )
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, threshold, open_seconds, enabled=config.circuit_breaker_enable)
+            _breakers[name] = breaker
+    return breaker
+
+
+def get_circuit_metrics() -> dict:
+    """Estado de cada breaker (usado em /api/admin/metrics)."""
+    return {name: get_breaker(name).metrics() for name in DEPENDENCIES}
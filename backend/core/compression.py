@@ -0,0 +1,227 @@
+"""
+Compressão extrativa de saídas de ferramentas antes de voltarem ao contexto do LLM.
+
+web_fetch (até 20k chars), ask_browser (até 15k) e web_search (10 fontes)
+entram inteiros na conversa e são reenviados em toda iteração seguinte. Aqui a saída grande é quebrada em passagens (parágrafos;
+parágrafos longos em janelas de frases), ranqueada por BM25 contra a
+intenção do usuário + argumentos da chamada, e só as melhores passagens
+entram no contexto, na ordem original, até tool_output_budget_tokens.
+
+O texto bruto fica guardado (LRU em memória do worker) e o marcador no fim
+da saída comprimida traz a referência: a tool read_tool_output(ref, query)
+devolve o original — ou outro recorte, se vier uma query diferente.
+Sem dependências: BM25 calculado aqui mesmo, por requisição.
+"""
+
+import logging
+import math
+import re
+import threading
+import unicodedata
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros clássicos do BM25
+_K1 = 1.5
+_B = 0.75
+
+# Tamanho alvo de uma passagem (tokens) ao agrupar frases de um parágrafo longo
+_PASSAGE_TOKENS = 80
+# Parágrafo sem pontuação (texto do get_text) é cortado nesse tamanho
+_MAX_SENTENCE_CHARS = 400
+# Saídas brutas guardadas por worker para read_tool_output
+_RAW_STORE_SIZE = 256
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_TERM_RE = re.compile(r"\w+")
+
+_STOPWORDS = frozenset(
+    "a o as os um uma uns umas de da do das dos em na no nas nos por para pra com sem "
+    "que se e ou mas como mais menos ao aos à às é ser são foi era está estão isso isto "
+    "esse essa este esta ele ela eles elas seu sua seus suas meu minha nao não sim "
+    "the of and or to in on for with is are was be by at as it this that from an"
+    .split()
+)
+
+
+def _terms(text: str) -> list[str]:
+    """Termos normalizados (minúsculas, sem acento, sem stopwords)."""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in _TERM_RE.findall(folded) if (len(t) > 1 or t.isdigit()) and t not in _STOPWORDS]
+
+
+def split_passages(text: str) -> list[str]:
+    """Parágrafos; os longos viram janelas de frases de ~_PASSAGE_TOKENS tokens."""
+    passages = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= _PASSAGE_TOKENS * 1.5:
+            passages.append(paragraph)
+            continue
+        sentences = []
+        for sentence in _SENTENCE_RE.split(paragraph):
+            sentences.extend(
+                sentence[i:i + _MAX_SENTENCE_CHARS] for i in range(0, len(sentence), _MAX_SENTENCE_CHARS)
+            )
+        window, window_tokens = [], 0
+        for sentence in sentences:
+            if not sentence.strip():
+                continue
+            window.append(sentence)
+            window_tokens += estimate_tokens(sentence)
+            if window_tokens >= _PASSAGE_TOKENS:
+                passages.append(" ".join(window))
+                window, window_tokens = [], 0
+        if window:
+            passages.append(" ".join(window))
+    return passages
+
+
+def bm25_scores(passages: list[str], query: str) -> list[float]:
+    """Score BM25 de cada passagem para a query (corpus = as próprias passagens)."""
+    query_terms = set(_terms(query))
+    docs = [Counter(_terms(p)) for p in passages]
+    if not query_terms or not docs:
+        return [0.0] * len(passages)
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1.0
+    n = len(docs)
+    idf = {}
+    for term in query_terms:
+        df = sum(1 for d in docs if term in d)
+        idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (_K1 + 1) / (tf + _K1 * (1 - _B + _B * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def select_passages(text: str, query: str, budget: int) -> str:
+    """As passagens mais relevantes que cabem em `budget` tokens, na ordem original."""
+    passages = split_passages(text)
+    scores = bm25_scores(passages, query)
+    # A primeira passagem (título/cabeçalho da fonte) sempre entra; empate → ordem do texto.
+    # Passagens sem nenhum termo da query só entram se nada casou (vira um corte do início)
+    candidates = range(1, len(passages))
+    if any(scores[i] > 0 for i in candidates):
+        candidates = [i for i in candidates if scores[i] > 0]
+    ranked = [0] + sorted(candidates, key=lambda i: (-scores[i], i))
+    chosen, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(passages[i]) + 2
+        if used + cost > budget:
+            continue
+        chosen.add(i)
+        used += cost
+    parts, previous = [], -1
+    for i in sorted(chosen):
+        if previous >= 0 and i != previous + 1:
+            parts.append("[...]")
+        parts.append(passages[i])
+        previous = i
+    return "\n\n".join(parts)
+
+
+class ToolOutputCompressor:
+    """Comprime saídas grandes de ferramentas e guarda o original para read_tool_output."""
+
+    def __init__(self, budget_tokens: int = 1500, tools: Optional[set] = None, enabled: bool = True):
+        self.budget_tokens = budget_tokens
+        self.tools = tools or set()
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._raw: OrderedDict[str, str] = OrderedDict()
+        self._stats = {
+            "checked": 0,
+            "compressed": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "retrievals": 0,
+            "retrieval_misses": 0,
+        }
+
+    def compress(self, tool_name: str, output: str, query: str) -> str:
+        """Saída pronta para o contexto: a original se couber, senão as passagens mais relevantes."""
+        if not self.enabled or tool_name not in self.tools or not output:
+            return output
+        tokens = estimate_tokens(output)
+        with self._lock:
+            self._stats["checked"] += 1
+        if tokens <= self.budget_tokens:
+            return output
+
+        ref = uuid.uuid4().hex[:10]
+        with self._lock:
+            self._raw[ref] = output
+            while len(self._raw) > _RAW_STORE_SIZE:
+                self._raw.popitem(last=False)
+
+        compressed = select_passages(output, query, self.budget_tokens)
+        kept = estimate_tokens(compressed)
+        with self._lock:
+            self._stats["compressed"] += 1
+            self._stats["tokens_before"] += tokens
+            self._stats["tokens_after"] += kept
+        logger.info(f"[COMPRESS] {tool_name}: {tokens} → {kept} tokens (ref {ref})")
+        return (
+            f"{compressed}\n\n[Saída resumida: trechos mais relevantes, ~{kept} de {tokens} tokens. "
+            f'Texto completo: read_tool_output(ref="{ref}"); outro recorte: read_tool_output(ref="{ref}", query="...")]'
+        )
+
+    def retrieve(self, ref: str, query: str = "") -> str:
+        with self._lock:
+            raw = self._raw.get(ref)
+            if raw is not None:
+                self._raw.move_to_end(ref)
+            self._stats["retrievals" if raw is not None else "retrieval_misses"] += 1
+        if raw is None:
+            return f"Erro: saída '{ref}' não está mais disponível. Execute a ferramenta original de novo."
+        if query.strip():
+            return select_passages(raw, query, self.budget_tokens * 2)
+        return raw
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["stored_outputs"] = len(self._raw)
+        before = stats["tokens_before"]
+        stats["compression_ratio"] = round(stats["tokens_after"] / before, 3) if before else None
+        return {"enabled": self.enabled, "budget_tokens": self.budget_tokens, "tools": sorted(self.tools), **stats}
+
+
+def compression_query(intent: str, func_args: dict) -> str:
+    """Query do ranqueamento: intenção do usuário + argumentos textuais da chamada."""
+    values = [str(v) for v in func_args.values() if isinstance(v, str)] if isinstance(func_args, dict) else []
+    return " ".join([intent, *values])
+
+
+_compressor: Optional[ToolOutputCompressor] = None
+
+
+def get_tool_compressor() -> ToolOutputCompressor:
+    """Retorna o compressor singleton, configurado a partir de AgentConfig."""
+    global _compressor
+    if _compressor is None:
+        from .config import get_config
+        config = get_config()
+        _compressor = ToolOutputCompressor(
+            budget_tokens=config.tool_output_budget_tokens,
+            tools=set(config.tool_output_compress_tools),
+            enabled=config.tool_output_compression,
+        )
+    return _compressor
@@ -27,6 +27,36 @@ class AgentConfig:
     # OpenRouter
     openrouter_api_key: str = ""
     openrouter_model: str = "anthropic/claude-3.5-sonnet"
+    openrouter_fallback_models: list = field(default_factory=list)
+    # Base da API (aponte para backend/devtools/fake_openrouter.py em benchmarks)
+    openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    # Cassetes de gravação/reprodução (core/llm_cassette.py): off | record | replay
+    llm_cassette_mode: str = "off"
+    llm_cassette_path: str = ""
+    llm_cassette_realtime: bool = False
+
+    # Resiliência das chamadas LLM (ver core/llm.py)
+    llm_timeout: float = 60.0
+    llm_max_retries: int = 3
+    llm_backoff_base: float = 0.5
+    llm_backoff_max: float = 8.0
+    llm_retry_after_max: float = 20.0
+    llm_hedge_delay_seconds: float = 0.0  # 0 = hedging desligado
+    llm_input_token_budget: int = 100_000  # orçamento padrão de entrada (core/tokens.py); 0 = sem limite
+
+    # Limitador por modelo (ver core/rate_limiter.py)
+    rate_limit_enable: bool = True
+    rate_limit_initial_concurrency: float = 8.0
+    rate_limit_min_concurrency: float = 1.0
+    rate_limit_max_concurrency: float = 32.0
+    rate_limit_tokens_per_minute: float = 400_000.0
+    rate_limit_max_wait: float = 30.0
+
+    # Circuit breakers por dependência (ver core/circuit_breaker.py)
+    circuit_breaker_enable: bool = True
+    circuit_failure_threshold: int = 5
+    circuit_open_seconds: float = 30.0
+    circuit_breaker_overrides: dict = field(default_factory=dict)
 
     # Supabase
     supabase_url: str = ""
@@ -40,15 +70,96 @@ class AgentConfig:
     # Agent Behavior
     enable_caching: bool = True
     cache_ttl_seconds: int = 86400
+    llm_cache_max_entries: int = 512
+    llm_cache_max_memory_mb: int = 64
+    llm_cache_max_disk_mb: int = 256
+    tool_max_concurrency: int = 4  # tool calls independentes executadas em paralelo por turno
+    # Timeout por ferramenta sobrescrevendo o declarado no @tool (ver agents/tool_registry.py)
+    tool_timeouts: dict = field(default_factory=dict)
+    tool_cache_ttl_seconds: int = 300  # resultado de ferramentas cacheáveis (busca, leitura); 0 desliga
+    qa_mode: str = "blocking"  # blocking | speculative (QA em paralelo com o próximo turno do Supervisor)
+    # Amostragem do QA por taxa de aprovação (ver agents/qa_policy.py)
+    qa_policy_enable: bool = True
+    qa_policy_min_samples: int = 20
+    qa_policy_approval_threshold: float = 0.95
+    qa_policy_sample_rate: float = 0.2
+
+    # Sessões de conversa (ver core/session_store.py)
+    session_cache_size: int = 256
+    session_ttl_seconds: int = 7 * 86400
+    session_max_messages: int = 400
+    session_reuse_tool_results: bool = True
+    # Só ferramentas determinísticas: ask_browser e buscas leem dados ao vivo
+    session_reuse_tools: list = field(
+        default_factory=lambda: ["ask_file_generator", "ask_file_modifier", "read_tool_output"]
+    )
+
+    # Pré-roteador por keywords: pula o Supervisor em pedidos inequívocos (ver agents/prerouter.py)
+    # Limiar acima de CONFIDENT (0.95): o fast path fica desligado e os palpites só
+    # alimentam a concordância em /api/admin/metrics; baixe para 0.9 quando ela justificar
+    prerouter_enable: bool = True
+    prerouter_min_confidence: float = 1.0
+    prerouter_shadow_rate: float = 0.1  # fração do fast path comparada com o Supervisor em segundo plano
+
+    # Memo de artefatos: pedido idêntico devolve o link/design já gerado (ver agents/artifact_memo.py)
+    artifact_memo_enable: bool = True
+    artifact_memo_ttl_seconds: int = 86400
+
+    # Compressão extrativa (BM25) de saídas grandes de ferramentas (ver core/compression.py)
+    tool_output_compression: bool = True
+    tool_output_budget_tokens: int = 1500
+    # fetch_file_content fica de fora: o file_modifier edita pela estrutura exata (células, abas, páginas)
+    tool_output_compress_tools: list = field(
+        default_factory=lambda: ["web_fetch", "web_search", "ask_browser"]
+    )
+
+    # Roteador de modelos por latência/custo/qualidade (ver core/model_router.py)
+    model_router_enable: bool = True
+    # Modelos pequenos candidatos das tarefas curtas (classificação, revisão, plano)
+    model_router_small_models: list = field(
+        default_factory=lambda: ["google/gemini-2.0-flash-001", "openai/gpt-4o-mini", "anthropic/claude-3.5-haiku"]
+    )
+    # Política padrão por agente/tarefa; o admin pode sobrescrever por agente ("routing")
+    model_router_policies: dict = field(
+        default_factory=lambda: {"qa": "fastest", "classify": "fastest", "plan": "fastest"}
+    )
+
+    # Controle de admissão dos streams de chat/builder (ver core/admission.py)
+    admission_enable: bool = True
+    admission_max_in_flight: int = 16  # somando os workers
+    admission_per_user: int = 2
+    admission_max_queue: int = 32
+    admission_per_user_queue: int = 2
+    admission_max_wait: float = 120.0  # segundos na fila antes de desistir
+    # Proxies (IPs ou redes) cujo X-Forwarded-For é confiável para achar o IP do cliente
+    trusted_proxies: list = field(default_factory=lambda: ["127.0.0.1", "::1"])
+
+    # Jobs em segundo plano com SSE retomável (ver core/jobs.py)
+    job_max_workers: int = 4
+    job_retention_seconds: int = 3600
+
+    # Tracing (ver core/tracing.py)
+    tracing_enable: bool = True
+    tracing_export_path: Optional[Path] = None  # None = workspace_path/traces.jsonl; TRACING_EXPORT=off desliga
+    tracing_sse_timing: bool = False
 
     # Parser
     web_timeout: float = 20.0
     web_max_response_size: int = 2_000_000
     web_max_chars: int = 50_000
 
+    # HTTP de saída (pool compartilhado — ver core/http_client.py)
+    http_max_connections_per_host: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2_enable: bool = True
+    http_host_limits: dict = field(default_factory=dict)
+
     # Streaming
     stream_enable: bool = True
     stream_chunk_size: int = 8
+    sse_coalesce_window_ms: float = 30.0  # janela de agrupamento de chunks (core/sse.py); 0 = desligado
+    sse_max_frame_chars: int = 8192
+    cancel_on_disconnect: bool = True  # cancela a geração quando o cliente fecha a conexão (core/cancellation.py)
 
     # Workspace
     workspace_path: Path = field(default_factory=lambda: Path("/tmp/agent_workspace"))
@@ -70,6 +181,47 @@ class AgentConfig:
         self.max_iterations = int(os.getenv("AGENT_MAX_ITERATIONS", str(self.max_iterations)))
         self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY", self.openrouter_api_key)
         self.openrouter_model = os.getenv("OPENROUTER_MODEL", self.openrouter_model)
+        self.openrouter_fallback_models = [
+            m.strip() for m in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(",") if m.strip()
+        ]
+        self.openrouter_base_url = os.getenv("OPENROUTER_BASE_URL", self.openrouter_base_url)
+        self.llm_cassette_mode = os.getenv("LLM_CASSETTE_MODE", self.llm_cassette_mode).lower()
+        self.llm_cassette_path = os.getenv("LLM_CASSETTE_PATH", self.llm_cassette_path)
+        self.llm_cassette_realtime = os.getenv("LLM_CASSETTE_REALTIME", "false").lower() == "true"
+        self.llm_timeout = float(os.getenv("LLM_TIMEOUT", str(self.llm_timeout)))
+        self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", str(self.llm_max_retries)))
+        self.llm_backoff_base = float(os.getenv("LLM_BACKOFF_BASE", str(self.llm_backoff_base)))
+        self.llm_backoff_max = float(os.getenv("LLM_BACKOFF_MAX", str(self.llm_backoff_max)))
+        self.llm_retry_after_max = float(os.getenv("LLM_RETRY_AFTER_MAX", str(self.llm_retry_after_max)))
+        self.llm_hedge_delay_seconds = float(os.getenv("LLM_HEDGE_DELAY", str(self.llm_hedge_delay_seconds)))
+        self.llm_input_token_budget = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", str(self.llm_input_token_budget)))
+        self.rate_limit_enable = os.getenv("LLM_RATE_LIMIT", "true").lower() == "true"
+        self.rate_limit_initial_concurrency = float(
+            os.getenv("LLM_RATE_LIMIT_CONCURRENCY", str(self.rate_limit_initial_concurrency))
+        )
+        self.rate_limit_min_concurrency = float(
+            os.getenv("LLM_RATE_LIMIT_MIN_CONCURRENCY", str(self.rate_limit_min_concurrency))
+        )
+        self.rate_limit_max_concurrency = float(
+            os.getenv("LLM_RATE_LIMIT_MAX_CONCURRENCY", str(self.rate_limit_max_concurrency))
+        )
+        self.rate_limit_tokens_per_minute = float(
+            os.getenv("LLM_RATE_LIMIT_TPM", str(self.rate_limit_tokens_per_minute))
+        )
+        self.rate_limit_max_wait = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", str(self.rate_limit_max_wait)))
+        self.circuit_breaker_enable = os.getenv("CIRCUIT_BREAKER", "true").lower() == "true"
+        self.circuit_failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", str(self.circuit_failure_threshold)))
+        self.circuit_open_seconds = float(os.getenv("CIRCUIT_OPEN_SECONDS", str(self.circuit_open_seconds)))
+        # Formato: "supabase=3:20,pexels=2:120" (falhas seguidas:segundos aberto)
+        for item in os.getenv("CIRCUIT_BREAKER_OVERRIDES", "").split(","):
+            name, _, spec = item.partition("=")
+            threshold, _, seconds = spec.partition(":")
+            try:
+                self.circuit_breaker_overrides[name.strip().lower()] = (
+                    int(threshold), float(seconds or self.circuit_open_seconds)
+                )
+            except ValueError:
+                continue
         self.supabase_url = (
             os.getenv("SUPABASE_URL", "")
             or os.getenv("VITE_SUPABASE_URL", "")
@@ -86,12 +238,90 @@ class AgentConfig:
         self.browserbase_project_id = os.getenv("BROWSERBASE_PROJECT_ID", "")
         self.enable_caching = os.getenv("AGENT_CACHE", "true").lower() == "true"
         self.cache_ttl_seconds = int(os.getenv("AGENT_CACHE_TTL", str(self.cache_ttl_seconds)))
+        self.llm_cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", str(self.llm_cache_max_entries)))
+        self.llm_cache_max_memory_mb = int(os.getenv("LLM_CACHE_MAX_MEMORY_MB", str(self.llm_cache_max_memory_mb)))
+        self.llm_cache_max_disk_mb = int(os.getenv("LLM_CACHE_MAX_DISK_MB", str(self.llm_cache_max_disk_mb)))
+        self.qa_mode = os.getenv("AGENT_QA_MODE", self.qa_mode).lower()
+        self.qa_policy_enable = os.getenv("QA_POLICY", "true").lower() == "true"
+        self.qa_policy_min_samples = int(os.getenv("QA_POLICY_MIN_SAMPLES", str(self.qa_policy_min_samples)))
+        self.qa_policy_approval_threshold = float(
+            os.getenv("QA_POLICY_APPROVAL_THRESHOLD", str(self.qa_policy_approval_threshold))
+        )
+        self.qa_policy_sample_rate = float(os.getenv("QA_POLICY_SAMPLE_RATE", str(self.qa_policy_sample_rate)))
+        self.tool_max_concurrency = int(os.getenv("AGENT_TOOL_CONCURRENCY", str(self.tool_max_concurrency)))
+        # TOOL_TIMEOUTS="ask_browser=180,web_fetch=20"
+        for item in os.getenv("TOOL_TIMEOUTS", "").split(","):
+            name, _, seconds = item.partition("=")
+            if name.strip() and seconds.strip():
+                self.tool_timeouts[name.strip()] = float(seconds)
+        self.tool_cache_ttl_seconds = int(os.getenv("TOOL_CACHE_TTL", str(self.tool_cache_ttl_seconds)))
+        self.session_cache_size = int(os.getenv("SESSION_CACHE_SIZE", str(self.session_cache_size)))
+        self.session_ttl_seconds = int(os.getenv("SESSION_TTL", str(self.session_ttl_seconds)))
+        self.session_max_messages = int(os.getenv("SESSION_MAX_MESSAGES", str(self.session_max_messages)))
+        self.session_reuse_tool_results = os.getenv("SESSION_REUSE_TOOL_RESULTS", "true").lower() == "true"
+        if os.getenv("SESSION_REUSE_TOOLS") is not None:
+            self.session_reuse_tools = [
+                t.strip() for t in os.getenv("SESSION_REUSE_TOOLS", "").split(",") if t.strip()
+            ]
+        self.prerouter_enable = os.getenv("AGENT_PREROUTER", "true").lower() == "true"
+        self.prerouter_min_confidence = float(
+            os.getenv("AGENT_PREROUTER_MIN_CONFIDENCE", str(self.prerouter_min_confidence))
+        )
+        self.prerouter_shadow_rate = float(os.getenv("AGENT_PREROUTER_SHADOW_RATE", str(self.prerouter_shadow_rate)))
+        self.artifact_memo_enable = os.getenv("ARTIFACT_MEMO", "true").lower() == "true"
+        self.artifact_memo_ttl_seconds = int(os.getenv("ARTIFACT_MEMO_TTL", str(self.artifact_memo_ttl_seconds)))
+        self.tool_output_compression = os.getenv("TOOL_OUTPUT_COMPRESSION", "true").lower() == "true"
+        self.tool_output_budget_tokens = int(
+            os.getenv("TOOL_OUTPUT_BUDGET_TOKENS", str(self.tool_output_budget_tokens))
+        )
+        if os.getenv("TOOL_OUTPUT_COMPRESS_TOOLS"):
+            self.tool_output_compress_tools = [
+                t.strip() for t in os.getenv("TOOL_OUTPUT_COMPRESS_TOOLS", "").split(",") if t.strip()
+            ]
+        self.model_router_enable = os.getenv("MODEL_ROUTER", "true").lower() == "true"
+        if os.getenv("MODEL_ROUTER_SMALL_MODELS"):
+            self.model_router_small_models = [
+                m.strip() for m in os.getenv("MODEL_ROUTER_SMALL_MODELS", "").split(",") if m.strip()
+            ]
+        # MODEL_ROUTER_POLICIES="qa=fastest,classify=cheapest,file_generator=quality_floor"
+        for item in os.getenv("MODEL_ROUTER_POLICIES", "").split(","):
+            task, _, policy = item.partition("=")
+            if task.strip() and policy.strip():
+                self.model_router_policies[task.strip()] = policy.strip()
+        self.admission_enable = os.getenv("ADMISSION", "true").lower() == "true"
+        self.admission_max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", str(self.admission_max_in_flight)))
+        self.admission_per_user = int(os.getenv("ADMISSION_PER_USER", str(self.admission_per_user)))
+        self.admission_max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", str(self.admission_max_queue)))
+        self.admission_per_user_queue = int(os.getenv("ADMISSION_PER_USER_QUEUE", str(self.admission_per_user_queue)))
+        self.admission_max_wait = float(os.getenv("ADMISSION_MAX_WAIT", str(self.admission_max_wait)))
+        if os.getenv("TRUSTED_PROXIES"):
+            self.trusted_proxies = [p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()]
+        self.job_max_workers = int(os.getenv("JOB_MAX_WORKERS", str(self.job_max_workers)))
+        self.job_retention_seconds = int(os.getenv("JOB_RETENTION", str(self.job_retention_seconds)))
         self.web_timeout = float(os.getenv("WEB_TIMEOUT", str(self.web_timeout)))
         self.web_max_response_size = int(os.getenv("WEB_MAX_SIZE", str(self.web_max_response_size)))
         self.web_max_chars = int(os.getenv("WEB_MAX_CHARS", str(self.web_max_chars)))
+        self.http_max_connections_per_host = int(
+            os.getenv("HTTP_MAX_CONN_PER_HOST", str(self.http_max_connections_per_host))
+        )
+        self.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", str(self.http_keepalive_expiry)))
+        self.http2_enable = os.getenv("HTTP2_ENABLE", "true").lower() == "true"
+        # Formato: "openrouter.ai=64,api.tavily.com=8"
+        for item in os.getenv("HTTP_HOST_LIMITS", "").split(","):
+            host, _, limit = item.partition("=")
+            if host.strip() and limit.strip().isdigit():
+                self.http_host_limits[host.strip().lower()] = int(limit)
+        self.sse_coalesce_window_ms = float(os.getenv("SSE_COALESCE_MS", str(self.sse_coalesce_window_ms)))
+        self.sse_max_frame_chars = int(os.getenv("SSE_MAX_FRAME_CHARS", str(self.sse_max_frame_chars)))
+        self.cancel_on_disconnect = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true"
         self.allow_code_execution = os.getenv("ALLOW_CODE_EXEC", "false").lower() == "true"
         self.cors_origins = os.getenv("CORS_ORIGINS", self.cors_origins)
         self.workspace_path = Path(os.getenv("AGENT_WORKSPACE", "/tmp/agent_workspace"))
+        self.tracing_enable = os.getenv("TRACING", "true").lower() == "true"
+        tracing_export = os.getenv("TRACING_EXPORT", "")
+        if tracing_export.lower() != "off":
+            self.tracing_export_path = Path(tracing_export) if tracing_export else self.workspace_path / "traces.jsonl"
+        self.tracing_sse_timing = os.getenv("TRACING_SSE_TIMING", "false").lower() == "true"
         self.log_level = os.getenv("LOG_LEVEL", self.log_level)
 
         # Auto-load missing API keys from Supabase ApiKeys table
@@ -0,0 +1,172 @@
+"""
+Store único de credenciais (tabela ApiKeys do Supabase).
+
+Substitui os três caches copiados de llm.py (OpenRouter, busca, Vercel):
+
+  - Uma única query traz TODOS os providers ativos (provider, api_key).
+  - O nome da tabela que respondeu ("ApiKeys" ou "apikeys") é memorizado,
+    então os refreshes seguintes fazem 1 round trip em vez de 2–4.
+  - Refresh antecipado: ao se aproximar do TTL, o refresh roda em background
+    e a requisição atual usa a chave em cache (stale-while-revalidate).
+  - Single-flight: refreshes concorrentes compartilham a mesma task, então
+    N requisições simultâneas geram 1 consulta ao Supabase.
+
+Supabase continua sendo a Única Fonte da Verdade: uma chave alterada no
+painel admin é vista no próximo ciclo de TTL. Com o circuit breaker do
+Supabase aberto (core/circuit_breaker.py), o refresh nem sai: as chaves em
+cache continuam valendo e, sem cache, a falha é imediata.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_TABLE_NAMES = ("ApiKeys", "apikeys")
+
+
+class CredentialStore:
+    """Cache single-flight de todas as API keys ativas."""
+
+    def __init__(self, ttl: float = 60.0, refresh_ahead: float = 15.0, max_stale: float = 600.0):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        # Depois de max_stale sem refresh bem-sucedido, a requisição espera o refresh
+        self.max_stale = max_stale
+
+        self._keys: dict[str, str] = {}
+        self._loaded_at = 0.0  # 0 = nenhum refresh bem-sucedido ainda (zero chaves ativas também conta)
+        self._table: Optional[str] = None
+        self._inflight: Optional[asyncio.Task] = None
+
+        self._refreshes = 0
+        self._failures = 0
+
+    # ── Leitura ───────────────────────────────────────
+
+    async def get(self, provider: str, force_refresh: bool = False) -> str:
+        """Retorna a chave do provider ("" se não existir)."""
+        await self._ensure_fresh(force_refresh)
+        return self._keys.get(provider, "")
+
+    async def get_first(self, providers: tuple[str, ...], force_refresh: bool = False) -> str:
+        """Retorna a primeira chave disponível na ordem de preferência."""
+        await self._ensure_fresh(force_refresh)
+        for provider in providers:
+            if self._keys.get(provider):
+                return self._keys[provider]
+        return ""
+
+    async def _ensure_fresh(self, force_refresh: bool):
+        age = time.monotonic() - self._loaded_at
+        if force_refresh or not self._loaded_at or age >= self.max_stale:
+            await self.refresh()
+        elif age >= self.ttl - self.refresh_ahead:
+            # Chave ainda utilizável: atualiza em background, sem bloquear a requisição
+            self._start_refresh()
+
+    # ── Refresh ───────────────────────────────────────
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch_all())
+        return self._inflight
+
+    async def refresh(self):
+        """Força um refresh (coalescido com qualquer refresh já em andamento)."""
+        # shield: se quem espera for cancelado, o refresh continua para os demais
+        await asyncio.shield(self._start_refresh())
+
+    async def _fetch_all(self):
+        from .circuit_breaker import CircuitOpenError, get_breaker, is_failure_status
+        from .config import get_config
+        from .http_client import request as http_request
+
+        config = get_config()
+        headers = {
+            "apikey": config.supabase_key,
+            "Authorization": f"Bearer {config.supabase_key}",
+        }
+
+        # Tabela já conhecida primeiro; a outra só se ela deixar de responder
+        tables = [self._table] if self._table else []
+        tables += [t for t in _TABLE_NAMES if t != self._table]
+
+        self._refreshes += 1
+        breaker = get_breaker("supabase")
+        try:
+            with breaker.guard() as call:
+                for table_name in tables:
+                    url = f"{config.supabase_url}/rest/v1/{table_name}?select=provider,api_key&is_active=eq.true"
+                    try:
+                        response = await http_request("GET", url, headers=headers, timeout=10.0)
+                    except Exception as e:
+                        logger.warning(f"[CREDENTIALS] Erro consultando {table_name}: {e}")
+                        call.fail()
+                        continue
+                    if response.status_code != 200:
+                        logger.info(f"[CREDENTIALS] {table_name} → HTTP {response.status_code}")
+                        if is_failure_status(response.status_code):
+                            call.fail()
+                        continue
+                    try:
+                        rows = response.json()
+                    except ValueError as e:
+                        logger.warning(f"[CREDENTIALS] Resposta inválida de {table_name}: {e}")
+                        continue
+
+                    keys: dict[str, str] = {}
+                    for row in rows or []:
+                        provider = row.get("provider")
+                        if provider and row.get("api_key") and provider not in keys:
+                            keys[provider] = row["api_key"]
+
+                    call.failed = False
+                    self._table = table_name
+                    self._keys = keys
+                    self._loaded_at = time.monotonic()
+                    self._sync_config(config)
+                    logger.info(f"[CREDENTIALS] {len(keys)} provider(s) carregados de {table_name}: {sorted(keys)}")
+                    return
+        except CircuitOpenError as e:
+            logger.info(f"[CREDENTIALS] Refresh ignorado: {e}")
+
+        self._failures += 1
+        if self._loaded_at:
+            logger.warning("[CREDENTIALS] Supabase indisponível — usando chaves em cache")
+        else:
+            logger.error("[CREDENTIALS] Nenhuma chave carregada do Supabase")
+
+    def _sync_config(self, config):
+        """Mantém AgentConfig alinhado com as chaves do Supabase."""
+        if self._keys.get("openrouter"):
+            config.openrouter_api_key = self._keys["openrouter"]
+        if self._keys.get("browserbase"):
+            config.browserbase_api_key = self._keys["browserbase"]
+        if self._keys.get("browserbase_project_id"):
+            config.browserbase_project_id = self._keys["browserbase_project_id"]
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        return {
+            "table": self._table,
+            "providers": sorted(self._keys),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "refreshes": self._refreshes,
+            "failures": self._failures,
+            "refresh_in_flight": bool(self._inflight and not self._inflight.done()),
+        }
+
+
+_store: Optional[CredentialStore] = None
+
+
+def get_credential_store() -> CredentialStore:
+    """Retorna o store singleton."""
+    global _store
+    if _store is None:
+        _store = CredentialStore()
+    return _store
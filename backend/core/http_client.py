@@ -0,0 +1,311 @@
+"""
+Registry central de clientes HTTP de saída (httpx).
+
+Antes cada chamada externa criava e destruía seu próprio httpx.AsyncClient,
+pagando TCP + TLS a cada turno de LLM e a cada ferramenta. Aqui mantemos,
+durante todo o ciclo de vida do app:
+
+  - Um cliente dedicado por host conhecido (OpenRouter, Supabase, Tavily...)
+    com pool próprio, keep-alive e HTTP/2 quando o pacote `h2` está instalado.
+  - Um cliente compartilhado para hosts arbitrários (web_fetch, downloads).
+  - Um semáforo por host que limita requisições simultâneas.
+  - Métricas por host (requisições, erros, in-flight, espera na fila).
+
+Uso:
+    from backend.core.http_client import request, stream_request
+
+    response = await request("GET", url, timeout=10.0)
+
+    async with stream_request("POST", url, json=payload) as response:
+        async for line in response.aiter_lines():
+            ...
+
+Clientes síncronos (usados em threads, ex: upload do Supabase) vêm de
+get_sync_client(url) e respeitam os mesmos limites de pool.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Hosts com cliente dedicado → limite de conexões simultâneas.
+# Hosts fora desta lista usam o cliente compartilhado (_DEFAULT_CLIENT_KEY).
+_DEDICATED_HOSTS: dict[str, int] = {
+    "openrouter.ai": 64,
+    "api.tavily.com": 16,
+    "api.search.brave.com": 16,
+    "api.pexels.com": 8,
+    "api.vercel.com": 8,
+}
+
+_DEFAULT_CLIENT_KEY = "*"
+_MAX_TRACKED_HOSTS = 256  # limita o dicionário de semáforos/métricas para hosts arbitrários
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class _HostStats:
+    """Contadores de um host. Atualizados sob o lock do registry."""
+
+    __slots__ = ("requests", "errors", "in_flight", "max_in_flight", "wait_ms_total", "wait_ms_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_wait_ms": round(self.wait_ms_total / self.requests, 2) if self.requests else 0.0,
+            "max_wait_ms": round(self.wait_ms_max, 2),
+        }
+
+
+class HttpClientRegistry:
+    """Mantém clientes httpx reutilizáveis e os limites de concorrência por host."""
+
+    def __init__(self):
+        from .config import get_config
+        config = get_config()
+
+        self._per_host_default = config.http_max_connections_per_host
+        self._keepalive_expiry = config.http_keepalive_expiry
+        self._http2 = config.http2_enable and _HTTP2_AVAILABLE
+        self._host_limits = {**_DEDICATED_HOSTS, **config.http_host_limits}
+
+        supabase_host = urlsplit(config.supabase_url).hostname if config.supabase_url else None
+        if supabase_host:
+            self._host_limits.setdefault(supabase_host, 32)
+
+        self._async_clients: dict[str, httpx.AsyncClient] = {}
+        self._sync_clients: dict[str, httpx.Client] = {}
+        self._semaphores: "OrderedDict[str, asyncio.Semaphore]" = OrderedDict()
+        self._stats: "OrderedDict[str, _HostStats]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if config.http2_enable and not _HTTP2_AVAILABLE:
+            logger.info("[HTTP] Pacote 'h2' ausente — usando apenas HTTP/1.1")
+
+    # ── Clientes ──────────────────────────────────────
+
+    def _client_key(self, host: str) -> str:
+        return host if host in self._host_limits else _DEFAULT_CLIENT_KEY
+
+    def _limits_for(self, key: str) -> httpx.Limits:
+        max_conn = self._host_limits.get(key, self._per_host_default)
+        return httpx.Limits(
+            max_connections=max_conn if key != _DEFAULT_CLIENT_KEY else max_conn * 4,
+            max_keepalive_connections=max_conn,
+            keepalive_expiry=self._keepalive_expiry,
+        )
+
+    def get_async_client(self, url: str) -> httpx.AsyncClient:
+        key = self._client_key(_host_of(url))
+        client = self._async_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self._limits_for(key),
+                http2=self._http2,
+                timeout=30.0,
+            )
+            self._async_clients[key] = client
+        return client
+
+    def get_sync_client(self, url: str) -> httpx.Client:
+        key = self._client_key(_host_of(url))
+        with self._lock:
+            client = self._sync_clients.get(key)
+            if client is None or client.is_closed:
+                client = httpx.Client(
+                    limits=self._limits_for(key),
+                    http2=self._http2,
+                    timeout=30.0,
+                )
+                self._sync_clients[key] = client
+            return client
+
+    # ── Concorrência e métricas ───────────────────────
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self._host_limits.get(host, self._per_host_default))
+            self._semaphores[host] = sem
+            # Descarta semáforos ociosos de hosts arbitrários mais antigos
+            while len(self._semaphores) > _MAX_TRACKED_HOSTS:
+                oldest, old_sem = next(iter(self._semaphores.items()))
+                if old_sem.locked() or oldest in self._host_limits:
+                    self._semaphores.move_to_end(oldest)
+                    break
+                self._semaphores.pop(oldest)
+        else:
+            self._semaphores.move_to_end(host)
+        return sem
+
+    def _stats_for(self, host: str) -> _HostStats:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = _HostStats()
+            self._stats[host] = stats
+            while len(self._stats) > _MAX_TRACKED_HOSTS:
+                self._stats.popitem(last=False)
+        return stats
+
+    def _enter(self, host: str, waited_ms: float) -> _HostStats:
+        with self._lock:
+            stats = self._stats_for(host)
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            stats.wait_ms_total += waited_ms
+            stats.wait_ms_max = max(stats.wait_ms_max, waited_ms)
+            return stats
+
+    def _exit(self, stats: _HostStats, failed: bool):
+        with self._lock:
+            stats.in_flight -= 1
+            if failed:
+                stats.errors += 1
+
+    @asynccontextmanager
+    async def host_slot(self, url: str) -> AsyncIterator[None]:
+        """Reserva uma vaga de concorrência para o host da URL e contabiliza métricas."""
+        host = _host_of(url)
+        sem = self._semaphore(host)
+        started = time.perf_counter()
+        async with sem:
+            stats = self._enter(host, (time.perf_counter() - started) * 1000)
+            failed = False
+            try:
+                yield
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._exit(stats, failed)
+
+    @contextmanager
+    def sync_slot(self, url: str) -> Iterator[None]:
+        """Versão síncrona de host_slot (sem semáforo — o pool do httpx.Client limita)."""
+        stats = self._enter(_host_of(url), 0.0)
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._exit(stats, failed)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            hosts = {host: stats.as_dict() for host, stats in self._stats.items()}
+        pools = {}
+        for key, client in list(self._async_clients.items()):
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            connections = getattr(pool, "connections", None)
+            pools[key] = {
+                "open_connections": len(connections) if connections is not None else None,
+                "closed": client.is_closed,
+            }
+        return {"http2": self._http2, "hosts": hosts, "pools": pools}
+
+    async def aclose(self):
+        for client in list(self._async_clients.values()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"[HTTP] Falha ao fechar cliente async: {e}")
+        self._async_clients.clear()
+        with self._lock:
+            for client in list(self._sync_clients.values()):
+                try:
+                    client.close()
+                except Exception as e:
+                    logger.warning(f"[HTTP] Falha ao fechar cliente sync: {e}")
+            self._sync_clients.clear()
+
+
+def _host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+# ── Singleton ─────────────────────────────────────────
+
+_registry: Optional[HttpClientRegistry] = None
+
+
+def get_http_registry() -> HttpClientRegistry:
+    """Retorna o registry singleton (criado sob demanda)."""
+    global _registry
+    if _registry is None:
+        _registry = HttpClientRegistry()
+    return _registry
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """Cliente async pooled para o host da URL."""
+    return get_http_registry().get_async_client(url)
+
+
+def get_sync_client(url: str) -> httpx.Client:
+    """Cliente síncrono pooled para o host da URL (seguro entre threads)."""
+    return get_http_registry().get_sync_client(url)
+
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Executa uma requisição pelo cliente pooled do host, respeitando o limite
+    de concorrência por host. Aceita os mesmos kwargs de httpx (timeout, headers...).
+    """
+    registry = get_http_registry()
+    async with registry.host_slot(url):
+        return await registry.get_async_client(url).request(method, url, **kwargs)
+
+
+@asynccontextmanager
+async def stream_request(method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    """Requisição em streaming pelo cliente pooled. A vaga do host é mantida até o fim do stream."""
+    registry = get_http_registry()
+    async with registry.host_slot(url):
+        async with registry.get_async_client(url).stream(method, url, **kwargs) as response:
+            yield response
+
+
+def sync_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Requisição síncrona pelo cliente pooled (para código que roda em threads)."""
+    registry = get_http_registry()
+    with registry.sync_slot(url):
+        return registry.get_sync_client(url).request(method, url, **kwargs)
+
+
+def get_http_metrics() -> dict:
+    """Métricas de pool/concorrência por host (usado em /api/admin/metrics)."""
+    if _registry is None:
+        return {"http2": False, "hosts": {}, "pools": {}}
+    return _registry.metrics()
+
+
+async def close_http_clients():
+    """Fecha todos os clientes. Chamado no shutdown do FastAPI."""
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
@@ -0,0 +1,412 @@
+"""
+Execuções longas (chat/builder) como jobs em segundo plano com SSE retomável.
+
+Gerar arquivos, apps no builder (max_tokens=16000) ou navegar com o
+Browserbase leva minutos; antes, uma queda de rede obrigava a refazer (e
+pagar) o pipeline inteiro. Com "background": true no corpo da requisição:
+
+  - o pipeline roda numa task própria, limitada a job_max_workers por worker
+    uvicorn (os excedentes ficam "queued")
+  - cada evento SSE recebe um número sequencial e fica guardado no job
+  - o cliente consome o job por um stream com `id: N` em cada evento; ao
+    reconectar (GET /api/agent/jobs/{id}/events com Last-Event-ID) recebe
+    só os eventos depois de N e continua acompanhando ao vivo
+  - GET /api/agent/jobs/{id} devolve o status; DELETE cancela
+
+Fechar a conexão NÃO cancela o job (é o ponto), só a assinatura.
+
+O job pertence a quem o criou (client_identity, como as sessões): só esse
+cliente consulta, acompanha ou cancela; para os outros ele não existe (404).
+
+Os eventos ficam em memória no worker que roda o job e são gravados em
+lote (a cada _FLUSH_INTERVAL) num SQLite em workspace_path. Uma reconexão
+que cai no outro worker uvicorn lê do SQLite e acompanha por polling. O
+cancelamento pedido a outro worker é marcado no SQLite e o dono o aplica
+no próximo flush.
+
+Jobs terminados ficam disponíveis por job_retention_seconds.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from .cancellation import CancelToken, set_cancel_token
+from .sse import sse_event
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    events INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    frame TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs(finished_at);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATUSES = (DONE, FAILED, CANCELLED)
+
+# Intervalo de gravação dos eventos no SQLite e de polling de quem lê de lá
+_FLUSH_INTERVAL = 0.25
+_POLL_INTERVAL = 0.5
+
+
+class Job:
+    """Um pipeline em execução e os eventos que ele já produziu."""
+
+    def __init__(self, kind: str, owner: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner  # client_identity de quem criou; só ele consulta/cancela
+        self.status = QUEUED
+        self.events: list[str] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.token = CancelToken()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+        self._flushed = 0
+
+    def append(self, event: str):
+        self.events.append(str(event))
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def status_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "events": len(self.events),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _frame_with_id(seq: int, frame: str) -> str:
+    # seq é 1-based: Last-Event-ID: N → retoma a partir do evento N+1
+    return f"id: {seq}\n{frame}"
+
+
+class JobManager:
+    """Pool de jobs deste worker + log de eventos compartilhado no SQLite."""
+
+    def __init__(self, db_path: Path, max_workers: int = 4, retention: float = 3600.0):
+        self.db_path = db_path
+        self.max_workers = max(1, max_workers)
+        self.retention = retention
+
+        self._jobs: dict[str, Job] = {}
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._local = threading.local()
+        self._stats = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "resumed": 0, "db_errors": 0}
+
+    # ── Execução ──────────────────────────────────────
+
+    async def submit(
+        self,
+        kind: str,
+        stream_factory: Callable[[], AsyncIterator[str]],
+        owner: str,
+        on_finish: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Job:
+        """
+        Cria o job de `owner` e agenda o pipeline. stream_factory só é chamada quando
+        houver vaga; on_finish roda no fim do job, mesmo se ele for cancelado antes de começar.
+        """
+        self._sweep()
+        job = Job(kind, owner)
+        self._jobs[job.id] = job
+        self._stats["submitted"] += 1
+        await self._db(self._insert, job)
+        job.task = asyncio.create_task(self._run(job, stream_factory, on_finish), name=f"job-{job.id}")
+        # Deixa a task entrar no try de _run: um cancel() antes disso pularia o finally
+        await asyncio.sleep(0)
+        return job
+
+    async def _run(
+        self,
+        job: Job,
+        stream_factory: Callable[[], AsyncIterator[str]],
+        on_finish: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        # Roda fora do contexto da requisição: o token é o do job, não o da conexão
+        set_cancel_token(job.token)
+        flusher: Optional[asyncio.Task] = None
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = time.time()
+                job._notify()
+                flusher = asyncio.create_task(self._flush_loop(job))
+                stream = stream_factory()
+                try:
+                    async for event in stream:
+                        job.append(event)
+                finally:
+                    aclose = getattr(stream, "aclose", None)
+                    if aclose is not None:
+                        await aclose()
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            job.token.cancel("job_cancelled")
+        except Exception as e:
+            logger.error(f"[JOBS] Job {job.id} ({job.kind}) falhou: {e}")
+            job.status = FAILED
+            job.error = str(e)
+            job.append(sse_event("error", f"Erro interno ao processar o pedido: {e}"))
+        finally:
+            if flusher is not None:
+                flusher.cancel()
+            if on_finish is not None:
+                try:
+                    await on_finish()
+                except Exception as e:
+                    logger.warning(f"[JOBS] Falha no on_finish de {job.id}: {e}")
+            job.finished_at = time.time()
+            self._stats[job.status] += 1
+            await self._db(self._flush, job)
+            job._notify()
+            logger.info(
+                f"[JOBS] Job {job.id} ({job.kind}) {job.status}: {len(job.events)} evento(s) "
+                f"em {job.finished_at - job.created_at:.1f}s"
+            )
+
+    async def _flush_loop(self, job: Job):
+        while True:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            cancel_requested = await self._db(self._flush, job)
+            if cancel_requested and job.task is not None:
+                logger.info(f"[JOBS] Cancelamento de {job.id} pedido por outro worker")
+                job.token.cancel("job_cancelled")
+                job.task.cancel()
+                return
+
+    async def cancel(self, job_id: str, owner: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.owner != owner or job.status in FINAL_STATUSES:
+                return False
+            job.token.cancel("job_cancelled")
+            job.task.cancel()
+            return True
+        # Job de outro worker: o dono aplica no próximo flush
+        return bool(await self._db(self._request_cancel, job_id, owner))
+
+    # ── Consulta e assinatura ─────────────────────────
+
+    async def status(self, job_id: str, owner: str) -> Optional[dict]:
+        """Status do job de `owner`; inexistente, expirado ou de outro cliente → None."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.owner != owner:
+                return None
+            info = job.status_dict()
+            if job.status == QUEUED:
+                info["queue_position"] = sum(
+                    1 for j in self._jobs.values() if j.status == QUEUED and j.created_at <= job.created_at
+                )
+            return info
+        return await self._db(self._load_status, job_id, owner)
+
+    async def subscribe(self, job_id: str, owner: str, last_event_id: int = 0) -> Optional[AsyncIterator[str]]:
+        """Stream dos eventos depois de last_event_id. None se o job não existe ou é de outro cliente."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return self._follow_local(job, last_event_id) if job.owner == owner else None
+        info = await self._db(self._load_status, job_id, owner)
+        if info is None:
+            return None
+        return self._follow_db(job_id, owner, last_event_id)
+
+    async def _follow_local(self, job: Job, last_event_id: int) -> AsyncIterator[str]:
+        if last_event_id:
+            self._stats["resumed"] += 1
+        yield sse_event("job", json.dumps({"job_id": job.id, "status": job.status}))
+        sent = max(0, last_event_id)
+        while True:
+            changed = job._changed
+            while sent < len(job.events):
+                sent += 1
+                yield _frame_with_id(sent, job.events[sent - 1])
+            if job.status in FINAL_STATUSES:
+                break
+            if not changed.is_set():
+                await changed.wait()
+        yield sse_event("job", json.dumps({"job_id": job.id, "status": job.status}))
+
+    async def _follow_db(self, job_id: str, owner: str, last_event_id: int) -> AsyncIterator[str]:
+        if last_event_id:
+            self._stats["resumed"] += 1
+        sent = max(0, last_event_id)
+        status = None
+        first = True
+        while True:
+            info = await self._db(self._load_status, job_id, owner)
+            status = info["status"] if info else FAILED
+            if first:
+                yield sse_event("job", json.dumps({"job_id": job_id, "status": status}))
+                first = False
+            for seq, frame in await self._db(self._load_events, job_id, sent) or []:
+                sent = seq
+                yield _frame_with_id(seq, frame)
+            if status in FINAL_STATUSES:
+                # Os últimos eventos são gravados junto com o status final
+                break
+            await asyncio.sleep(_POLL_INTERVAL)
+        yield sse_event("job", json.dumps({"job_id": job_id, "status": status}))
+
+    # ── SQLite (roda em thread) ───────────────────────
+
+    async def _db(self, func, *args):
+        try:
+            return await asyncio.to_thread(func, *args)
+        except Exception as e:
+            self._stats["db_errors"] += 1
+            logger.warning(f"[JOBS] Falha no SQLite ({func.__name__}): {e}")
+            return None
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            # Bancos criados antes da coluna owner: os jobs antigos ficam sem dono e ninguém os lê
+            if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, job: Job):
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, owner, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job.id, job.kind, job.owner, job.status, job.created_at),
+        )
+
+    def _flush(self, job: Job) -> bool:
+        """Grava eventos novos + status. Retorna True se outro worker pediu o cancelamento."""
+        conn = self._conn()
+        total = len(job.events)
+        new = [(job.id, seq + 1, job.events[seq]) for seq in range(job._flushed, total)]
+        conn.execute("BEGIN")
+        try:
+            if new:
+                conn.executemany("INSERT OR IGNORE INTO job_events (job_id, seq, frame) VALUES (?, ?, ?)", new)
+            conn.execute(
+                "UPDATE jobs SET status = ?, events = ?, error = ?, started_at = ?, finished_at = ? WHERE id = ?",
+                (job.status, total, job.error, job.started_at, job.finished_at, job.id),
+            )
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job.id,)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job._flushed = total
+        return bool(row and row[0])
+
+    def _request_cancel(self, job_id: str, owner: str) -> bool:
+        cursor = self._conn().execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND owner = ? AND status NOT IN (?, ?, ?)",
+            (job_id, owner, *FINAL_STATUSES),
+        )
+        return cursor.rowcount > 0
+
+    def _load_status(self, job_id: str, owner: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT kind, status, events, error, created_at, started_at, finished_at FROM jobs "
+            "WHERE id = ? AND owner = ?",
+            (job_id, owner),
+        ).fetchone()
+        if row is None:
+            return None
+        kind, status, events, error, created_at, started_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "status": status,
+            "events": events,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def _load_events(self, job_id: str, after: int) -> list[tuple[int, str]]:
+        return self._conn().execute(
+            "SELECT seq, frame FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+        ).fetchall()
+
+    def _delete_expired(self, cutoff: float):
+        conn = self._conn()
+        expired = [r[0] for r in conn.execute("SELECT id FROM jobs WHERE finished_at < ?", (cutoff,))]
+        if expired:
+            conn.executemany("DELETE FROM job_events WHERE job_id = ?", [(i,) for i in expired])
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in expired])
+            logger.info(f"[JOBS] {len(expired)} job(s) expirado(s) removido(s)")
+
+    def _sweep(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+        asyncio.get_running_loop().create_task(self._db(self._delete_expired, cutoff))
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        by_status: dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {"max_workers": self.max_workers, "in_memory": by_status, **self._stats}
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Retorna o gerenciador singleton, configurado a partir de AgentConfig."""
+    global _manager
+    if _manager is None:
+        from .config import get_config
+        config = get_config()
+        _manager = JobManager(
+            db_path=config.workspace_path / "jobs.sqlite3",
+            max_workers=config.job_max_workers,
+            retention=config.job_retention_seconds,
+        )
+    return _manager
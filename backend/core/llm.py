@@ -2,188 +2,514 @@
 Wrapper para chamadas LLM via OpenRouter e Anthropic.
 """
 
+import asyncio
+import json
 import logging
+import random
 import time
 from typing import Optional
 
 import httpx
 
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from .credentials import get_credential_store
+from .http_client import request as http_request, stream_request
+from .llm_cache import get_llm_cache, make_cache_key
+from .llm_cassette import get_cassette
+from .model_router import get_model_router
+from .rate_limiter import get_rate_limiter
+from .tokens import estimate_messages_tokens, fit_to_budget, record_trim
+from .tracing import span, start_span
+
 logger = logging.getLogger(__name__)
 
-# Cache em memória com TTL de 60 segundos.
-# Supabase (tabela ApiKeys) é a Única Fonte da Verdade.
-# Se a chave for alterada no painel admin, será recarregada no próximo ciclo de TTL.
-_api_key_cache: dict = {"key": None, "ts": 0.0}
-_search_key_cache: dict = {"key": None, "ts": 0.0}
-_vercel_key_cache: dict = {"key": None, "ts": 0.0}
-_API_KEY_TTL = 60.0  # segundos
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# As chaves vêm do CredentialStore (core/credentials.py): uma query traz todos os
+# providers ativos da tabela ApiKeys, com refresh antecipado e single-flight.
+# Supabase (tabela ApiKeys) continua sendo a Única Fonte da Verdade.
 
 
 async def get_api_key(force_refresh: bool = False) -> str:
     """
-    Busca a API key do Supabase (tabela ApiKeys) — Única Fonte da Verdade.
-    Cache de 60s para evitar chamadas excessivas.
-    Se force_refresh=True, ignora o cache e recarrega do Supabase.
+    Retorna a API key do OpenRouter (tabela ApiKeys).
+    Se force_refresh=True, aguarda um refresh do Supabase (coalescido).
+    """
+    key = await get_credential_store().get("openrouter", force_refresh=force_refresh)
+    if not key:
+        print("[GET_API_KEY] FATAL: No API key found in Supabase!")
+        raise ValueError("Chave OpenRouter não encontrada no Supabase (tabela ApiKeys)")
+    return key
+
+
+async def get_search_key(force_refresh: bool = False) -> str:
+    """
+    Retorna a API key de busca (tabela ApiKeys).
+    Tavily tem prioridade (prefixo 'tvly-'), depois Brave. "" se nenhuma existir.
     """
-    global _api_key_cache
+    key = await get_credential_store().get_first(("tavily", "brave"), force_refresh=force_refresh)
+    if not key:
+        print("[GET_SEARCH_KEY] Nenhuma chave de busca encontrada no Supabase (tavily/brave).")
+    return key
+
 
+async def get_vercel_key(force_refresh: bool = False) -> str:
+    """Retorna a API key do Vercel (provider='vercel'). "" se não existir."""
+    key = await get_credential_store().get("vercel", force_refresh=force_refresh)
+    if not key:
+        print("[GET_VERCEL_KEY] Chave Vercel não encontrada no Supabase.")
+    return key
+
+
+def _chat_url() -> str:
+    """Endpoint de chat/completions (AgentConfig.openrouter_base_url permite um servidor local)."""
+    from .config import get_config
+    return f"{get_config().openrouter_base_url.rstrip('/')}/chat/completions"
+
+
+async def _request_api_key() -> str:
+    """
+    Key para a requisição. Apontando para um servidor local (devtools), não
+    consulta o Supabase: usa OPENROUTER_API_KEY do ambiente ou um placeholder.
+    """
     from .config import get_config
     config = get_config()
+    if config.openrouter_base_url.rstrip("/") != OPENROUTER_BASE_URL:
+        return config.openrouter_api_key or "local-dev"
+    return await get_api_key()
 
-    now = time.time()
-    cache_valid = (
-        not force_refresh
-        and _api_key_cache["key"]
-        and (now - _api_key_cache["ts"]) < _API_KEY_TTL
-    )
 
-    if cache_valid:
-        return _api_key_cache["key"]
+def _cassette_miss(payload: dict) -> "LLMAPIError":
+    return LLMAPIError(404, f"Cassete sem gravação para {payload['model']}", retryable=False)
 
-    # Busca sempre do Supabase (Single Source of Truth)
-    supabase_url = config.supabase_url
-    supabase_key = config.supabase_key
 
-    headers = {
-        "apikey": supabase_key,
-        "Authorization": f"Bearer {supabase_key}",
-    }
+# ── Erros e política de retry ────────────────────────
 
-    for table_name in ["ApiKeys", "apikeys"]:
-        try:
-            url = f"{supabase_url}/rest/v1/{table_name}?select=api_key&provider=eq.openrouter&is_active=eq.true"
-            print(f"[GET_API_KEY] Querying Supabase ({table_name})...")
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, headers=headers)
-                if response.status_code != 200:
-                    continue
-                rows = response.json()
-                if rows and rows[0].get("api_key"):
-                    key = rows[0]["api_key"]
-                    _api_key_cache = {"key": key, "ts": now}
-                    config.openrouter_api_key = key
-                    print(f"[GET_API_KEY] OK - Supabase key loaded: {key[:15]}...")
-                    return key
-        except Exception as e:
-            print(f"[GET_API_KEY] ERROR querying {table_name}: {e}")
-            continue
+# Status que indicam falha transitória do provider (vale tentar de novo)
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 520, 522, 524}
+# Status em que outro modelo pode funcionar (modelo indisponível/removido)
+_FALLBACK_STATUS = _RETRYABLE_STATUS | {404}
+
+
+class LLMAPIError(Exception):
+    """Falha de uma chamada ao OpenRouter. status_code=None para timeout/erro de rede."""
 
-    # Fallback: usar key já em cache (Supabase indisponível temporariamente)
-    if _api_key_cache["key"]:
-        print("[GET_API_KEY] WARN - Supabase unavailable, using stale cache")
-        return _api_key_cache["key"]
+    def __init__(
+        self,
+        status_code: Optional[int],
+        detail: str,
+        retry_after: Optional[float] = None,
+        retryable: Optional[bool] = None,
+    ):
+        super().__init__(f"LLM API Error: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+        self.retryable = (
+            retryable if retryable is not None
+            else status_code is None or status_code in _RETRYABLE_STATUS
+        )
 
-    print("[GET_API_KEY] FATAL: No API key found in Supabase!")
-    raise ValueError("Chave OpenRouter não encontrada no Supabase (tabela ApiKeys)")
+    @property
+    def fallback_allowed(self) -> bool:
+        return self.status_code is None or self.status_code in _FALLBACK_STATUS
 
 
-async def get_search_key(force_refresh: bool = False) -> str:
+def _parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Lê Retry-After (segundos ou data HTTP)."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def _retry_delay(attempt: int, error: LLMAPIError) -> Optional[float]:
     """
-    Busca a API key de busca do Supabase (tabela ApiKeys) — Única Fonte da Verdade.
-    Tenta Tavily primeiro (prefixo 'tvly-'), depois Brave.
-    Cache de 60s para evitar chamadas excessivas.
+    Quanto esperar antes da próxima tentativa com o MESMO modelo.
+    None = não tentar de novo (esgotou tentativas, erro permanente ou
+    Retry-After maior do que vale a pena esperar → passa ao fallback).
     """
-    global _search_key_cache
-
     from .config import get_config
     config = get_config()
 
-    now = time.time()
-    cache_valid = (
-        not force_refresh
-        and _search_key_cache["key"]
-        and (now - _search_key_cache["ts"]) < _API_KEY_TTL
-    )
+    if error.status_code == 401:
+        # Chave já foi recarregada — uma nova tentativa imediata, só se ela mudou
+        return 0.0 if error.retryable and attempt == 0 else None
+    if not error.retryable or attempt >= config.llm_max_retries:
+        return None
 
-    if cache_valid:
-        return _search_key_cache["key"]
+    # Backoff exponencial com jitter ("equal jitter": metade fixa, metade aleatória)
+    ceiling = min(config.llm_backoff_max, config.llm_backoff_base * (2 ** attempt))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
 
-    supabase_url = config.supabase_url
-    supabase_key = config.supabase_key
-    headers = {
-        "apikey": supabase_key,
-        "Authorization": f"Bearer {supabase_key}",
+    if error.retry_after is not None:
+        if error.retry_after > config.llm_retry_after_max:
+            return None
+        delay = max(delay, error.retry_after)
+    return delay
+
+
+def _model_chain(model: str, fallback_models: Optional[list]) -> list[str]:
+    """Modelo principal + fallbacks (sem repetições). None → fallbacks do config."""
+    from .config import get_config
+    if fallback_models is None:
+        fallback_models = get_config().openrouter_fallback_models
+    chain = [model]
+    for candidate in fallback_models or []:
+        if candidate and candidate not in chain:
+            chain.append(candidate)
+    return chain
+
+
+def _openrouter_headers(api_key: str) -> dict:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://arcco.ai",
+        "X-Title": "Arcco.ai Agent",
     }
 
-    for provider in ["tavily", "brave"]:
-        for table_name in ["ApiKeys", "apikeys"]:
-            try:
-                url = f"{supabase_url}/rest/v1/{table_name}?select=api_key&provider=eq.{provider}&is_active=eq.true"
-                print(f"[GET_SEARCH_KEY] Querying Supabase: provider={provider} table={table_name}")
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(url, headers=headers)
-                    print(f"[GET_SEARCH_KEY] Status: {response.status_code} | Body: {response.text[:200]}")
-                    if response.status_code != 200:
-                        continue
-                    rows = response.json()
-                    if rows and rows[0].get("api_key"):
-                        key = rows[0]["api_key"]
-                        _search_key_cache = {"key": key, "ts": now}
-                        print(f"[GET_SEARCH_KEY] OK - {provider} key loaded: {key[:15]}...")
-                        return key
-                    else:
-                        print(f"[GET_SEARCH_KEY] Rows returned: {rows} — chave não encontrada para provider={provider}")
-            except Exception as e:
-                print(f"[GET_SEARCH_KEY] ERROR provider={provider} table={table_name}: {e}")
-                continue
 
-    # Fallback: stale cache se Supabase indisponível
-    if _search_key_cache["key"]:
-        print("[GET_SEARCH_KEY] WARN - usando cache antigo (Supabase indisponível)")
-        return _search_key_cache["key"]
+async def _refresh_key_after_401(api_key: str, tag: str) -> LLMAPIError:
+    """Recarrega a key do Supabase após um 401. Retryable só se a key mudou."""
+    print(f"[{tag}] 401 with key {api_key[:15]}... - trying to refresh key from Supabase")
+    try:
+        new_key = await get_api_key(force_refresh=True)
+    except Exception as e:
+        print(f"[{tag}] Key refresh failed: {e}")
+        new_key = None
+    changed = bool(new_key and new_key != api_key)
+    if changed:
+        print(f"[{tag}] Retrying with new key: {new_key[:15]}...")
+    return LLMAPIError(401, "Unauthorized (OpenRouter key)", retryable=changed)
 
-    print("[GET_SEARCH_KEY] FATAL: Nenhuma chave de busca encontrada no Supabase (tavily/brave).")
-    return ""
 
+def _openrouter_circuit() -> tuple[CircuitBreaker, bool]:
+    """
+    Consulta o circuit breaker do OpenRouter antes de reservar vaga no limitador.
+    Aberto → LLMAPIError não-retryable (sem backoff); a cadeia de fallback
+    também falha em milissegundos, pois todos os modelos passam pelo mesmo host.
+    """
+    breaker = get_breaker("openrouter")
+    try:
+        return breaker, breaker.before_call()
+    except CircuitOpenError as e:
+        raise LLMAPIError(503, str(e), retryable=False) from e
 
-async def get_vercel_key(force_refresh: bool = False) -> str:
+
+def _settle_openrouter_circuit(breaker: CircuitBreaker, probe: bool, status_code: Optional[int], network_error: bool):
     """
-    Busca a API key do Vercel do Supabase (tabela ApiKeys) — provider='vercel'.
-    Cache de 60s para evitar chamadas excessivas.
+    Só timeout/erro de rede e 5xx contam como falha do OpenRouter. 429 e 404
+    são por modelo (limitador e fallback cuidam deles). Sem resposta e sem
+    erro de rede (cancelamento, chave ausente) não decide nada.
     """
-    global _vercel_key_cache
+    if network_error or (status_code is not None and status_code >= 500):
+        breaker.record_failure()
+    elif status_code is not None:
+        breaker.record_success()
+    elif probe:
+        breaker.release_probe()
+
+
+def _estimate_request_tokens(payload: dict) -> float:
+    """Reserva no token bucket: prompt estimado (core/tokens.py) + max_tokens de saída."""
+    prompt_tokens = estimate_messages_tokens(payload.get("messages", []), payload.get("tools"))
+    return prompt_tokens + payload.get("max_tokens", 0)
+
 
+def _apply_input_budget(messages: list, tools: Optional[list], input_budget: Optional[int], tag: str) -> list:
+    """Corta o contexto para caber no orçamento de entrada (None = AgentConfig.llm_input_token_budget)."""
     from .config import get_config
-    config = get_config()
+    budget = input_budget or get_config().llm_input_token_budget
+    if budget <= 0:
+        return messages
+    trimmed, report = fit_to_budget(messages, budget, tools)
+    record_trim(report, tag)
+    return trimmed
 
-    now = time.time()
-    if (
-        not force_refresh
-        and _vercel_key_cache["key"]
-        and (now - _vercel_key_cache["ts"]) < _API_KEY_TTL
-    ):
-        return _vercel_key_cache["key"]
 
-    supabase_url = config.supabase_url
-    supabase_key = config.supabase_key
-    headers = {
-        "apikey": supabase_key,
-        "Authorization": f"Bearer {supabase_key}",
+# ── Prompt caching (cache_control) ───────────────────
+
+# Modelos que aceitam breakpoints explícitos de cache via OpenRouter.
+# Os demais (OpenAI, DeepSeek, Grok...) fazem cache de prefixo automaticamente.
+_CACHE_CONTROL_PREFIXES = ("anthropic/", "google/gemini")
+_MAX_CACHE_BREAKPOINTS = 4  # limite da Anthropic por requisição
+
+_prompt_cache_stats = {
+    "requests_with_breakpoints": 0,
+    "prompt_tokens": 0,
+    "cached_tokens": 0,
+}
+
+
+def supports_cache_control(model: str) -> bool:
+    return model.startswith(_CACHE_CONTROL_PREFIXES)
+
+
+def system_message(static: str, dynamic: str = "", cacheable: bool = True) -> dict:
+    """
+    Mensagem de sistema com a parte estável marcada como cacheável.
+
+    static  → prompt fixo do agente (o provider cacheia tools + este bloco)
+    dynamic → contexto que muda a cada requisição (fica fora do prefixo cacheado)
+
+    Para modelos sem cache_control, _prepare_messages junta os blocos de novo
+    numa string idêntica a static + dynamic.
+    """
+    if not cacheable or not static:
+        return {"role": "system", "content": static + dynamic}
+    blocks = [{"type": "text", "text": static, "cache_control": {"type": "ephemeral"}}]
+    if dynamic:
+        blocks.append({"type": "text", "text": dynamic})
+    return {"role": "system", "content": blocks}
+
+
+def _prepare_messages(messages: list, model: str) -> list:
+    """
+    Ajusta os blocos de conteúdo ao modelo da tentativa (a cadeia de fallback
+    pode misturar providers): mantém até 4 breakpoints para quem suporta e,
+    para os demais, remove cache_control e achata blocos só de texto.
+    """
+    keep_breakpoints = supports_cache_control(model)
+    breakpoints = 0
+    prepared = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list) or not any(
+            isinstance(block, dict) and "cache_control" in block for block in content
+        ):
+            prepared.append(message)
+            continue
+
+        blocks = []
+        for block in content:
+            if "cache_control" in block:
+                if keep_breakpoints and breakpoints < _MAX_CACHE_BREAKPOINTS:
+                    breakpoints += 1
+                else:
+                    block = {k: v for k, v in block.items() if k != "cache_control"}
+            blocks.append(block)
+
+        if not keep_breakpoints and all(block.get("type") == "text" for block in blocks):
+            prepared.append({**message, "content": "".join(block["text"] for block in blocks)})
+        else:
+            prepared.append({**message, "content": blocks})
+    return prepared
+
+
+def _has_breakpoints(messages: list) -> bool:
+    return any(
+        isinstance(message.get("content"), list)
+        and any(isinstance(block, dict) and "cache_control" in block for block in message["content"])
+        for message in messages
+    )
+
+
+def _record_prompt_cache_usage(payload: dict, data: dict):
+    """Soma tokens de prompt e cached_tokens (inclui o cache automático de OpenAI/DeepSeek)."""
+    usage = data.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    if _has_breakpoints(payload["messages"]):
+        _prompt_cache_stats["requests_with_breakpoints"] += 1
+    _prompt_cache_stats["prompt_tokens"] += usage.get("prompt_tokens") or 0
+    _prompt_cache_stats["cached_tokens"] += details.get("cached_tokens") or 0
+
+
+def get_prompt_cache_metrics() -> dict:
+    """Tokens de prompt servidos do cache do provider (usado em /api/admin/metrics)."""
+    prompt_tokens = _prompt_cache_stats["prompt_tokens"]
+    return {
+        **_prompt_cache_stats,
+        "cached_ratio": round(_prompt_cache_stats["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0,
     }
 
-    for table_name in ["ApiKeys", "apikeys"]:
+
+# ── Chamada completa (sem streaming) ─────────────────
+
+def _record_model_call(
+    model: str,
+    started: Optional[float],
+    status_code: Optional[int],
+    network_error: bool,
+    output_tokens: float,
+    ttft: Optional[float] = None,
+):
+    """Alimenta o roteador de modelos; erros do pedido (4xx, cancelamento) não dizem nada do modelo."""
+    if started is None:
+        return
+    ok = status_code == 200 and not network_error
+    if not ok and not network_error and status_code != 429 and (status_code or 0) < 500:
+        return
+    get_model_router().record(
+        model, ok, time.perf_counter() - started, output_tokens=output_tokens, ttft_s=ttft
+    )
+
+
+async def _post_completion(payload: dict) -> dict:
+    """Uma única tentativa de chat/completions. Levanta LLMAPIError em qualquer falha."""
+    from .config import get_config
+    config = get_config()
+
+    cassette = get_cassette()
+    if cassette and cassette.replaying:
+        data = await cassette.replay_completion(payload)
+        if data is None:
+            raise _cassette_miss(payload)
+        return data
+
+    breaker, probe = _openrouter_circuit()
+    response = None
+    data = None
+    started = None
+    network_error = False
+    try:
+        api_key = await _request_api_key()
+        print(f"[CALL_OPENROUTER] Using API key: {api_key[:15] if api_key else 'EMPTY'}... (len={len(api_key) if api_key else 0})")
+
+        limiter = get_rate_limiter()
+        lease = await limiter.acquire(payload["model"], _estimate_request_tokens(payload))
+        started = time.perf_counter()
         try:
-            url = f"{supabase_url}/rest/v1/{table_name}?select=api_key&provider=eq.vercel&is_active=eq.true"
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, headers=headers)
-                if response.status_code != 200:
-                    continue
-                rows = response.json()
-                if rows and rows[0].get("api_key"):
-                    key = rows[0]["api_key"]
-                    _vercel_key_cache = {"key": key, "ts": now}
-                    print(f"[GET_VERCEL_KEY] OK - key loaded: {key[:20]}...")
-                    return key
-        except Exception as e:
-            print(f"[GET_VERCEL_KEY] ERROR table={table_name}: {e}")
-            continue
+            response = await http_request(
+                "POST",
+                _chat_url(),
+                headers=_openrouter_headers(api_key),
+                json=payload,
+                timeout=config.llm_timeout,
+            )
+            if response.status_code == 200:
+                data = response.json()
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            network_error = True
+            raise LLMAPIError(None, f"{type(e).__name__}: {e}") from e
+        finally:
+            # Libera a vaga e realimenta o limitador (429, headers x-ratelimit-*, uso real)
+            usage = (data or {}).get("usage") or {}
+            await limiter.release(
+                lease,
+                status_code=response.status_code if response is not None else None,
+                headers=response.headers if response is not None else None,
+                used_tokens=usage.get("total_tokens"),
+            )
+    finally:
+        status_code = response.status_code if response is not None else None
+        _settle_openrouter_circuit(breaker, probe, status_code, network_error)
+        completion_tokens = ((data or {}).get("usage") or {}).get("completion_tokens") or 0
+        _record_model_call(payload["model"], started, status_code, network_error, completion_tokens)
+
+    if response.status_code == 401:
+        raise await _refresh_key_after_401(api_key, "CALL_OPENROUTER")
+
+    if response.status_code != 200:
+        error_text = response.text
+        logger.error(f"OpenRouter error ({response.status_code}) [{payload['model']}]: {error_text}")
+        raise LLMAPIError(response.status_code, error_text, _parse_retry_after(response))
+
+    # OpenRouter às vezes responde 200 com {"error": {...}} quando o provider upstream falha
+    if data.get("error") and not data.get("choices"):
+        error = data["error"]
+        code = error.get("code") if isinstance(error, dict) else None
+        raise LLMAPIError(code if isinstance(code, int) else 502, json.dumps(error, ensure_ascii=False))
+    _record_prompt_cache_usage(payload, data)
+    if cassette and cassette.recording:
+        cassette.record_completion(payload, data, time.perf_counter() - started)
+    return data
+
+
+async def _complete_with_retries(payload: dict, model: str) -> dict:
+    attempt = 0
+    while True:
+        try:
+            with span("openrouter.request", model=model, attempt=attempt) as s:
+                data = await _post_completion(
+                    {**payload, "model": model, "messages": _prepare_messages(payload["messages"], model)}
+                )
+                usage = data.get("usage") or {}
+                s.set(
+                    prompt_tokens=usage.get("prompt_tokens", 0),
+                    completion_tokens=usage.get("completion_tokens", 0),
+                )
+            return data
+        except LLMAPIError as e:
+            delay = _retry_delay(attempt, e)
+            if delay is None:
+                raise
+            logger.warning(
+                f"[CALL_OPENROUTER] {model} falhou ({e.status_code or 'rede'}) — "
+                f"tentativa {attempt + 2} em {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+class _ChainClaimed(LLMAPIError):
+    """A tarefa do hedge não tinha modelo livre: não é o erro a reportar."""
+
+
+async def _complete_with_fallback(payload: dict, chain: list[str], claimed: Optional[set] = None) -> dict:
+    """
+    Tenta os modelos da cadeia em ordem. claimed: modelos já assumidos por
+    outra tarefa do hedge — compartilhado, para o mesmo modelo não rodar duas vezes.
+    """
+    last_error: Optional[LLMAPIError] = None
+    last_model = ""
+    for model in chain:
+        if claimed is not None:
+            if model in claimed:
+                continue
+            claimed.add(model)
+        if last_error is not None:
+            logger.warning(f"[CALL_OPENROUTER] Fallback de modelo: {last_model} → {model}")
+        try:
+            return await _complete_with_retries(payload, model)
+        except LLMAPIError as e:
+            last_error, last_model = e, model
+            if not e.fallback_allowed:
+                raise
+    if last_error is None:
+        raise _ChainClaimed(None, "todos os modelos da cadeia já estão em uso pelo hedge", retryable=False)
+    raise last_error
 
-    if _vercel_key_cache["key"]:
-        print("[GET_VERCEL_KEY] WARN - usando cache antigo (Supabase indisponível)")
-        return _vercel_key_cache["key"]
 
-    print("[GET_VERCEL_KEY] Chave Vercel não encontrada no Supabase.")
-    return ""
+async def _complete_hedged(payload: dict, chain: list[str], hedge_delay: float) -> dict:
+    """
+    Dispara o modelo principal; se não responder em hedge_delay segundos,
+    dispara em paralelo o próximo modelo da cadeia ainda não usado. Cada
+    modelo roda em uma só das tarefas (o fallback do principal pula o que o
+    hedge assumiu). Vence a primeira resposta bem-sucedida; a outra é cancelada.
+    """
+    claimed: set = set()
+    primary = asyncio.create_task(_complete_with_fallback(payload, chain, claimed))
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+        spare = [model for model in chain if model not in claimed]
+        if not done and spare:
+            logger.info(f"[CALL_OPENROUTER] Hedge: {chain[0]} > {hedge_delay}s, disparando {spare[0]}")
+            tasks.add(asyncio.create_task(_complete_with_fallback(payload, spare, claimed)))
+
+        last_error: Optional[BaseException] = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                if last_error is None or not isinstance(task.exception(), _ChainClaimed):
+                    last_error = task.exception()
+        raise last_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
 
 
 async def call_openrouter(
@@ -192,68 +518,79 @@ async def call_openrouter(
     max_tokens: int = 2048,
     temperature: float = 0.7,
     tools: Optional[list] = None,
+    use_cache: bool = True,
+    fallback_models: Optional[list] = None,
+    hedge: Optional[bool] = None,
+    input_budget: Optional[int] = None,
 ) -> dict:
     """
     Chamada ao OpenRouter API.
     Retorna a resposta completa do modelo.
-    Se der 401, tenta recarregar a key do Supabase e tentar novamente.
+
+    Resiliência:
+      - 429/5xx/timeout → retry com backoff exponencial + jitter (respeita Retry-After)
+      - esgotadas as tentativas → próximo modelo de fallback_models
+        (None = AgentConfig.openrouter_fallback_models; [] = sem fallback)
+      - 401 → recarrega a key do Supabase e tenta de novo
+      - hedge=True (ou LLM_HEDGE_DELAY > 0) → dispara o 1º fallback em paralelo
+        se o modelo principal passar do limite de latência
+
+    Mensagens com blocos cache_control (ver system_message) mantêm os breakpoints
+    para Anthropic/Gemini; para os demais modelos o conteúdo é achatado em string.
+
+    input_budget limita os tokens de entrada (core/tokens.py): turnos antigos,
+    saídas de ferramentas grandes e contexto do projeto são cortados, nessa ordem.
+
+    Respostas idênticas (model, messages, tools, temperature, max_tokens) são
+    servidas do cache (core/llm_cache.py) quando AgentConfig.enable_caching está
+    ativo. use_cache=False força a chamada ao provider.
     """
     from .config import get_config
     config = get_config()
 
-    api_key = await get_api_key()
-    print(f"[CALL_OPENROUTER] Using API key: {api_key[:15] if api_key else 'EMPTY'}... (len={len(api_key) if api_key else 0})")
     model = model or config.openrouter_model
+    messages = _apply_input_budget(messages, tools, input_budget, "CALL_OPENROUTER")
+
+    with span("llm.call", model=model, max_tokens=max_tokens, tools=len(tools or [])) as call_span:
+        cache = get_llm_cache() if config.enable_caching else None
+        cache_key = None
+        if cache is not None:
+            if use_cache:
+                cache_key = make_cache_key(model, messages, tools, temperature, max_tokens)
+                cached = await cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"[CALL_OPENROUTER] Cache hit ({model}) {cache_key[:12]}")
+                    call_span.set(cache_hit=True)
+                    return cached
+            else:
+                cache.record_bypass()
+
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": False,
+        }
 
-    payload = {
-        "model": model,
-        "messages": messages,
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-        "stream": False,
-    }
+        if tools:
+            payload["tools"] = tools
 
-    if tools:
-        payload["tools"] = tools
+        chain = _model_chain(model, fallback_models)
+        hedge_delay = config.llm_hedge_delay_seconds
+        if hedge is None:
+            hedge = hedge_delay > 0
+        if hedge and len(chain) > 1:
+            data = await _complete_hedged(payload, chain, hedge_delay or 8.0)
+        else:
+            data = await _complete_with_fallback(payload, chain)
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://arcco.ai",
-                "X-Title": "Arcco.ai Agent",
-            },
-            json=payload,
-        )
+        if cache_key and data.get("choices") and not data.get("error"):
+            await cache.set(cache_key, data)
+        return data
 
-        # Se 401, tenta recarregar a key do Supabase e tentar uma vez mais
-        if response.status_code == 401:
-            print(f"[CALL_OPENROUTER] 401 with key {api_key[:15]}... - trying to refresh key from Supabase")
-            try:
-                new_key = await get_api_key(force_refresh=True)
-                if new_key and new_key != api_key:
-                    print(f"[CALL_OPENROUTER] Retrying with new key: {new_key[:15]}...")
-                    response = await client.post(
-                        "https://openrouter.ai/api/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {new_key}",
-                            "Content-Type": "application/json",
-                            "HTTP-Referer": "https://arcco.ai",
-                            "X-Title": "Arcco.ai Agent",
-                        },
-                        json=payload,
-                    )
-            except Exception as e:
-                print(f"[CALL_OPENROUTER] Key refresh failed: {e}")
-
-        if response.status_code != 200:
-            error_text = response.text
-            logger.error(f"OpenRouter error ({response.status_code}): {error_text}")
-            raise Exception(f"LLM API Error: {error_text}")
-
-        return response.json()
+
+# ── Streaming ────────────────────────────────────────
 
 async def stream_openrouter(
     messages: list,
@@ -261,16 +598,22 @@ async def stream_openrouter(
     max_tokens: int = 2048,
     temperature: float = 0.7,
     tools: Optional[list] = None,
+    fallback_models: Optional[list] = None,
+    input_budget: Optional[int] = None,
 ):
     """
     Chamada ao OpenRouter API com Streaming (Server-Sent Events).
     Gera chunks de resposta à medida que são recebidos.
+    input_budget: mesmo orçamento de contexto de call_openrouter.
+
+    Retry/backoff e fallback de modelo valem apenas ANTES do primeiro chunk:
+    depois que o texto começou a ser entregue, uma falha é propagada.
     """
     from .config import get_config
     config = get_config()
 
-    api_key = await get_api_key()
     model = model or config.openrouter_model
+    messages = _apply_input_budget(messages, tools, input_budget, "STREAM_OPENROUTER")
 
     payload = {
         "model": model,
@@ -283,52 +626,226 @@ async def stream_openrouter(
     if tools:
         payload["tools"] = tools
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://arcco.ai",
-            "X-Title": "Arcco.ai Agent",
-        }
-        request = client.build_request(
-            "POST",
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=payload,
-        )
-        response = await client.send(request, stream=True)
+    chain = _model_chain(model, fallback_models)
+    last_error: Optional[LLMAPIError] = None
 
-        # Se 401, tenta recarregar a key do Supabase e tentar uma vez mais
-        if response.status_code == 401:
-            await response.aclose()
-            print(f"[STREAM_OPENROUTER] 401 with key {api_key[:15]}... - trying to refresh key")
+    for index, current_model in enumerate(chain):
+        attempt = 0
+        while True:
+            started = False
             try:
-                new_key = await get_api_key(force_refresh=True)
-                if new_key and new_key != api_key:
-                    print(f"[STREAM_OPENROUTER] Retrying with new key: {new_key[:15]}...")
-                    headers["Authorization"] = f"Bearer {new_key}"
-                    request = client.build_request(
-                        "POST",
-                        "https://openrouter.ai/api/v1/chat/completions",
-                        headers=headers,
-                        json=payload,
-                    )
-                    response = await client.send(request, stream=True)
-            except Exception as e:
-                print(f"[STREAM_OPENROUTER] Key refresh failed: {e}")
-
-        if response.status_code != 200:
-            error_text = await response.aread()
-            logger.error(f"OpenRouter stream error ({response.status_code}): {error_text}")
-            raise Exception(f"LLM Stream API Error: {error_text}")
-
-        import json
-        async for line in response.aiter_lines():
-            if line.startswith("data: "):
-                data_str = line[6:]
-                if data_str == "[DONE]":
+                attempt_payload = {
+                    **payload,
+                    "model": current_model,
+                    "messages": _prepare_messages(payload["messages"], current_model),
+                }
+                async for chunk in _stream_once(attempt_payload):
+                    started = True
+                    yield chunk
+                return
+            except LLMAPIError as e:
+                if started:
+                    raise
+                last_error = e
+                delay = _retry_delay(attempt, e)
+                if delay is None:
                     break
-                try:
-                    yield json.loads(data_str)
-                except json.JSONDecodeError:
-                    pass
+                logger.warning(
+                    f"[STREAM_OPENROUTER] {current_model} falhou ({e.status_code or 'rede'}) — "
+                    f"tentativa {attempt + 2} em {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+        if not last_error.fallback_allowed:
+            raise last_error
+        if index + 1 < len(chain):
+            logger.warning(f"[STREAM_OPENROUTER] Fallback de modelo: {current_model} → {chain[index + 1]}")
+
+    raise last_error
+
+
+async def _stream_once(payload: dict):
+    """Uma tentativa de streaming. Falhas de rede/status viram LLMAPIError."""
+    from .config import get_config
+    config = get_config()
+
+    cassette = get_cassette()
+    if cassette and cassette.replaying:
+        chunks = await cassette.replay_stream(payload)
+        if chunks is None:
+            raise _cassette_miss(payload)
+        async for chunk in chunks:
+            yield chunk
+        return
+    recorded: Optional[list] = [] if cassette and cassette.recording else None
+
+    breaker, probe = _openrouter_circuit()
+    status_code = None
+    network_error = False
+    output_chars = 0
+    started = None
+    ttft = None
+    completed = False
+    # Gerador: o span não vira o atual (ver core/tracing.py)
+    stream_span = start_span("openrouter.stream", model=payload["model"])
+    try:
+        api_key = await _request_api_key()
+        limiter = get_rate_limiter()
+        reserved = _estimate_request_tokens(payload)
+        lease = await limiter.acquire(payload["model"], reserved)
+        headers = None
+        # Stream não traz usage por padrão: estima a saída pelos caracteres recebidos
+        started = time.perf_counter()
+        try:
+            async with stream_request(
+                "POST",
+                _chat_url(),
+                headers=_openrouter_headers(api_key),
+                json=payload,
+                timeout=config.llm_timeout,
+            ) as response:
+                status_code = response.status_code
+                headers = response.headers
+                if response.status_code == 401:
+                    raise await _refresh_key_after_401(api_key, "STREAM_OPENROUTER")
+
+                async for chunk in _iter_sse_chunks(response):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                        stream_span.set(ttft_ms=round(ttft * 1000, 1))
+                    for choice in chunk.get("choices") or []:
+                        output_chars += len((choice.get("delta") or {}).get("content") or "")
+                    if recorded is not None:
+                        recorded.append((time.perf_counter() - started, chunk))
+                    yield chunk
+            completed = True
+            if recorded is not None:
+                cassette.record_stream(payload, recorded)
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            network_error = True
+            raise LLMAPIError(None, f"{type(e).__name__}: {e}") from e
+        finally:
+            prompt_tokens = reserved - payload.get("max_tokens", 0)
+            await limiter.release(
+                lease,
+                status_code=status_code,
+                headers=headers,
+                used_tokens=prompt_tokens + output_chars / 4 if status_code == 200 else None,
+            )
+    except LLMAPIError as e:
+        stream_span.fail(e)
+        raise
+    finally:
+        _settle_openrouter_circuit(breaker, probe, status_code, network_error)
+        # Só stream completo ou falho conta: saída pela metade (cliente saiu) subestimaria tokens/s
+        if completed or network_error or status_code != 200:
+            _record_model_call(payload["model"], started, status_code, network_error, output_chars / 4, ttft)
+        stream_span.set(status=status_code or 0, output_chars=output_chars)
+        stream_span.end()
+
+
+async def _iter_sse_chunks(response):
+    """Valida o status e converte as linhas SSE do OpenRouter em dicts."""
+    if response.status_code != 200:
+        error_text = (await response.aread()).decode("utf-8", errors="replace")
+        logger.error(f"OpenRouter stream error ({response.status_code}): {error_text}")
+        raise LLMAPIError(response.status_code, error_text, _parse_retry_after(response))
+
+    async for line in response.aiter_lines():
+        if line.startswith("data: "):
+            data_str = line[6:]
+            if data_str == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data_str)
+            except json.JSONDecodeError:
+                continue
+            # Falha do provider upstream no meio do stream chega como {"error": {...}}
+            if chunk.get("error") and not chunk.get("choices"):
+                error = chunk["error"]
+                code = error.get("code") if isinstance(error, dict) else None
+                raise LLMAPIError(code if isinstance(code, int) else 502, json.dumps(error, ensure_ascii=False))
+            yield chunk
+
+
+class StreamedMessage:
+    """
+    Monta a mensagem do assistant a partir dos chunks de stream_openrouter.
+
+    O OpenRouter envia tool_calls em pedaços: o primeiro delta de cada índice
+    traz id e nome, os seguintes trazem fragmentos de `arguments`. Uma tool
+    call está completa quando chega um delta de índice maior ou o stream
+    termina (finish_reason).
+
+        message = StreamedMessage()
+        async for chunk in stream_openrouter(...):
+            text, completed = message.add(chunk)
+        message.finish()  # tool calls que ainda estavam abertas
+        message.as_dict() # mesmo formato de choices[0].message
+    """
+
+    def __init__(self):
+        self._text: list[str] = []
+        self._tool_calls: dict[int, dict] = {}
+        self._completed: set[int] = set()
+        self.finish_reason: Optional[str] = None
+
+    @property
+    def content(self) -> str:
+        return "".join(self._text)
+
+    @property
+    def tool_calls(self) -> list[dict]:
+        return [self._tool_calls[i] for i in sorted(self._tool_calls)]
+
+    @property
+    def has_tool_calls(self) -> bool:
+        return bool(self._tool_calls)
+
+    def add(self, chunk: dict) -> tuple[str, list[dict]]:
+        """Incorpora um chunk. Retorna (texto novo, tool calls que acabaram de completar)."""
+        text = ""
+        completed: list[dict] = []
+        for choice in chunk.get("choices") or []:
+            delta = choice.get("delta") or {}
+            if delta.get("content"):
+                text += delta["content"]
+            for fragment in delta.get("tool_calls") or []:
+                index = fragment.get("index", len(self._tool_calls) - 1 if self._tool_calls else 0)
+                completed += self._close_before(index)
+                call = self._tool_calls.setdefault(
+                    index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                )
+                if fragment.get("id"):
+                    call["id"] = fragment["id"]
+                function = fragment.get("function") or {}
+                if function.get("name"):
+                    call["function"]["name"] += function["name"]
+                if function.get("arguments"):
+                    call["function"]["arguments"] += function["arguments"]
+            if choice.get("finish_reason"):
+                self.finish_reason = choice["finish_reason"]
+                completed += self.finish()
+        if text:
+            self._text.append(text)
+        return text, completed
+
+    def finish(self) -> list[dict]:
+        """Fecha as tool calls ainda abertas e as retorna."""
+        return self._close_before(None)
+
+    def _close_before(self, index: Optional[int]) -> list[dict]:
+        closed = []
+        for i in sorted(self._tool_calls):
+            if i not in self._completed and (index is None or i < index):
+                self._completed.add(i)
+                closed.append(self._tool_calls[i])
+        return closed
+
+    def as_dict(self) -> dict:
+        message: dict = {"role": "assistant", "content": self.content}
+        if self._tool_calls:
+            message["tool_calls"] = self.tool_calls
+            message["content"] = self.content or None
+        return message
@@ -0,0 +1,232 @@
+"""
+Cache de respostas do LLM (call_openrouter), endereçado por conteúdo.
+
+Chave: sha256 do JSON canônico de (model, messages, tools, temperature, max_tokens).
+Duas camadas:
+  1. Memória (LRU)            → limite por número de entradas e por bytes
+  2. Disco (workspace_path)   → sobrevive a restarts e é compartilhado entre workers
+
+Controlado por AgentConfig.enable_caching / cache_ttl_seconds (env AGENT_CACHE,
+AGENT_CACHE_TTL). Cada chamada pode desligar o cache com use_cache=False.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Varre o diretório do cache em disco a cada N gravações
+_DISK_SWEEP_EVERY = 50
+
+
+def make_cache_key(
+    model: str,
+    messages: list,
+    tools: Optional[list],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """Hash estável da requisição (ordem das chaves normalizada)."""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "tools": tools or [],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Cache LRU em memória + diretório em disco, ambos com TTL."""
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl_seconds: int,
+        max_entries: int,
+        max_memory_bytes: int,
+        max_disk_bytes: int,
+    ):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        # key → (expires_at, response, size_bytes)
+        self._memory: "OrderedDict[str, tuple[float, dict, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._writes_since_sweep = 0
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "bypassed": 0,
+        }
+
+    # ── API ───────────────────────────────────────────
+
+    async def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, response, _ = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return copy.deepcopy(response)
+                self._drop_memory(key)
+
+        record = await asyncio.to_thread(self._read_disk, key)
+        if record and record.get("expires_at", 0) > now:
+            response = record["response"]
+            self._put_memory(key, record["expires_at"], response)
+            self.stats["disk_hits"] += 1
+            return copy.deepcopy(response)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, response: dict):
+        expires_at = time.time() + self.ttl_seconds
+        self._put_memory(key, expires_at, copy.deepcopy(response))
+        self.stats["stores"] += 1
+        try:
+            await asyncio.to_thread(self._write_disk, key, expires_at, response)
+        except Exception as e:
+            logger.warning(f"[LLM_CACHE] Falha ao gravar em disco: {e}")
+
+    def record_bypass(self):
+        self.stats["bypassed"] += 1
+
+    def metrics(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+    # ── Memória ───────────────────────────────────────
+
+    def _put_memory(self, key: str, expires_at: float, response: dict):
+        size = len(json.dumps(response, ensure_ascii=False, default=str))
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._drop_memory(key)
+            self._memory[key] = (expires_at, response, size)
+            self._memory_bytes += size
+            while self._memory and (
+                len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes
+            ):
+                oldest = next(iter(self._memory))
+                self._drop_memory(oldest)
+                self.stats["memory_evictions"] += 1
+
+    def _drop_memory(self, key: str):
+        _, _, size = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    # ── Disco (roda em thread) ────────────────────────
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[dict]:
+        path = self._path_for(key)
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[LLM_CACHE] Entrada corrompida {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: str, expires_at: float, response: dict):
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({"expires_at": expires_at, "response": response}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        tmp.replace(path)  # atômico: outro worker nunca lê arquivo pela metade
+
+        with self._lock:
+            self._writes_since_sweep += 1
+            should_sweep = self._writes_since_sweep >= _DISK_SWEEP_EVERY
+            if should_sweep:
+                self._writes_since_sweep = 0
+        if should_sweep:
+            self._sweep_disk()
+
+    def _sweep_disk(self):
+        """Remove entradas expiradas e, se preciso, as mais antigas até caber no limite."""
+        now = time.time()
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime + self.ttl_seconds < now:
+                path.unlink(missing_ok=True)
+                self.stats["disk_evictions"] += 1
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.stats["disk_evictions"] += 1
+
+
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Retorna o cache singleton, configurado a partir de AgentConfig."""
+    global _cache
+    if _cache is None:
+        from .config import get_config
+        config = get_config()
+        _cache = LLMResponseCache(
+            directory=config.workspace_path / "llm_cache",
+            ttl_seconds=config.cache_ttl_seconds,
+            max_entries=config.llm_cache_max_entries,
+            max_memory_bytes=config.llm_cache_max_memory_mb * 1024 * 1024,
+            max_disk_bytes=config.llm_cache_max_disk_mb * 1024 * 1024,
+        )
+    return _cache
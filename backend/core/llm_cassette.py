@@ -0,0 +1,162 @@
+"""
+Cassetes de gravação/reprodução das chamadas ao OpenRouter.
+
+Permite medir orchestrate_and_stream, builder_stream e /route sem pagar por
+chamadas reais e sem o jitter da rede:
+
+  LLM_CASSETTE_MODE=record  → grava cada resposta bem-sucedida (completa ou
+                              stream, com o tempo de cada chunk) em JSONL
+  LLM_CASSETTE_MODE=replay  → responde a partir do arquivo, sem rede
+  LLM_CASSETTE_PATH         → arquivo (padrão: workspace/cassettes/default.jsonl)
+  LLM_CASSETTE_REALTIME     → true = reproduz os tempos gravados; false = instantâneo
+
+Na reprodução, a requisição é procurada pela chave exata (mesma de
+core/llm_cache.py + modo stream). Se não existir — resultados de ferramentas
+que mudaram, por exemplo — usa a próxima gravação do mesmo modelo, em
+rodízio na ordem em que foram gravadas.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from .llm_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def _key_for(payload: dict) -> str:
+    key = make_cache_key(
+        payload["model"],
+        payload["messages"],
+        payload.get("tools"),
+        payload.get("temperature", 0.7),
+        payload.get("max_tokens", 0),
+    )
+    return f"{'s' if payload.get('stream') else 'c'}:{key}"
+
+
+class LLMCassette:
+    """Grava ou reproduz respostas do OpenRouter num arquivo JSONL."""
+
+    def __init__(self, path: Path, mode: str, realtime: bool):
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_key: dict[str, deque] = defaultdict(deque)
+        self._by_model: dict[tuple[str, bool], deque] = defaultdict(deque)
+        self.stats = {"recorded": 0, "exact_hits": 0, "sequential_hits": 0, "misses": 0}
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ── Gravação ──────────────────────────────────────
+
+    def record_completion(self, payload: dict, data: dict, elapsed: float):
+        self._append({"key": _key_for(payload), "model": payload["model"], "stream": False,
+                      "elapsed": round(elapsed, 4), "response": data})
+
+    def record_stream(self, payload: dict, chunks: list[tuple[float, dict]]):
+        self._append({"key": _key_for(payload), "model": payload["model"], "stream": True,
+                      "chunks": [{"t": round(t, 4), "data": c} for t, c in chunks]})
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.stats["recorded"] += 1
+
+    # ── Reprodução ────────────────────────────────────
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            if self.path.exists():
+                for line in self.path.read_text(encoding="utf-8").splitlines():
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    self._by_key[entry["key"]].append(entry)
+                    self._by_model[(entry["model"], entry["stream"])].append(entry)
+            else:
+                logger.warning(f"[CASSETTE] Arquivo não encontrado: {self.path}")
+            self._loaded = True
+
+    def _take(self, payload: dict) -> Optional[dict]:
+        self._load()
+        stream = bool(payload.get("stream"))
+        with self._lock:
+            exact = self._by_key.get(_key_for(payload))
+            if exact:
+                entry = exact.popleft()
+                exact.append(entry)  # a mesma requisição pode se repetir entre execuções
+                self.stats["exact_hits"] += 1
+                return entry
+            queue = self._by_model.get((payload["model"], stream))
+            if queue:
+                entry = queue.popleft()
+                queue.append(entry)
+                self.stats["sequential_hits"] += 1
+                return entry
+            self.stats["misses"] += 1
+            return None
+
+    async def replay_completion(self, payload: dict) -> Optional[dict]:
+        entry = self._take(payload)
+        if entry is None:
+            return None
+        if self.realtime:
+            await asyncio.sleep(entry.get("elapsed", 0))
+        return entry["response"]
+
+    async def replay_stream(self, payload: dict) -> Optional[AsyncIterator[dict]]:
+        entry = self._take(payload)
+        if entry is None:
+            return None
+        return self._iter_chunks(entry["chunks"])
+
+    async def _iter_chunks(self, chunks: list[dict]) -> AsyncIterator[dict]:
+        started = time.perf_counter()
+        for chunk in chunks:
+            if self.realtime:
+                delay = chunk["t"] - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield chunk["data"]
+
+    def metrics(self) -> dict:
+        return {"mode": self.mode, "path": str(self.path), **self.stats}
+
+
+_cassette: Optional[LLMCassette] = None
+
+
+def get_cassette() -> Optional[LLMCassette]:
+    """Cassete ativo, ou None quando LLM_CASSETTE_MODE=off (padrão)."""
+    global _cassette
+    from .config import get_config
+    config = get_config()
+    if config.llm_cassette_mode not in ("record", "replay"):
+        return None
+    if _cassette is None:
+        path = Path(config.llm_cassette_path) if config.llm_cassette_path else (
+            config.workspace_path / "cassettes" / "default.jsonl"
+        )
+        _cassette = LLMCassette(path, config.llm_cassette_mode, config.llm_cassette_realtime)
+        logger.info(f"[CASSETTE] Modo {config.llm_cassette_mode}: {path}")
+    return _cassette
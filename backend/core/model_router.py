@@ -0,0 +1,313 @@
+"""
+Roteador de modelos por latência, custo e qualidade.
+
+Cada chamada ao OpenRouter (core/llm.py) alimenta estatísticas vivas por
+modelo, em médias móveis exponenciais (_ALPHA):
+  - ttft_ms e tokens_per_second (streams)
+  - latency_ms (chamadas sem stream: a resposta chega inteira)
+  - error_rate (429/5xx/rede; erros do próprio pedido não contam)
+
+Os preços vêm do catálogo do OpenRouter, o mesmo de GET /api/admin/models
+(fetch_model_catalog, cache de 1h).
+
+choose() escolhe entre os candidatos permitidos de um agente/tarefa:
+  - fastest       → menor ttft + tokens esperados / tokens_per_second
+  - cheapest      → menor custo esperado (preço de entrada + saída)
+  - quality_floor → o mais barato cuja taxa de aprovação do QA está acima do
+                    piso (agents/qa_policy.py); o modelo padrão sempre é elegível
+  - static        → o modelo padrão, sem roteamento
+
+Modelos com error_rate alto ficam de fora enquanto houver alternativa.
+Candidatos sem amostras suficientes são explorados de vez em quando
+(_EXPLORE_RATE) para que as estatísticas não congelem no primeiro vencedor.
+As estatísticas são do worker (memória); a política vem do registry
+(agents/registry.py: pick_model).
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("static", "fastest", "cheapest", "quality_floor")
+
+# Peso da amostra nova nas médias móveis
+_ALPHA = 0.2
+# Amostras para um modelo ter estatística "conhecida"
+_MIN_SAMPLES = 3
+# Fração das escolhas que experimenta um candidato ainda sem amostras
+_EXPLORE_RATE = 0.05
+# Acima disso o modelo só é usado se não houver alternativa
+_MAX_ERROR_RATE = 0.5
+
+_CATALOG_TTL = 3600
+# Espera antes de tentar o catálogo de novo depois de uma falha
+_CATALOG_RETRY = 300
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    errors: int = 0
+    streams: int = 0
+    ttft_ms: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    latency_ms: Optional[float] = None
+    error_rate: float = 0.0
+    last_used: float = 0.0
+
+    def expected_ms(self, output_tokens: int) -> Optional[float]:
+        if self.ttft_ms is not None and self.tokens_per_second:
+            estimate = self.ttft_ms + output_tokens / self.tokens_per_second * 1000
+        elif self.latency_ms is not None:
+            estimate = self.latency_ms
+        else:
+            return None
+        # Erros viram retry/fallback: penaliza proporcionalmente
+        return estimate / max(0.05, 1 - self.error_rate)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 3),
+            "ttft_ms": round(self.ttft_ms, 1) if self.ttft_ms is not None else None,
+            "tokens_per_second": round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+        }
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    return sample if current is None else current + _ALPHA * (sample - current)
+
+
+class ModelRouter:
+    """Estatísticas vivas por modelo e escolha do modelo por política."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._models: dict[str, ModelStats] = {}
+        self._decisions: dict[str, dict[str, int]] = {}
+        self._prices: dict[str, tuple[float, float]] = {}  # modelo → (entrada, saída) USD por 1M tokens
+        self._catalog_task: Optional[asyncio.Task] = None
+        self._catalog_failed_at = 0.0
+
+    # ── Coleta (core/llm.py) ──────────────────────────
+
+    def record(
+        self,
+        model: str,
+        ok: bool,
+        latency_s: float,
+        output_tokens: float = 0,
+        ttft_s: Optional[float] = None,
+    ):
+        with self._lock:
+            stats = self._models.setdefault(model, ModelStats())
+            stats.calls += 1
+            stats.last_used = time.time()
+            stats.error_rate = _ewma(stats.error_rate if stats.calls > 1 else None, 0.0 if ok else 1.0)
+            if not ok:
+                stats.errors += 1
+                return
+            if ttft_s is not None:
+                stats.streams += 1
+                stats.ttft_ms = _ewma(stats.ttft_ms, ttft_s * 1000)
+                generation_s = latency_s - ttft_s
+                if output_tokens > 0 and generation_s > 0:
+                    stats.tokens_per_second = _ewma(stats.tokens_per_second, output_tokens / generation_s)
+            else:
+                stats.latency_ms = _ewma(stats.latency_ms, latency_s * 1000)
+
+    # ── Preços ────────────────────────────────────────
+
+    def update_prices(self, catalog: list[dict]):
+        """Preços por 1M tokens a partir do catálogo (formato de GET /api/admin/models)."""
+        prices = {
+            m["id"]: (m["pricing"]["prompt_1m"], m["pricing"]["completion_1m"])
+            for m in catalog if m.get("pricing")
+        }
+        with self._lock:
+            self._prices = prices
+
+    def _ensure_prices(self):
+        """Sem catálogo ainda: busca em segundo plano (a escolha atual segue a ordem dos candidatos)."""
+        if self._prices or time.time() - self._catalog_failed_at < _CATALOG_RETRY:
+            return
+        if self._catalog_task is not None and not self._catalog_task.done():
+            return
+        try:
+            self._catalog_task = asyncio.get_running_loop().create_task(self._load_prices())
+        except RuntimeError:
+            pass
+
+    async def _load_prices(self):
+        try:
+            await fetch_model_catalog()
+        except Exception as e:
+            self._catalog_failed_at = time.time()
+            logger.warning(f"[MODEL_ROUTER] Catálogo de preços indisponível: {e}")
+
+    def expected_cost(self, model: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+        price = self._prices.get(model)
+        if price is None:
+            return None
+        return (price[0] * input_tokens + price[1] * output_tokens) / 1_000_000
+
+    # ── Escolha ───────────────────────────────────────
+
+    def choose(
+        self,
+        task: str,
+        default: str,
+        candidates: list[str],
+        policy: str,
+        output_tokens: int = 500,
+        input_tokens: int = 1000,
+        quality: Optional[dict[str, float]] = None,
+        quality_floor: float = 0.0,
+    ) -> str:
+        """Modelo para `task` segundo a política; `default` se nada melhor se qualificar."""
+        if not self.enabled or policy not in POLICIES or policy == "static":
+            return default
+        pool = list(dict.fromkeys([*candidates, default]))
+
+        with self._lock:
+            stats = {m: self._models.get(m) for m in pool}
+            healthy = [
+                m for m in pool
+                if not (stats[m] and stats[m].calls >= _MIN_SAMPLES and stats[m].error_rate >= _MAX_ERROR_RATE)
+            ]
+            pool = healthy or pool
+
+            if policy == "quality_floor":
+                quality = quality or {}
+                pool = [m for m in pool if m == default or quality.get(m, 0.0) >= quality_floor] or [default]
+
+            if policy == "fastest":
+                chosen = self._fastest(pool, stats, output_tokens)
+            else:
+                self._ensure_prices()
+                chosen = self._cheapest(pool, stats, input_tokens, output_tokens)
+
+            decisions = self._decisions.setdefault(task, {})
+            decisions[chosen] = decisions.get(chosen, 0) + 1
+        if chosen != default:
+            logger.debug(f"[MODEL_ROUTER] {task} ({policy}) → {chosen}")
+        return chosen
+
+    def _fastest(self, pool: list[str], stats: dict, output_tokens: int) -> str:
+        known = {
+            m: stats[m].expected_ms(output_tokens)
+            for m in pool
+            if stats[m] and stats[m].calls >= _MIN_SAMPLES and stats[m].expected_ms(output_tokens) is not None
+        }
+        unknown = [m for m in pool if m not in known]
+        # Sem nada medido: a ordem dos candidatos (modelos pequenos primeiro) decide
+        if not known or (unknown and random.random() < _EXPLORE_RATE):
+            return unknown[0]
+        return min(known, key=known.get)
+
+    def _cheapest(self, pool: list[str], stats: dict, input_tokens: int, output_tokens: int) -> str:
+        costs = {m: cost for m in pool if (cost := self.expected_cost(m, input_tokens, output_tokens)) is not None}
+        if not costs:
+            return pool[0]
+        cheapest = min(costs.values())
+        # Empate de preço (ex: dois modelos grátis) → o mais rápido
+        tied = [m for m, cost in costs.items() if cost <= cheapest * 1.01]
+        return self._fastest(tied, stats, output_tokens) if len(tied) > 1 else tied[0]
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "prices_loaded": len(self._prices),
+                "models": {m: s.as_dict() for m, s in self._models.items()},
+                "decisions": {task: dict(picks) for task, picks in self._decisions.items()},
+            }
+
+
+# ── Catálogo do OpenRouter (compartilhado com GET /api/admin/models) ─────────
+
+_catalog: Optional[list] = None
+_catalog_ts: float = 0.0
+
+
+async def fetch_model_catalog(force: bool = False) -> tuple[list, bool]:
+    """
+    Modelos do OpenRouter com preço por 1M tokens. Retorna (modelos, veio_do_cache).
+    Gratuitos por último. Levanta exceção se a API falhar.
+    """
+    global _catalog, _catalog_ts
+    if not force and _catalog and (time.time() - _catalog_ts) < _CATALOG_TTL:
+        return _catalog, True
+
+    from .config import get_config
+    from .http_client import request as http_request
+    config = get_config()
+
+    headers: dict[str, str] = {
+        "HTTP-Referer": "https://arcco.ai",
+        "X-Title": "Arcco Admin",
+    }
+    if config.openrouter_api_key:
+        headers["Authorization"] = f"Bearer {config.openrouter_api_key}"
+
+    resp = await http_request(
+        "GET", f"{config.openrouter_base_url.rstrip('/')}/models", headers=headers, timeout=20.0
+    )
+    resp.raise_for_status()
+    data = resp.json()
+
+    models = []
+    for m in data.get("data", []):
+        pricing = m.get("pricing", {})
+        try:
+            # OpenRouter retorna preço por token; multiplicamos por 1M para exibir
+            prompt_1m = round(float(pricing.get("prompt", 0) or 0) * 1_000_000, 4)
+            completion_1m = round(float(pricing.get("completion", 0) or 0) * 1_000_000, 4)
+        except (ValueError, TypeError):
+            prompt_1m = completion_1m = 0.0
+
+        models.append({
+            "id": m["id"],
+            "name": m.get("name", m["id"]),
+            "context_length": m.get("context_length", 0),
+            "pricing": {
+                "prompt_1m": prompt_1m,
+                "completion_1m": completion_1m,
+            },
+        })
+
+    # Gratuitos (ambos os preços = 0) vão para o final da lista
+    models.sort(key=lambda x: (
+        x["pricing"]["prompt_1m"] == 0 and x["pricing"]["completion_1m"] == 0,
+        x["name"].lower()
+    ))
+
+    _catalog = models
+    _catalog_ts = time.time()
+    get_model_router().update_prices(models)
+    logger.info(f"[MODEL_ROUTER] {len(models)} modelos carregados do OpenRouter")
+    return models, False
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Retorna o roteador singleton, configurado a partir de AgentConfig."""
+    global _router
+    if _router is None:
+        from .config import get_config
+        _router = ModelRouter(enabled=get_config().model_router_enable)
+    return _router
@@ -0,0 +1,338 @@
+"""
+Limitador adaptativo por modelo para as chamadas ao OpenRouter.
+
+Cada modelo tem:
+  - Um limite de requisições simultâneas (in-flight), ajustado no estilo AIMD:
+      sucesso → +1/limite (aumento aditivo)
+      429 ou rate-limit esgotado nos headers → limite × 0.5 (redução multiplicativa)
+  - Um token bucket de tokens por minuto (TPM). A reserva é feita com a
+    estimativa do prompt + max_tokens e corrigida pelo uso real ao liberar.
+
+O estado fica num SQLite em workspace_path, compartilhado entre os workers
+uvicorn. Cada requisição em andamento é uma linha em `leases` (com pid e
+timestamp), então um worker que morre não "vaza" vagas: leases antigas são
+descartadas após lease_ttl segundos.
+
+Se o SQLite ficar indisponível, o limitador se desliga (fail-open) em vez de
+bloquear o chat.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_state (
+    model TEXT PRIMARY KEY,
+    concurrency_limit REAL NOT NULL,
+    tokens REAL NOT NULL,
+    tpm REAL NOT NULL,
+    refilled_at REAL NOT NULL,
+    last_decrease_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    tokens REAL NOT NULL,
+    acquired_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_model ON leases(model);
+"""
+
+# Intervalo mínimo entre duas reduções do limite (uma rajada de 429 conta uma vez)
+_DECREASE_COOLDOWN = 2.0
+
+
+@dataclass
+class Lease:
+    """Vaga reservada para uma requisição. id=None quando o limitador está desligado."""
+    id: Optional[str]
+    model: str
+    tokens: float
+    waited_ms: float
+
+
+class ModelRateLimiter:
+    """Limite de concorrência AIMD + token bucket por modelo, persistido em SQLite."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        initial_limit: float,
+        min_limit: float,
+        max_limit: float,
+        tokens_per_minute: float,
+        max_wait: float,
+        lease_ttl: float = 300.0,
+    ):
+        self.db_path = db_path
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        self.lease_ttl = lease_ttl
+
+        self._disabled = False
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    # ── API async ─────────────────────────────────────
+
+    async def acquire(self, model: str, tokens: float) -> Lease:
+        """Aguarda vaga para o modelo. Após max_wait segundos segue mesmo sem vaga."""
+        started = time.perf_counter()
+        deadline = started + self.max_wait
+        while not self._disabled:
+            lease_id, retry_in = await asyncio.to_thread(self._try_acquire, model, tokens)
+            if lease_id:
+                waited = (time.perf_counter() - started) * 1000
+                self._record_wait(model, waited, timed_out=False)
+                return Lease(lease_id, model, tokens, waited)
+            if time.perf_counter() + retry_in > deadline:
+                break
+            # Jitter evita que os dois workers acordem juntos
+            await asyncio.sleep(retry_in * random.uniform(0.8, 1.2))
+
+        waited = (time.perf_counter() - started) * 1000
+        if not self._disabled:
+            logger.warning(f"[RATE_LIMIT] {model}: sem vaga após {waited:.0f}ms — seguindo sem limite")
+            self._record_wait(model, waited, timed_out=True)
+        return Lease(None, model, tokens, waited)
+
+    async def release(
+        self,
+        lease: Lease,
+        status_code: Optional[int] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        used_tokens: Optional[float] = None,
+    ):
+        """Libera a vaga e ajusta o limite a partir do resultado observado."""
+        if lease.id is None or self._disabled:
+            return
+        if status_code == 429:
+            with self._stats_lock:
+                self._stats_for(lease.model)["rate_limited"] += 1
+        try:
+            await asyncio.to_thread(
+                self._release, lease, status_code, dict(headers or {}), used_tokens
+            )
+        except Exception as e:
+            logger.warning(f"[RATE_LIMIT] Falha ao liberar lease: {e}")
+
+    # ── SQLite (roda em thread) ───────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _load_state(self, conn: sqlite3.Connection, model: str, now: float) -> tuple[float, float, float, float]:
+        row = conn.execute(
+            "SELECT concurrency_limit, tokens, tpm, refilled_at FROM model_state WHERE model = ?",
+            (model,),
+        ).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO model_state (model, concurrency_limit, tokens, tpm, refilled_at) VALUES (?, ?, ?, ?, ?)",
+                (model, self.initial_limit, self.tokens_per_minute, self.tokens_per_minute, now),
+            )
+            return self.initial_limit, self.tokens_per_minute, self.tokens_per_minute, now
+        limit, tokens, tpm, refilled_at = row
+        tokens = min(tpm, tokens + (now - refilled_at) * tpm / 60.0)
+        return limit, tokens, tpm, now
+
+    def _try_acquire(self, model: str, tokens: float) -> tuple[Optional[str], float]:
+        try:
+            conn = self._conn()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM leases WHERE acquired_at < ?", (now - self.lease_ttl,))
+                limit, available, tpm, refilled_at = self._load_state(conn, model, now)
+                in_flight = conn.execute(
+                    "SELECT COUNT(*) FROM leases WHERE model = ?", (model,)
+                ).fetchone()[0]
+
+                # Um pedido maior que o bucket inteiro só precisa do bucket cheio
+                needed = min(tokens, tpm)
+                if in_flight < max(1, int(limit)) and available >= needed:
+                    lease_id = uuid.uuid4().hex
+                    conn.execute(
+                        "INSERT INTO leases (id, model, pid, tokens, acquired_at) VALUES (?, ?, ?, ?, ?)",
+                        (lease_id, model, os.getpid(), needed, now),
+                    )
+                    available -= needed
+                    retry_in = 0.0
+                else:
+                    lease_id = None
+                    retry_in = 0.25 if available >= needed else max(0.25, (needed - available) * 60.0 / tpm)
+                conn.execute(
+                    "UPDATE model_state SET tokens = ?, refilled_at = ? WHERE model = ?",
+                    (available, refilled_at, model),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return lease_id, min(retry_in, 2.0)
+        except Exception as e:
+            self._disable(e)
+            return None, 0.0
+
+    def _release(self, lease: Lease, status_code: Optional[int], headers: dict, used_tokens: Optional[float]):
+        conn = self._conn()
+        now = time.time()
+        headers = {k.lower(): v for k, v in headers.items()}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease.id,))
+            limit, available, tpm, refilled_at = self._load_state(conn, lease.model, now)
+            last_decrease_at = conn.execute(
+                "SELECT last_decrease_at FROM model_state WHERE model = ?", (lease.model,)
+            ).fetchone()[0]
+
+            # TPM informado pelo provider substitui o valor configurado
+            header_tpm = _header_float(headers, "x-ratelimit-limit-tokens")
+            if header_tpm:
+                tpm = header_tpm
+
+            remaining_requests = _header_float(headers, "x-ratelimit-remaining-requests")
+            remaining_tokens = _header_float(headers, "x-ratelimit-remaining-tokens")
+            throttled = (
+                status_code == 429
+                or remaining_requests == 0
+                or (remaining_tokens is not None and remaining_tokens < lease.tokens)
+            )
+
+            if throttled:
+                if now - last_decrease_at >= _DECREASE_COOLDOWN:
+                    limit = max(self.min_limit, limit * 0.5)
+                    last_decrease_at = now
+                if remaining_tokens is not None:
+                    available = min(available, remaining_tokens)
+            elif status_code is not None and status_code < 400:
+                limit = min(self.max_limit, limit + 1.0 / max(limit, 1.0))
+
+            # Devolve ao bucket a diferença entre a reserva e o uso real
+            if used_tokens is not None:
+                available = min(tpm, available + max(0.0, lease.tokens - used_tokens))
+
+            conn.execute(
+                "UPDATE model_state SET concurrency_limit = ?, tokens = ?, tpm = ?, refilled_at = ?, "
+                "last_decrease_at = ? WHERE model = ?",
+                (limit, available, tpm, refilled_at, last_decrease_at, lease.model),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _disable(self, error: Exception):
+        if not self._disabled:
+            logger.error(f"[RATE_LIMIT] SQLite indisponível ({error}) — limitador desligado")
+        self._disabled = True
+
+    # ── Métricas ──────────────────────────────────────
+
+    def _stats_for(self, model: str) -> dict:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = {"acquired": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0, "timeouts": 0, "rate_limited": 0}
+            self._stats[model] = stats
+        return stats
+
+    def _record_wait(self, model: str, waited_ms: float, timed_out: bool):
+        with self._stats_lock:
+            stats = self._stats_for(model)
+            stats["acquired"] += 1
+            stats["wait_ms_total"] += waited_ms
+            stats["wait_ms_max"] = max(stats["wait_ms_max"], waited_ms)
+            if timed_out:
+                stats["timeouts"] += 1
+
+    def metrics(self) -> dict:
+        shared: dict[str, dict] = {}
+        if not self._disabled:
+            try:
+                conn = sqlite3.connect(str(self.db_path), timeout=1.0)
+                try:
+                    for model, limit, tokens, tpm in conn.execute(
+                        "SELECT model, concurrency_limit, tokens, tpm FROM model_state"
+                    ):
+                        in_flight = conn.execute(
+                            "SELECT COUNT(*) FROM leases WHERE model = ?", (model,)
+                        ).fetchone()[0]
+                        shared[model] = {
+                            "concurrency_limit": round(limit, 2),
+                            "in_flight": in_flight,
+                            "tokens_available": int(tokens),
+                            "tokens_per_minute": int(tpm),
+                        }
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+
+        with self._stats_lock:
+            local = {
+                model: {
+                    "acquired": s["acquired"],
+                    "avg_wait_ms": round(s["wait_ms_total"] / s["acquired"], 2) if s["acquired"] else 0.0,
+                    "max_wait_ms": round(s["wait_ms_max"], 2),
+                    "timeouts": s["timeouts"],
+                    "rate_limited": s["rate_limited"],
+                }
+                for model, s in self._stats.items()
+            }
+        return {"enabled": not self._disabled, "shared": shared, "worker": local}
+
+
+def _header_float(headers: dict, name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+_limiter: Optional[ModelRateLimiter] = None
+
+
+def get_rate_limiter() -> ModelRateLimiter:
+    """Retorna o limitador singleton, configurado a partir de AgentConfig."""
+    global _limiter
+    if _limiter is None:
+        from .config import get_config
+        config = get_config()
+        _limiter = ModelRateLimiter(
+            db_path=config.workspace_path / "rate_limits.sqlite3",
+            initial_limit=config.rate_limit_initial_concurrency,
+            min_limit=config.rate_limit_min_concurrency,
+            max_limit=config.rate_limit_max_concurrency,
+            tokens_per_minute=config.rate_limit_tokens_per_minute,
+            max_wait=config.rate_limit_max_wait,
+        )
+        if not config.rate_limit_enable:
+            _limiter._disabled = True
+    return _limiter
@@ -0,0 +1,256 @@
+"""
+Sessões de conversa do lado do servidor (ChatRequest.session_id).
+
+Cada sessão guarda:
+  - o histórico canônico (user/assistant) — o cliente pode mandar só as
+    mensagens novas (delta) em vez da conversa inteira a cada turno
+  - resultados de ferramentas dos especialistas, pela chave (ferramenta +
+    argumentos), para reaproveitar chamadas idênticas dentro da sessão — só
+    as de session_reuse_tools (determinísticas; ask_browser lê a página ao vivo)
+
+Ids são sempre gerados pelo servidor e cada sessão pertence ao cliente que a
+criou (admission.client_identity: token ou IP). Id de outro dono é tratado
+como sessão inexistente.
+
+Duas camadas, como em core/llm_cache.py:
+  1. Memória (LRU, session_cache_size sessões)
+  2. SQLite em workspace_path — sobrevive a restarts e é compartilhado entre
+     os workers uvicorn. Cada gravação incrementa `version`; a leitura só
+     decodifica o JSON do SQLite quando a versão em memória ficou para trás
+     (outro worker atendeu o último turno).
+
+Sessões sem uso por session_ttl_seconds são descartadas.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL,
+    messages TEXT NOT NULL,
+    tool_results TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated_at);
+"""
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+# Limpa sessões expiradas do SQLite a cada N gravações
+_SWEEP_EVERY = 100
+# Resultados de ferramentas guardados por sessão (os mais antigos saem primeiro)
+_MAX_TOOL_RESULTS = 64
+
+
+def is_valid_session_id(session_id: str) -> bool:
+    return bool(session_id and _SESSION_ID_RE.match(session_id))
+
+
+def tool_result_key(func_name: str, arguments: str) -> str:
+    """Chave de uma tool call: nome + argumentos JSON normalizados."""
+    try:
+        canonical = json.dumps(json.loads(arguments), sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        canonical = arguments
+    return hashlib.sha256(f"{func_name}\x00{canonical}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Session:
+    id: str
+    owner: str = ""
+    messages: list = field(default_factory=list)
+    tool_results: dict = field(default_factory=dict)
+    version: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    def remember_tool_result(self, key: str, result: str):
+        self.tool_results.pop(key, None)
+        self.tool_results[key] = result
+        while len(self.tool_results) > _MAX_TOOL_RESULTS:
+            self.tool_results.pop(next(iter(self.tool_results)))
+
+
+class SessionStore:
+    """LRU em memória + SQLite compartilhado entre workers."""
+
+    def __init__(self, db_path: Path, max_memory: int = 256, ttl: float = 7 * 86400, max_messages: int = 400):
+        self.db_path = db_path
+        self.max_memory = max_memory
+        self.ttl = ttl
+        self.max_messages = max_messages
+
+        self._memory: "OrderedDict[str, Session]" = OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {
+            "hits": 0, "disk_loads": 0, "misses": 0, "foreign": 0, "created": 0, "saved": 0, "errors": 0,
+        }
+
+    # ── API async ─────────────────────────────────────
+
+    def new(self, owner: str) -> Session:
+        """Sessão vazia com id gerado aqui (ids escolhidos pelo cliente não são aceitos)."""
+        self._stats["created"] += 1
+        return Session(id=uuid.uuid4().hex, owner=owner)
+
+    async def get(self, session_id: str, owner: str) -> Optional[Session]:
+        """Sessão do dono `owner`; inexistente, expirada ou de outro cliente → None."""
+        if not is_valid_session_id(session_id):
+            return None
+        try:
+            session = await asyncio.to_thread(self._get, session_id)
+        except Exception as e:
+            logger.warning(f"[SESSIONS] Falha lendo sessão {session_id}: {e}")
+            self._stats["errors"] += 1
+            session = self._memory.get(session_id)
+        if session is not None and session.owner != owner:
+            self._stats["foreign"] += 1
+            logger.warning(f"[SESSIONS] Sessão {session_id} pedida por outro cliente")
+            return None
+        return session
+
+    async def save(self, session: Session):
+        if len(session.messages) > self.max_messages:
+            session.messages = session.messages[-self.max_messages:]
+        session.version += 1
+        self._remember(session)
+        try:
+            await asyncio.to_thread(self._save, session)
+            self._stats["saved"] += 1
+        except Exception as e:
+            logger.warning(f"[SESSIONS] Falha gravando sessão {session.id}: {e}")
+            self._stats["errors"] += 1
+
+    # ── Memória ───────────────────────────────────────
+
+    def _remember(self, session: Session):
+        with self._lock:
+            self._memory[session.id] = session
+            self._memory.move_to_end(session.id)
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    # ── SQLite (roda em thread) ───────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            # Bancos criados antes da coluna owner: as sessões antigas ficam sem dono e ninguém as reabre
+            if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}:
+                conn.execute("ALTER TABLE sessions ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, session_id: str) -> Optional[Session]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT version, updated_at FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            self._stats["misses"] += 1
+            return None
+        cached = self._memory.get(session_id)
+        if cached is not None and cached.version == row[0]:
+            self._stats["hits"] += 1
+            self._remember(cached)
+            return cached
+
+        # Outro worker gravou depois: recarrega o histórico do disco
+        full = conn.execute(
+            "SELECT version, owner, messages, tool_results, created_at FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if full is None:
+            self._stats["misses"] += 1
+            return None
+        session = Session(
+            id=session_id,
+            owner=full[1],
+            messages=json.loads(full[2]),
+            tool_results=json.loads(full[3]),
+            version=full[0],
+            created_at=full[4],
+        )
+        self._stats["disk_loads"] += 1
+        self._remember(session)
+        return session
+
+    def _save(self, session: Session):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            """
+            INSERT INTO sessions (id, owner, version, messages, tool_results, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                version = MAX(sessions.version + 1, excluded.version),
+                messages = excluded.messages,
+                tool_results = excluded.tool_results,
+                updated_at = excluded.updated_at
+            """,
+            (
+                session.id,
+                session.owner,
+                session.version,
+                json.dumps(session.messages, ensure_ascii=False, default=str),
+                json.dumps(session.tool_results, ensure_ascii=False),
+                session.created_at,
+                now,
+            ),
+        )
+        # A versão no disco pode ter passado a da memória (gravação concorrente de outro worker)
+        session.version = conn.execute(
+            "SELECT version FROM sessions WHERE id = ?", (session.id,)
+        ).fetchone()[0]
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % _SWEEP_EVERY == 0
+        if sweep:
+            removed = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,)).rowcount
+            if removed:
+                logger.info(f"[SESSIONS] {removed} sessão(ões) expirada(s) removida(s)")
+
+    # ── Métricas ──────────────────────────────────────
+
+    def metrics(self) -> dict:
+        return {"in_memory": len(self._memory), **self._stats}
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """Retorna o store singleton, configurado a partir de AgentConfig."""
+    global _store
+    if _store is None:
+        from .config import get_config
+        config = get_config()
+        _store = SessionStore(
+            db_path=config.workspace_path / "sessions.sqlite3",
+            max_memory=config.session_cache_size,
+            ttl=config.session_ttl_seconds,
+            max_messages=config.session_max_messages,
+        )
+    return _store
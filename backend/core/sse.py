@@ -0,0 +1,131 @@
+"""
+Escrita de Server-Sent Events compartilhada (orquestrador e builder).
+
+sse_event() monta o frame `data: {"type": ..., "content": ...}\n\n` e o
+devolve como SSEFrame: uma str comum (pode ser yieldada, comparada, passada
+ao StreamingResponse) que também guarda o tipo e o conteúdo, para o
+coalescedor não precisar decodificar o JSON de volta.
+
+coalesce_sse() envolve o gerador de um endpoint e junta eventos "chunk"
+consecutivos num único frame, no estilo Nagle:
+
+  - o primeiro chunk depois de um período ocioso sai na hora (TTFT intacto)
+  - os seguintes acumulam até a janela (AgentConfig.sse_coalesce_window_ms,
+    20–50ms) vencer ou o frame chegar a sse_max_frame_chars
+  - qualquer outro evento (steps, thought, error, browser_action...) e o fim
+    do stream descarregam o buffer antes, preservando a ordem
+
+Menos frames = menos json.dumps, menos send() no ASGI e menos flushes no
+nginx por stream. A janela é medida sem cancelar o gerador de origem (o
+próximo evento fica numa task que sobrevive ao timeout).
+"""
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Optional
+
+
+class SSEFrame(str):
+    """Frame SSE pronto para envio que lembra o tipo e o conteúdo originais."""
+
+    __slots__ = ("event_type", "content")
+
+    def __new__(cls, event_type: str, content: str):
+        frame = super().__new__(cls, f"data: {json.dumps({'type': event_type, 'content': content})}\n\n")
+        frame.event_type = event_type
+        frame.content = content
+        return frame
+
+
+def sse_event(event_type: str, content: str) -> SSEFrame:
+    """Frame SSE `{"type": event_type, "content": content}`."""
+    return SSEFrame(event_type, content)
+
+
+def _is_chunk(event) -> bool:
+    return isinstance(event, SSEFrame) and event.event_type == "chunk" and isinstance(event.content, str)
+
+
+async def coalesce_sse(
+    stream: AsyncIterator[str],
+    window_ms: Optional[float] = None,
+    max_frame_chars: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Junta chunks de texto consecutivos de `stream` em frames maiores.
+    window_ms=None → AgentConfig.sse_coalesce_window_ms (0 desliga).
+    """
+    from .config import get_config
+    config = get_config()
+    window = (config.sse_coalesce_window_ms if window_ms is None else window_ms) / 1000
+    max_chars = config.sse_max_frame_chars if max_frame_chars is None else max_frame_chars
+
+    if window <= 0:
+        async for event in stream:
+            yield event
+        return
+
+    iterator = stream.__aiter__()
+    buffer: list[SSEFrame] = []
+    buffered_chars = 0
+    last_flush = float("-inf")
+    pending: Optional[asyncio.Future] = None
+
+    def flush():
+        nonlocal buffered_chars, last_flush
+        if len(buffer) == 1:
+            frame = buffer[0]  # nada a juntar: reaproveita o frame já codificado
+        else:
+            frame = sse_event("chunk", "".join(f.content for f in buffer))
+        buffer.clear()
+        buffered_chars = 0
+        last_flush = time.monotonic()
+        return frame
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            if buffer:
+                timeout = last_flush + window - time.monotonic()
+                if timeout <= 0:
+                    yield flush()
+                    continue
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    yield flush()
+                    continue
+            else:
+                await asyncio.wait({pending})
+
+            task, pending = pending, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                break
+
+            if _is_chunk(event):
+                buffer.append(event)
+                buffered_chars += len(event.content)
+                if buffered_chars >= max_chars or time.monotonic() - last_flush >= window:
+                    yield flush()
+                continue
+
+            if buffer:
+                yield flush()
+            yield event
+
+        if buffer:
+            yield flush()
+    finally:
+        # Cliente desconectou: cancela a leitura pendente e fecha o gerador de origem
+        if pending is not None and not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -7,7 +7,10 @@ import time
 import logging
 from typing import Optional
 
-import httpx
+from .cancellation import check_cancelled
+from .circuit_breaker import get_breaker, is_failure_status
+from .http_client import sync_request
+from .tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +38,9 @@ class SupabaseClient:
         """Upload arquivo e retorna URL pública."""
         upload_url = f"{self.url}/storage/v1/object/{bucket}/{path}"
 
-        with httpx.Client(timeout=60.0) as client:
-            response = client.post(
+        with get_breaker("supabase").guard() as call:
+            response = sync_request(
+                "POST",
                 upload_url,
                 headers={
                     **self.headers,
@@ -44,11 +48,14 @@ class SupabaseClient:
                     "x-upsert": "true",
                 },
                 content=file_content,
+                timeout=60.0,
             )
+            if is_failure_status(response.status_code):
+                call.fail()
 
-            if response.status_code not in (200, 201):
-                logger.error(f"Upload failed ({response.status_code}): {response.text}")
-                raise Exception(f"Supabase upload failed: {response.text}")
+        if response.status_code not in (200, 201):
+            logger.error(f"Upload failed ({response.status_code}): {response.text}")
+            raise Exception(f"Supabase upload failed: {response.text}")
 
         public_url = f"{self.url}/storage/v1/object/public/{bucket}/{path}"
         return public_url
@@ -63,12 +70,14 @@ class SupabaseClient:
             for key, value in filters.items():
                 url += f"&{key}=eq.{value}"
 
-        with httpx.Client(timeout=30.0) as client:
-            response = client.get(url, headers=self.headers)
-            if response.status_code != 200:
-                logger.error(f"Query failed: {response.text}")
-                return []
-            return response.json()
+        with get_breaker("supabase").guard() as call:
+            response = sync_request("GET", url, headers=self.headers, timeout=30.0)
+            if is_failure_status(response.status_code):
+                call.fail()
+        if response.status_code != 200:
+            logger.error(f"Query failed: {response.text}")
+            return []
+        return response.json()
 
 
 _client: Optional[SupabaseClient] = None
@@ -93,9 +102,11 @@ def upload_to_supabase(
     content_type: str = "application/octet-stream",
 ) -> str:
     """Upload arquivo para Supabase Storage e retorna URL pública."""
+    check_cancelled()  # cliente já desconectou: não sobe arquivo que ninguém vai baixar
     client = get_supabase_client()
     timestamped_name = f"{int(time.time())}-{filename}"
 
-    url = client.storage_upload(bucket, timestamped_name, file_content, content_type)
+    with span("supabase.upload", bucket=bucket, content_type=content_type, bytes=len(file_content)):
+        url = client.storage_upload(bucket, timestamped_name, file_content, content_type)
     logger.info(f"Uploaded {filename} ({len(file_content)} bytes) → {url}")
     return url
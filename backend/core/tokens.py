@@ -0,0 +1,256 @@
+"""
+Estimativa de tokens e orçamento de contexto por chamada ao LLM.
+
+Contagem: aproximação local do BPE, sem dependências nem download de
+vocabulário. O texto é quebrado como no pré-tokenizador do GPT (palavras,
+números, pontuação, espaços) e cada pedaço vira uma estimativa de tokens.
+Precisão suficiente para orçamento, não para cobrança.
+
+Orçamento (fit_to_budget), na ordem:
+  1. Turnos mais antigos (mantém system + o turno atual a partir da última
+     mensagem do usuário; cada turno sai inteiro, com tool_calls e resultados)
+  2. Saídas de ferramentas grandes (as maiores primeiro, até _TOOL_OUTPUT_FLOOR)
+  3. Contexto do projeto (blocos dinâmicos do system, ver llm.system_message)
+
+O que foi removido volta num TrimReport (logado e somado em métricas).
+"""
+
+import json
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Pré-tokenização no estilo GPT: contrações, palavras, números (até 3 dígitos),
+# pontuação e espaços
+_PIECE_RE = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+")
+
+# Overhead por mensagem (role, separadores) no formato chat
+_MESSAGE_OVERHEAD = 4
+# Tamanho mínimo ao qual uma saída de ferramenta é encurtada
+_TOOL_OUTPUT_FLOOR = 500
+# Contexto do projeto nunca é cortado abaixo disso
+_CONTEXT_FLOOR = 200
+# Tokens do marcador "... [truncado: ...]" acrescentado ao texto cortado
+_TRUNCATION_MARKER_TOKENS = 24
+
+
+def estimate_tokens(text: str) -> int:
+    """Número aproximado de tokens de um texto."""
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        core = piece.lstrip(" ")
+        if not core or core.isspace():
+            tokens += 1
+        elif core[0].isdigit():
+            tokens += 1
+        elif core[0].isalpha():
+            # Palavras comuns em inglês viram 1 token; acentos e palavras longas quebram mais
+            per_token = 4 if core.isascii() else 3
+            tokens += max(1, math.ceil(len(core) / per_token))
+        else:
+            tokens += max(1, math.ceil(len(core) / 2))
+    return tokens
+
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return "" if content is None else str(content)
+
+
+def estimate_message_tokens(message: dict) -> int:
+    tokens = _MESSAGE_OVERHEAD + estimate_tokens(_content_text(message.get("content")))
+    for call in message.get("tool_calls") or []:
+        function = call.get("function") or {}
+        tokens += estimate_tokens(function.get("name", "")) + estimate_tokens(function.get("arguments", ""))
+    return tokens
+
+
+def estimate_messages_tokens(messages: list, tools: Optional[list] = None) -> int:
+    """Tokens de entrada de uma requisição (mensagens + schema das tools)."""
+    total = sum(estimate_message_tokens(m) for m in messages)
+    if tools:
+        total += estimate_tokens(json.dumps(tools, ensure_ascii=False, separators=(",", ":")))
+    return total
+
+
+# ── Orçamento ────────────────────────────────────────
+
+@dataclass
+class TrimReport:
+    budget: int
+    tokens_before: int
+    tokens_after: int = 0
+    dropped_messages: int = 0
+    truncated_tool_outputs: int = 0
+    context_tokens_removed: int = 0
+    notes: list[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.dropped_messages or self.truncated_tool_outputs or self.context_tokens_removed)
+
+    def summary(self) -> str:
+        parts = []
+        if self.dropped_messages:
+            parts.append(f"{self.dropped_messages} mensagem(ns) antiga(s)")
+        if self.truncated_tool_outputs:
+            parts.append(f"{self.truncated_tool_outputs} saída(s) de ferramenta truncada(s)")
+        if self.context_tokens_removed:
+            parts.append(f"~{self.context_tokens_removed} tokens do contexto do projeto")
+        removed = ", ".join(parts) or "nada"
+        return f"{self.tokens_before} → {self.tokens_after} tokens (orçamento {self.budget}): removido {removed}"
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta o texto para caber em ~max_tokens (incluindo o marcador de corte)."""
+    current = estimate_tokens(text)
+    if current <= max_tokens:
+        return text
+    target = max(0, max_tokens - _TRUNCATION_MARKER_TOKENS)
+    keep_chars = max(0, int(len(text) * target / current))
+    # Densidade de tokens não é uniforme: um ajuste proporcional extra se passou
+    kept = estimate_tokens(text[:keep_chars])
+    if kept > target and kept:
+        keep_chars = int(keep_chars * target / kept)
+    removed = current - estimate_tokens(text[:keep_chars])
+    return text[:keep_chars] + f"\n... [truncado: ~{removed} tokens removidos para caber no contexto]"
+
+
+def _turn_groups(messages: list, start: int, end: int) -> list[tuple[int, int]]:
+    """
+    Agrupa [start, end) em turnos removíveis: cada turno começa numa mensagem
+    do usuário e vai até a próxima (respostas, tool_calls e resultados juntos).
+    """
+    groups = []
+    i = start
+    while i < end:
+        j = i + 1
+        while j < end and messages[j].get("role") != "user":
+            j += 1
+        groups.append((i, j))
+        i = j
+    return groups
+
+
+def fit_to_budget(messages: list, budget: int, tools: Optional[list] = None) -> tuple[list, TrimReport]:
+    """
+    Retorna (mensagens que cabem no orçamento, relatório). A lista original
+    não é alterada. Se nem o mínimo couber, retorna o melhor esforço.
+    """
+    tokens = [estimate_message_tokens(m) for m in messages]
+    tools_tokens = estimate_messages_tokens([], tools)
+    total = sum(tokens) + tools_tokens
+    report = TrimReport(budget=budget, tokens_before=total)
+    if total <= budget:
+        report.tokens_after = total
+        return messages, report
+
+    result = list(messages)
+
+    # 1. Turnos antigos: entre os system iniciais e a última mensagem do usuário
+    head = 0
+    while head < len(result) and result[head].get("role") == "system":
+        head += 1
+    last_user = max((i for i, m in enumerate(result) if m.get("role") == "user"), default=len(result))
+    groups = _turn_groups(result, head, last_user)
+    if last_user == len(result):
+        groups = groups[:-1]  # sem mensagem do usuário: preserva ao menos o último turno
+    drop_until = head
+    for start, end in groups:
+        if total <= budget:
+            break
+        total -= sum(tokens[start:end])
+        report.dropped_messages += end - start
+        drop_until = end
+    if drop_until > head:
+        result = result[:head] + result[drop_until:]
+        tokens = tokens[:head] + tokens[drop_until:]
+
+    # 2. Saídas de ferramentas, das maiores para as menores
+    if total > budget:
+        tool_indexes = sorted(
+            (i for i, m in enumerate(result) if m.get("role") == "tool" and tokens[i] > _TOOL_OUTPUT_FLOOR),
+            key=lambda i: tokens[i],
+            reverse=True,
+        )
+        for i in tool_indexes:
+            if total <= budget:
+                break
+            target = max(_TOOL_OUTPUT_FLOOR, tokens[i] - (total - budget))
+            content = _truncate_to_tokens(_content_text(result[i].get("content")), target)
+            result[i] = {**result[i], "content": content}
+            new_tokens = estimate_message_tokens(result[i])
+            total -= tokens[i] - new_tokens
+            tokens[i] = new_tokens
+            report.truncated_tool_outputs += 1
+
+    # 3. Contexto do projeto: blocos do system depois do prompt fixo
+    if total > budget:
+        for i in range(head):
+            content = result[i].get("content")
+            if not isinstance(content, list) or len(content) < 2:
+                continue
+            blocks = list(content)
+            for b in range(len(blocks) - 1, 0, -1):
+                if total <= budget:
+                    break
+                text = blocks[b].get("text", "")
+                before = estimate_tokens(text)
+                if before <= _CONTEXT_FLOOR:
+                    continue
+                target = max(_CONTEXT_FLOOR, before - (total - budget))
+                blocks[b] = {**blocks[b], "text": _truncate_to_tokens(text, target)}
+                removed = before - estimate_tokens(blocks[b]["text"])
+                total -= removed
+                report.context_tokens_removed += removed
+            result[i] = {**result[i], "content": blocks}
+
+    if total > budget:
+        report.notes.append("turno atual excede o orçamento mesmo após os cortes")
+    report.tokens_after = total
+    return result, report
+
+
+# ── Métricas ─────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats = {
+    "checked": 0,
+    "trimmed": 0,
+    "dropped_messages": 0,
+    "truncated_tool_outputs": 0,
+    "context_tokens_removed": 0,
+    "tokens_removed": 0,
+    "over_budget_after_trim": 0,
+}
+
+
+def record_trim(report: TrimReport, tag: str = ""):
+    """Soma o relatório nas métricas e loga quando algo foi removido."""
+    with _stats_lock:
+        _stats["checked"] += 1
+        if report.changed:
+            _stats["trimmed"] += 1
+            _stats["dropped_messages"] += report.dropped_messages
+            _stats["truncated_tool_outputs"] += report.truncated_tool_outputs
+            _stats["context_tokens_removed"] += report.context_tokens_removed
+            _stats["tokens_removed"] += report.tokens_before - report.tokens_after
+        if report.notes:
+            _stats["over_budget_after_trim"] += 1
+    if report.changed or report.notes:
+        logger.warning(f"[TOKENS]{f' [{tag}]' if tag else ''} {report.summary()} {'; '.join(report.notes)}")
+
+
+def get_token_budget_metrics() -> dict:
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,234 @@
+"""
+Tracing leve de ponta a ponta (chat → orquestrador → especialistas → tools → uploads).
+
+Cada requisição de streaming vira um trace (traced_stream) com spans para:
+  llm.call / openrouter.request / openrouter.stream → model, tokens, status
+  qa.review         → rota, aprovado
+  tool.execute      → nome da ferramenta, tamanho do resultado
+  playwright.render → tipo (pdf/screenshot/pptx), bytes
+  supabase.upload   → bucket, content_type, bytes
+
+O trace e o span atual vivem em contextvars, então atravessam await,
+asyncio.create_task e asyncio.to_thread sem precisar ser passados adiante.
+
+    with span("tool.execute", tool=name) as s:
+        result = await ...
+        s.set(result_chars=len(result))
+
+Geradores não devem manter um span ativo entre yields (o coalescedor de SSE
+avança o gerador em tasks diferentes): nesses casos use start_span(), que
+não vira o span atual, e span.end() no finally.
+
+Exportação: ao fim do trace, uma linha JSON por span em TRACING_EXPORT
+(padrão: workspace_path/traces.jsonl), no formato de span do OTLP/JSON
+(traceId, spanId, parentSpanId, startTimeUnixNano, attributes[{key, value}]).
+Com TRACING_SSE_TIMING=true o stream termina com um evento "timing" com o
+tempo total e a soma por tipo de span (spans concorrentes somam em paralelo,
+então a soma pode passar do total).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Intervalo de tempo nomeado com atributos. Seguro para usar de threads."""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace: Optional["Trace"], parent_id: str = "", attributes: Optional[dict] = None):
+        self.name = name
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException | str):
+        self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        if self.trace is not None:
+            self.trace.add(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace.trace_id if self.trace else "",
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+class Trace:
+    """Spans de uma requisição."""
+
+    def __init__(self, name: str, attributes: Optional[dict] = None):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, self, attributes=attributes)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> dict:
+        """Tempo total e soma por tipo de span (para o evento SSE "timing")."""
+        by_name: dict[str, dict] = {}
+        with self._lock:
+            spans = [s for s in self.spans if s is not self.root]
+        for s in spans:
+            entry = by_name.setdefault(s.name, {"count": 0, "ms": 0.0})
+            entry["count"] += 1
+            entry["ms"] += s.duration_ms
+            for attr in ("prompt_tokens", "completion_tokens", "bytes"):
+                if isinstance(s.attributes.get(attr), (int, float)):
+                    entry[attr] = entry.get(attr, 0) + s.attributes[attr]
+        for entry in by_name.values():
+            entry["ms"] = round(entry["ms"], 1)
+        return {"trace_id": self.trace_id, "total_ms": round(self.root.duration_ms, 1), "spans": by_name}
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("arcco_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("arcco_span", default=None)
+
+_export_lock = threading.Lock()
+_stats = {"traces": 0, "spans": 0, "export_errors": 0}
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_span(name: str, **attributes) -> Span:
+    """Span filho do atual, sem torná-lo o atual (para geradores). Chame .end()."""
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    parent_id = parent.span_id if parent is not None else (trace.root.span_id if trace else "")
+    return Span(name, trace, parent_id, attributes)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Span ativo durante o bloco (funciona em código sync, async e em threads)."""
+    s = start_span(name, **attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.fail(e)
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Bloco encerrado em outro contexto (gerador fechado por outra task)
+            pass
+        s.end()
+
+
+async def traced_stream(stream: AsyncIterator[str], name: str, **attributes) -> AsyncIterator[str]:
+    """
+    Envolve o gerador SSE de um endpoint num trace. Deve ser o gerador mais
+    externo (o StreamingResponse o consome numa única task).
+    """
+    from .config import get_config
+    from .sse import sse_event
+    config = get_config()
+
+    if not config.tracing_enable:
+        async for event in stream:
+            yield event
+        return
+
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    completed = False
+    try:
+        async for event in stream:
+            yield event
+        completed = True
+    except GeneratorExit:
+        trace.root.set(client_disconnected=True)
+        raise
+    except BaseException as e:
+        trace.root.fail(e)
+        raise
+    finally:
+        try:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+        except ValueError:
+            pass
+        trace.root.end()
+        _export(trace, config.tracing_export_path)
+        summary = trace.summary()
+        logger.info(f"[TRACE] {name} {trace.trace_id[:12]}: {summary['total_ms']:.0f}ms, {len(trace.spans) - 1} span(s)")
+
+    if completed and config.tracing_sse_timing:
+        yield sse_event("timing", json.dumps(summary))
+
+
+def _export(trace: Trace, path: Optional[Path]):
+    _stats["traces"] += 1
+    _stats["spans"] += len(trace.spans)
+    if path is None:
+        return
+    try:
+        lines = "".join(json.dumps(s.to_otlp(), ensure_ascii=False, default=str) + "\n" for s in trace.spans)
+        with _export_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+    except OSError as e:
+        _stats["export_errors"] += 1
+        logger.warning(f"[TRACE] Falha exportando trace: {e}")
+
+
+def get_tracing_metrics() -> dict:
+    """Contadores de traces exportados (usado em /api/admin/metrics)."""
+    from .config import get_config
+    config = get_config()
+    return {
+        "enabled": config.tracing_enable,
+        "export_path": str(config.tracing_export_path) if config.tracing_export_path else None,
+        "sse_timing": config.tracing_sse_timing,
+        **_stats,
+    }
@@ -0,0 +1,8 @@
+"""
+Ferramentas de desenvolvimento e benchmark (não são montadas no app FastAPI).
+
+  fake_openrouter.py → servidor local compatível com chat/completions do OpenRouter
+  bench.py           → mede orchestrate_and_stream, builder_stream e /route
+
+Cassetes de gravação/reprodução ficam em backend/core/llm_cassette.py.
+"""
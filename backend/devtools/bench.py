@@ -0,0 +1,155 @@
+"""
+Benchmark offline dos fluxos de LLM.
+
+Roda o pipeline in-process (sem HTTP do FastAPI) contra o fake_openrouter ou
+um cassete, e imprime latências em JSON:
+
+    # terminal 1
+    python -m backend.devtools.fake_openrouter --ttft 0.4 --tps 60
+
+    # terminal 2
+    OPENROUTER_BASE_URL=http://127.0.0.1:8787/api/v1 \\
+        python -m backend.devtools.bench chat --runs 20 --concurrency 4
+
+    # ou reproduzindo um cassete gravado com LLM_CASSETTE_MODE=record
+    LLM_CASSETTE_MODE=replay LLM_CASSETTE_REALTIME=true LLM_CASSETTE_PATH=sessao.jsonl \\
+        python -m backend.devtools.bench chat --runs 20
+
+Alvos: chat (orchestrate_and_stream), builder (builder_stream), route (/route).
+Métricas SSE: ttfb (primeiro evento), ttft (primeiro "chunk"), total, eventos.
+Os streams passam por core/sse.coalesce_sse como nos endpoints
+(SSE_COALESCE_MS=0 mede sem agrupamento).
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(_percentile(values, 50) * 1000, 1),
+        "p95_ms": round(_percentile(values, 95) * 1000, 1),
+        "mean_ms": round(statistics.fmean(values) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+async def _measure_sse(stream) -> dict:
+    started = time.perf_counter()
+    first_event = first_chunk = None
+    events = 0
+    errors = 0
+    async for raw in stream:
+        now = time.perf_counter() - started
+        events += 1
+        if first_event is None:
+            first_event = now
+        try:
+            event_type = json.loads(raw[len("data: "):]).get("type")
+        except (ValueError, AttributeError):
+            event_type = None
+        if event_type == "chunk" and first_chunk is None:
+            first_chunk = now
+        elif event_type == "error":
+            errors += 1
+    return {
+        "ttfb": first_event,
+        "ttft": first_chunk,
+        "total": time.perf_counter() - started,
+        "events": events,
+        "errors": errors,
+    }
+
+
+async def _run_chat(message: str, model: str) -> dict:
+    from backend.agents.orchestrator import orchestrate_and_stream
+    from backend.core.sse import coalesce_sse
+    return await _measure_sse(coalesce_sse(orchestrate_and_stream([{"role": "user", "content": message}], model)))
+
+
+async def _run_builder(message: str, model: str) -> dict:
+    from backend.api.builder import builder_stream
+    from backend.core.sse import coalesce_sse
+    stream = builder_stream(
+        [{"role": "user", "content": message}], [], "creation", "app", None, model, None
+    )
+    return await _measure_sse(coalesce_sse(stream))
+
+
+async def _run_route(message: str, model: str) -> dict:
+    from backend.api.router import route_endpoint
+    from backend.models.schemas import RouteRequest
+    started = time.perf_counter()
+    await route_endpoint(RouteRequest(message=message, user_id="bench"))
+    return {"total": time.perf_counter() - started}
+
+
+_TARGETS = {"chat": _run_chat, "builder": _run_builder, "route": _run_route}
+
+
+async def run_bench(target: str, message: str, model: str, runs: int, concurrency: int) -> dict:
+    from backend.agents import registry
+    from backend.core.config import get_config
+    from backend.core.http_client import close_http_clients
+
+    config = get_config()
+    config.workspace_path.mkdir(parents=True, exist_ok=True)
+    registry.initialize()
+
+    runner = _TARGETS[target]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> dict:
+        async with semaphore:
+            return await runner(message, model)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(runs)))
+    wall = time.perf_counter() - started
+    await close_http_clients()
+
+    report = {
+        "target": target,
+        "runs": runs,
+        "concurrency": concurrency,
+        "base_url": config.openrouter_base_url,
+        "cassette": config.llm_cassette_mode,
+        "wall_s": round(wall, 3),
+        "total": _summary([r["total"] for r in results]),
+    }
+    if target != "route":
+        report["ttfb"] = _summary([r["ttfb"] for r in results if r["ttfb"] is not None])
+        report["ttft"] = _summary([r["ttft"] for r in results if r["ttft"] is not None])
+        report["events_mean"] = round(statistics.fmean(r["events"] for r in results), 1)
+        report["errors"] = sum(r["errors"] for r in results)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline dos fluxos de LLM")
+    parser.add_argument("target", choices=sorted(_TARGETS))
+    parser.add_argument("--message", default="Explique em poucas linhas o que é uma landing page.")
+    parser.add_argument("--model", default="anthropic/claude-3.5-sonnet")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_bench(args.target, args.message, args.model, args.runs, args.concurrency))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
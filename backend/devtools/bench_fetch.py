@@ -0,0 +1,182 @@
+"""
+Benchmark do leitor de páginas (services/web_fetcher.py) contra a
+implementação anterior (download inteiro + BeautifulSoup html.parser).
+
+Sem rede: páginas sintéticas grandes (artigo com nav/scripts/tabelas) são
+servidas com gzip por um servidor HTTP local, e também convertidas direto
+para medir só a extração:
+
+    python -m backend.devtools.bench_fetch --sizes 200,1000,5000 --runs 5
+
+    # páginas reais salvas em disco entram na medição de extração
+    python -m backend.devtools.bench_fetch --file pagina.html --file outra.html
+
+Para cada página: p50/máximo de extração (html → texto) e de fetch ponta a
+ponta, bytes lidos e tamanho do texto. Páginas acima de web_max_response_size
+mostram o efeito do teto (o legado baixa tudo).
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "mercado receita crescimento clientes produto digital estratégia equipe dados "
+    "análise resultado projeto empresa investimento tecnologia vendas margem"
+).split()
+
+
+def synthetic_page(size_kb: int) -> bytes:
+    """Página de artigo com o ruído típico (menu, scripts, estilos, tabelas, rodapé)."""
+    head = (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Relatório de mercado — página de teste</title>"
+        "<style>" + ".c{color:#333;margin:0 auto}" * 200 + "</style>"
+        "<script>" + "window.dataLayer=window.dataLayer||[];" * 300 + "</script></head><body>"
+        "<header><nav>" + "".join(f"<a href='/s{i}'>Seção {i}</a>" for i in range(60)) + "</nav></header><main><article>"
+    )
+    tail = "</article></main><footer>" + "<p>Links úteis e avisos legais</p>" * 30 + "</footer></body></html>"
+    parts, size, i = [head], len(head), 0
+    while size < size_kb * 1024:
+        words = " ".join(_WORDS[(i + j) % len(_WORDS)] for j in range(60))
+        block = (
+            f"<section><h2>Capítulo {i}</h2><div class='c'><p>{words}.</p><p><b>Nota {i}:</b> {words[:200]}.</p></div>"
+            "<table>" + "".join(f"<tr><td>Linha {r}</td><td>{r * i}</td><td>R$ {r * 10},00</td></tr>" for r in range(8))
+            + "</table><script>track('bloco', " + str(i) + ");</script></section>"
+        )
+        parts.append(block)
+        size += len(block)
+        i += 1
+    parts.append(tail)
+    return "".join(parts).encode("utf-8")
+
+
+def legacy_extract(html: str) -> str:
+    """Extração usada antes em agents/executor.py (_web_fetch)."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "nav", "footer", "header", "aside", "form", "svg", "noscript"]):
+        tag.decompose()
+    return soup.get_text(separator=" ", strip=True)
+
+
+async def legacy_fetch(url: str) -> tuple[int, str]:
+    from backend.core.http_client import request as http_request
+    response = await http_request("GET", url, headers={"User-Agent": "ArccoAgent/2.0"}, follow_redirects=True, timeout=60.0)
+    return len(response.content), legacy_extract(response.text)
+
+
+def _summary(values: list[float]) -> dict:
+    return {
+        "p50_ms": round(statistics.median(values) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+def _timed(fn, runs: int) -> tuple[dict, object]:
+    timings, result = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return _summary(timings), result
+
+
+async def _timed_async(fn, runs: int) -> tuple[dict, object]:
+    timings, result = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await fn()
+        timings.append(time.perf_counter() - started)
+    return _summary(timings), result
+
+
+def _serve(pages: dict[str, bytes]) -> ThreadingHTTPServer:
+    compressed = {path: gzip.compress(body, 6) for path, body in pages.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = compressed.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_bench(sizes: list[int], files: list[str], runs: int) -> dict:
+    from backend.core.config import get_config
+    from backend.core.http_client import close_http_clients
+    from backend.services.web_fetcher import PARSER, fetch_page, html_to_text
+
+    pages = {f"/synthetic-{kb}kb": synthetic_page(kb) for kb in sizes}
+    report = {"parser": PARSER, "max_response_bytes": get_config().web_max_response_size, "extract": {}, "fetch": {}}
+
+    local = dict(pages)
+    for name in files:
+        with open(name, "rb") as f:
+            local[name] = f.read()
+    for name, body in local.items():
+        html = body.decode("utf-8", errors="replace")
+        legacy, legacy_text = _timed(lambda: legacy_extract(html), runs)
+        current, (_, text) = _timed(lambda: html_to_text(html), runs)
+        report["extract"][name] = {
+            "html_kb": round(len(body) / 1024),
+            "legacy": {**legacy, "text_chars": len(legacy_text)},
+            "web_fetcher": {**current, "text_chars": len(text)},
+            "speedup_p50": round(legacy["p50_ms"] / current["p50_ms"], 1) if current["p50_ms"] else None,
+        }
+
+    server = _serve(pages)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        for path in pages:
+            url = base + path
+            legacy, (legacy_bytes, legacy_text) = await _timed_async(lambda: legacy_fetch(url), runs)
+            current, page = await _timed_async(lambda: fetch_page(url, max_chars=10**9), runs)
+            report["fetch"][path] = {
+                "legacy": {**legacy, "bytes_read": legacy_bytes, "text_chars": len(legacy_text)},
+                "web_fetcher": {
+                    **current,
+                    "bytes_read": page.bytes_read,
+                    "truncated": page.truncated,
+                    "text_chars": len(page.text),
+                    "error": page.error or None,
+                },
+                "speedup_p50": round(legacy["p50_ms"] / current["p50_ms"], 1) if current["p50_ms"] else None,
+            }
+    finally:
+        server.shutdown()
+        await close_http_clients()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do leitor de páginas web")
+    parser.add_argument("--sizes", default="200,1000,5000", help="tamanhos das páginas sintéticas em KB")
+    parser.add_argument("--file", action="append", default=[], help="página HTML salva (pode repetir)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = asyncio.run(run_bench(sizes, args.file, args.runs))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
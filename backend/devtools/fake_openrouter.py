@@ -0,0 +1,242 @@
+"""
+Servidor local que imita o OpenRouter (chat/completions e /models).
+
+Respostas determinísticas (derivadas do hash das mensagens), com latência e
+taxa de tokens configuráveis, para medir o backend sem custo e sem jitter:
+
+    python -m backend.devtools.fake_openrouter --port 8787 --ttft 0.4 --tps 60
+
+    OPENROUTER_BASE_URL=http://127.0.0.1:8787/api/v1 uvicorn backend.main:app
+
+Opções:
+  --ttft        segundos até o primeiro token
+  --tps         tokens por segundo depois do primeiro
+  --tokens      tokens de texto por resposta (limitado por max_tokens)
+  --tool NOME   se a requisição oferecer essa tool e a última mensagem for
+                do usuário, responde com uma tool call (argumentos gerados a
+                partir do schema)
+  --error-rate  fração de requisições respondidas com 429 (testa retry/limitador)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS = (
+    "o projeto usa dados reais para montar uma resposta clara com base no pedido "
+    "do usuário e organiza cada etapa em seções curtas objetivas e fáceis de revisar"
+).split()
+
+
+@dataclass
+class FakeSettings:
+    ttft: float = 0.3
+    tps: float = 80.0
+    tokens: int = 120
+    tool: Optional[str] = None
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+settings = FakeSettings()
+app = FastAPI(title="Fake OpenRouter")
+
+
+# ── Geração determinística ──────────────────────────
+
+def _rng_for(payload: dict) -> random.Random:
+    digest = hashlib.sha256(
+        json.dumps(payload.get("messages", []), sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return random.Random(int(digest[:16], 16) ^ settings.seed)
+
+
+def _text_tokens(payload: dict) -> list[str]:
+    rng = _rng_for(payload)
+    count = max(1, min(settings.tokens, int(payload.get("max_tokens") or settings.tokens)))
+    return [("" if i == 0 else " ") + rng.choice(_WORDS) for i in range(count)]
+
+
+def _example_value(schema: dict):
+    if schema.get("enum"):
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "string":
+        return "teste"
+    if kind in ("number", "integer"):
+        return 1
+    if kind == "boolean":
+        return True
+    if kind == "array":
+        return []
+    if kind == "object":
+        return {
+            name: _example_value(prop)
+            for name, prop in (schema.get("properties") or {}).items()
+            if name in (schema.get("required") or [])
+        }
+    return None
+
+
+def _tool_call_for(payload: dict) -> Optional[dict]:
+    if not settings.tool:
+        return None
+    messages = payload.get("messages") or []
+    if not messages or messages[-1].get("role") != "user":
+        return None
+    for tool in payload.get("tools") or []:
+        function = tool.get("function") or {}
+        if function.get("name") == settings.tool:
+            return {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {
+                    "name": settings.tool,
+                    "arguments": json.dumps(_example_value(function.get("parameters") or {}), ensure_ascii=False),
+                },
+            }
+    return None
+
+
+def _usage(payload: dict, completion_tokens: int) -> dict:
+    prompt_chars = len(json.dumps(payload.get("messages", []), ensure_ascii=False, default=str))
+    prompt_tokens = prompt_chars // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+# ── Endpoints ───────────────────────────────────────
+
+@app.post("/api/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    if settings.error_rate and random.random() < settings.error_rate:
+        return JSONResponse(
+            {"error": {"code": 429, "message": "Rate limit exceeded (fake)"}},
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+
+    model = payload.get("model", "fake/model")
+    tool_call = _tool_call_for(payload)
+    tokens = [] if tool_call else _text_tokens(payload)
+    completion_id = f"gen-{uuid.uuid4().hex[:16]}"
+
+    if payload.get("stream"):
+        return StreamingResponse(
+            _stream(payload, model, completion_id, tokens, tool_call),
+            media_type="text/event-stream",
+        )
+
+    await asyncio.sleep(settings.ttft + max(0, len(tokens) - 1) / settings.tps)
+    message: dict = {"role": "assistant", "content": "".join(tokens)}
+    if tool_call:
+        message = {"role": "assistant", "content": None, "tool_calls": [tool_call]}
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if tool_call else "stop",
+        }],
+        "usage": _usage(payload, len(tokens) or 20),
+    }
+
+
+async def _stream(payload: dict, model: str, completion_id: str, tokens: list[str], tool_call: Optional[dict]):
+    def chunk(delta: dict, finish_reason: Optional[str] = None, **extra) -> str:
+        body = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+    # O OpenRouter real manda comentários de keep-alive enquanto o provider processa
+    yield ": OPENROUTER PROCESSING\n\n"
+    await asyncio.sleep(settings.ttft)
+
+    if tool_call:
+        arguments = tool_call["function"]["arguments"]
+        yield chunk({"role": "assistant", "tool_calls": [{
+            "index": 0, "id": tool_call["id"], "type": "function",
+            "function": {"name": tool_call["function"]["name"], "arguments": ""},
+        }]})
+        for start in range(0, len(arguments), 16):
+            await asyncio.sleep(1 / settings.tps)
+            yield chunk({"tool_calls": [{"index": 0, "function": {"arguments": arguments[start:start + 16]}}]})
+        yield chunk({}, "tool_calls", usage=_usage(payload, 20))
+    else:
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(1 / settings.tps)
+            delta = {"content": token}
+            if index == 0:
+                delta["role"] = "assistant"
+            yield chunk(delta)
+        yield chunk({}, "stop", usage=_usage(payload, len(tokens)))
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/api/v1/models")
+async def list_models():
+    def model(model_id: str, name: str, prompt: str, completion: str) -> dict:
+        return {
+            "id": model_id,
+            "name": name,
+            "context_length": 200000,
+            "pricing": {"prompt": prompt, "completion": completion},
+        }
+
+    return {"data": [
+        model("anthropic/claude-3.5-sonnet", "Fake: Claude 3.5 Sonnet", "0.000003", "0.000015"),
+        model("openai/gpt-4o-mini", "Fake: GPT-4o mini", "0.00000015", "0.0000006"),
+        model("google/gemini-2.0-flash-001", "Fake: Gemini 2.0 Flash", "0.0000001", "0.0000004"),
+    ]}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor local que imita o OpenRouter")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--ttft", type=float, default=settings.ttft)
+    parser.add_argument("--tps", type=float, default=settings.tps)
+    parser.add_argument("--tokens", type=int, default=settings.tokens)
+    parser.add_argument("--tool", default=None)
+    parser.add_argument("--error-rate", type=float, default=settings.error_rate)
+    parser.add_argument("--seed", type=int, default=settings.seed)
+    args = parser.parse_args()
+
+    settings.ttft = args.ttft
+    settings.tps = args.tps
+    settings.tokens = args.tokens
+    settings.tool = args.tool
+    settings.error_rate = args.error_rate
+    settings.seed = args.seed
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,9 +18,12 @@ from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.core.config import get_config
+from backend.core.credentials import get_credential_store
+from backend.core.http_client import close_http_clients
 from backend.api import chat, router as intent_router, search, files, ocr, builder, admin
 from backend.api import pages as pages_api
 from backend.api import export as export_api
+from backend.api import jobs as jobs_api
 from backend.agents import registry
 
 # ── Logging ───────────────────────────────────────────
@@ -61,6 +64,7 @@ app.include_router(ocr.router, prefix="/api/agent", tags=["ocr"])
 app.include_router(builder.router, prefix="/api/builder", tags=["builder"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(export_api.router, prefix="/api/agent", tags=["export"])
+app.include_router(jobs_api.router, prefix="/api/agent", tags=["jobs"])
 
 # Serving de páginas publicadas — acessível em /p/{slug}
 # No nginx, o subdomínio pages.arccoai.com aponta para este prefixo
@@ -107,6 +111,9 @@ async def startup():
 
     config.workspace_path.mkdir(parents=True, exist_ok=True)
 
+    # Aquece o cache de credenciais: a primeira requisição de chat não espera o Supabase
+    await get_credential_store().refresh()
+
     # Inicializa registry de agentes (carrega defaults + overrides persistidos)
     registry.initialize()
     logger.info("Backend ready")
@@ -115,6 +122,7 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown():
     logger.info("Arcco AI Backend shutting down...")
+    await close_http_clients()
 
 
 # ── Dev Runner ────────────────────────────────────────
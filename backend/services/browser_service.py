@@ -9,7 +9,7 @@ Variáveis de ambiente necessárias:
     BROWSERBASE_API_KEY      — chave da conta Browserbase
     BROWSERBASE_PROJECT_ID   — ID do projeto Browserbase
 
-Tipos de action suportados (mesma interface de tools.py):
+Tipos de action suportados (mesma interface do @tool ask_browser em agents/executor.py):
     click | write | scroll | wait | press | execute_javascript | screenshot | scrape
 
 NOTA WINDOWS: usa playwright.sync_api em asyncio.to_thread para evitar
@@ -20,15 +20,13 @@ import asyncio
 import logging
 from typing import Any
 
+from backend.core.cancellation import RequestCancelled, check_cancelled
+from backend.core.circuit_breaker import CircuitOpenError, get_breaker
+
 logger = logging.getLogger(__name__)
 
 _MAX_CONTENT_CHARS = 15_000
 
-_NOISE_TAGS = [
-    "script", "style", "noscript", "nav", "footer",
-    "header", "aside", "form", "svg", "meta", "link",
-]
-
 
 # ── Entrypoint Público ─────────────────────────────────────────────────────────
 
@@ -82,37 +80,45 @@ async def execute_browserbase_task(
     actions = actions or []
     bb = Browserbase(api_key=api_key)
 
-    # Cria a sessão Browserbase (SDK síncrono)
+    # Cria a sessão Browserbase (SDK síncrono). Só a criação passa pelo circuit
+    # breaker: erros de navegação costumam ser do site, não do Browserbase.
     try:
-        session = await asyncio.to_thread(
-            lambda: bb.sessions.create(project_id=project_id)
-        )
+        with get_breaker("browserbase").guard():
+            session = await asyncio.to_thread(
+                lambda: bb.sessions.create(project_id=project_id)
+            )
         logger.info(f"[BROWSER] Sessão criada: {session.id} → {url}")
+    except CircuitOpenError as exc:
+        logger.warning(f"[BROWSER] {exc}")
+        return f"Erro: Browserbase temporariamente indisponível ({exc}). Tente outra ferramenta de acesso à web."
     except Exception as exc:
         logger.error(f"[BROWSER] Falha ao criar sessão Browserbase: {exc}")
         return f"Erro ao criar sessão no Browserbase: {exc}"
 
     # Executa toda a navegação em uma thread (sync_playwright não precisa de subprocess asyncio)
-    result = await asyncio.to_thread(
-        _run_sync_session,
-        session.connect_url,
-        session.id,
-        url,
-        actions,
-        wait_for,
-        mobile,
-        include_tags,
-        exclude_tags,
-    )
-
-    # Libera a sessão
     try:
-        await asyncio.to_thread(
-            lambda: bb.sessions.update(session.id, status="REQUEST_RELEASE")
+        result = await asyncio.to_thread(
+            _run_sync_session,
+            session.connect_url,
+            session.id,
+            url,
+            actions,
+            wait_for,
+            mobile,
+            include_tags,
+            exclude_tags,
         )
-        logger.info(f"[BROWSER] Sessão {session.id} liberada.")
-    except Exception as exc:
-        logger.warning(f"[BROWSER] Falha ao liberar sessão {session.id}: {exc}")
+    finally:
+        # Libera a sessão — também quando o cliente desconectou (CancelledError):
+        # a thread pode ainda estar navegando, mas o release derruba a conexão CDP
+        # e ela para na próxima operação em vez de segurar a sessão até o timeout
+        try:
+            await asyncio.to_thread(
+                lambda: bb.sessions.update(session.id, status="REQUEST_RELEASE")
+            )
+            logger.info(f"[BROWSER] Sessão {session.id} liberada.")
+        except Exception as exc:
+            logger.warning(f"[BROWSER] Falha ao liberar sessão {session.id}: {exc}")
 
     return result
 
@@ -168,10 +174,12 @@ def _run_sync_session(
                 return f"Erro ao carregar a página {url}: {exc}"
 
             if wait_for > 0:
+                check_cancelled()
                 page.wait_for_timeout(wait_for)
 
             # ── Executar actions ───────────────────────────────────────────
             for action in actions:
+                check_cancelled()
                 action_type = action.get("type", "")
                 try:
                     if action_type == "click":
@@ -232,6 +240,7 @@ def _run_sync_session(
                     action_log.append(f"❌ {action_type} → {str(exc)[:60]}")
 
             # ── Scrape final ───────────────────────────────────────────────
+            check_cancelled()
             final_content = _extract_page_text_sync(page, include_tags, exclude_tags)
             if final_content:
                 scraped_content = final_content
@@ -239,6 +248,9 @@ def _run_sync_session(
             page_title = page.title()
             browser.close()
 
+    except RequestCancelled:
+        logger.info(f"[BROWSER] Sessão {session_id}: cliente desconectou, navegação interrompida")
+        return "Erro: navegação cancelada (cliente desconectou)."
     except Exception as exc:
         logger.error(f"[BROWSER] Erro crítico na sessão {session_id}: {exc}")
         return f"Erro durante navegação com Browserbase: {exc}"
@@ -267,23 +279,8 @@ def _extract_page_text_sync(
     exclude_tags: list[str] | None,
 ) -> str:
     try:
-        from bs4 import BeautifulSoup
-
-        raw_html = page.content()
-        soup = BeautifulSoup(raw_html, "html.parser")
-
-        for tag in soup(_NOISE_TAGS + (exclude_tags or [])):
-            tag.decompose()
-
-        if include_tags:
-            elements = soup.find_all(include_tags)
-            if elements:
-                return "\n\n".join(
-                    el.get_text(separator=" ", strip=True) for el in elements
-                )
-
-        return soup.get_text(separator=" ", strip=True)
-
+        from backend.services.web_fetcher import html_to_text
+        return html_to_text(page.content(), include_tags, exclude_tags)[1]
     except Exception as exc:
         logger.error(f"[BROWSER] Falha na extração de texto: {exc}")
         return ""
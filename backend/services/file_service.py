@@ -11,6 +11,9 @@ import os
 from pathlib import Path
 from typing import Tuple
 
+from backend.core.cancellation import check_cancelled
+from backend.core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 _TEMPLATES_DIR = Path(__file__).parent / "pdf_templates"
@@ -37,11 +40,13 @@ async def generate_pdf_playwright(html_content: str) -> bytes:
         else:
             inject_html = html_content
 
+        check_cancelled()
         with sync_playwright() as p:
             browser = p.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage"])
             page = browser.new_page()
             try:
                 page.set_content(inject_html, wait_until="networkidle", timeout=30_000)
+                check_cancelled()
                 pdf_bytes = page.pdf(
                     format="A4",
                     print_background=True,
@@ -51,7 +56,10 @@ async def generate_pdf_playwright(html_content: str) -> bytes:
                 browser.close()
         return pdf_bytes
 
-    return await asyncio.to_thread(_sync_render)
+    with span("playwright.render", kind="pdf") as s:
+        pdf_bytes = await asyncio.to_thread(_sync_render)
+        s.set(bytes=len(pdf_bytes))
+    return pdf_bytes
 
 
 async def generate_pdf_from_template(template_name: str, data: dict) -> bytes:
@@ -243,17 +251,22 @@ async def html_to_screenshot(html_content: str, img_format: str = "png") -> byte
 
     def _sync() -> bytes:
         from playwright.sync_api import sync_playwright
+        check_cancelled()
         with sync_playwright() as p:
             browser = p.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage"])
             page = browser.new_page(viewport={"width": 1280, "height": 720})
             try:
                 page.set_content(inject, wait_until="networkidle", timeout=30_000)
+                check_cancelled()
                 data = page.screenshot(full_page=False, type=fmt)
             finally:
                 browser.close()
         return data
 
-    return await asyncio.to_thread(_sync)
+    with span("playwright.render", kind="screenshot", format=fmt) as s:
+        data = await asyncio.to_thread(_sync)
+        s.set(bytes=len(data))
+    return data
 
 
 async def html_to_pptx(html_content: str, title: str = "Apresentação") -> bytes:
@@ -272,6 +285,7 @@ async def html_to_pptx(html_content: str, title: str = "Apresentação") -> byte
 
         screenshots: list[bytes] = []
 
+        check_cancelled()
         with sync_playwright() as p:
             browser = p.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage"])
             page = browser.new_page(viewport={"width": 1280, "height": 720})
@@ -281,6 +295,7 @@ async def html_to_pptx(html_content: str, title: str = "Apresentação") -> byte
 
                 if slide_count and slide_count > 0:
                     for i in range(int(slide_count)):
+                        check_cancelled()
                         # Mostra apenas o slide i, esconde os outros
                         page.evaluate(f"""() => {{
                             const slides = document.querySelectorAll('.slide');
@@ -310,7 +325,10 @@ async def html_to_pptx(html_content: str, title: str = "Apresentação") -> byte
         prs.save(buf)
         return buf.getvalue()
 
-    return await asyncio.to_thread(_sync)
+    with span("playwright.render", kind="pptx") as s:
+        data = await asyncio.to_thread(_sync)
+        s.set(bytes=len(data))
+    return data
 
 
 def _text_to_html(title: str, content: str) -> str:
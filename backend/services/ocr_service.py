@@ -6,7 +6,7 @@ Portado de netlify/functions/ocr.ts (Tesseract)
 import logging
 import tempfile
 
-import httpx
+from backend.core.http_client import request as http_request
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +27,8 @@ async def ocr_image(image_url: str, lang: str = "por+eng") -> dict:
         from PIL import Image
 
         # Baixar imagem
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(image_url)
-            response.raise_for_status()
+        response = await http_request("GET", image_url, timeout=30.0)
+        response.raise_for_status()
 
         # Salvar temporariamente
         with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
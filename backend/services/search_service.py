@@ -1,21 +1,28 @@
 """
 Serviço de busca web — Tavily (primário) + Brave (fallback).
 Portado de netlify/functions/search.ts e lib/agent-tools.ts
+
+Cada provider tem um circuit breaker (core/circuit_breaker.py): com a Tavily
+degradada (circuito aberto ou qualquer falha), search_web e
+search_web_formatted (tool web_search do agente e do Builder) vão direto ao
+Brave em vez de esperar o timeout.
 """
 
 import logging
 from typing import Optional
 from urllib.parse import quote_plus
 
-import httpx
+from backend.core.circuit_breaker import get_breaker, is_failure_status
+from backend.core.http_client import request as http_request
 
 logger = logging.getLogger(__name__)
 
 
 async def search_tavily(query: str, api_key: str, max_results: int = 5) -> dict:
     """Busca via Tavily API."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
+    with get_breaker("tavily").guard() as call:
+        response = await http_request(
+            "POST",
             "https://api.tavily.com/search",
             json={
                 "api_key": api_key,
@@ -24,96 +31,121 @@ async def search_tavily(query: str, api_key: str, max_results: int = 5) -> dict:
                 "include_answer": True,
                 "max_results": max_results,
             },
+            timeout=30.0,
         )
-        response.raise_for_status()
-        return response.json()
+        if is_failure_status(response.status_code):
+            call.fail()
+    response.raise_for_status()
+    return response.json()
 
 
 async def search_brave(query: str, api_key: str, max_results: int = 5) -> dict:
     """Busca via Brave Search API."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(
+    with get_breaker("brave").guard() as call:
+        response = await http_request(
+            "GET",
             f"https://api.search.brave.com/res/v1/web/search?q={quote_plus(query)}&count={max_results}",
             headers={"X-Subscription-Token": api_key},
+            timeout=30.0,
         )
-        response.raise_for_status()
-        data = response.json()
+        if is_failure_status(response.status_code):
+            call.fail()
+    response.raise_for_status()
+    data = response.json()
 
-        # Normalizar formato para compatibilidade
-        results = []
-        for r in data.get("web", {}).get("results", []):
-            results.append({
-                "title": r.get("title", ""),
-                "url": r.get("url", ""),
-                "content": r.get("description", ""),
-            })
+    # Normalizar formato para compatibilidade
+    results = []
+    for r in data.get("web", {}).get("results", []):
+        results.append({
+            "title": r.get("title", ""),
+            "url": r.get("url", ""),
+            "content": r.get("description", ""),
+        })
 
-        return {"answer": None, "results": results, "query": query}
+    return {"answer": None, "results": results, "query": query}
 
 
-async def search_web(
+async def _load_keys(tavily_key: Optional[str], brave_key: Optional[str]) -> tuple[str, str]:
+    """Chaves explícitas ou, sem nenhuma, as duas da tabela ApiKeys (cada provider na sua)."""
+    if tavily_key or brave_key:
+        return tavily_key or "", brave_key or ""
+    from backend.core.credentials import get_credential_store
+    store = get_credential_store()
+    return await store.get("tavily"), await store.get("brave")
+
+
+async def _search_with_fallback(
     query: str,
-    max_results: int = 5,
-    tavily_key: Optional[str] = None,
-    brave_key: Optional[str] = None,
-) -> dict:
+    tavily_key: str,
+    brave_key: str,
+    tavily_results: int,
+    brave_results: int,
+) -> tuple[str, dict]:
     """
-    Busca web com fallback automático.
-    Carrega a chave dinamicamente do Supabase (ApiKeys) se não fornecida.
+    Tavily primeiro; qualquer falha (inclusive circuito aberto) cai no Brave.
+    Retorna (provider, dados). Sem chave nenhuma → ValueError.
     """
-    from backend.core.llm import get_search_key
-
-    if not tavily_key and not brave_key:
-        key = await get_search_key()
-        if key.startswith("tvly-"):
-            tavily_key = key
-        elif key:
-            brave_key = key
-
-    # Tavily como primário
+    last_error: Optional[Exception] = None
     if tavily_key:
         try:
-            return await search_tavily(query, tavily_key, max_results)
+            return "tavily", await search_tavily(query, tavily_key, tavily_results)
         except Exception as e:
-            logger.warning(f"Tavily search failed, trying Brave: {e}")
+            last_error = e
+            logger.warning(f"Tavily search failed{', trying Brave' if brave_key else ''}: {e}")
 
-    # Brave como fallback
     if brave_key:
         try:
-            return await search_brave(query, brave_key, max_results)
+            return "brave", await search_brave(query, brave_key, brave_results)
         except Exception as e:
             logger.error(f"Brave search also failed: {e}")
             raise
 
+    if last_error is not None:
+        raise last_error
     raise ValueError("Nenhuma chave de busca configurada. Adicione 'tavily' ou 'brave' na tabela ApiKeys do Supabase.")
 
 
+async def search_web(
+    query: str,
+    max_results: int = 5,
+    tavily_key: Optional[str] = None,
+    brave_key: Optional[str] = None,
+) -> dict:
+    """
+    Busca web com fallback automático.
+    Carrega as chaves dinamicamente do Supabase (ApiKeys) se não fornecidas.
+    """
+    tavily_key, brave_key = await _load_keys(tavily_key, brave_key)
+    _, data = await _search_with_fallback(query, tavily_key, brave_key, max_results, max_results)
+    return data
+
+
 async def search_web_formatted(query: str, api_key: Optional[str] = None) -> str:
     """
     Busca e retorna resultado formatado em markdown.
-    Usado pelo agente como tool.
-    Carrega a chave dinamicamente do Supabase (ApiKeys) se não fornecida.
+    Usado pelo agente como tool (mesmo fallback Tavily → Brave de search_web).
+    Carrega as chaves dinamicamente do Supabase (ApiKeys) se não fornecida.
     """
-    from backend.core.llm import get_search_key
-
-    key = api_key or await get_search_key()
-    if not key:
+    if api_key:
+        tavily_key, brave_key = (api_key, "") if api_key.startswith("tvly-") else ("", api_key)
+    else:
+        tavily_key, brave_key = await _load_keys(None, None)
+    if not tavily_key and not brave_key:
         return "ERRO: Chave de API de busca não configurada. Adicione 'tavily' ou 'brave' na tabela ApiKeys do Supabase."
 
     try:
-        if key.startswith("tvly-"):
-            data = await search_tavily(query, key, 10)
-            answer = data.get("answer", "")
-            results_text = f"**Resumo:** {answer}\n\n**Fontes:**\n"
-            for i, r in enumerate(data.get("results", []), 1):
-                content = r.get("content", "")[:300]
-                results_text += f"[{i}] {r['title']} ({r['url']})\n{content}...\n\n"
-            return results_text
-        else:
-            data = await search_brave(query, key, 5)
-            lines = []
-            for r in data.get("results", []):
-                lines.append(f"• **{r['title']}**\n  {r['url']}\n  {r['content']}")
-            return f'**Resultados para "{query}":**\n\n' + "\n\n".join(lines)
+        provider, data = await _search_with_fallback(query, tavily_key, brave_key, 10, 5)
     except Exception as e:
         return f"Erro na busca: {e}"
+
+    if provider == "tavily":
+        answer = data.get("answer", "")
+        results_text = f"**Resumo:** {answer}\n\n**Fontes:**\n"
+        for i, r in enumerate(data.get("results", []), 1):
+            content = r.get("content", "")[:300]
+            results_text += f"[{i}] {r['title']} ({r['url']})\n{content}...\n\n"
+        return results_text
+    lines = []
+    for r in data.get("results", []):
+        lines.append(f"• **{r['title']}**\n  {r['url']}\n  {r['content']}")
+    return f'**Resultados para "{query}":**\n\n' + "\n\n".join(lines)
@@ -169,16 +169,21 @@ async def search_pexels_image(
         query: Termos de busca em inglês para melhores resultados. Ex: "wedding flowers elegant"
         orientation: "landscape" | "portrait" | "square"
     """
-    import httpx
+    from backend.core.circuit_breaker import CircuitOpenError, get_breaker, is_failure_status
+    from backend.core.http_client import request as http_request
 
     try:
         params = {"query": query, "per_page": 1, "orientation": orientation}
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            resp = await client.get(
+        with get_breaker("pexels").guard() as call:
+            resp = await http_request(
+                "GET",
                 "https://api.pexels.com/v1/search",
                 params=params,
                 headers={"Authorization": _PEXELS_API_KEY},
+                timeout=8.0,
             )
+            if is_failure_status(resp.status_code):
+                call.fail()
         if resp.status_code != 200:
             logger.warning(f"[Pexels] HTTP {resp.status_code} para query '{query}'")
             return ""
@@ -188,6 +193,9 @@ async def search_pexels_image(
             logger.warning(f"[Pexels] Nenhuma foto encontrada para '{query}'")
             return ""
         return photos[0]["src"]["large"]
+    except CircuitOpenError as e:
+        logger.info(f"[Pexels] {e} — seguindo sem imagem para '{query}'")
+        return ""
     except Exception as e:
         logger.warning(f"[Pexels] Erro na busca '{query}': {e}")
         return ""
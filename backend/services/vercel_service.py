@@ -6,7 +6,7 @@ import base64
 import re
 import logging
 
-import httpx
+from backend.core.http_client import request as http_request
 
 logger = logging.getLogger(__name__)
 
@@ -43,13 +43,14 @@ async def deploy_to_vercel(files: dict[str, str], name: str) -> str:
 
     # Busca o teamId padrão da conta (necessário para contas team)
     team_id: str | None = None
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        try:
-            user_resp = await client.get("https://api.vercel.com/v2/user", headers=headers)
-            if user_resp.status_code == 200:
-                team_id = user_resp.json().get("user", {}).get("defaultTeamId")
-        except Exception as e:
-            logger.warning(f"[VERCEL] Não foi possível obter teamId: {e}")
+    try:
+        user_resp = await http_request(
+            "GET", "https://api.vercel.com/v2/user", headers=headers, timeout=15.0
+        )
+        if user_resp.status_code == 200:
+            team_id = user_resp.json().get("user", {}).get("defaultTeamId")
+    except Exception as e:
+        logger.warning(f"[VERCEL] Não foi possível obter teamId: {e}")
 
     deploy_url = "https://api.vercel.com/v13/deployments"
     if team_id:
@@ -81,8 +82,7 @@ async def deploy_to_vercel(files: dict[str, str], name: str) -> str:
         "target": "production",
     }
 
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(deploy_url, headers=headers, json=payload)
+    response = await http_request("POST", deploy_url, headers=headers, json=payload, timeout=120.0)
 
     if response.status_code not in (200, 201):
         error_body = response.text[:500]
@@ -0,0 +1,296 @@
+"""
+Leitor de páginas web compartilhado: web_fetch do Chat (agents/executor.py),
+web_fetch do Builder (api/builder.py) e a extração de texto do ask_browser
+(services/browser_service.py).
+
+  - download em streaming pelo pool de core/http_client.py, com teto de
+    bytes (web_max_response_size, contado depois de descomprimir) — uma
+    página de 50 MB ou uma bomba gzip para de ser lida no teto
+  - Accept-Encoding com os encodings que o httpx consegue decodificar
+  - charset: BOM → header Content-Type → <meta charset> → UTF-8 válido → cp1252
+  - HTML → texto com lxml (parser em C), removendo tags de ruído e
+    preservando quebras de bloco (parágrafos viram linhas em branco, o que
+    ajuda a compressão em core/compression.py); sem lxml, cai no
+    BeautifulSoup html.parser
+
+Benchmark contra a implementação anterior: python -m backend.devtools.bench_fetch
+"""
+
+import asyncio
+import codecs
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from backend.core.http_client import stream_request
+
+logger = logging.getLogger(__name__)
+
+NOISE_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "nav", "footer",
+    "header", "aside", "form", "svg", "meta", "link",
+)
+
+# Fim de bloco: linha em branco (parágrafo) ou quebra simples (itens, linhas)
+_PARAGRAPH_TAGS = (
+    "p", "div", "section", "article", "main", "blockquote", "pre", "table",
+    "ul", "ol", "dl", "figure", "h1", "h2", "h3", "h4", "h5", "h6",
+)
+_LINE_TAGS = ("li", "tr", "br", "dt", "dd", "figcaption", "caption", "hr")
+_CELL_TAGS = ("td", "th")
+
+_TEXT_TYPES = ("text/", "application/xhtml", "application/xml", "application/json", "+xml", "+json")
+# Páginas maiores que isso são convertidas numa thread para não travar o event loop
+_THREAD_PARSE_BYTES = 256_000
+_SNIFF_BYTES = 4096
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*>")
+_INLINE_SPACE = re.compile(r"[^\S\n]+")
+_SPACE_AROUND_NEWLINE = re.compile(r" ?\n ?")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _accept_encoding() -> str:
+    encodings = ["gzip", "deflate"]
+    for module, name in (("brotli", "br"), ("brotlicffi", "br"), ("zstandard", "zstd")):
+        if name in encodings:
+            continue
+        try:
+            __import__(module)
+            encodings.append(name)
+        except ImportError:
+            pass
+    return ", ".join(encodings)
+
+
+_ACCEPT_ENCODING = _accept_encoding()
+
+
+@dataclass
+class FetchedPage:
+    url: str
+    status: int = 0
+    content_type: str = ""
+    charset: str = ""
+    title: str = ""
+    text: str = ""
+    bytes_read: int = 0
+    truncated: bool = False  # parou no teto de bytes
+    error: str = ""
+
+
+# ── Charset ──────────────────────────────────────────────────────────────────
+
+def _valid_codec(name: str) -> Optional[str]:
+    try:
+        return codecs.lookup(name.strip().strip("\"'")).name
+    except (LookupError, ValueError):
+        return None
+
+
+def _looks_utf8(data: bytes, partial: bool) -> bool:
+    try:
+        data.decode("utf-8")
+        return True
+    except UnicodeDecodeError as e:
+        # Amostra cortada (teto de bytes, primeiros 64 KB) pode partir um caractere no fim
+        return partial and e.reason == "unexpected end of data"
+
+
+def detect_charset(data: bytes, content_type: str = "", truncated: bool = False) -> str:
+    """Charset do corpo: BOM, header Content-Type, <meta charset>, UTF-8 válido ou cp1252."""
+    for bom, name in _BOMS:
+        if data.startswith(bom):
+            return name
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and (codec := _valid_codec(value)):
+            return codec
+    sample, partial = data[:65536], truncated or len(data) > 65536
+    match = _META_CHARSET.search(data[:_SNIFF_BYTES])
+    if match and (codec := _valid_codec(match.group(1).decode("ascii", "ignore"))):
+        # Páginas declaram latin-1 e mandam UTF-8 com frequência: o conteúdo decide
+        if codec in ("iso8859-1", "cp1252") and _looks_utf8(sample, partial):
+            return "utf-8"
+        return codec
+    return "utf-8" if _looks_utf8(sample, partial) else "cp1252"
+
+
+# ── HTML → texto ─────────────────────────────────────────────────────────────
+
+def _normalize(text: str) -> str:
+    text = _INLINE_SPACE.sub(" ", text)
+    text = _SPACE_AROUND_NEWLINE.sub("\n", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def _to_text_lxml(html: str, include_tags, exclude_tags) -> tuple[str, str]:
+    from lxml import etree
+    from lxml import html as lxml_html
+
+    html = _XML_DECLARATION.sub("", html, count=1)
+    if not html.strip():
+        return "", ""
+    try:
+        doc = lxml_html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return "", ""
+
+    title_el = doc.find(".//title")
+    title = " ".join(title_el.text_content().split()) if title_el is not None else ""
+
+    etree.strip_elements(
+        doc, etree.Comment, etree.ProcessingInstruction, "title", *NOISE_TAGS, *(exclude_tags or ()),
+        with_tail=False,
+    )
+    for el in doc.iter(*_PARAGRAPH_TAGS):
+        el.tail = "\n\n" + (el.tail or "")
+    for el in doc.iter(*_LINE_TAGS):
+        el.tail = "\n" + (el.tail or "")
+    for el in doc.iter(*_CELL_TAGS):
+        el.tail = " " + (el.tail or "")
+
+    if include_tags:
+        elements = list(doc.iter(*include_tags))
+        if elements:
+            return title, _normalize("\n\n".join("".join(el.itertext()) for el in elements))
+    body = doc.find("body")
+    return title, _normalize("".join((body if body is not None else doc).itertext()))
+
+
+def _to_text_bs4(html: str, include_tags, exclude_tags) -> tuple[str, str]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    title = " ".join(soup.title.get_text().split()) if soup.title else ""
+    for tag in soup(["title", *NOISE_TAGS, *(exclude_tags or [])]):
+        tag.decompose()
+    for tags, separator in ((_PARAGRAPH_TAGS, "\n\n"), (_LINE_TAGS, "\n"), (_CELL_TAGS, " ")):
+        for el in soup.find_all(tags):
+            el.insert_after(separator)
+    if include_tags:
+        elements = soup.find_all(include_tags)
+        if elements:
+            return title, _normalize("\n\n".join(el.get_text() for el in elements))
+    return title, _normalize(soup.get_text())
+
+
+try:
+    import lxml.html  # noqa: F401
+    _to_text = _to_text_lxml
+    PARSER = "lxml"
+except ImportError:
+    _to_text = _to_text_bs4
+    PARSER = "html.parser"
+
+
+def html_to_text(html: str, include_tags: Optional[list] = None, exclude_tags: Optional[list] = None) -> tuple[str, str]:
+    """(título, texto) do HTML, sem tags de ruído. include_tags restringe a extração a essas tags."""
+    return _to_text(html, include_tags, exclude_tags)
+
+
+# ── Download ─────────────────────────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats = {"pages": 0, "errors": 0, "truncated": 0, "bytes": 0, "parse_ms": 0.0}
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for key, value in deltas.items():
+            _stats[key] += value
+
+
+async def fetch_page(
+    url: str,
+    max_chars: Optional[int] = None,
+    user_agent: str = "ArccoAgent/2.0",
+) -> FetchedPage:
+    """
+    Baixa a URL (até web_max_response_size bytes) e extrai título e texto.
+    Falhas voltam em page.error, nunca como exceção.
+    """
+    from backend.core.config import get_config
+    config = get_config()
+    max_bytes = config.web_max_response_size
+    max_chars = max_chars or config.web_max_chars
+    page = FetchedPage(url=url)
+
+    try:
+        async with stream_request(
+            "GET",
+            url,
+            headers={
+                "User-Agent": user_agent,
+                "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5",
+                "Accept-Encoding": _ACCEPT_ENCODING,
+            },
+            follow_redirects=True,
+            timeout=config.web_timeout,
+        ) as response:
+            page.status = response.status_code
+            page.content_type = response.headers.get("content-type", "")
+            if response.status_code >= 400:
+                page.error = f"HTTP {response.status_code}"
+            elif page.content_type and not any(t in page.content_type.lower() for t in _TEXT_TYPES):
+                page.error = f"conteúdo não é uma página de texto ({page.content_type.split(';')[0]})"
+            else:
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= max_bytes:
+                        page.truncated = True
+                        break
+                data = b"".join(chunks)[:max_bytes]
+                page.bytes_read = len(data)
+    except Exception as e:
+        page.error = str(e) or type(e).__name__
+
+    if page.error:
+        _count(pages=1, errors=1)
+        return page
+
+    started = time.perf_counter()
+    page.charset = detect_charset(data, page.content_type, page.truncated)
+    body = data.decode(page.charset, errors="replace")
+    if "html" in page.content_type.lower() or (not page.content_type and "<html" in body[:_SNIFF_BYTES].lower()):
+        if len(data) > _THREAD_PARSE_BYTES:
+            page.title, page.text = await asyncio.to_thread(html_to_text, body)
+        else:
+            page.title, page.text = html_to_text(body)
+    else:
+        page.text = _normalize(body)
+    if len(page.text) > max_chars:
+        page.text = page.text[:max_chars] + "... [Truncado]"
+
+    _count(pages=1, truncated=int(page.truncated), bytes=page.bytes_read, parse_ms=(time.perf_counter() - started) * 1000)
+    if page.truncated:
+        logger.info(f"[FETCH] {url}: corpo cortado em {max_bytes} bytes")
+    return page
+
+
+def get_fetch_metrics() -> dict:
+    """Páginas lidas, bytes, cortes no teto e tempo de extração (usado em /api/admin/metrics)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    parsed = stats["pages"] - stats["errors"]
+    return {
+        "parser": PARSER,
+        "accept_encoding": _ACCEPT_ENCODING,
+        "pages": stats["pages"],
+        "errors": stats["errors"],
+        "truncated": stats["truncated"],
+        "bytes": stats["bytes"],
+        "avg_parse_ms": round(stats["parse_ms"] / parsed, 2) if parsed else None,
+    }
@@ -0,0 +1,79 @@
+import asyncio
+
+from backend.core import admission
+from backend.core.admission import AdmissionController, admitted_stream, hand_off_to_job
+from backend.core.jobs import CANCELLED, DONE, JobManager
+
+
+def _in_flight(controller: AdmissionController) -> int:
+    return controller._conn().execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+
+
+def _setup(tmp_path, monkeypatch):
+    controller = AdmissionController(tmp_path / "admission.sqlite3", max_in_flight=4, per_user=1)
+    monkeypatch.setattr(admission, "_controller", controller)
+    manager = JobManager(tmp_path / "jobs.sqlite3", max_workers=1)
+    return controller, manager
+
+
+async def _events(*events):
+    for event in events:
+        yield event
+
+
+def test_job_waiting_for_worker_keeps_its_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(admission, "_HEARTBEAT", 0.01)
+    monkeypatch.setattr(admission, "_STALE", 0.02)
+
+    async def scenario():
+        controller, manager = _setup(tmp_path, monkeypatch)
+        blocker = asyncio.Event()
+
+        async def busy():
+            await blocker.wait()
+            yield "busy"
+
+        await manager.submit("chat", busy, owner="user")
+        ticket = await controller.enter("user", "chat")
+        job = await manager.submit(
+            "chat", lambda: admitted_stream(ticket, lambda: _events("ok")), owner="user",
+            on_finish=hand_off_to_job(ticket),
+        )
+        # Bem além de _STALE: o heartbeat não pode liberar a vaga de um job na fila de workers
+        await asyncio.sleep(0.1)
+        assert not ticket.released
+        assert _in_flight(controller) == 1
+
+        blocker.set()
+        await job.task
+        assert job.status == DONE
+        assert job.events == ["ok"]
+        assert ticket.released
+        assert _in_flight(controller) == 0
+
+    asyncio.run(scenario())
+
+
+def test_job_cancelled_before_start_releases_slot(tmp_path, monkeypatch):
+    async def scenario():
+        controller, manager = _setup(tmp_path, monkeypatch)
+        blocker = asyncio.Event()
+
+        async def busy():
+            await blocker.wait()
+            yield "busy"
+
+        await manager.submit("chat", busy, owner="user")
+        ticket = await controller.enter("user", "chat")
+        job = await manager.submit(
+            "chat", lambda: admitted_stream(ticket, lambda: _events("ok")), owner="user",
+            on_finish=hand_off_to_job(ticket),
+        )
+        assert await manager.cancel(job.id, "user")
+        await asyncio.gather(job.task, return_exceptions=True)
+        assert job.status == CANCELLED
+        assert ticket.released
+        assert _in_flight(controller) == 0
+        blocker.set()
+
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+"""CircuitBreaker: closed → open → half_open (uma prova) → closed/open."""
+
+import time
+
+import pytest
+
+from backend.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _fail(breaker: CircuitBreaker):
+    with pytest.raises(RuntimeError):
+        with breaker.guard():
+            raise RuntimeError("timeout")
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        _fail(breaker)
+    assert breaker.state == OPEN
+
+
+def test_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker("teste", failure_threshold=3, open_seconds=60)
+    _fail(breaker)
+    _fail(breaker)
+    with breaker.guard():
+        pass  # sucesso zera a contagem
+    _fail(breaker)
+    _fail(breaker)
+    assert breaker.state == CLOSED
+    _fail(breaker)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_in > 0
+    assert breaker.metrics()["rejected"] == 1
+
+
+def test_half_open_allows_a_single_probe_and_closes_on_success():
+    breaker = CircuitBreaker("teste", failure_threshold=1, open_seconds=0.05)
+    _open(breaker)
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # prova já em andamento
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("teste", failure_threshold=2, open_seconds=0.05)
+    _open(breaker)
+    time.sleep(0.06)
+    _fail(breaker)  # a prova falha: reabre mesmo abaixo do limite
+    assert breaker.state == OPEN
+    assert breaker.metrics()["opened"] == 2
+
+
+def test_explicit_fail_and_cancelled_probe():
+    breaker = CircuitBreaker("teste", failure_threshold=1, open_seconds=0.05)
+    with breaker.guard() as call:
+        call.fail()  # ex.: HTTP 503 sem exceção
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    with pytest.raises(KeyboardInterrupt):
+        with breaker.guard():
+            raise KeyboardInterrupt  # cancelamento não decide o estado, só libera a prova
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call() is True
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker("teste", failure_threshold=1, enabled=False)
+    _fail(breaker)
+    _fail(breaker)
+    assert breaker.before_call() is False
+    assert breaker.metrics()["state"] == "disabled"
@@ -0,0 +1,47 @@
+"""client_address: X-Forwarded-For só vale quando a conexão vem de um proxy confiável."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from backend.core import admission
+from backend.core.config import get_config
+
+
+def _request(host: str, forwarded: str = "", authorization: str = ""):
+    headers = {}
+    if forwarded:
+        headers["x-forwarded-for"] = forwarded
+    if authorization:
+        headers["authorization"] = authorization
+    return SimpleNamespace(client=SimpleNamespace(host=host), headers=headers)
+
+
+@pytest.fixture(autouse=True)
+def trusted(monkeypatch):
+    monkeypatch.setattr(get_config(), "trusted_proxies", ["127.0.0.1", "172.16.0.0/12"])
+
+
+def test_direct_client_cannot_spoof_forwarded_for():
+    assert admission.client_address(_request("203.0.113.9", "198.51.100.1")) == "203.0.113.9"
+
+
+def test_trusted_proxy_uses_rightmost_untrusted_hop():
+    # O cliente mandou "1.1.1.1" no header; o nginx acrescentou o IP real no fim
+    request = _request("172.18.0.3", "1.1.1.1, 203.0.113.9")
+    assert admission.client_address(request) == "203.0.113.9"
+
+
+def test_chain_of_trusted_proxies():
+    request = _request("127.0.0.1", "203.0.113.9, 172.18.0.3")
+    assert admission.client_address(request) == "203.0.113.9"
+
+
+def test_trusted_proxy_without_header_is_the_client():
+    assert admission.client_address(_request("127.0.0.1")) == "127.0.0.1"
+
+
+def test_identity_prefers_token_over_address():
+    with_token = admission.client_identity(_request("203.0.113.9", authorization="Bearer abc"))
+    assert with_token.startswith("token:") and "abc" not in with_token
+    assert admission.client_identity(_request("203.0.113.9")) == "ip:203.0.113.9"
@@ -0,0 +1,76 @@
+import asyncio
+import sqlite3
+
+from backend.core.jobs import DONE, JobManager
+
+
+async def _events(*events):
+    for event in events:
+        yield event
+
+
+async def _collect(stream) -> list[str]:
+    return [event async for event in stream]
+
+
+def test_job_is_invisible_to_other_clients(tmp_path):
+    async def scenario():
+        manager = JobManager(tmp_path / "jobs.sqlite3")
+        job = await manager.submit("chat", lambda: _events("segredo"), owner="alice")
+        await job.task
+
+        assert (await manager.status(job.id, "alice"))["status"] == DONE
+        assert await manager.status(job.id, "mallory") is None
+        assert await manager.subscribe(job.id, "mallory") is None
+        assert any("segredo" in e for e in await _collect(await manager.subscribe(job.id, "alice")))
+
+        # Outro worker uvicorn só tem o SQLite
+        other = JobManager(tmp_path / "jobs.sqlite3")
+        assert (await other.status(job.id, "alice"))["status"] == DONE
+        assert await other.status(job.id, "mallory") is None
+        assert await other.subscribe(job.id, "mallory") is None
+
+    asyncio.run(scenario())
+
+
+def test_only_owner_can_cancel(tmp_path):
+    async def scenario():
+        manager = JobManager(tmp_path / "jobs.sqlite3")
+        blocker = asyncio.Event()
+
+        async def slow():
+            await blocker.wait()
+            yield "ok"
+
+        job = await manager.submit("builder", slow, owner="alice")
+        other = JobManager(tmp_path / "jobs.sqlite3")
+        assert not await manager.cancel(job.id, "mallory")
+        assert not await other.cancel(job.id, "mallory")
+        assert await manager.cancel(job.id, "alice")
+        await asyncio.gather(job.task, return_exceptions=True)
+        blocker.set()
+
+    asyncio.run(scenario())
+
+
+def test_adds_owner_column_to_old_database(tmp_path):
+    db = tmp_path / "jobs.sqlite3"
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+        "events INTEGER NOT NULL DEFAULT 0, error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+        "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+    )
+    conn.execute("INSERT INTO jobs (id, kind, status, created_at) VALUES ('old', 'chat', 'done', 0)")
+    conn.commit()
+    conn.close()
+
+    async def scenario():
+        manager = JobManager(db)
+        job = await manager.submit("chat", lambda: _events("ok"), owner="alice")
+        await job.task
+        assert await JobManager(db).status(job.id, "alice") is not None
+        # Jobs anteriores à coluna ficam sem dono
+        assert await manager.status("old", "alice") is None
+
+    asyncio.run(scenario())
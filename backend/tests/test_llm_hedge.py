@@ -0,0 +1,50 @@
+"""_complete_hedged: cada modelo da cadeia roda em uma só das tarefas."""
+
+import asyncio
+
+import pytest
+
+from backend.core import llm
+
+
+def _fake_models(monkeypatch, behaviour: dict) -> list:
+    calls = []
+
+    async def complete(payload, model):
+        calls.append(model)
+        delay, outcome = behaviour[model]
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"model": outcome}
+
+    monkeypatch.setattr(llm, "_complete_with_retries", complete)
+    return calls
+
+
+def test_primary_failover_skips_model_taken_by_hedge(monkeypatch):
+    calls = _fake_models(monkeypatch, {
+        "a": (0.1, llm.LLMAPIError(503, "fora do ar")),
+        "b": (0.5, "b"),
+        "c": (0.0, "c"),
+    })
+    result = asyncio.run(llm._complete_hedged({}, ["a", "b", "c"], 0.02))
+    assert result == {"model": "c"}
+    assert sorted(calls) == ["a", "b", "c"]
+
+
+def test_hedge_wins_when_primary_is_slow(monkeypatch):
+    calls = _fake_models(monkeypatch, {"a": (1.0, "a"), "b": (0.0, "b")})
+    assert asyncio.run(llm._complete_hedged({}, ["a", "b"], 0.02)) == {"model": "b"}
+    assert calls == ["a", "b"]
+
+
+def test_real_error_is_reported_when_every_model_fails(monkeypatch):
+    _fake_models(monkeypatch, {
+        "a": (0.1, llm.LLMAPIError(503, "a caiu")),
+        "b": (0.0, llm.LLMAPIError(502, "b caiu")),
+    })
+    with pytest.raises(llm.LLMAPIError) as error:
+        asyncio.run(llm._complete_hedged({}, ["a", "b"], 0.02))
+    assert not isinstance(error.value, llm._ChainClaimed)
+    assert error.value.detail == "a caiu"
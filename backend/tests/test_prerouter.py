@@ -0,0 +1,57 @@
+"""preroute: só pedidos no imperativo, sem ambiguidade, chegam ao fast path."""
+
+import pytest
+
+from backend.agents.prerouter import AMBIGUOUS, CONFIDENT, preroute
+from backend.core.config import AgentConfig
+
+
+@pytest.mark.parametrize(
+    "message, tool, arguments",
+    [
+        ("crie uma planilha de gastos mensais", "ask_file_generator", {"file_type": "excel"}),
+        ("Gere um PDF com o resumo da reunião", "ask_file_generator", {"file_type": "pdf"}),
+        ("me gera uma planilha de vendas", "ask_file_generator", {"file_type": "excel"}),
+        ("faça um post para o instagram da padaria", "generate_ui_design", {}),
+        ("monte-me um carrossel sobre produtividade", "generate_ui_design", {}),
+        ("crie uma landing page para minha consultoria", "generate_web_page", {}),
+    ],
+)
+def test_imperative_requests_are_confident(message, tool, arguments):
+    guess = preroute(message)
+    assert guess.tool == tool
+    assert guess.confidence == CONFIDENT
+    assert arguments.items() <= guess.arguments.items()
+
+
+@pytest.mark.parametrize(
+    "message, tool, reason",
+    [
+        ("Como criar uma planilha no Excel?", "ask_file_generator", "pergunta"),
+        ("como gerar um pdf a partir do word", "ask_file_generator", "pergunta"),
+        ("Qual a melhor forma de montar um site?", "generate_web_page", "pergunta"),
+        ("não crie um pdf, só me explique", "ask_file_generator", "negação"),
+        ("Criei um post ontem, o que acha do texto?", "generate_ui_design", "pergunta"),
+        ("Criei um post ontem para a loja", "generate_ui_design", "verbo fora do imperativo"),
+        ("preciso criar uma apresentação para segunda", "ask_file_generator", "verbo fora do imperativo"),
+        ("crie um post e um site para a loja", "generate_ui_design", None),
+        ("crie um docx com o contrato", "ask_file_generator", None),
+        ("pesquise os preços e crie uma planilha", "ask_file_generator", None),
+    ],
+)
+def test_ambiguous_requests_fall_back_to_supervisor(message, tool, reason):
+    guess = preroute(message)
+    assert guess.tool == tool
+    assert guess.confidence == AMBIGUOUS
+    if reason:
+        assert guess.reason == reason
+
+
+@pytest.mark.parametrize("message", ["", "   ", "bom dia!", "me explique o que é uma planilha dinâmica"])
+def test_no_creation_request(message):
+    assert preroute(message) is None
+
+
+def test_fast_path_is_off_by_default():
+    # Até a concordância com o Supervisor justificar, nenhum palpite passa do limiar
+    assert AgentConfig().prerouter_min_confidence > CONFIDENT
@@ -0,0 +1,64 @@
+"""Busca web: Tavily com circuito aberto ou falhando cai no Brave."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from backend.core import circuit_breaker
+from backend.core.circuit_breaker import CircuitBreaker
+from backend.services import search_service
+
+_BRAVE_BODY = {"web": {"results": [{"title": "Resultado", "url": "https://exemplo.com", "description": "Trecho"}]}}
+
+
+class _Store:
+    async def get(self, provider: str, force_refresh: bool = False) -> str:
+        return {"tavily": "tvly-teste", "brave": "brave-teste"}.get(provider, "")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    seen = []
+
+    async def fake_request(method, url, **kwargs):
+        seen.append(url)
+        if "tavily" in url:
+            return httpx.Response(503, request=httpx.Request(method, url))
+        return httpx.Response(200, json=_BRAVE_BODY, request=httpx.Request(method, url))
+
+    monkeypatch.setattr(search_service, "http_request", fake_request)
+    monkeypatch.setattr("backend.core.credentials.get_credential_store", lambda: _Store())
+    for name in ("tavily", "brave"):
+        monkeypatch.setitem(circuit_breaker._breakers, name, CircuitBreaker(name, failure_threshold=1, open_seconds=60))
+    return seen
+
+
+def _open_tavily():
+    circuit_breaker._breakers["tavily"].record_failure()
+
+
+def test_search_web_uses_brave_when_tavily_circuit_is_open(calls):
+    _open_tavily()
+    data = asyncio.run(search_service.search_web("preço do café"))
+    assert data["results"][0]["url"] == "https://exemplo.com"
+    assert all("brave" in url for url in calls)  # Tavily nem foi chamada
+
+
+def test_search_web_uses_brave_when_tavily_fails(calls):
+    data = asyncio.run(search_service.search_web("preço do café"))
+    assert data["results"][0]["title"] == "Resultado"
+    assert ["tavily" in url for url in calls] == [True, False]
+
+
+def test_formatted_search_falls_back_with_brave_formatting(calls):
+    _open_tavily()
+    text = asyncio.run(search_service.search_web_formatted("preço do café"))
+    assert text.startswith('**Resultados para "preço do café":**')
+    assert "https://exemplo.com" in text
+
+
+def test_formatted_search_reports_error_when_both_fail(calls):
+    _open_tavily()
+    circuit_breaker._breakers["brave"].record_failure()
+    assert asyncio.run(search_service.search_web_formatted("x")).startswith("Erro na busca:")
@@ -0,0 +1,103 @@
+"""StreamedMessage (montagem das tool calls) e o preâmbulo retirado em _stream_supervisor_turn."""
+
+import asyncio
+import json
+
+from backend.agents import orchestrator
+from backend.core.llm import StreamedMessage
+
+
+def _text(content: str) -> dict:
+    return {"choices": [{"delta": {"content": content}}]}
+
+
+def _call(index: int, call_id: str = "", name: str = "", arguments: str = "") -> dict:
+    fragment = {"index": index, "function": {}}
+    if call_id:
+        fragment["id"] = call_id
+    if name:
+        fragment["function"]["name"] = name
+    if arguments:
+        fragment["function"]["arguments"] = arguments
+    return {"choices": [{"delta": {"tool_calls": [fragment]}}]}
+
+
+def _finish(reason: str) -> dict:
+    return {"choices": [{"delta": {}, "finish_reason": reason}]}
+
+
+def test_assembles_tool_calls_from_fragments():
+    message = StreamedMessage()
+    assert message.add(_text("Vou pesquisar.")) == ("Vou pesquisar.", [])
+    assert message.add(_call(0, "c1", "web_search", '{"que')) == ("", [])
+    assert message.add(_call(0, arguments='ry": "a"}')) == ("", [])
+
+    # Índice novo fecha a tool call anterior
+    _, completed = message.add(_call(1, "c2", "web_fetch", '{"url": "https://x"}'))
+    assert [c["id"] for c in completed] == ["c1"]
+    assert json.loads(completed[0]["function"]["arguments"]) == {"query": "a"}
+
+    _, completed = message.add(_finish("tool_calls"))
+    assert [c["id"] for c in completed] == ["c2"]
+    assert message.finish() == []
+
+    result = message.as_dict()
+    assert result["content"] == "Vou pesquisar."
+    assert [c["function"]["name"] for c in result["tool_calls"]] == ["web_search", "web_fetch"]
+
+
+def test_plain_answer_has_no_tool_calls():
+    message = StreamedMessage()
+    message.add(_text("Olá"))
+    message.add(_text(", tudo bem?"))
+    message.add(_finish("stop"))
+    assert not message.has_tool_calls
+    assert message.as_dict() == {"role": "assistant", "content": "Olá, tudo bem?"}
+
+
+def test_fragments_without_index_extend_the_last_call():
+    message = StreamedMessage()
+    message.add({"choices": [{"delta": {"tool_calls": [{"id": "c1", "function": {"name": "web_search"}}]}}]})
+    message.add({"choices": [{"delta": {"tool_calls": [{"function": {"arguments": "{}"}}]}}]})
+    assert message.finish()[0]["function"] == {"name": "web_search", "arguments": "{}"}
+
+
+def _run_turn(monkeypatch, chunks: list) -> tuple[list[tuple[str, str]], StreamedMessage]:
+    async def fake_stream(**kwargs):
+        for chunk in chunks:
+            yield chunk
+
+    monkeypatch.setattr(orchestrator, "stream_openrouter", fake_stream)
+    streamed = StreamedMessage()
+
+    async def collect():
+        return [(e.event_type, e.content) async for e in orchestrator._stream_supervisor_turn([], "m", [], streamed)]
+
+    return asyncio.run(collect()), streamed
+
+
+def test_short_preamble_before_tool_call_is_a_thought(monkeypatch):
+    events, streamed = _run_turn(monkeypatch, [
+        _text("Vou criar a planilha."),
+        _call(0, "c1", "ask_file_generator", "{}"),
+        _finish("tool_calls"),
+    ])
+    assert ("thought", "Vou criar a planilha.") in events
+    assert not any(kind in ("chunk", "retract") for kind, _ in events)
+    assert streamed.has_tool_calls
+
+
+def test_long_preamble_is_retracted_when_tool_call_arrives(monkeypatch):
+    preamble = "Claro! " + "Vou montar a planilha com as colunas pedidas e os totais por mês. " * 3
+    events, streamed = _run_turn(monkeypatch, [
+        _text(preamble),
+        _call(0, "c1", "ask_file_generator", "{}"),
+        _finish("tool_calls"),
+    ])
+    kinds = [kind for kind, _ in events]
+    assert "chunk" in kinds
+    retract = kinds.index("retract")
+    assert kinds.index("chunk") < retract
+    assert events[retract + 1] == ("thought", preamble.strip())
+    assert "chunk" not in kinds[retract:]
+    assert streamed.has_tool_calls
@@ -0,0 +1,105 @@
+"""fit_to_budget: corte de turnos antigos, piso das saídas de ferramentas e contexto do projeto."""
+
+from backend.core.tokens import (
+    _CONTEXT_FLOOR,
+    _TOOL_OUTPUT_FLOOR,
+    estimate_messages_tokens,
+    estimate_tokens,
+    fit_to_budget,
+)
+
+
+def _text(words: int, word: str = "palavra") -> str:
+    return " ".join(f"{word}{i}" for i in range(words))
+
+
+def _tool_call(call_id: str, name: str = "web_search") -> dict:
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": '{"query": "x"}'}}
+
+
+def _conversation() -> list:
+    return [
+        {"role": "system", "content": "Você é um assistente."},
+        {"role": "user", "content": _text(300)},
+        {"role": "assistant", "content": "", "tool_calls": [_tool_call("c1")]},
+        {"role": "tool", "tool_call_id": "c1", "content": _text(300, "resultado")},
+        {"role": "assistant", "content": _text(100, "resposta")},
+        {"role": "user", "content": _text(50, "segundo")},
+        {"role": "assistant", "content": _text(50, "resposta")},
+        {"role": "user", "content": "Pedido atual"},
+    ]
+
+
+def test_within_budget_returns_same_list():
+    messages = _conversation()
+    result, report = fit_to_budget(messages, 10**6)
+    assert result is messages
+    assert not report.changed
+    assert report.tokens_after == report.tokens_before
+
+
+def test_drops_whole_oldest_turns_only():
+    messages = _conversation()
+    total = estimate_messages_tokens(messages)
+    first_turn = estimate_messages_tokens(messages[1:5])
+    result, report = fit_to_budget(messages, total - first_turn + 1)
+
+    assert report.dropped_messages == 4
+    assert [m["role"] for m in result] == ["system", "user", "assistant", "user"]
+    assert result[1]["content"].startswith("segundo")
+    # Nenhum resultado de ferramenta fica sem a tool call que o originou
+    assert all(m["role"] != "tool" for m in result)
+    assert report.tokens_after <= report.budget
+    assert len(messages) == 8  # a lista original não muda
+
+
+def test_current_turn_is_kept_even_over_budget():
+    messages = _conversation()
+    result, report = fit_to_budget(messages, 10)
+    assert result[0]["role"] == "system"
+    assert result[-1] == messages[-1]
+    assert report.notes
+
+
+def test_tool_outputs_are_truncated_down_to_floor():
+    big = _text(3000, "linha")
+    messages = [
+        {"role": "system", "content": "Você é um assistente."},
+        {"role": "user", "content": "Resuma a página"},
+        {"role": "assistant", "content": "", "tool_calls": [_tool_call("c1", "web_fetch")]},
+        {"role": "tool", "tool_call_id": "c1", "content": big},
+    ]
+    result, report = fit_to_budget(messages, 100)
+
+    assert report.truncated_tool_outputs == 1
+    truncated = result[3]["content"]
+    assert "[truncado:" in truncated
+    assert big.startswith(truncated.split("\n... [truncado")[0])
+    assert estimate_tokens(truncated) >= _TOOL_OUTPUT_FLOOR * 0.9
+    assert messages[3]["content"] == big
+
+
+def test_project_context_blocks_are_trimmed_but_static_prompt_kept():
+    static = {"type": "text", "text": _text(100, "regra"), "cache_control": {"type": "ephemeral"}}
+    context = {"type": "text", "text": _text(2000, "contexto")}
+    messages = [
+        {"role": "system", "content": [static, context]},
+        {"role": "user", "content": "Pedido atual"},
+    ]
+    budget = estimate_messages_tokens(messages) - 1000
+    result, report = fit_to_budget(messages, budget)
+
+    blocks = result[0]["content"]
+    assert blocks[0] == static
+    assert report.context_tokens_removed > 0
+    assert _CONTEXT_FLOOR <= estimate_tokens(blocks[1]["text"]) < estimate_tokens(context["text"])
+    assert report.tokens_after <= budget
+    assert messages[0]["content"][1] is context
+
+
+def test_string_system_prompt_is_never_trimmed():
+    system = {"role": "system", "content": _text(2000, "regra")}
+    result, report = fit_to_budget([system, {"role": "user", "content": "oi"}], 50)
+    assert result[0] == system
+    assert report.context_tokens_removed == 0
+    assert report.notes
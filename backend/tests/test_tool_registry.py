@@ -0,0 +1,75 @@
+"""ToolRunner: validação, timeout e slot de concorrência preso até o trabalho terminar."""
+
+import asyncio
+import threading
+import time
+
+from backend.agents.tool_registry import ToolRunner, compile_validator, tool
+
+_SCHEMA = {"type": "object", "properties": {"seconds": {"type": "number"}}, "required": ["seconds"]}
+_running = {"thread": 0, "peak": 0}
+_running_lock = threading.Lock()
+
+
+@tool("_test_slow_thread", "teste", _SCHEMA, timeout=0.05, concurrency=1, executor="thread")
+def _slow_thread(args: dict) -> str:
+    with _running_lock:
+        _running["thread"] += 1
+        _running["peak"] = max(_running["peak"], _running["thread"])
+    time.sleep(float(args["seconds"]))
+    with _running_lock:
+        _running["thread"] -= 1
+    return "ok"
+
+
+@tool("_test_slow_async", "teste", _SCHEMA, timeout=0.05, concurrency=1)
+async def _slow_async(args: dict) -> str:
+    await asyncio.sleep(float(args["seconds"]))
+    return "ok"
+
+
+def test_validator_reports_missing_and_wrong_types():
+    validate = compile_validator({
+        "type": "object",
+        "properties": {"file_type": {"type": "string", "enum": ["pdf", "excel"]}, "rows": {"type": "array"}},
+        "required": ["file_type"],
+    })
+    assert validate({"file_type": "pdf", "extra": 1}) == []
+    assert validate({}) == ["campo obrigatório ausente: file_type"]
+    assert validate({"file_type": "docx", "rows": "x"}) == [
+        "file_type deve ser um de ['pdf', 'excel']",
+        "rows deveria ser array",
+    ]
+
+
+def test_invalid_arguments_become_error_text():
+    result = asyncio.run(ToolRunner().run("_test_slow_async", {"seconds": "muito"}))
+    assert result.startswith("Erro: argumentos inválidos")
+
+
+def test_thread_keeps_concurrency_slot_after_timeout():
+    runner = ToolRunner()
+
+    async def scenario():
+        first = await runner.run("_test_slow_thread", {"seconds": 0.3})
+        assert "tempo limite" in first
+        # A thread da primeira chamada ainda roda: a segunda espera o slot
+        waited = time.perf_counter()
+        assert await runner.run("_test_slow_thread", {"seconds": 0}) == "ok"
+        return time.perf_counter() - waited
+
+    assert asyncio.run(scenario()) > 0.15
+    assert _running["peak"] == 1
+    assert runner.metrics()["tools"]["_test_slow_thread"]["in_flight"] == 0
+
+
+def test_async_handler_is_cancelled_on_timeout():
+    runner = ToolRunner()
+
+    async def scenario():
+        started = time.perf_counter()
+        assert "tempo limite" in await runner.run("_test_slow_async", {"seconds": 5})
+        assert await runner.run("_test_slow_async", {"seconds": 0}) == "ok"
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) < 1
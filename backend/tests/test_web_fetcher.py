@@ -0,0 +1,75 @@
+"""detect_charset e html_to_text do leitor de páginas compartilhado."""
+
+import pytest
+
+from backend.services import web_fetcher
+from backend.services.web_fetcher import detect_charset, html_to_text
+
+_PAGE = """<!DOCTYPE html><html><head><title> Relatório
+  anual </title><style>.x{color:red}</style><script>track()</script></head>
+<body><header><nav><a href="/">Início</a></nav></header>
+<main><h1>Resultados</h1><p>Receita <b>cresceu</b> 12%.</p><p>Margem estável.</p>
+<ul><li>Vendas</li><li>Marketing</li></ul>
+<table><tr><td>Q1</td><td>10</td></tr><tr><td>Q2</td><td>12</td></tr></table>
+<aside>Leia também</aside></main><footer>Contato</footer></body></html>"""
+
+
+@pytest.mark.parametrize(
+    "data, content_type, expected",
+    [
+        (b"\xef\xbb\xbf<p>oi</p>", "text/html; charset=iso-8859-1", "utf-8-sig"),
+        ("<p>café</p>".encode("cp1252"), "text/html; charset=windows-1252", "cp1252"),
+        ("<p>café</p>".encode("utf-8"), "text/html", "utf-8"),
+        ("<p>café</p>".encode("latin-1"), "text/html", "cp1252"),
+        # Meta declara latin-1 mas o corpo é UTF-8 válido: o conteúdo decide
+        ("<meta charset='iso-8859-1'><p>café</p>".encode("utf-8"), "text/html", "utf-8"),
+        ("<meta charset='iso-8859-1'><p>café</p>".encode("latin-1"), "text/html", "iso8859-1"),
+        ('<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">'.encode(), "", "shift_jis"),
+        (b"<p>ok</p>", "text/html; charset=nao-existe", "utf-8"),
+    ],
+)
+def test_detect_charset(data, content_type, expected):
+    assert detect_charset(data, content_type) == expected
+
+
+def test_truncated_body_cut_inside_a_character_is_still_utf8():
+    data = ("<p>" + "ação " * 20 + "aç").encode("utf-8")[:-1]  # corta o "ç" ao meio
+    assert detect_charset(data, "text/html") == "cp1252"
+    assert detect_charset(data, "text/html", truncated=True) == "utf-8"
+
+
+def _both_parsers():
+    parsers = [web_fetcher._to_text_bs4]
+    if web_fetcher.PARSER == "lxml":
+        parsers.append(web_fetcher._to_text_lxml)
+    return parsers
+
+
+@pytest.mark.parametrize("parser", _both_parsers(), ids=lambda f: f.__name__)
+def test_html_to_text_drops_noise_and_keeps_blocks(parser, monkeypatch):
+    monkeypatch.setattr(web_fetcher, "_to_text", parser)
+    title, text = html_to_text(_PAGE)
+
+    assert title == "Relatório anual"
+    for noise in ("color:red", "track()", "Início", "Leia também", "Contato"):
+        assert noise not in text
+    assert "Receita cresceu 12%." in text  # inline não quebra a frase
+    assert "Resultados\n\nReceita cresceu 12%.\n\nMargem estável." in text
+    assert "Vendas\nMarketing" in text
+    assert "Q1 10\nQ2 12" in text
+
+
+@pytest.mark.parametrize("parser", _both_parsers(), ids=lambda f: f.__name__)
+def test_html_to_text_include_and_exclude_tags(parser, monkeypatch):
+    monkeypatch.setattr(web_fetcher, "_to_text", parser)
+    _, only_lists = html_to_text(_PAGE, include_tags=["ul"])
+    assert only_lists == "Vendas\nMarketing"
+
+    _, without_table = html_to_text(_PAGE, exclude_tags=["table"])
+    assert "Q1" not in without_table and "Margem estável." in without_table
+
+
+def test_html_to_text_empty_and_xml_declaration():
+    assert html_to_text("") == ("", "")
+    _, text = html_to_text("<?xml version='1.0' encoding='utf-8'?><html><body><p>oi</p></body></html>")
+    assert text == "oi"
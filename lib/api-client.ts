@@ -103,6 +103,8 @@ export const agentApi = {
 
                         if (event.type === 'chunk') {
                             fullContent += event.content;
+                        } else if (event.type === 'retract') {
+                            fullContent = '';
                         } else if (event.type === 'error') {
                             throw new Error(event.content);
                         }
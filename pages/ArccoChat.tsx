@@ -373,6 +373,20 @@ const ArccoChatPage: React.FC<ArccoChatPageProps> = ({
           return;
         }
 
+        // Texto já mostrado era preâmbulo de uma tool call: apaga a resposta parcial
+        // (o backend reenvia o texto como 'thought' logo em seguida)
+        if (type === 'retract') {
+          queue = [];
+          displayContent = '';
+          fullResponse = '';
+          hasStartedTalking = false;
+          setIsThoughtsExpanded(true);
+          setMessages(prev => prev.map(msg =>
+            msg.id === assistantMsgId ? { ...msg, content: '' } : msg
+          ));
+          return;
+        }
+
         if (type === 'chunk') {
           if (!hasStartedTalking) {
             hasStartedTalking = true;